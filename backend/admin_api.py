@@ -3,8 +3,9 @@ REMZA019 Gaming Admin Dashboard - API Endpoints
 FastAPI endpoints for admin functionality with Real-time YouTube Sync
 Real-time updates via broadcast system
 """
-from fastapi import APIRouter, HTTPException, Depends, Header, BackgroundTasks, Request
+from fastapi import APIRouter, HTTPException, Depends, Header, BackgroundTasks, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import asyncio
 import bcrypt
 import jwt
 from datetime import datetime, timedelta, timezone
@@ -15,6 +16,13 @@ import logging
 from dotenv import load_dotenv
 from pathlib import Path
 from audit_logger import audit_log
+from chat_assistant import invalidate_chat_assistant
+from live_status_service import get_live_status_service
+from pagination import paginate, export_response, register_pagination_index
+from dashboard_queries import Count, run_dashboard, get_dashboard_cache
+from security_anomaly_detector import get_anomaly_detector
+from site_bootstrap import invalidate_site_bootstrap
+from security_audit import security_auditor
 
 # Load environment variables
 load_dotenv(Path(__file__).parent / '.env')
@@ -27,6 +35,14 @@ from email_notifications import send_live_notifications_to_subscribers
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fire-and-forget fan-outs (Web Push go-live) - referenced here so they are not garbage collected
+_background_tasks = set()
+
+def _background_task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Background task {task.get_name()} failed: {task.exception()!r}")
+
 # Broadcast function for real-time updates
 async def broadcast_admin_update(event_type: str, data: dict):
     """Broadcast admin updates to all connected clients via WebSocket & SSE (dual mode)"""
@@ -80,6 +96,7 @@ TOKEN_EXPIRE_HOURS = 8
 
 # Security scheme
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Database connection
 def get_database():
@@ -141,6 +158,12 @@ async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(
         logger.error(f"Auth error: {e}")
         raise HTTPException(status_code=401, detail="Authentication failed")
 
+async def get_optional_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """The authenticated admin, or None when no bearer token was sent (for partly public endpoints)"""
+    if credentials is None:
+        return None
+    return await get_current_admin(credentials)
+
 # Rate limiting storage (in-memory, for production use Redis)
 from collections import defaultdict
 from datetime import datetime, timedelta
@@ -184,6 +207,7 @@ async def admin_login(login_data: LoginRequest, request: Request):
             
             # Audit log failed attempt
             audit_log.log_auth_attempt(login_data.username, False, ip_address, "Invalid credentials")
+            get_anomaly_detector().record_login_failure(ip_address, login_data.username, scope="admin")
             return LoginResponse(success=False, message="Invalid credentials")
         
         # Create access token
@@ -236,15 +260,58 @@ async def admin_logout(admin = Depends(get_current_admin)):
         logger.error(f"❌ Logout error: {e}")
         raise HTTPException(status_code=500, detail="Logout failed")
 
+@admin_router.post("/auth/change-password")
+async def change_admin_password(data: ChangePasswordRequest, admin = Depends(get_current_admin)):
+    """Change the admin password - new passwords are screened against breached lists"""
+    if not verify_password(data.current_password, admin['password_hash']):
+        raise HTTPException(status_code=400, detail="Current password is incorrect")
+    
+    validation = security_auditor.validate_password_strength(data.new_password)
+    if not validation["is_valid"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Weak password: {', '.join(validation['issues'])}"
+        )
+    
+    db = get_database()
+    await db.admin_users.update_one(
+        {'id': admin['id']},
+        {'$set': {'password_hash': hash_password(data.new_password)}}
+    )
+    await db.admin_activity.insert_one(AdminActivity(
+        admin_id=admin['id'],
+        action="change_password",
+        details={"timestamp": datetime.now(timezone.utc).isoformat()}
+    ).dict())
+    
+    logger.info(f"🔐 Admin password changed: {admin['username']}")
+    return {"success": True, "message": "Password changed successfully"}
+
 # Dashboard Endpoints
+async def get_content_counts(db) -> dict:
+    """Content counts shared by both admin dashboards - collections queried concurrently, briefly cached"""
+    async def compute():
+        results = await run_dashboard([
+            (db.recent_streams, {"recent_streams": Count()}),
+            (db.stream_schedule, {"scheduled_streams": Count()}),
+            (db.video_content, {"active_videos": Count({'is_active': True})}),
+            (db.recent_videos, {"recent_videos": Count()}),
+        ])
+        return {name: value for result in results for name, value in result.items()}
+    
+    return await get_dashboard_cache().get_or_compute("admin_content_counts", compute)
+
 @admin_router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats(admin = Depends(get_current_admin)):
     """Get dashboard statistics"""
     try:
         db = get_database()
         
-        # Get channel stats
-        channel_stats = await db.channel_stats.find_one({}, sort=[('updated_at', -1)])
+        # Channel stats and content counts in parallel
+        channel_stats, counts = await asyncio.gather(
+            db.channel_stats.find_one({}, sort=[('updated_at', -1)]),
+            get_content_counts(db)
+        )
         if not channel_stats:
             # Create default stats
             default_stats = ChannelStats(
@@ -257,16 +324,11 @@ async def get_dashboard_stats(admin = Depends(get_current_admin)):
             await db.channel_stats.insert_one(default_stats.dict())
             channel_stats = default_stats.dict()
         
-        # Count documents
-        recent_streams_count = await db.recent_streams.count_documents({})
-        scheduled_streams_count = await db.stream_schedule.count_documents({})
-        total_videos = await db.video_content.count_documents({'is_active': True})
-        
         return DashboardStats(
             channel_stats=ChannelStats(**channel_stats),
-            recent_streams_count=recent_streams_count,
-            scheduled_streams_count=scheduled_streams_count,
-            total_videos=total_videos,
+            recent_streams_count=counts["recent_streams"],
+            scheduled_streams_count=counts["scheduled_streams"],
+            total_videos=counts["active_videos"],
             last_updated=datetime.now(timezone.utc)
         )
         
@@ -324,6 +386,14 @@ async def toggle_live_status(update_data: UpdateLiveStatusRequest, admin = Depen
             except Exception as email_error:
                 logger.error(f"❌ Failed to send email notifications: {email_error}")
                 # Continue even if email fails
+            
+            # Web Push fan-out runs in the background - large subscriber sets take a few seconds
+            from notifications_api import push_live_notification
+            push_task = asyncio.create_task(
+                push_live_notification(update_data.live_game or "FORTNITE"), name="push_live_notification"
+            )
+            _background_tasks.add(push_task)
+            push_task.add_done_callback(_background_task_done)
         
         # Broadcast update to all clients
         await broadcast_admin_update("live_status_update", {
@@ -333,6 +403,9 @@ async def toggle_live_status(update_data: UpdateLiveStatusRequest, admin = Depen
             "manual_override": True
         })
         
+        # Update the cached status and in-process subscribers (already broadcast above)
+        await get_live_status_service().refresh(push=False, poll=False)
+        
         return {
             "success": True, 
             "message": f"Stream status MANUALLY set to {status} (YouTube sync will respect this)",
@@ -401,6 +474,11 @@ async def reset_admin_override(admin = Depends(get_current_admin)):
             "reset_by": admin.get('username')
         })
         
+        # Drop the override from the cached status and re-poll the platforms right away
+        live_status = get_live_status_service()
+        await live_status.refresh(poll=False)
+        live_status.request_refresh()
+        
         return {
             "success": True,
             "message": "Admin override reset - YouTube sync will now auto-update live status and videos"
@@ -473,6 +551,7 @@ async def get_stream_schedule(admin = Depends(get_current_admin)):
             
             # Reload schedule
             schedule = await db.stream_schedule.find({'is_active': True}, {"_id": 0}).to_list(length=None)
+            invalidate_site_bootstrap("default schedule created")
         
         return [StreamSchedule(**item) for item in schedule]
         
@@ -510,6 +589,10 @@ async def update_schedule_day(schedule_data: UpdateScheduleRequest, admin = Depe
             if 'updated_at' in item and isinstance(item['updated_at'], datetime):
                 item['updated_at'] = item['updated_at'].isoformat()
         
+        invalidate_chat_assistant("schedule updated")
+        get_live_status_service().invalidate_schedule()
+        invalidate_site_bootstrap("schedule updated")
+        
         # Broadcast schedule update
         await broadcast_admin_update("schedule_update", {
             "schedule": schedule_list,
@@ -552,6 +635,10 @@ async def delete_schedule_day(day: str, admin = Depends(get_current_admin)):
             if 'updated_at' in item and isinstance(item['updated_at'], datetime):
                 item['updated_at'] = item['updated_at'].isoformat()
         
+        invalidate_chat_assistant("schedule day removed")
+        get_live_status_service().invalidate_schedule()
+        invalidate_site_bootstrap("schedule day removed")
+        
         # Broadcast schedule update
         await broadcast_admin_update("schedule_update", {
             "schedule": schedule_list,
@@ -623,6 +710,9 @@ async def update_about_content(content_data: UpdateAboutRequest, admin = Depends
         
         logger.info(f"✅ About content updated: {len(content_list)} items, modified: {result.modified_count}, upserted: {result.upserted_id}")
         
+        invalidate_chat_assistant("about content updated")
+        invalidate_site_bootstrap("about content updated")
+        
         # Log activity
         await log_admin_activity(admin['id'], "update_about_content", {"content_length": len(content_list)})
         
@@ -728,14 +818,39 @@ async def update_featured_video(video_data: UpdateFeaturedVideoRequest, admin =
         raise HTTPException(status_code=500, detail="Failed to update featured video")
 
 # Recent Streams Management - Enhanced
+register_pagination_index(lambda: get_database().recent_streams, [("created_at", -1)], "id")
+
 @admin_router.get("/streams", response_model=List[RecentStream])
-async def get_recent_streams(admin = Depends(get_current_admin)):
-    """Get recent streams"""
+async def get_recent_streams(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    export: Optional[str] = None,
+    admin = Depends(get_current_admin)
+):
+    """Get recent streams, newest first (next page cursor in the X-Next-Cursor header)"""
+    db = get_database()
+    if export:
+        return export_response(
+            db.recent_streams, export, "recent_streams",
+            ["id", "title", "game", "duration", "views", "video_url", "thumbnail", "is_featured", "created_at"],
+            sort=[("created_at", -1), ("id", -1)], admin=admin
+        )
     try:
-        db = get_database()
-        streams = await db.recent_streams.find({}, {"_id": 0}).sort([('created_at', -1)]).to_list(length=None)
-        return [RecentStream(**stream) for stream in streams]
+        page = await paginate(
+            db.recent_streams,
+            sort=[("created_at", -1)],
+            tiebreaker="id",
+            projection={"_id": 0},
+            limit=limit,
+            cursor=cursor
+        )
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return [RecentStream(**stream) for stream in page["items"]]
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Get streams error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch streams")
@@ -939,9 +1054,7 @@ async def get_real_time_stats(admin = Depends(get_current_admin)):
                 logger.warning(f"⚠️ YouTube sync failed, using fallback: {e}")
         
         # Get counts
-        recent_streams_count = await db.recent_streams.count_documents({})
-        scheduled_streams_count = await db.stream_schedule.count_documents({})
-        recent_videos_count = await db.recent_videos.count_documents({})
+        counts = await get_content_counts(db)
         
         return {
             "channel_stats": channel_stats or {
@@ -951,9 +1064,9 @@ async def get_real_time_stats(admin = Depends(get_current_admin)):
                 "is_live": False,
                 "current_viewers": "0"
             },
-            "recent_streams_count": recent_streams_count,
-            "scheduled_streams_count": scheduled_streams_count,
-            "recent_videos_count": recent_videos_count,
+            "recent_streams_count": counts["recent_streams"],
+            "scheduled_streams_count": counts["scheduled_streams"],
+            "recent_videos_count": counts["recent_videos"],
             "last_updated": datetime.now(timezone.utc),
             "sync_status": "active"
         }
@@ -1077,6 +1190,7 @@ async def update_about_tags(
         )
         
         logger.info(f"✅ About tags updated: {len(tags)} tags")
+        invalidate_site_bootstrap("about tags updated")
         
         # Broadcast update
         await broadcast_admin_update("tags_update", {"tags": tags})
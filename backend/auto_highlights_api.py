@@ -10,11 +10,18 @@ from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-# emergentintegrations not available in production - commented out
-# from emergentintegrations.llm.chat import LlmChat, UserMessage
-# Note: Auto-highlights feature requires manual AI integration setup
+import json
 import uuid
 
+from highlight_detector import detect_highlight_windows
+
+# emergentintegrations is optional - without it highlights are titled from detector stats only
+try:
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    LLM_AVAILABLE = True
+except ImportError:
+    LLM_AVAILABLE = False
+
 # Load environment variables
 load_dotenv()
 
@@ -28,6 +35,7 @@ class HighlightRequest(BaseModel):
     duration_minutes: int
     chat_messages: List[Dict]
     game_events: Optional[List[Dict]] = []
+    stream_started_at: Optional[datetime] = None  # origin for ISO timestamps; earliest one if unset
     
 class HighlightResponse(BaseModel):
     highlight_id: str
@@ -39,62 +47,137 @@ class HighlightResponse(BaseModel):
     confidence_score: float
     reason: str
 
+HIGHLIGHT_SYSTEM_MESSAGE = """You are an expert gaming stream analyst. A local detector has already found the moments where chat velocity, hype emotes/keywords and unique chatters spiked against the stream's baseline.
+
+For each candidate window you receive its index, time range, stats, sample chat messages and game events. Decide which windows are real highlights and for each one provide:
+1. index (the candidate index you were given)
+2. Title (short, catchy)
+3. Description (what made this moment special)
+4. Confidence score (0-1, how sure you are this is highlight-worthy)
+5. Reason (why viewers would want to watch this)
+
+Skip candidates that look like spam or off-topic chatter. Respond ONLY with valid JSON array format."""
+
+
+def _fallback_title(candidate: Dict) -> str:
+    if candidate["events"]:
+        return str(candidate["events"][0].get("description") or candidate["events"][0].get("type", "Highlight"))[:60]
+    if candidate["hype_count"] >= candidate["message_count"] / 2:
+        return "Chat Goes Wild"
+    return "Chat Spike"
+
+
+def _candidate_reason(candidate: Dict) -> str:
+    return (
+        f"{candidate['message_count']} messages from {candidate['unique_chatters']} chatters "
+        f"({candidate['hype_count']} hype reactions) in {int(candidate['end_time'] - candidate['start_time'])}s"
+    )
+
+
+def _candidate_confidence(candidate: Dict, strongest: float) -> float:
+    return round(min(1.0, 0.5 + 0.5 * candidate["score"] / strongest), 3) if strongest else 0.5
+
+
+def _to_response(candidate: Dict, title: str, description: str, confidence: float, reason: str) -> HighlightResponse:
+    return HighlightResponse(
+        highlight_id=str(uuid.uuid4()),
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        title=title,
+        description=description,
+        start_time=float(candidate["start_time"]),
+        end_time=float(candidate["end_time"]),
+        confidence_score=confidence,
+        reason=reason
+    )
+
+
+async def _find_candidates(request: HighlightRequest) -> List[Dict]:
+    # Scoring is NumPy work on the full log - keep it off the event loop
+    return await asyncio.to_thread(
+        detect_highlight_windows,
+        request.chat_messages,
+        request.game_events or [],
+        request.duration_minutes * 60,
+        stream_start=request.stream_started_at,
+    )
+
+
+@router.post("/candidates")
+async def get_highlight_candidates(request: HighlightRequest):
+    """
+    Candidate highlight windows from the local chat-velocity detector (no LLM)
+    """
+    try:
+        candidates = await _find_candidates(request)
+        return {
+            "stream_id": request.stream_id,
+            "total_chat_messages": len(request.chat_messages),
+            "candidates": candidates
+        }
+    except Exception as e:
+        print(f"❌ Error detecting highlight candidates: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to detect highlights: {str(e)}")
+
+
 @router.post("/analyze", response_model=List[HighlightResponse])
 async def analyze_stream_for_highlights(request: HighlightRequest):
     """
-    Analyze stream data to automatically identify highlight moments using AI
+    Analyze stream data to automatically identify highlight moments.
+    The full chat log is scored locally; only candidate windows are sent to the LLM.
     """
     try:
-        # Initialize AI chat
+        candidates = await _find_candidates(request)
+        if not candidates:
+            return []
+        
+        strongest = max(candidate["score"] for candidate in candidates)
+        
+        if not LLM_AVAILABLE or not EMERGENT_LLM_KEY:
+            return [
+                _to_response(
+                    candidate,
+                    _fallback_title(candidate),
+                    f"Peak at {candidate['peak_time']:.0f}s",
+                    _candidate_confidence(candidate, strongest),
+                    _candidate_reason(candidate)
+                )
+                for candidate in candidates[:5]
+            ]
+        
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
             session_id=f"highlight-{request.stream_id}",
-            system_message="""You are an expert gaming stream analyst. Your job is to identify the most exciting moments from a stream based on chat reactions, viewer engagement, and game events. 
-            
-            Analyze the provided data and identify 3-5 key highlight moments. For each highlight, provide:
-            1. Exact timestamp (in seconds from stream start)
-            2. Title (short, catchy)
-            3. Description (what made this moment special)
-            4. Confidence score (0-1, how sure you are this is highlight-worthy)
-            5. Reason (why viewers would want to watch this)
-            
-            Focus on moments with:
-            - Sudden spikes in chat activity
-            - Excitement words (pog, wow, amazing, insane, wtf, etc.)
-            - Game events (kills, wins, achievements)
-            - Peak viewer reactions
-            
-            Respond ONLY with valid JSON array format."""
+            system_message=HIGHLIGHT_SYSTEM_MESSAGE
         ).with_model("openai", "gpt-4o-mini")
         
-        # Prepare analysis prompt
-        analysis_data = {
-            "stream_duration_minutes": request.duration_minutes,
-            "total_chat_messages": len(request.chat_messages),
-            "chat_sample": request.chat_messages[:100] if len(request.chat_messages) > 100 else request.chat_messages,
-            "game_events": request.game_events
-        }
+        candidate_lines = []
+        for index, candidate in enumerate(candidates):
+            candidate_lines.append(
+                f"Candidate {index}: {candidate['start_time']:.0f}s-{candidate['end_time']:.0f}s, "
+                f"peak {candidate['peak_time']:.0f}s, {_candidate_reason(candidate)}"
+            )
+            candidate_lines.extend(
+                f"  [{msg['timestamp']}s] {msg['user']}: {msg['text']}" for msg in candidate["sample_messages"]
+            )
+            candidate_lines.extend(
+                f"  EVENT [{event['timestamp']}s] {event['type']}: {event['description']}" for event in candidate["events"]
+            )
         
-        prompt = f"""Analyze this Fortnite stream data and identify highlight moments:
+        prompt = f"""Analyze these candidate highlight windows from a Fortnite stream:
 
 Stream Duration: {request.duration_minutes} minutes
 Total Chat Messages: {len(request.chat_messages)}
 
-Chat Messages (chronological sample):
-{chr(10).join([f"[{msg.get('timestamp', 0)}s] {msg.get('user', 'Unknown')}: {msg.get('text', '')}" for msg in request.chat_messages[:50]])}
+{chr(10).join(candidate_lines)}
 
-Game Events:
-{chr(10).join([f"[{event.get('timestamp', 0)}s] {event.get('type', 'Unknown')}: {event.get('description', '')}" for event in request.game_events])}
-
-Return JSON array of 3-5 highlights in this EXACT format:
+Return JSON array of up to 5 highlights in this EXACT format:
 [
   {{
-    "timestamp": 125.5,
+    "index": 0,
     "title": "Insane Victory Royale",
     "description": "Epic final kill with sniper headshot",
     "confidence_score": 0.95,
-    "reason": "Chat went crazy with 50+ messages in 10 seconds",
-    "duration": 30
+    "reason": "Chat went crazy with 50+ messages in 10 seconds"
   }}
 ]"""
 
@@ -102,24 +185,22 @@ Return JSON array of 3-5 highlights in this EXACT format:
         user_message = UserMessage(text=prompt)
         response = await chat.send_message(user_message)
         
-        # Parse AI response
-        import json
+        # Parse AI response - timing comes from the detector, not the model
         highlights_data = json.loads(response.strip())
         
-        # Convert to response format
         highlights = []
         for h in highlights_data:
-            highlight = HighlightResponse(
-                highlight_id=str(uuid.uuid4()),
-                timestamp=datetime.now(timezone.utc).isoformat(),
-                title=h.get("title", "Highlight"),
-                description=h.get("description", ""),
-                start_time=float(h.get("timestamp", 0)),
-                end_time=float(h.get("timestamp", 0)) + float(h.get("duration", 30)),
-                confidence_score=float(h.get("confidence_score", 0.7)),
-                reason=h.get("reason", "Viewer engagement spike")
-            )
-            highlights.append(highlight)
+            index = h.get("index")
+            if not isinstance(index, int) or not 0 <= index < len(candidates):
+                continue
+            candidate = candidates[index]
+            highlights.append(_to_response(
+                candidate,
+                h.get("title", _fallback_title(candidate)),
+                h.get("description", ""),
+                float(h.get("confidence_score", _candidate_confidence(candidate, strongest))),
+                h.get("reason", _candidate_reason(candidate))
+            ))
         
         return highlights
         
@@ -3,13 +3,20 @@ REMZA019 Gaming - Real-Time Chat System
 Handles member chat messages and broadcasting
 """
 
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
+import json
 import logging
+import time
 import uuid
 
+from fast_json import get_payload_cache
+from presence import get_presence_service
+from metrics import WS_BROADCAST_BYTES, WS_BROADCAST_DURATION, WS_BROADCAST_RECIPIENTS
+from ws_protocol import EncodedFrames, WireFormat, encode, event_frame, negotiate, receive_frame, send_encoded
+
 logger = logging.getLogger("chat")
 
 chat_router = APIRouter(prefix="/chat", tags=["chat"])
@@ -18,30 +25,93 @@ chat_router = APIRouter(prefix="/chat", tags=["chat"])
 class ChatConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        # Negotiated wire format per connection; v2 clients get seq-numbered appends
+        self.formats: Dict[WebSocket, WireFormat] = {}
+        # Presence key per connection (?viewer_id=... when the client sends one)
+        self.viewer_keys: Dict[WebSocket, str] = {}
+        self.seq = 0
+        # In-process consumers of new messages (e.g. the multi-streamer chat merge)
+        self.listeners: List[Callable[[dict], None]] = []
+    
+    def add_listener(self, listener: Callable[[dict], None]) -> Callable[[], None]:
+        """Register a callback for every new message; returns an unsubscribe function"""
+        self.listeners.append(listener)
+        return lambda: self.listeners.remove(listener) if listener in self.listeners else None
+    
+    def notify_listeners(self, message: dict):
+        for listener in list(self.listeners):
+            try:
+                listener(message)
+            except Exception as e:
+                logger.error(f"Chat listener failed: {e}")
     
     async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+        fmt = negotiate(websocket)
+        await websocket.accept(subprotocol=fmt.subprotocol)
         self.active_connections.append(websocket)
-        logger.info(f"💬 Chat client connected. Active: {len(self.active_connections)}")
+        self.formats[websocket] = fmt
+        viewer_key = websocket.query_params.get("viewer_id") or f"chat-{uuid.uuid4().hex}"
+        self.viewer_keys[websocket] = viewer_key
+        get_presence_service().heartbeat(viewer_key, "chat", connected=True, connection=str(id(websocket)))
+        logger.info(f"💬 Chat client connected ({fmt.label}). Active: {len(self.active_connections)}")
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+        self.formats.pop(websocket, None)
+        viewer_key = self.viewer_keys.pop(websocket, None)
+        if viewer_key:
+            get_presence_service().leave(viewer_key, "chat", connection=str(id(websocket)))
         logger.info(f"💬 Chat client disconnected. Active: {len(self.active_connections)}")
     
+    async def send(self, websocket: WebSocket, message: dict):
+        """Send a stateless message to one client in its wire format"""
+        fmt = self.formats.get(websocket, WireFormat())
+        await send_encoded(websocket, encode(fmt, event_frame(fmt, message)))
+    
+    async def send_history(self, websocket: WebSocket):
+        """Recent messages: "history" for v1, a "chat" channel snapshot at the current seq for v2"""
+        fmt = self.formats.get(websocket, WireFormat())
+        if fmt.version == 1:
+            frame = {"type": "history", "messages": recent_messages}
+        else:
+            frame = {"t": "snap", "ch": "chat", "seq": self.seq, "d": {"messages": recent_messages}}
+        await send_encoded(websocket, encode(fmt, frame))
+    
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients"""
+        await self._fan_out(EncodedFrames(lambda fmt: event_frame(fmt, message)))
+    
+    async def broadcast_new_message(self, chat_message: dict):
+        """Broadcast one new chat message ("new_message" for v1, a seq-numbered append for v2)"""
+        self.seq += 1
+        append = {"t": "append", "ch": "chat", "seq": self.seq, "d": chat_message}
+        legacy = {"type": "new_message", "message": chat_message}
+        await self._fan_out(EncodedFrames(lambda fmt: legacy if fmt.version == 1 else append))
+    
+    async def _fan_out(self, frames: EncodedFrames):
+        started = time.perf_counter()
         disconnected = []
-        for connection in self.active_connections:
+        bytes_by_format: Dict[str, int] = {}
+        for connection in list(self.active_connections):
+            fmt = self.formats.get(connection, WireFormat())
+            payload = frames.get(fmt)
             try:
-                await connection.send_json(message)
+                await send_encoded(connection, payload)
+                bytes_by_format[fmt.label] = bytes_by_format.get(fmt.label, 0) + len(payload)
             except Exception as e:
                 logger.error(f"Failed to send message: {e}")
                 disconnected.append(connection)
         
+        metric_labels = {"manager": "chat", "room": "chat"}
+        WS_BROADCAST_DURATION.observe(time.perf_counter() - started, metric_labels)
+        WS_BROADCAST_RECIPIENTS.inc(len(self.active_connections) - len(disconnected), metric_labels)
+        for label, sent_bytes in bytes_by_format.items():
+            WS_BROADCAST_BYTES.inc(sent_bytes, {**metric_labels, "format": label})
+        
         # Remove disconnected clients
         for conn in disconnected:
-            if conn in self.active_connections:
-                self.active_connections.remove(conn)
+            self.disconnect(conn)
 
 chat_manager = ChatConnectionManager()
 
@@ -63,12 +133,18 @@ class SendMessageRequest(BaseModel):
 # Store recent messages in memory (for new joiners)
 recent_messages: List[dict] = []
 MAX_RECENT_MESSAGES = 50
+RECENT_MESSAGES_CACHE_SECONDS = 60  # /send invalidates, the TTL is only a backstop
 
-@chat_router.get("/messages")
-async def get_recent_messages():
-    """Get recent chat messages"""
+async def _recent_messages_payload() -> dict:
     return {"messages": recent_messages}
 
+@chat_router.get("/messages")
+async def get_recent_messages(request: Request):
+    """Get recent chat messages (encoded once per new message)"""
+    return await get_payload_cache().respond(
+        request, "chat:recent", _recent_messages_payload, ttl=RECENT_MESSAGES_CACHE_SECONDS
+    )
+
 @chat_router.post("/send")
 async def send_message(request: SendMessageRequest):
     """Send a chat message and broadcast to all connected clients"""
@@ -90,11 +166,11 @@ async def send_message(request: SendMessageRequest):
         if len(recent_messages) > MAX_RECENT_MESSAGES:
             recent_messages.pop(0)
         
+        get_payload_cache().invalidate("chat:recent")
+        chat_manager.notify_listeners(message)
+        
         # Broadcast to all connected clients
-        await chat_manager.broadcast({
-            "type": "new_message",
-            "message": message
-        })
+        await chat_manager.broadcast_new_message(message)
         
         logger.info(f"💬 Message sent by {request.user}: {request.text[:50]}")
         
@@ -111,19 +187,31 @@ async def chat_websocket(websocket: WebSocket):
     
     try:
         # Send recent messages on connect
-        await websocket.send_json({
-            "type": "history",
-            "messages": recent_messages
-        })
+        await chat_manager.send_history(websocket)
         
         # Keep connection alive
         while True:
-            # Wait for messages from client (keep-alive pings)
-            data = await websocket.receive_text()
+            # Wait for messages from client (keep-alive pings, v2 resync requests;
+            # msgpack clients send binary frames)
+            try:
+                data = await receive_frame(websocket, chat_manager.formats.get(websocket, WireFormat()))
+            except ValueError:
+                continue
             
             # Echo back to confirm connection
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
+                await chat_manager.send(websocket, {"type": "pong"})
+                continue
+            request = data
+            if isinstance(data, str) and data.startswith("{"):
+                try:
+                    request = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+            if isinstance(request, dict):
+                if request.get("type") == "resync":
+                    # v2 client saw a gap in the chat seq - resend the history snapshot
+                    await chat_manager.send_history(websocket)
                 
     except WebSocketDisconnect:
         chat_manager.disconnect(websocket)
@@ -133,8 +221,9 @@ async def chat_websocket(websocket: WebSocket):
 
 @chat_router.get("/online-count")
 async def get_online_count():
-    """Get count of online users in chat"""
+    """Get count of online users in chat (across all workers, from presence)"""
+    count = (await get_presence_service().online(room="chat"))["online"]
     return {
-        "count": len(chat_manager.active_connections),
-        "online": len(chat_manager.active_connections) > 0
+        "count": count,
+        "online": count > 0
     }
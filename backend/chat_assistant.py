@@ -0,0 +1,330 @@
+"""
+REMZA019 Gaming - AI Chat Assistant Layer
+Response cache for repeated questions, per-session LLM chat reuse and
+token streaming for the /api/chat assistant
+"""
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Used when the schedule collection is empty or unreachable
+DEFAULT_SCHEDULE_LINES = [
+    "- Monday 19:00 - FORTNITE",
+    "- Tuesday 20:00 - COD Multiplayer",
+    "- Wednesday 19:30 - ROCKET RACING",
+    "- Thursday 20:00 - MODERN WARFARE",
+    "- Friday 19:00 - FORTNITE Weekend",
+    "- Saturday 18:00 - ROCKET RACING Tournament",
+    "- Sunday - REST DAY (No Stream)",
+]
+
+DEFAULT_ABOUT_LINES = [
+    "- Serbia-based casual gamer focused on FORTNITE, Call of Duty, and Modern Warfare",
+    "- Specializes in FORTNITE ROCKET RACING (tournament competitor)",
+    "- Streams honest gameplay with real statistics - NO fake content or exaggerated claims",
+    "- NOT an esports representative - just a passionate gamer",
+]
+
+DAY_NAMES = {
+    "MON": "Monday", "TUE": "Tuesday", "WED": "Wednesday", "THU": "Thursday",
+    "FRI": "Friday", "SAT": "Saturday", "SUN": "Sunday",
+}
+DAY_ORDER = list(DAY_NAMES)
+
+SYSTEM_MESSAGE_TEMPLATE = """You are 019 Solutions Assistant, a friendly AI helper for the 019 Solutions website.
+
+ABOUT REMZA019:
+{about}
+- Timezone: CET (Central European Time)
+- YouTube Channel: @remza019
+
+STREAMING SCHEDULE (CET):
+{schedule}
+
+COMMUNITY LINKS:
+- Discord: https://discord.gg/remza019
+- YouTube: http://www.youtube.com/@remza019
+- Twitch: https://www.twitch.tv/remza019
+- Twitter/X: https://twitter.com/remza019
+
+GAMING PHILOSOPHY:
+- Real gameplay sessions only
+- Honest gaming content approach
+- Focus on improving skills, not fake highlights
+- Community-first mindset
+- Help other gamers learn and improve
+
+Answer questions about gaming, streaming schedule, community, and provide helpful gaming tips. Keep responses friendly, authentic, and gaming-focused. Always maintain the honest, no-fake-content approach that REMZA019 represents."""
+
+# Filler that doesn't change the answer ("hey, what's the schedule??" == "what is the schedule")
+_FILLER_WORDS = {"hi", "hey", "hello", "pls", "please", "plz", "thanks", "thx", "yo", "bro"}
+# Apostrophes are stripped first (the sanitization middleware already removes them)
+_CONTRACTIONS = {"whats": "what is", "whos": "who is", "whens": "when is", "wheres": "where is"}
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_question(text: str) -> str:
+    """Canonical cache key for a question: case, accents, punctuation and filler insensitive"""
+    text = unicodedata.normalize("NFKD", text.lower().replace("'", "").replace("\u2019", ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    words = []
+    for word in _NON_WORD.sub(" ", text).split():
+        if word not in _FILLER_WORDS:
+            words.append(_CONTRACTIONS.get(word, word))
+    return " ".join(words)
+
+
+class _Session:
+    """Per-session LLM chat plus the turns the LLM has not seen yet"""
+    __slots__ = ("chat", "last_used", "turns", "unsent")
+
+    def __init__(self, now: float):
+        self.chat = None
+        self.last_used = now
+        self.turns = 0
+        # (question, answer) pairs served from cache - replayed to the LLM on the next miss
+        self.unsent: List[Tuple[str, str]] = []
+
+    def record_cached(self, question: str, answer: str):
+        self.turns += 1
+        self.unsent.append((question, answer))
+
+
+class ChatAssistant:
+    """
+    Wraps the LLM chat with:
+    - a normalized-question response cache for a session's first question only
+      (later answers depend on the conversation), cleared when schedule/about change
+    - one LlmChat object reused per session_id (bounded LRU with idle expiry)
+    - single-flight: concurrent identical questions share one LLM call
+    - token streaming when the chat client supports it
+    """
+
+    def __init__(
+        self,
+        chat_factory: Callable[[str, str], object],
+        message_factory: Callable[[str], object],
+        response_ttl: float = 900.0,
+        session_ttl: float = 1800.0,
+        max_cached_responses: int = 500,
+        max_sessions: int = 1000,
+    ):
+        self.chat_factory = chat_factory
+        self.message_factory = message_factory
+        self.response_ttl = response_ttl
+        self.session_ttl = session_ttl
+        self.max_cached_responses = max_cached_responses
+        self.max_sessions = max_sessions
+
+        self._responses: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._system_message: Optional[str] = None
+        self._system_lock = asyncio.Lock()
+        self._version = 0
+        self.stats = {"cache_hits": 0, "cache_misses": 0, "llm_calls": 0, "sessions_created": 0}
+
+    # ---------- context ----------
+    def invalidate(self, reason: str = "content"):
+        """Drop cached answers and the built system prompt (schedule/about changed)"""
+        self._version += 1
+        self._responses.clear()
+        self._system_message = None
+        # Existing sessions were primed with the old prompt
+        self._sessions.clear()
+        logger.info(f"🧹 Chat assistant cache invalidated ({reason})")
+
+    async def get_system_message(self, db) -> str:
+        if self._system_message is not None:
+            return self._system_message
+        async with self._system_lock:
+            if self._system_message is None:
+                self._system_message = await self._build_system_message(db)
+        return self._system_message
+
+    async def _build_system_message(self, db) -> str:
+        schedule_lines = DEFAULT_SCHEDULE_LINES
+        about_lines = DEFAULT_ABOUT_LINES
+        if db is not None:
+            try:
+                schedule = await db.stream_schedule.find(
+                    {"is_active": True}, {"_id": 0, "day": 1, "time": 1, "game": 1}
+                ).to_list(length=14)
+                if schedule:
+                    schedule.sort(key=lambda item: DAY_ORDER.index(item["day"]) if item.get("day") in DAY_ORDER else 99)
+                    schedule_lines = [
+                        f"- {DAY_NAMES.get(item.get('day'), item.get('day'))} {item.get('time', '')} - {item.get('game', '')}"
+                        for item in schedule
+                    ]
+                about = await db.about_content.find_one({}, {"_id": 0, "content": 1}, sort=[("updated_at", -1)])
+                if about and about.get("content"):
+                    about_lines = [f"- {line}" for line in about["content"]]
+            except Exception as e:
+                logger.warning(f"⚠️ Chat assistant context load failed, using defaults: {e}")
+        return SYSTEM_MESSAGE_TEMPLATE.format(about="\n".join(about_lines), schedule="\n".join(schedule_lines))
+
+    # ---------- caches ----------
+    def _cache_get(self, key: str) -> Optional[str]:
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at < time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return text
+
+    def _cache_put(self, key: str, text: str):
+        self._responses[key] = (time.monotonic() + self.response_ttl, text)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_cached_responses:
+            self._responses.popitem(last=False)
+
+    def _get_session(self, session_id: str) -> _Session:
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None or now - session.last_used >= self.session_ttl:
+            session = self._sessions[session_id] = _Session(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def _get_session_chat(self, session_id: str, session: _Session, db):
+        if session.chat is None:
+            system_message = await self.get_system_message(db)
+            session.chat = self.chat_factory(session_id, system_message)
+            self.stats["sessions_created"] += 1
+        return session.chat
+
+    def _llm_message(self, session: _Session, message: str):
+        """User message for the LLM, prefixed with turns it answered from cache"""
+        if not session.unsent:
+            return self.message_factory(message)
+        earlier = "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in session.unsent)
+        return self.message_factory(f"(Earlier in this conversation)\n{earlier}\n\n{message}")
+
+    def _cache_key(self, message: str) -> Optional[str]:
+        """None for filler-only messages ("hi!") - they normalize to nothing and must not share an entry"""
+        question = normalize_question(message)
+        return f"{self._version}:{question}" if question else None
+
+    # ---------- public API ----------
+    async def answer(self, message: str, session_id: str, db=None) -> Tuple[str, bool]:
+        """Return (response, served_from_cache)"""
+        session = self._get_session(session_id)
+        # Follow-ups depend on the conversation so far - always ask the LLM
+        key = None if session.turns else self._cache_key(message)
+        if key is None:
+            self.stats["cache_misses"] += 1
+            return await self._ask(session_id, session, message, db), False
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            session.record_cached(message, cached)
+            return cached, True
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["cache_hits"] += 1
+            response = await asyncio.shield(pending)
+            session.record_cached(message, response)
+            return response, True
+
+        self.stats["cache_misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._ask(session_id, session, message, db)
+            if key.startswith(f"{self._version}:"):
+                self._cache_put(key, response)
+            future.set_result(response)
+            return response, False
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiters-less failures don't log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _ask(self, session_id: str, session: _Session, message: str, db) -> str:
+        chat = await self._get_session_chat(session_id, session, db)
+        self.stats["llm_calls"] += 1
+        response = await chat.send_message(self._llm_message(session, message))
+        session.unsent.clear()
+        session.turns += 1
+        return response
+
+    async def stream(self, message: str, session_id: str, db=None) -> AsyncIterator[Tuple[str, bool]]:
+        """Yield (token, served_from_cache) chunks as they arrive"""
+        session = self._get_session(session_id)
+        key = None if session.turns else self._cache_key(message)
+        cacheable = key is not None
+        cached = self._cache_get(key) if cacheable else None
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            session.record_cached(message, cached)
+            yield cached, True
+            return
+
+        self.stats["cache_misses"] += 1
+        chat = await self._get_session_chat(session_id, session, db)
+        self.stats["llm_calls"] += 1
+        user_message = self._llm_message(session, message)
+
+        stream_method = getattr(chat, "stream_message", None)
+        if stream_method is None:
+            # Client has no token streaming - forward the full completion as one chunk
+            response = await chat.send_message(user_message)
+            session.unsent.clear()
+            session.turns += 1
+            if cacheable and key.startswith(f"{self._version}:"):
+                self._cache_put(key, response)
+            yield response, False
+            return
+
+        parts: List[str] = []
+        async for token in stream_method(user_message):
+            parts.append(token)
+            yield token, False
+        session.unsent.clear()
+        session.turns += 1
+        if cacheable and key.startswith(f"{self._version}:"):
+            self._cache_put(key, "".join(parts))
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "cached_responses": len(self._responses),
+            "active_sessions": len(self._sessions),
+            "context_version": self._version,
+        }
+
+
+# Global assistant instance (configured by server.py with the LLM client factories)
+_chat_assistant: Optional[ChatAssistant] = None
+
+def init_chat_assistant(chat_factory: Callable[[str, str], object], message_factory: Callable[[str], object]) -> ChatAssistant:
+    """Create the global chat assistant"""
+    global _chat_assistant
+    _chat_assistant = ChatAssistant(chat_factory, message_factory)
+    return _chat_assistant
+
+def get_chat_assistant() -> Optional[ChatAssistant]:
+    """Get the global chat assistant (None until server.py configures it)"""
+    return _chat_assistant
+
+def invalidate_chat_assistant(reason: str):
+    """Invalidate cached answers - call from admin write paths that change assistant context"""
+    if _chat_assistant is not None:
+        _chat_assistant.invalidate(reason)
@@ -0,0 +1,385 @@
+"""
+REMZA019 Gaming - Multi-Source Chat Merge Engine
+Subscribes to N chat sources (our own chat_api stream plus pluggable
+platform adapters) and merges them into one timestamp-ordered feed with a
+k-way heap merge. A message is released once every active source has a
+later message queued, or once it is `max_lateness` seconds old - so an idle
+source delays the feed by at most that much. One merged feed is shared by
+every client watching the same set of streamers. Messages carrying an id
+that was already merged (an adapter replaying after a reconnect) are dropped.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import re
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LATENESS = 2.0   # seconds a message may wait for slower sources
+SOURCE_BUFFER_SIZE = 200     # per-source queue; a full queue blocks that source's pump
+CLIENT_BUFFER_SIZE = 100     # per-client queue; a slow client drops its oldest messages
+RECENT_MESSAGES = 50
+SEEN_IDS = 1000              # message ids remembered for duplicate detection
+
+TWITCH_IRC_URL = "wss://irc-ws.chat.twitch.tv:443"
+TWITCH_RECONNECT_SECONDS = 5.0
+
+# Streamer IDs whose chat is our own site chat (chat_api)
+HOUSE_STREAMER_IDS = {"remza019", "remza019_twitch"}
+
+
+def _timestamp(value) -> float:
+    """Epoch seconds from an ISO string, datetime or number (naive values are local time, as chat_api writes them)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return time.time()
+
+
+# ---------- sources ----------
+class ChatSource(ABC):
+    """Base adapter: yields chat message dicts in (roughly) timestamp order"""
+
+    def __init__(self, source_id: str):
+        self.source_id = source_id
+
+    @abstractmethod
+    def stream(self) -> AsyncIterator[Dict]:
+        """Async generator of {id, username, user_id, message, timestamp, ...} dicts"""
+
+    async def close(self):
+        pass
+
+
+class LocalChatSource(ChatSource):
+    """Our own chat_api messages, delivered through its listener hook"""
+
+    def __init__(self, source_id: str = "site"):
+        super().__init__(source_id)
+        # Push-based: chat_api can't be blocked, so this buffer drops oldest when full
+        self.buffer: deque = deque(maxlen=SOURCE_BUFFER_SIZE)
+        self._ready = asyncio.Event()
+        self._unsubscribe: Optional[Callable] = None
+
+    def _on_message(self, message: Dict):
+        self.buffer.append(message)
+        self._ready.set()
+
+    async def stream(self) -> AsyncIterator[Dict]:
+        from chat_api import chat_manager
+        self._unsubscribe = chat_manager.add_listener(self._on_message)
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self.buffer:
+                message = self.buffer.popleft()
+                yield {
+                    "id": message.get("id"),
+                    "username": message.get("user"),
+                    "user_id": message.get("user_id"),
+                    "level": message.get("level"),
+                    "message": message.get("text"),
+                    "timestamp": message.get("timestamp"),
+                }
+
+    async def close(self):
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+
+class FakeChatSource(ChatSource):
+    """Replays a fixed list of messages - for local testing and demos"""
+
+    def __init__(self, source_id: str, messages: Iterable[Dict], interval: float = 0.0):
+        super().__init__(source_id)
+        self.messages = list(messages)
+        self.interval = interval
+
+    async def stream(self) -> AsyncIterator[Dict]:
+        for message in self.messages:
+            if self.interval:
+                await asyncio.sleep(self.interval)
+            yield message
+
+
+# IRCv3 tag value escapes (\s = space, \: = semicolon, ...)
+_TAG_ESCAPE = re.compile(r"\\(.)")
+_TAG_ESCAPES = {"s": " ", ":": ";", "\\": "\\", "r": "\r", "n": "\n"}
+
+
+def parse_twitch_privmsg(line: str) -> Optional[Dict]:
+    """One IRC line (`@tags :nick!user@host PRIVMSG #channel :text`) to a chat message, None for other commands"""
+    tags: Dict[str, str] = {}
+    if line.startswith("@"):
+        raw_tags, _, line = line[1:].partition(" ")
+        for item in raw_tags.split(";"):
+            key, _, value = item.partition("=")
+            tags[key] = _TAG_ESCAPE.sub(lambda m: _TAG_ESCAPES.get(m.group(1), m.group(1)), value)
+    prefix, _, rest = line.partition(" ")
+    command, _, rest = rest.partition(" ")
+    if command != "PRIVMSG" or not prefix.startswith(":"):
+        return None
+    _channel, _, text = rest.partition(" :")
+    sent_ms = tags.get("tmi-sent-ts", "")
+    sent = int(sent_ms) / 1000 if sent_ms.isdigit() else time.time()
+    return {
+        "id": tags.get("id") or None,
+        "username": tags.get("display-name") or prefix[1:].split("!", 1)[0],
+        "user_id": tags.get("user-id"),
+        "message": text,
+        "timestamp": datetime.fromtimestamp(sent, timezone.utc).isoformat(),
+    }
+
+
+class TwitchChatSource(ChatSource):
+    """A Twitch channel's chat, read anonymously over Twitch's IRC WebSocket"""
+
+    def __init__(self, source_id: str, channel: str, url: str = TWITCH_IRC_URL):
+        super().__init__(source_id)
+        self.channel = channel.lower().lstrip("#")
+        self.url = url
+
+    async def stream(self) -> AsyncIterator[Dict]:
+        import aiohttp
+        while True:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.url, heartbeat=60) as ws:
+                        await ws.send_str("CAP REQ :twitch.tv/tags")
+                        # justinfan* logins are Twitch's read-only anonymous accounts
+                        await ws.send_str("PASS SCHMOOPIIE")
+                        await ws.send_str(f"NICK justinfan{random.randint(10000, 99999)}")
+                        await ws.send_str(f"JOIN #{self.channel}")
+                        async for frame in ws:
+                            if frame.type != aiohttp.WSMsgType.TEXT:
+                                break
+                            for line in frame.data.split("\r\n"):
+                                if line.startswith("PING"):
+                                    await ws.send_str("PONG" + line[4:])
+                                    continue
+                                message = parse_twitch_privmsg(line)
+                                if message is not None:
+                                    yield message
+                logger.warning(f"⚠️ Twitch chat #{self.channel} disconnected, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Twitch chat #{self.channel} failed: {e}")
+            await asyncio.sleep(TWITCH_RECONNECT_SECONDS)
+
+
+# platform -> factory(streamer_id) returning a ChatSource
+_adapters: Dict[str, Callable[[str], ChatSource]] = {}
+
+def register_chat_adapter(platform: str, factory: Callable[[str], ChatSource]):
+    """Plug in a chat adapter for a platform (twitch, youtube, kick, ...)"""
+    _adapters[platform] = factory
+
+
+# ---------- merge ----------
+class ChatMergeEngine:
+    """Timestamp-ordered k-way merge of several chat sources with bounded lateness"""
+
+    def __init__(self, sources: List[ChatSource], max_lateness: float = DEFAULT_MAX_LATENESS,
+                 clock: Callable[[], float] = time.time):
+        self.sources = sources
+        self.max_lateness = max_lateness
+        self.clock = clock
+        self.queues = [asyncio.Queue(maxsize=SOURCE_BUFFER_SIZE) for _ in sources]
+        self.active = [True] * len(sources)
+        self.recent: deque = deque(maxlen=RECENT_MESSAGES)
+        self.subscribers: Dict[str, asyncio.Queue] = {}
+        self.stats = {"merged": 0, "late": 0, "client_drops": 0, "duplicates": 0}
+        self._seen_ids: deque = deque(maxlen=SEEN_IDS)
+        self._seen: set = set()
+        self._arrival = asyncio.Event()
+        self._seq = itertools.count()
+        self._last_emitted = float("-inf")
+        self._tasks: List[asyncio.Task] = []
+
+    # ---------- pumps ----------
+    async def _pump(self, index: int):
+        source = self.sources[index]
+        try:
+            async for message in source.stream():
+                # Blocks when this source's queue is full - backpressure stays per source
+                await self.queues[index].put(message)
+                self._arrival.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Chat source {source.source_id} failed: {e}")
+        finally:
+            self.active[index] = False
+            self._arrival.set()
+
+    def _normalize(self, index: int, message: Dict) -> Dict:
+        source_id = self.sources[index].source_id
+        return {
+            **message,
+            "id": message.get("id") or str(uuid.uuid4()),
+            "streamer_id": message.get("streamer_id", source_id),
+            "source": source_id,
+        }
+
+    # ---------- merge loop ----------
+    async def _merge(self):
+        heap: List[tuple] = []
+        has_head = [False] * len(self.sources)
+        while True:
+            self._arrival.clear()
+            for index, queue in enumerate(self.queues):
+                if not has_head[index] and not queue.empty():
+                    message = self._normalize(index, queue.get_nowait())
+                    heapq.heappush(heap, (_timestamp(message.get("timestamp")), next(self._seq), index, message))
+                    has_head[index] = True
+
+            if not heap:
+                if not any(self.active):
+                    return
+                await self._arrival.wait()
+                continue
+
+            ts, _, index, message = heap[0]
+            # Safe to release when no active source could still deliver something earlier
+            waiting_on = any(self.active[i] and not has_head[i] for i in range(len(self.sources)))
+            wait = ts + self.max_lateness - self.clock() if waiting_on else 0
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._arrival.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                if self._arrival.is_set():
+                    continue
+
+            heapq.heappop(heap)
+            has_head[index] = False
+            self._emit(ts, message)
+
+    def _emit(self, ts: float, message: Dict):
+        if message["id"] in self._seen:
+            self.stats["duplicates"] += 1
+            return
+        if len(self._seen_ids) == self._seen_ids.maxlen:
+            self._seen.discard(self._seen_ids[0])
+        self._seen_ids.append(message["id"])
+        self._seen.add(message["id"])
+        if ts < self._last_emitted:
+            # Arrived after its slot was already passed; delivered as-is, flagged
+            message["late"] = True
+            self.stats["late"] += 1
+        else:
+            self._last_emitted = ts
+        self.stats["merged"] += 1
+        self.recent.append(message)
+        for queue in self.subscribers.values():
+            if queue.full():
+                queue.get_nowait()
+                self.stats["client_drops"] += 1
+            queue.put_nowait(message)
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._pump(i)) for i in range(len(self.sources))]
+        self._tasks.append(asyncio.create_task(self._merge()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        for source in self.sources:
+            await source.close()
+
+    def subscribe(self) -> tuple:
+        """Returns (subscriber_id, queue) of merged messages"""
+        subscriber_id = str(uuid.uuid4())
+        self.subscribers[subscriber_id] = asyncio.Queue(maxsize=CLIENT_BUFFER_SIZE)
+        return subscriber_id, self.subscribers[subscriber_id]
+
+    def unsubscribe(self, subscriber_id: str):
+        self.subscribers.pop(subscriber_id, None)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "sources": [s.source_id for s in self.sources],
+            "active_sources": sum(self.active),
+            "subscribers": len(self.subscribers),
+            "queued": [q.qsize() for q in self.queues],
+        }
+
+
+class ChatMergeHub:
+    """One shared, reference-counted merge engine per distinct set of sources"""
+
+    def __init__(self):
+        self.engines: Dict[tuple, ChatMergeEngine] = {}
+
+    def resolve_sources(self, streamers: Dict[str, str]) -> tuple:
+        """
+        Map {streamer_id: platform} to source factories.
+        Returns (key, {source_id: factory}, unsupported streamer IDs)
+        """
+        factories: Dict[str, Callable[[], ChatSource]] = {}
+        unsupported = []
+        for streamer_id, platform in streamers.items():
+            if streamer_id in HOUSE_STREAMER_IDS:
+                # Every house channel shares the one site chat
+                factories.setdefault("site", lambda: LocalChatSource("site"))
+            elif platform in _adapters:
+                factories[streamer_id] = lambda sid=streamer_id, p=platform: _adapters[p](sid)
+            else:
+                unsupported.append(streamer_id)
+        return tuple(sorted(factories)), factories, unsupported
+
+    def acquire(self, key: tuple, factories: Dict[str, Callable[[], ChatSource]]) -> ChatMergeEngine:
+        engine = self.engines.get(key)
+        if engine is None:
+            engine = ChatMergeEngine([factories[source_id]() for source_id in key])
+            engine.start()
+            self.engines[key] = engine
+            logger.info(f"💬 Chat merge started for {', '.join(key)}")
+        return engine
+
+    async def release(self, key: tuple, subscriber_id: str):
+        engine = self.engines.get(key)
+        if engine is None:
+            return
+        engine.unsubscribe(subscriber_id)
+        if not engine.subscribers:
+            del self.engines[key]
+            await engine.stop()
+            logger.info(f"💬 Chat merge stopped for {', '.join(key)}")
+
+    def get_stats(self) -> Dict:
+        return {"feeds": {"+".join(key): engine.get_stats() for key, engine in self.engines.items()}}
+
+
+# Global hub instance
+chat_merge_hub = ChatMergeHub()
+
+def get_chat_merge_hub() -> ChatMergeHub:
+    """Get the global chat merge hub"""
+    return chat_merge_hub
@@ -11,6 +11,7 @@ import logging
 from datetime import datetime
 
 from admin_api import get_current_admin
+from site_bootstrap import invalidate_site_bootstrap
 
 logger = logging.getLogger("customization_api")
 
@@ -102,6 +103,7 @@ async def save_customization(
         )
         
         logger.info(f"✅ Customization saved by {admin.get('username')}")
+        invalidate_site_bootstrap("customization saved")
         
         # Broadcast update to all clients
         await broadcast_customization_update(data.dict())
@@ -137,6 +139,7 @@ async def reset_customization(admin = Depends(get_current_admin)):
         )
         
         logger.info(f"✅ Customization reset to defaults by {admin.get('username')}")
+        invalidate_site_bootstrap("customization reset")
         
         # Broadcast update
         await broadcast_customization_update(default_data.dict())
@@ -0,0 +1,101 @@
+"""
+REMZA019 Gaming - Dashboard Query Layer
+Admin dashboards used to issue one count_documents per number, one after the
+other. Here a dashboard is declared as named counts/pipelines per collection,
+compiled into a single $facet aggregation per collection, and the collections
+are queried concurrently. Results are cached for a few seconds so a dashboard
+refresh storm costs one round of queries.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_SECONDS = float(os.environ.get('DASHBOARD_CACHE_SECONDS', '10'))
+
+
+class Count:
+    """A facet that counts the documents matching `query`"""
+    __slots__ = ("query",)
+
+    def __init__(self, query: Optional[Dict] = None):
+        self.query = query or {}
+
+
+Facet = Union[Count, List[Dict]]
+DashboardSpec = Sequence[Tuple[object, Dict[str, Facet]]]
+
+
+def compile_facets(facets: Dict[str, Facet]) -> List[Dict]:
+    """{name: Count | pipeline} -> one-stage $facet pipeline"""
+    stages = {}
+    for name, facet in facets.items():
+        if isinstance(facet, Count):
+            stages[name] = ([{"$match": facet.query}] if facet.query else []) + [{"$count": "n"}]
+        else:
+            stages[name] = list(facet)
+    return [{"$facet": stages}]
+
+
+async def run_facets(collection, facets: Dict[str, Facet]) -> Dict:
+    """One aggregation for every facet on `collection`; counts come back as ints, pipelines as lists"""
+    rows = await collection.aggregate(compile_facets(facets)).to_list(length=1)
+    row = rows[0] if rows else {}
+    results = {}
+    for name, facet in facets.items():
+        values = row.get(name, [])
+        if isinstance(facet, Count):
+            results[name] = values[0]["n"] if values else 0
+        else:
+            results[name] = values
+    return results
+
+
+async def run_dashboard(spec: DashboardSpec) -> List[Dict]:
+    """Run each collection's facets concurrently; results in spec order"""
+    return list(await asyncio.gather(*(run_facets(collection, facets) for collection, facets in spec)))
+
+
+class DashboardCache:
+    """Short-lived per-dashboard result cache; concurrent misses share one computation"""
+
+    def __init__(self, ttl: float = DASHBOARD_CACHE_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, object]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def get_or_compute(self, name: str, compute: Callable[[], Awaitable[object]],
+                             ttl: Optional[float] = None):
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] > time.monotonic():
+            self.stats["hits"] += 1
+            return entry[1]
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] > time.monotonic():
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+            value = await compute()
+            self._entries[name] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            return value
+
+    def invalidate(self, name: Optional[str] = None):
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+
+# Global dashboard cache
+dashboard_cache = DashboardCache()
+
+def get_dashboard_cache() -> DashboardCache:
+    """Get the global dashboard result cache"""
+    return dashboard_cache
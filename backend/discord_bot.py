@@ -33,6 +33,7 @@ bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
 # Track last stream status for notifications
 last_stream_status = False
 notified_users = set()  # Users who want live notifications
+live_status_unsubscribe = None  # Set when running inside the API process
 
 # Day name mapping
 DAY_NAMES = {
@@ -50,8 +51,8 @@ async def on_ready():
     logger.info(f'✅ Discord Bot logged in as {bot.user.name} (ID: {bot.user.id})')
     logger.info(f'Connected to {len(bot.guilds)} server(s)')
     
-    # Start background tasks
-    if not check_stream_status.is_running():
+    # Start background tasks (in-process bots get pushed transitions instead of polling)
+    if live_status_unsubscribe is None and not check_stream_status.is_running():
         check_stream_status.start()
     
     logger.info('🔄 Stream monitoring started!')
@@ -384,9 +385,51 @@ async def help_command(ctx):
 
 # ==================== BACKGROUND TASKS ====================
 
+async def announce_live(game: str, viewers: str):
+    """Post the LIVE embed to every guild and DM users who opted in with !notify"""
+    embed = discord.Embed(
+        title="🔴 REMZA019 JE LIVE!",
+        description=f"🎮 {game}",
+        color=discord.Color.red()
+    )
+    embed.add_field(name="👥 Viewers", value=viewers, inline=True)
+    embed.add_field(name="📺 Gledaj", value="[YouTube](https://youtube.com/@REMZA019)", inline=True)
+    embed.set_footer(text="🔔 Koristi !notify za personalizovane notifikacije")
+    
+    # Broadcast to all guilds
+    for guild in bot.guilds:
+        # Find general or first text channel
+        channel = discord.utils.get(guild.text_channels, name='general')
+        if not channel:
+            channel = guild.text_channels[0] if guild.text_channels else None
+        
+        if channel:
+            try:
+                await channel.send("@everyone", embed=embed)
+            except:
+                logger.warning(f"Could not send to {guild.name}")
+    
+    # Send DM to notified users
+    for user_id in notified_users:
+        try:
+            user = await bot.fetch_user(user_id)
+            await user.send(embed=embed)
+        except:
+            logger.warning(f"Could not DM user {user_id}")
+    
+    logger.info("✅ Live notification sent!")
+
+async def on_live_status_change(status: dict, previous: dict):
+    """Live status service subscriber - called once per transition, no polling"""
+    global last_stream_status
+    if status.get('is_live') and not previous.get('is_live'):
+        await bot.wait_until_ready()
+        await announce_live(status.get('live_game') or 'FORTNITE', status.get('current_viewers') or '0')
+    last_stream_status = bool(status.get('is_live'))
+
 @tasks.loop(minutes=2)
 async def check_stream_status():
-    """Background task - provera live statusa svakih 2 minuta"""
+    """Background task - provera live statusa svakih 2 minuta (only when the bot runs as its own process)"""
     global last_stream_status
     
     try:
@@ -398,40 +441,7 @@ async def check_stream_status():
                     
                     # Notify when going live
                     if is_live and not last_stream_status:
-                        game = data.get('live_game', 'FORTNITE')
-                        viewers = data.get('current_viewers', '0')
-                        
-                        # Broadcast to all guilds
-                        for guild in bot.guilds:
-                            # Find general or first text channel
-                            channel = discord.utils.get(guild.text_channels, name='general')
-                            if not channel:
-                                channel = guild.text_channels[0] if guild.text_channels else None
-                            
-                            if channel:
-                                embed = discord.Embed(
-                                    title="🔴 REMZA019 JE LIVE!",
-                                    description=f"🎮 {game}",
-                                    color=discord.Color.red()
-                                )
-                                embed.add_field(name="👥 Viewers", value=viewers, inline=True)
-                                embed.add_field(name="📺 Gledaj", value="[YouTube](https://youtube.com/@REMZA019)", inline=True)
-                                embed.set_footer(text="🔔 Koristi !notify za personalizovane notifikacije")
-                                
-                                try:
-                                    await channel.send("@everyone", embed=embed)
-                                except:
-                                    logger.warning(f"Could not send to {guild.name}")
-                        
-                        # Send DM to notified users
-                        for user_id in notified_users:
-                            try:
-                                user = await bot.fetch_user(user_id)
-                                await user.send(embed=embed)
-                            except:
-                                logger.warning(f"Could not DM user {user_id}")
-                        
-                        logger.info("✅ Live notification sent!")
+                        await announce_live(data.get('live_game') or 'FORTNITE', data.get('current_viewers') or '0')
                     
                     last_stream_status = is_live
                     
@@ -460,5 +470,26 @@ def run_discord_bot():
     except Exception as e:
         logger.error(f"❌ Failed to start Discord bot: {e}")
 
+async def start_discord_bot_in_process(live_status_service):
+    """
+    Run the bot inside the API process, subscribed to the live status service
+    (no HTTP polling of /api/live/status)
+    """
+    global live_status_unsubscribe, last_stream_status
+    if DISCORD_BOT_TOKEN == 'PENDING_USER_INPUT' or not DISCORD_BOT_TOKEN:
+        logger.warning("⚠️ DISCORD_BOT_TOKEN not set! Discord bot will not start.")
+        return
+    
+    last_stream_status = live_status_service.get_status().get('is_live', False)
+    live_status_unsubscribe = live_status_service.subscribe(on_live_status_change)
+    try:
+        logger.info("🤖 Starting Discord bot in-process (live status push)...")
+        await bot.start(DISCORD_BOT_TOKEN)
+    except Exception as e:
+        logger.error(f"❌ Failed to start Discord bot: {e}")
+    finally:
+        live_status_unsubscribe()
+        live_status_unsubscribe = None
+
 if __name__ == "__main__":
     run_discord_bot()
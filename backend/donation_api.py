@@ -5,12 +5,16 @@ Support the gaming channel with secure payment processing
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks, Depends
 from pydantic import BaseModel, EmailStr, Field
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import hmac
+import time
 import uuid
 import json
 import os
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
 # emergentintegrations not available in production - commented out
 # from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 # Note: Stripe integration requires manual setup with stripe library
@@ -20,6 +24,9 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 
+from admin_api import get_current_admin
+from webhook_ingest import get_webhook_queue
+
 # Load environment variables
 load_dotenv()
 
@@ -36,6 +43,11 @@ PAYPAL_CLIENT_ID = os.environ.get('PAYPAL_CLIENT_ID', '')
 PAYPAL_CLIENT_SECRET = os.environ.get('PAYPAL_CLIENT_SECRET', '')
 PAYPAL_MODE = os.environ.get('PAYPAL_MODE', 'sandbox')  # 'sandbox' or 'live'
 
+# Stripe webhook signing secret (whsec_...)
+STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+STRIPE_SIGNATURE_TOLERANCE = 300  # seconds
+DONATION_STEP_LEASE_SECONDS = 120  # a crashed worker's claim on a side effect expires after this
+
 
 # Database connection
 MONGO_URL = os.environ.get('MONGO_URL')
@@ -142,12 +154,18 @@ DONATION_NOTIFICATION_TEMPLATE = """
 </html>
 """
 
-async def send_donation_receipt(donor_email: str, donation_data: Dict):
-    """Send donation receipt email to donor"""
+def _send_smtp(msg: MIMEMultipart):
+    with smtplib.SMTP('smtp.gmail.com', 587, timeout=30) as server:
+        server.starttls()
+        server.login(SENDER_EMAIL, GMAIL_APP_PASSWORD)
+        server.send_message(msg)
+
+async def send_donation_receipt(donor_email: str, donation_data: Dict) -> bool:
+    """Send donation receipt email to donor; False if sending failed"""
     try:
         if not GMAIL_APP_PASSWORD:
             logger.warning("Gmail app password not configured, skipping receipt email")
-            return
+            return True
         
         # Format donor message
         donor_message = ""
@@ -173,23 +191,22 @@ async def send_donation_receipt(donor_email: str, donation_data: Dict):
         html_part = MIMEText(html_content, 'html')
         msg.attach(html_part)
         
-        # Send email
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
+        # Send email (blocking SMTP runs in a thread)
+        await asyncio.to_thread(_send_smtp, msg)
         
         logger.info(f"✅ Donation receipt sent to {donor_email}")
+        return True
         
     except Exception as e:
         logger.error(f"❌ Error sending donation receipt: {e}")
+        return False
 
-async def notify_admin_donation(donation_data: Dict):
-    """Notify admin about new donation"""
+async def notify_admin_donation(donation_data: Dict) -> bool:
+    """Notify admin about new donation; False if sending failed"""
     try:
         if not GMAIL_APP_PASSWORD:
             logger.warning("Gmail app password not configured, skipping admin notification")
-            return
+            return True
         
         # Format donor message
         donor_message = ""
@@ -215,16 +232,15 @@ async def notify_admin_donation(donation_data: Dict):
         html_part = MIMEText(html_content, 'html')
         msg.attach(html_part)
         
-        # Send email
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
+        # Send email (blocking SMTP runs in a thread)
+        await asyncio.to_thread(_send_smtp, msg)
         
         logger.info(f"✅ Donation notification sent to admin")
+        return True
         
     except Exception as e:
         logger.error(f"❌ Error sending donation notification: {e}")
+        return False
 
 # API Endpoints
 
@@ -370,7 +386,7 @@ async def get_donation_status(
             )
             
             # Process successful donation
-            background_tasks.add_task(process_successful_donation, transaction)
+            background_tasks.add_task(_process_donation_after_poll, transaction)
         
         return {
             "status": checkout_status.status,
@@ -384,99 +400,230 @@ async def get_donation_status(
         logger.error(f"Get donation status error: {e}")
         raise HTTPException(status_code=500, detail="Failed to get donation status")
 
+class DonationStepInProgress(RuntimeError):
+    """Another worker holds the lease on a donation step - retry once it finished or expired"""
+
+async def _dedupe_donations(db) -> int:
+    """Delete duplicate session_id donations left by older code, keeping the first recorded"""
+    removed = 0
+    duplicates = db.donations.aggregate([
+        {"$match": {"session_id": {"$exists": True}}},
+        {"$sort": {"created_at": 1}},
+        {"$group": {"_id": "$session_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    async for group in duplicates:
+        result = await db.donations.delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+    return removed
+
+async def ensure_donation_indexes(db=None):
+    """One donation per checkout session - makes donation processing idempotent (built at startup)"""
+    db = db if db is not None else await get_database()
+    try:
+        await db.donations.create_index("session_id", unique=True, sparse=True)
+    except OperationFailure as e:
+        # Older code could record a session twice; the unique index can't build over that
+        removed = await _dedupe_donations(db)
+        logger.warning(f"⚠️ donations.session_id unique index failed ({e}); removed {removed} duplicate donations")
+        await db.donations.create_index("session_id", unique=True, sparse=True)
+
+async def _run_donation_step(db, session_id: str, step: str, action) -> bool:
+    """
+    Apply a side effect once per session. The caller leases `step` on the donation
+    record, runs `action` and only then marks the step done; a failed action (an
+    exception or False) releases the lease and raises, so the webhook queue retries.
+    Returns False if the step is already done; raises DonationStepInProgress while
+    another worker holds the lease, so the event is retried rather than completed
+    (the lease expires if that worker died).
+    """
+    now = datetime.now()
+    lease = f"{step}_claimed_at"
+    claimed = await db.donations.find_one_and_update(
+        {"session_id": session_id, step: {"$ne": True},
+         "$or": [{lease: {"$exists": False}},
+                 {lease: {"$lt": now - timedelta(seconds=DONATION_STEP_LEASE_SECONDS)}}]},
+        {"$set": {lease: now}}
+    )
+    if claimed is None:
+        if await db.donations.find_one({"session_id": session_id, step: True}, {"_id": 1}):
+            return False
+        raise DonationStepInProgress(f"Donation step {step} for {session_id} is leased by another worker")
+    try:
+        done = await action()
+    except Exception:
+        await db.donations.update_one({"session_id": session_id}, {"$unset": {lease: ""}})
+        raise
+    if done is False:
+        await db.donations.update_one({"session_id": session_id}, {"$unset": {lease: ""}})
+        raise RuntimeError(f"Donation step {step} failed for {session_id}")
+    await db.donations.update_one({"session_id": session_id}, {"$set": {step: True}, "$unset": {lease: ""}})
+    return True
+
 async def process_successful_donation(transaction: Dict):
-    """Process successful donation - send emails and update goals"""
+    """
+    Process successful donation - record it, update totals, send emails.
+    Safe to call repeatedly for the same session (webhook retries, status polling):
+    every side effect is leased on the donation record and marked done only after
+    it succeeded, so a failure is retried instead of being skipped.
+    """
     try:
-        # Prepare donation data for emails
-        donation_data = {
+        db = await get_database()
+        session_id = transaction["session_id"]
+        
+        # Record individual donation
+        donation_record = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
             "amount": transaction["amount"],
             "currency": transaction["currency"],
             "package_name": transaction["package_name"],
-            "donor_name": transaction.get("donor_name", "Anonymous Supporter"),
+            "donor_name": transaction.get("donor_name") or "Anonymous",
             "message": transaction.get("message", ""),
-            "date": datetime.now().strftime("%B %d, %Y at %I:%M %p"),
-            "transaction_id": transaction["session_id"][:16]
+            "created_at": datetime.now(),
+            "is_public": True  # Can be displayed on website
         }
-        
-        # Send receipt to donor if email provided
-        if transaction.get("donor_email"):
-            await send_donation_receipt(transaction["donor_email"], donation_data)
-        
-        # Notify admin about donation
-        await notify_admin_donation(donation_data)
-        
-        # Update donation goals
-        db = await get_database()
+        try:
+            await db.donations.insert_one(donation_record)
+        except DuplicateKeyError:
+            pass
         
         # Add to total donations
-        await db.donation_stats.update_one(
-            {"type": "total"},
-            {
-                "$inc": {
-                    "total_amount": transaction["amount"],
-                    "total_donations": 1
+        async def apply_stats():
+            await db.donation_stats.update_one(
+                {"type": "total"},
+                {
+                    "$inc": {
+                        "total_amount": transaction["amount"],
+                        "total_donations": 1
+                    },
+                    "$set": {"updated_at": datetime.now()}
                 },
-                "$set": {"updated_at": datetime.now()}
-            },
-            upsert=True
-        )
+                upsert=True
+            )
+        await _run_donation_step(db, session_id, "stats_applied", apply_stats)
         
-        # Record individual donation
-        donation_record = {
-            "id": str(uuid.uuid4()),
-            "session_id": transaction["session_id"],
+        # Prepare donation data for emails
+        donation_data = {
             "amount": transaction["amount"],
             "currency": transaction["currency"],
             "package_name": transaction["package_name"],
-            "donor_name": transaction.get("donor_name", "Anonymous"),
+            "donor_name": transaction.get("donor_name") or "Anonymous Supporter",
             "message": transaction.get("message", ""),
-            "created_at": datetime.now(),
-            "is_public": True  # Can be displayed on website
+            "date": datetime.now().strftime("%B %d, %Y at %I:%M %p"),
+            "transaction_id": session_id[:16]
         }
         
-        await db.donations.insert_one(donation_record)
+        # Send receipt to donor if email provided
+        if transaction.get("donor_email"):
+            await _run_donation_step(db, session_id, "receipt_sent",
+                                     lambda: send_donation_receipt(transaction["donor_email"], donation_data))
+        
+        # Notify admin about donation
+        await _run_donation_step(db, session_id, "admin_notified", lambda: notify_admin_donation(donation_data))
         
         logger.info(f"✅ Processed successful donation: ${transaction['amount']} from {transaction.get('donor_name', 'Anonymous')}")
         
+    except DonationStepInProgress as e:
+        logger.info(f"⏳ {e} - will retry")
+        raise
     except Exception as e:
         logger.error(f"❌ Error processing successful donation: {e}")
+        raise
+
+async def _process_donation_after_poll(transaction: Dict):
+    """Status-poll path: the Stripe webhook owns retries, so a concurrent run is left to it"""
+    try:
+        await process_successful_donation(transaction)
+    except DonationStepInProgress:
+        pass
+
+def verify_stripe_signature(payload: bytes, signature_header: str, secret: str) -> bool:
+    """Check a Stripe-Signature header (t=...,v1=...) against the signing secret"""
+    try:
+        parts = dict(item.split("=", 1) for item in signature_header.split(","))
+        timestamp = int(parts["t"])
+    except (ValueError, KeyError):
+        return False
+    if abs(time.time() - timestamp) > STRIPE_SIGNATURE_TOLERANCE:
+        return False
+    expected = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    signatures = [v for k, v in (item.split("=", 1) for item in signature_header.split(",")) if k == "v1"]
+    return any(hmac.compare_digest(expected, candidate) for candidate in signatures)
+
+async def handle_stripe_checkout_completed(event: Dict):
+    """Webhook worker: checkout.session.completed"""
+    session = event["payload"]["data"]["object"]
+    session_id = session["id"]
+    payment_status = session.get("payment_status")
+    db = await get_database()
+    
+    # Update transaction
+    await db.payment_transactions.update_one(
+        {"session_id": session_id},
+        {
+            "$set": {
+                "payment_status": "completed" if payment_status == "paid" else payment_status,
+                "webhook_processed": True,
+                "updated_at": datetime.now()
+            }
+        }
+    )
+    if payment_status != "paid":
+        return
+    
+    transaction = await db.payment_transactions.find_one({"session_id": session_id})
+    if not transaction:
+        raise ValueError(f"No payment transaction for session {session_id}")
+    await process_successful_donation(transaction)
+
+get_webhook_queue().register_handler("stripe", "checkout.session.completed", handle_stripe_checkout_completed)
 
 @donation_router.post("/webhook/stripe")
 async def stripe_webhook(request: Request):
-    """Handle Stripe webhooks"""
+    """
+    Handle Stripe webhooks - verify, store and acknowledge;
+    processing happens in the webhook queue workers
+    """
+    body = await request.body()
+    signature = request.headers.get("Stripe-Signature")
+    
+    if not signature:
+        raise HTTPException(status_code=400, detail="Missing Stripe signature")
+    if not STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=500, detail="Stripe webhook secret not configured")
+    if not verify_stripe_signature(body, signature, STRIPE_WEBHOOK_SECRET):
+        raise HTTPException(status_code=400, detail="Invalid Stripe signature")
+    
     try:
-        body = await request.body()
-        signature = request.headers.get("Stripe-Signature")
-        
-        if not signature:
-            raise HTTPException(status_code=400, detail="Missing Stripe signature")
-        
-        stripe_checkout = await get_stripe_checkout(request)
-        webhook_response = await stripe_checkout.handle_webhook(body, signature)
-        
-        logger.info(f"Stripe webhook received: {webhook_response.event_type}")
-        
-        # Handle specific webhook events
-        if webhook_response.event_type == "checkout.session.completed":
-            db = await get_database()
-            
-            # Update transaction
-            await db.payment_transactions.update_one(
-                {"session_id": webhook_response.session_id},
-                {
-                    "$set": {
-                        "payment_status": webhook_response.payment_status,
-                        "webhook_processed": True,
-                        "updated_at": datetime.now()
-                    }
-                }
-            )
-        
-        return {"success": True}
-        
+        event = json.loads(body)
+        result = await get_webhook_queue().ingest("stripe", event["id"], event.get("type", ""), event)
+    except (ValueError, KeyError):
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
     except Exception as e:
+        # Not stored - let Stripe retry
         logger.error(f"Stripe webhook error: {e}")
-        raise HTTPException(status_code=400, detail="Webhook processing failed")
+        raise HTTPException(status_code=503, detail="Webhook could not be stored")
+    
+    return {"success": True, "duplicate": result["duplicate"]}
+
+@donation_router.get("/webhooks/stats")
+async def get_webhook_stats(admin = Depends(get_current_admin)):
+    """Webhook queue counters and events by status (Admin only)"""
+    return await get_webhook_queue().get_stats()
+
+@donation_router.get("/webhooks/dead-letter")
+async def get_dead_letter_webhooks(limit: int = 50, admin = Depends(get_current_admin)):
+    """Webhook events that exhausted their retries (Admin only)"""
+    events = await get_webhook_queue().dead_letters(min(limit, 500))
+    return {"events": events, "count": len(events)}
+
+@donation_router.post("/webhooks/{event_key}/retry")
+async def retry_dead_letter_webhook(event_key: str, admin = Depends(get_current_admin)):
+    """Requeue a dead-lettered webhook event (Admin only)"""
+    if not await get_webhook_queue().retry(event_key):
+        raise HTTPException(status_code=404, detail="Dead-lettered event not found")
+    return {"success": True, "message": f"Event {event_key} requeued"}
 
 @donation_router.get("/recent")
 async def get_recent_donations(limit: int = 10):
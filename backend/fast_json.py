@@ -0,0 +1,207 @@
+"""
+REMZA019 Gaming - Fast JSON Response Pipeline
+JSON is encoded with orjson when installed (stdlib json otherwise). Hot public
+list endpoints return trusted dicts straight from Mongo/memory through
+PayloadCache, which keeps the encoded bytes plus gzip/brotli copies per key, so
+a cache hit costs an Accept-Encoding lookup and no model validation,
+jsonable_encoder pass or compression. PAYLOAD_CACHE_ENABLED=false restores the
+plain stdlib path (used by json_bench.py as the baseline).
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:
+    orjson = None
+    ORJSONResponse = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_CACHE_ENABLED = os.environ.get('PAYLOAD_CACHE_ENABLED', 'true').lower() != 'false'
+PAYLOAD_CACHE_MAX_ENTRIES = int(os.environ.get('PAYLOAD_CACHE_MAX_ENTRIES', '1024'))
+COMPRESS_MIN_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# App-wide default: same jsonable_encoder pass, faster final encode
+DefaultJSONResponse = ORJSONResponse or JSONResponse
+
+
+def encode_default(value):
+    """Fallback for types orjson doesn't know natively (ObjectId, Decimal, pydantic models, sets)"""
+    if hasattr(value, "dict") and callable(value.dict):
+        return value.dict()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode trusted data (dicts/lists of plain values, datetimes) to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=encode_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored, '*' matches anything"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding -> {coding: q}"""
+    encodings = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding.strip().lower()] = q
+    return encodings
+
+
+class CachedPayload:
+    """Encoded body plus precompressed variants, built once per cache fill"""
+    __slots__ = ("body", "gzip_body", "br_body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        self.expires_at = time.monotonic() + ttl
+        compress = len(body) >= COMPRESS_MIN_BYTES
+        self.gzip_body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0) if compress else None
+        self.br_body = brotli.compress(body, quality=BROTLI_QUALITY) if compress and brotli is not None else None
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Smallest acceptable variant: br, then gzip, then identity"""
+        if self.gzip_body is None:
+            return self.body, None
+        accepted = accepted_encodings(accept_encoding)
+        if self.br_body is not None and accepted.get("br", 0) > 0:
+            return self.br_body, "br"
+        if accepted.get("gzip", 0) > 0:
+            return self.gzip_body, "gzip"
+        return self.body, None
+
+
+class PayloadCache:
+    """Short-lived cache of encoded + compressed responses; concurrent misses share one build"""
+
+    def __init__(self, enabled: bool = PAYLOAD_CACHE_ENABLED, max_entries: int = PAYLOAD_CACHE_MAX_ENTRIES):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedPayload] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._epoch = 0  # bumped by invalidate(); a build that straddles one is served but not stored
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "bytes_sent": 0, "bytes_uncompressed": 0,
+                      "evictions": 0}
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones, until there is room for one more"""
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if entry.expires_at <= now]:
+            del self._entries[key]
+            self.stats["evictions"] += 1
+        while len(self._entries) >= self.max_entries:
+            # dicts keep insertion order: the first key is the oldest fill
+            del self._entries[next(iter(self._entries))]
+            self.stats["evictions"] += 1
+        # Locks are only needed while a build is in flight
+        for key in [k for k, lock in self._locks.items() if k not in self._entries and not lock.locked()]:
+            del self._locks[key]
+
+    async def _payload(self, key: str, producer: Callable[[], Awaitable[Any]], ttl: float) -> CachedPayload:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.stats["hits"] += 1
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self.stats["hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+            epoch = self._epoch
+            entry = CachedPayload(dumps(await producer()), ttl)
+            if epoch != self._epoch:
+                return entry
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = entry
+            return entry
+
+    async def respond(self, request, key: str, producer: Callable[[], Awaitable[Any]], ttl: float) -> Response:
+        """
+        Serve `producer()`'s data under `key`, cached for `ttl` seconds.
+        The producer must return JSON-ready data (dicts/lists/str/int/datetime).
+        """
+        if not self.enabled:
+            return JSONResponse(jsonable_encoder(await producer()))
+
+        entry = await self._payload(key, producer, ttl)
+        headers = {"ETag": entry.etag, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        body, encoding = entry.negotiate(request.headers.get("accept-encoding"))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        self.stats["bytes_sent"] += len(body)
+        self.stats["bytes_uncompressed"] += len(entry.body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, prefix: str):
+        """Drop every entry whose key starts with `prefix`"""
+        self._epoch += 1
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "encoder": "orjson" if orjson is not None else "json",
+            "brotli": brotli is not None,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+# Global payload cache
+payload_cache = PayloadCache()
+
+def get_payload_cache() -> PayloadCache:
+    """Get the global precompressed payload cache"""
+    return payload_cache
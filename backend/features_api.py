@@ -6,6 +6,8 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 import logging
 
+from site_bootstrap import invalidate_site_bootstrap
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -88,6 +90,7 @@ async def admin_create_feature(
         
         await db.features.insert_one(feature_doc)
         logger.info(f"Created feature: {feature_id}")
+        invalidate_site_bootstrap("feature created")
         
         # Return without _id
         feature_doc.pop("_id", None)
@@ -124,6 +127,7 @@ async def admin_update_feature(
         # Fetch updated feature
         updated_feature = await db.features.find_one({"id": feature_id}, {"_id": 0})
         logger.info(f"Updated feature: {feature_id}")
+        invalidate_site_bootstrap("feature updated")
         
         return FeatureInDB(**updated_feature)
     except HTTPException:
@@ -146,6 +150,7 @@ async def admin_delete_feature(
             raise HTTPException(status_code=404, detail="Feature not found")
         
         logger.info(f"Deleted feature: {feature_id}")
+        invalidate_site_bootstrap("feature deleted")
         return {"message": "Feature deleted successfully"}
     except HTTPException:
         raise
@@ -169,6 +174,7 @@ async def admin_reorder_features(
             )
         
         logger.info(f"Reordered {len(feature_ids)} features")
+        invalidate_site_bootstrap("features reordered")
         return {"message": "Features reordered successfully"}
     except Exception as e:
         logger.error(f"Error reordering features: {e}")
@@ -0,0 +1,243 @@
+"""
+REMZA019 Gaming - Chat Velocity Spike Detector
+Bins a full stream chat log and game events into time windows and scores
+message rate, hype (emote/keyword) bursts and unique chatters against a
+rolling baseline. Only the resulting candidate windows go to the LLM.
+"""
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Chat reactions that usually follow a highlight moment
+HYPE_KEYWORDS = {
+    "pog", "pogchamp", "poggers", "pogu", "wow", "insane", "wtf", "omg", "omfg", "clutch",
+    "gg", "ggs", "ez", "sheesh", "kekw", "lul", "lol", "lmao", "hype", "clip", "clipit",
+    "letsgo", "goat", "nuts", "crazy", "w", "monkas", "pepega", "kreygasm", "bravo", "svaka",
+}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_EMOJI_RE = re.compile("[\U0001F300-\U0001FAFF☀-➿]")
+
+# Relative weight of game events when scoring a bin
+GAME_EVENT_WEIGHTS = {
+    "win": 5.0, "victory": 5.0, "victory_royale": 5.0, "elimination": 1.0, "kill": 1.0,
+    "multi_kill": 2.5, "achievement": 2.0, "death": 0.5, "raid": 3.0, "donation": 1.0,
+}
+DEFAULT_EVENT_WEIGHT = 1.0
+
+# Score weights: rate, hype, unique chatters, game events
+SCORE_WEIGHTS = (1.0, 1.25, 0.75, 1.0)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Naive timestamps are UTC (chat logs and Mongo store them that way)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """ISO timestamp -> aware UTC datetime; None for numbers (already seconds) and garbage"""
+    try:
+        float(value)
+        return None
+    except (TypeError, ValueError):
+        pass
+    try:
+        return _as_utc(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def _to_seconds(values: List, stream_start: Optional[datetime] = None) -> np.ndarray:
+    """
+    Timestamps as seconds from stream start (numbers pass through, ISO strings are converted).
+    Callers converting several series pass the same stream_start so they share one origin.
+    """
+    out = np.empty(len(values), dtype=np.float64)
+    parsed: List[Optional[datetime]] = []
+    for index, value in enumerate(values):
+        moment = _parse_datetime(value)
+        parsed.append(moment)
+        if moment is not None:
+            out[index] = np.nan
+            continue
+        try:
+            out[index] = float(value)
+        except (TypeError, ValueError):
+            out[index] = np.nan
+
+    datetimes = [moment for moment in parsed if moment is not None]
+    if datetimes:
+        origin = _as_utc(stream_start) if stream_start else min(datetimes)
+        for index, moment in enumerate(parsed):
+            if moment is not None:
+                out[index] = (moment - origin).total_seconds()
+    return out
+
+
+def _is_hype(text: str) -> bool:
+    lowered = text.lower()
+    if _EMOJI_RE.search(text):
+        return True
+    words = _WORD_RE.findall(lowered)
+    return any(word in HYPE_KEYWORDS for word in words) or "lets go" in lowered
+
+
+def _rolling_baseline(series: np.ndarray, window: int):
+    """Trailing mean/std of the previous `window` bins (current bin excluded)"""
+    padded = np.concatenate(([0.0], np.cumsum(series)))
+    padded_sq = np.concatenate(([0.0], np.cumsum(series * series)))
+    idx = np.arange(series.size)
+    start = np.maximum(0, idx - window)
+    count = np.maximum(idx - start, 1)
+    total = padded[idx] - padded[start]
+    total_sq = padded_sq[idx] - padded_sq[start]
+    mean = total / count
+    variance = np.maximum(total_sq / count - mean * mean, 0.0)
+    # Poisson floor: quiet streams shouldn't turn 3 messages into a 10-sigma spike
+    std = np.maximum(np.sqrt(variance), np.sqrt(np.maximum(mean, 1.0)))
+    # Bins without history have no baseline to compare against
+    std[idx == 0] = np.inf
+    return mean, std
+
+
+def detect_highlight_windows(
+    chat_messages: List[Dict],
+    game_events: Optional[List[Dict]] = None,
+    duration_seconds: Optional[float] = None,
+    bin_seconds: float = 10.0,
+    baseline_bins: int = 30,
+    threshold: float = 5.0,
+    pre_roll_seconds: float = 20.0,
+    max_window_seconds: float = 90.0,
+    max_candidates: int = 8,
+    samples_per_window: int = 8,
+    stream_start: Optional[datetime] = None,
+) -> List[Dict]:
+    """
+    Return candidate highlight windows, strongest first.
+
+    Each candidate: start_time, end_time, peak_time (seconds), score, and the
+    window's message_count, hype_count, unique_chatters, events and a few
+    sample messages for LLM context. ISO timestamps are measured from
+    stream_start, or from the earliest chat/event timestamp when it is unknown.
+    """
+    game_events = game_events or []
+    if not chat_messages and not game_events:
+        return []
+
+    chat_raw = [msg.get("timestamp", 0) for msg in chat_messages]
+    event_raw = [event.get("timestamp", 0) for event in game_events]
+    if stream_start is None:
+        # One origin for both series, otherwise a kill and the chat reacting to it drift apart
+        moments = [moment for moment in map(_parse_datetime, chat_raw + event_raw) if moment is not None]
+        stream_start = min(moments) if moments else None
+    chat_times = _to_seconds(chat_raw, stream_start)
+    event_times = _to_seconds(event_raw, stream_start)
+    valid_chat = ~np.isnan(chat_times) & (chat_times >= 0)
+    valid_events = ~np.isnan(event_times) & (event_times >= 0)
+
+    last_time = max(
+        float(chat_times[valid_chat].max()) if valid_chat.any() else 0.0,
+        float(event_times[valid_events].max()) if valid_events.any() else 0.0,
+        float(duration_seconds or 0.0),
+    )
+    n_bins = int(last_time // bin_seconds) + 1
+
+    chat_bins = (chat_times[valid_chat] // bin_seconds).astype(np.int64)
+    rate = np.bincount(chat_bins, minlength=n_bins).astype(np.float64)
+
+    texts = [str(msg.get("text", "")) for msg in chat_messages]
+    hype_flags = np.fromiter((_is_hype(text) for text in texts), dtype=bool, count=len(texts))[valid_chat]
+    hype = np.bincount(chat_bins, weights=hype_flags.astype(np.float64), minlength=n_bins)
+
+    users = np.array([str(msg.get("user", msg.get("user_id", ""))) for msg in chat_messages], dtype=object)[valid_chat]
+    user_ids = np.zeros(0, dtype=np.int64)
+    if users.size:
+        _, user_ids = np.unique(users.astype(str), return_inverse=True)
+        pairs = np.unique(chat_bins * (int(user_ids.max()) + 1) + user_ids)
+        unique = np.bincount(pairs // (int(user_ids.max()) + 1), minlength=n_bins).astype(np.float64)
+    else:
+        unique = np.zeros(n_bins)
+
+    event_bins = (event_times[valid_events] // bin_seconds).astype(np.int64)
+    event_weights = np.array([
+        GAME_EVENT_WEIGHTS.get(str(event.get("type", "")).lower(), DEFAULT_EVENT_WEIGHT)
+        for event in game_events
+    ], dtype=np.float64)[valid_events]
+    events = np.bincount(event_bins, weights=event_weights, minlength=n_bins)
+
+    score = np.zeros(n_bins)
+    for weight, series in zip(SCORE_WEIGHTS[:3], (rate, hype, unique)):
+        mean, std = _rolling_baseline(series, baseline_bins)
+        score += weight * np.maximum((series - mean) / std, 0.0)
+    score += SCORE_WEIGHTS[3] * events
+
+    hot = np.flatnonzero(score >= threshold)
+    if hot.size == 0:
+        return []
+
+    # Merge hot bins separated by at most one quiet bin into runs
+    breaks = np.flatnonzero(np.diff(hot) > 2) + 1
+    runs = np.split(hot, breaks)
+
+    pre_roll_bins = int(round(pre_roll_seconds / bin_seconds))
+    max_bins = max(1, int(max_window_seconds // bin_seconds))
+    candidates = []
+    for run in runs:
+        peak_bin = int(run[np.argmax(score[run])])
+        # Chat reacts after the moment - start the window a little earlier
+        first = max(0, int(run[0]) - pre_roll_bins)
+        last = min(n_bins - 1, int(run[-1]))
+        if last - first + 1 > max_bins:
+            first = max(0, peak_bin - pre_roll_bins)
+            last = min(n_bins - 1, first + max_bins - 1)
+        candidates.append({
+            "first_bin": first,
+            "last_bin": last,
+            "start_time": round(first * bin_seconds, 2),
+            "end_time": round((last + 1) * bin_seconds, 2),
+            "peak_time": round(peak_bin * bin_seconds, 2),
+            "score": round(float(score[peak_bin]), 3),
+            "message_count": int(rate[first:last + 1].sum()),
+            "hype_count": int(hype[first:last + 1].sum()),
+            "event_score": round(float(events[first:last + 1].sum()), 2),
+        })
+
+    candidates.sort(key=lambda item: item["score"], reverse=True)
+    candidates = candidates[:max_candidates]
+
+    # Attach context only for the few surviving windows
+    chat_index = np.flatnonzero(valid_chat)
+    event_index = np.flatnonzero(valid_events)
+    for candidate in candidates:
+        start, end = candidate.pop("first_bin"), candidate.pop("last_bin")
+        in_window = (chat_bins >= start) & (chat_bins <= end)
+        window_messages = chat_index[in_window]
+        candidate["unique_chatters"] = int(np.unique(user_ids[in_window]).size)
+        hype_first = window_messages[np.argsort(~hype_flags[in_window], kind="stable")]
+        candidate["sample_messages"] = [
+            {
+                "timestamp": round(float(chat_times[i]), 1),
+                "user": chat_messages[i].get("user", "Unknown"),
+                "text": str(chat_messages[i].get("text", ""))[:200],
+            }
+            for i in sorted(hype_first[:samples_per_window], key=lambda i: chat_times[i])
+        ]
+        events_in_window = event_index[(event_bins >= start) & (event_bins <= end)]
+        candidate["events"] = [
+            {
+                "timestamp": round(float(event_times[i]), 1),
+                "type": game_events[i].get("type", "Unknown"),
+                "description": game_events[i].get("description", ""),
+            }
+            for i in events_in_window[:5]
+        ]
+
+    logger.info(
+        f"🎬 Highlight detector: {len(chat_messages)} messages, {n_bins} bins -> {len(candidates)} candidate windows"
+    )
+    return candidates
@@ -0,0 +1,363 @@
+"""
+REMZA019 Gaming - Background Job Scheduler
+Interval and cron triggered jobs with jitter and per-job timeouts. Each run
+is claimed through a Mongo lease, so with several uvicorn workers every job
+still runs once per period instead of once per worker.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from metrics import JOB_RUN_DURATION, JOB_RUNS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Extra lease time on top of the job timeout before another worker may take over
+LEASE_GRACE_SECONDS = 30
+RUN_HISTORY_DAYS = int(os.environ.get("SCHEDULER_RUN_HISTORY_DAYS", "14"))
+# Backoff after a scheduler-side error (Mongo unreachable for the lease, ...): 5s doubling to 5 min
+LOOP_ERROR_BACKOFF_SECONDS = 5
+LOOP_ERROR_BACKOFF_MAX_SECONDS = 300
+
+
+# ============== TRIGGERS ==============
+class IntervalTrigger:
+    """Every `seconds`, offset by up to `jitter` seconds per run"""
+
+    def __init__(self, seconds: float, jitter: float = 0.0):
+        self.seconds = seconds
+        self.jitter = jitter
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds + random.uniform(0, self.jitter))
+
+    def describe(self) -> str:
+        return f"every {int(self.seconds)}s" + (f" (+{int(self.jitter)}s jitter)" if self.jitter else "")
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+        if start < low or end > high or step < 1:
+            raise ValueError(f"Cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronTrigger:
+    """
+    Standard 5-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in `tz`. Supports *, lists, ranges and steps; Sunday is 0 or 7.
+    """
+
+    def __init__(self, expression: str, tz: str = "Europe/Belgrade", jitter: float = 0.0):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression}")
+        self.expression = expression
+        self.tz = ZoneInfo(tz)
+        self.jitter = jitter
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {d % 7 for d in _parse_cron_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        # Cron semantics: when both day fields are restricted, either one matching is enough
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        local = moment.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = local + timedelta(days=366)
+        while local < limit:
+            if local.month not in self.months or not self._day_matches(local):
+                local = (local + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if local.hour not in self.hours:
+                local = (local + timedelta(hours=1)).replace(minute=0)
+                continue
+            if local.minute not in self.minutes:
+                local += timedelta(minutes=1)
+                continue
+            result = local.astimezone(timezone.utc)
+            return result + timedelta(seconds=random.uniform(0, self.jitter))
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+    def describe(self) -> str:
+        return f"cron '{self.expression}' {self.tz.key}"
+
+
+# ============== JOBS ==============
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        trigger,
+        timeout: float = 300.0,
+        run_on_start: bool = False,
+    ):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.timeout = timeout
+        self.run_on_start = run_on_start
+        self.next_run_at: Optional[datetime] = None
+        self.running = False
+        self.stats = {
+            "runs": 0, "failures": 0, "timeouts": 0, "skipped_leases": 0, "loop_errors": 0,
+            "last_status": None, "last_error": None, "last_run_at": None, "last_duration": None,
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trigger": self.trigger.describe(),
+            "timeout": self.timeout,
+            "running": self.running,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            **self.stats,
+        }
+
+
+class JobScheduler:
+    """
+    Runs registered jobs on their triggers. Before each run the worker claims
+    the job's lease document (owner, lease_until, next_run_at); workers that
+    lose the claim skip the run and sleep until the winner's next_run_at.
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeups: Dict[str, asyncio.Event] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], trigger, timeout: float = 300.0, run_on_start: bool = False) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job already registered: {name}")
+        job = Job(name, func, trigger, timeout=timeout, run_on_start=run_on_start)
+        self.jobs[name] = job
+        if self._tasks:
+            self._start_job(job)
+        return job
+
+    # ---------- leases ----------
+    async def _claim(self, job: Job, now: datetime, force: bool = False) -> bool:
+        """Atomically take the job's lease if it's due and nobody holds it"""
+        if self.db is None:
+            return True
+        due = {} if force else {"next_run_at": {"$lte": now}}
+        try:
+            doc = await self.db.scheduler_leases.find_one_and_update(
+                {"_id": job.name, "lease_until": {"$lte": now}, **due},
+                {"$set": {
+                    "owner": self.owner,
+                    "lease_until": now + timedelta(seconds=job.timeout + LEASE_GRACE_SECONDS),
+                    "claimed_at": now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return doc is not None and doc.get("owner") == self.owner
+        except DuplicateKeyError:
+            # Lease document exists but isn't claimable right now
+            return False
+
+    async def _release(self, job: Job, next_run_at: datetime):
+        if self.db is None:
+            return
+        try:
+            await self.db.scheduler_leases.update_one(
+                {"_id": job.name, "owner": self.owner},
+                {"$set": {"lease_until": datetime.now(timezone.utc), "next_run_at": next_run_at}},
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Scheduler: lease release failed for {job.name}: {e}")
+
+    async def _shared_next_run(self, job: Job) -> Optional[datetime]:
+        if self.db is None:
+            return None
+        try:
+            doc = await self.db.scheduler_leases.find_one({"_id": job.name}, {"next_run_at": 1})
+        except Exception:
+            return None
+        next_run_at = (doc or {}).get("next_run_at")
+        if next_run_at is not None and next_run_at.tzinfo is None:
+            next_run_at = next_run_at.replace(tzinfo=timezone.utc)
+        return next_run_at
+
+    # ---------- running ----------
+    async def _execute(self, job: Job, started: datetime) -> str:
+        job.running = True
+        t0 = time.perf_counter()
+        status, error = "ok", None
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Timed out after {job.timeout}s"
+            job.stats["timeouts"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status, error = "error", str(e)
+            job.stats["failures"] += 1
+        finally:
+            job.running = False
+        duration = time.perf_counter() - t0
+
+        job.stats.update({
+            "last_status": status, "last_error": error,
+            "last_run_at": started.isoformat(), "last_duration": round(duration, 3),
+        })
+        job.stats["runs"] += 1
+        JOB_RUN_DURATION.observe(duration, {"job": job.name, "status": status})
+        JOB_RUNS_TOTAL.inc(labels={"job": job.name, "status": status})
+        if status == "ok":
+            logger.info(f"⏱️ Job {job.name} finished in {duration:.2f}s")
+        else:
+            logger.error(f"❌ Job {job.name} {status}: {error}")
+
+        if self.db is not None:
+            try:
+                await self.db.scheduler_runs.insert_one({
+                    "job": job.name, "owner": self.owner, "status": status, "error": error,
+                    "started_at": started, "duration_seconds": round(duration, 3),
+                })
+            except Exception as e:
+                logger.warning(f"⚠️ Scheduler: run history write failed: {e}")
+        return status
+
+    async def run_job_now(self, name: str) -> Dict:
+        """Run a job immediately (admin trigger), still respecting the lease"""
+        job = self.jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        now = datetime.now(timezone.utc)
+        if not await self._claim(job, now, force=True):
+            return {"ran": False, "reason": "Job is running on another worker"}
+        next_run_at = job.next_run_at or job.trigger.next_after(now)
+        try:
+            status = await self._execute(job, now)
+        finally:
+            await self._release(job, next_run_at)
+        return {"ran": True, "status": status, **job.to_dict()}
+
+    async def _job_loop(self, job: Job):
+        now = datetime.now(timezone.utc)
+        job.next_run_at = now if job.run_on_start else job.trigger.next_after(now)
+        backoff = LOOP_ERROR_BACKOFF_SECONDS
+        while True:
+            try:
+                await self._job_iteration(job)
+                backoff = LOOP_ERROR_BACKOFF_SECONDS
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A lease/schedule read failing must not kill the job for the rest of the process
+                job.stats["loop_errors"] += 1
+                logger.error(f"❌ Scheduler loop for {job.name} failed, retrying in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, LOOP_ERROR_BACKOFF_MAX_SECONDS)
+
+    async def _job_iteration(self, job: Job):
+        """Wait for the job's next slot, then run it if this worker gets the lease"""
+        # Another worker may already have pushed the shared schedule forward
+        shared = await self._shared_next_run(job)
+        if shared is not None and shared > job.next_run_at:
+            job.next_run_at = shared
+
+        delay = (job.next_run_at - datetime.now(timezone.utc)).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        now = datetime.now(timezone.utc)
+        if await self._claim(job, now):
+            next_run_at = job.trigger.next_after(now)
+            try:
+                await self._execute(job, now)
+            finally:
+                await self._release(job, next_run_at)
+            job.next_run_at = next_run_at
+        else:
+            job.stats["skipped_leases"] += 1
+            shared = await self._shared_next_run(job)
+            # Lease held or run already taken - retry no earlier than the shared schedule
+            job.next_run_at = shared if shared and shared > now else now + timedelta(seconds=LEASE_GRACE_SECONDS)
+
+    def _start_job(self, job: Job):
+        task = asyncio.create_task(self._job_loop(job), name=f"job:{job.name}")
+        self._tasks.append(task)
+
+    def start(self, db=None):
+        if self._tasks:
+            return
+        if db is not None:
+            self.db = db
+        for job in self.jobs.values():
+            self._start_job(job)
+        logger.info(f"⏱️ Job scheduler started with {len(self.jobs)} jobs (owner {self.owner})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+
+    # ---------- reporting ----------
+    def get_jobs(self) -> List[Dict]:
+        return [job.to_dict() for job in self.jobs.values()]
+
+    async def get_runs(self, job: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        if self.db is None:
+            return []
+        query = {"job": job} if job else {}
+        return await self.db.scheduler_runs.find(query, {"_id": 0}).sort("started_at", -1).limit(min(limit, 500)).to_list(length=500)
+
+    async def prune_run_history(self):
+        """Drop run history older than SCHEDULER_RUN_HISTORY_DAYS"""
+        if self.db is None:
+            return
+        cutoff = datetime.now(timezone.utc) - timedelta(days=RUN_HISTORY_DAYS)
+        result = await self.db.scheduler_runs.delete_many({"started_at": {"$lt": cutoff}})
+        logger.info(f"🧹 Pruned {result.deleted_count} scheduler run records")
+
+
+# Global scheduler instance
+job_scheduler = JobScheduler()
+
+def get_job_scheduler() -> JobScheduler:
+    """Get global job scheduler"""
+    return job_scheduler
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - JSON Response Benchmark
+Hammers the hot public list endpoints in-process and reports requests per
+second, latency and bytes per response for each Accept-Encoding, once through
+the fast path (orjson + precompressed payload cache) and once through the
+stdlib baseline (PAYLOAD_CACHE_ENABLED=false behaviour):
+
+    python json_bench.py --requests 2000 --out after.json
+    python json_bench.py --compare before.json
+
+Boots and seeds the app exactly like load_harness.py (same Mongo stand-in),
+plus a video catalog, a chat backlog and an active poll.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from load_harness import LoadHarness, git_revision, install_mongo_standin, summarize_ms
+
+logger = logging.getLogger("json_bench")
+
+ENDPOINTS = {
+    "latest_videos": ("/api/youtube/latest-videos", {"limit": 20}),
+    "leaderboard_top": ("/api/leaderboard/top", {"limit": 50}),
+    "chat_messages": ("/api/chat/messages", {}),
+    "polls_active": ("/api/polls/active", {}),
+}
+ENCODINGS = {"identity": "identity", "gzip": "gzip", "br": "br, gzip"}
+
+
+async def seed(harness: LoadHarness, videos: int, messages: int):
+    now = datetime.now(timezone.utc)
+    await harness.db.videos.delete_many({"video_id": {"$regex": "^bench"}})
+    await harness.db.videos.insert_many([{
+        "video_id": f"bench{index:05d}",
+        "title": f"FORTNITE Rocket Racing session #{index} - road to Unreal",
+        "description": "Real FORTNITE gameplay from Serbia. " * 5,
+        "thumbnail_url": f"https://img.youtube.com/vi/bench{index:05d}/maxresdefault.jpg",
+        "published_at": (now - timedelta(hours=index)).isoformat(),
+        "view_count": str(harness.random.randint(100, 50000)),
+        "duration": "PT45M12S",
+    } for index in range(videos)])
+
+    for index in range(messages):
+        await harness.http.post("/api/chat/send", json={
+            "user": f"loadviewer{index}", "user_id": harness.viewer_ids[index % len(harness.viewer_ids)],
+            "level": 1, "text": f"GG {index} that was a clean finish Kappa",
+        })
+
+    headers = {"Authorization": f"Bearer {harness.admin_token}"} if harness.admin_token else {}
+    for question in ("Next game?", "Tournament format?"):
+        await harness.http.post("/api/polls/create", headers=headers, json={
+            "question": question, "options": ["FORTNITE", "COD WARZONE", "ROCKET RACING", "MODERN WARFARE"],
+        })
+
+
+async def measure(harness: LoadHarness, path: str, params: Dict, accept_encoding: str, count: int) -> Dict:
+    latencies: List[float] = []
+    sizes: List[int] = []
+    statuses: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(harness.concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await harness.http.get(path, params=params, headers={"Accept-Encoding": accept_encoding})
+            latencies.append(time.perf_counter() - started)
+            # Bytes on the wire, before httpx decodes the content encoding
+            sizes.append(response.num_bytes_downloaded)
+            status = str(response.status_code)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    duration = time.perf_counter() - started
+    return {
+        "requests": count,
+        "status_counts": dict(sorted(statuses.items())),
+        "requests_per_s": round(count / duration, 1) if duration else 0.0,
+        "latency_ms": summarize_ms(latencies),
+        "bytes_per_response": round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+    }
+
+
+async def run(args) -> Dict:
+    backend = install_mongo_standin(args.mongo_url)
+    harness = LoadHarness(scale=args.viewers, concurrency=args.concurrency, seed=args.seed)
+    await harness.boot()
+
+    from fast_json import get_payload_cache
+    cache = get_payload_cache()
+
+    results: Dict[str, Dict] = {}
+    try:
+        await seed(harness, args.videos, args.messages)
+        for mode in ("baseline", "fast"):
+            cache.enabled = mode == "fast"
+            for name, (path, params) in ENDPOINTS.items():
+                for label, accept in ENCODINGS.items():
+                    if mode == "baseline" and label != "identity":
+                        continue  # the baseline path never compresses
+                    # Warm-up fills the cache and the Mongo stand-in's indexes
+                    await measure(harness, path, params, accept, min(20, args.requests))
+                    results.setdefault(name, {})[f"{mode}:{label}"] = await measure(
+                        harness, path, params, accept, args.requests
+                    )
+                    logger.info(f"✅ {name} {mode}:{label} {results[name][f'{mode}:{label}']['requests_per_s']} req/s")
+    finally:
+        cache.enabled = True
+        await harness.shutdown()
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "mongo_backend": backend.split(":", 1)[0],
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            **{k: v for k, v in cache.get_stats().items() if k in ("encoder", "brotli")},
+        },
+        "endpoints": results,
+    }
+
+
+def compare_reports(before: Dict, after: Dict) -> List[str]:
+    lines = []
+    for name, variants in sorted(after.get("endpoints", {}).items()):
+        for variant, current in sorted(variants.items()):
+            previous = before.get("endpoints", {}).get(name, {}).get(variant)
+            if not previous:
+                continue
+            for label in ("requests_per_s", "bytes_per_response"):
+                old, new = previous[label], current[label]
+                change = ((new - old) / old * 100) if old else 0.0
+                lines.append(f"{name:16} {variant:16} {label:20} {old:>10} -> {new:>10} ({change:+.1f}%)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON responses of the hot list endpoints")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint/variant")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--viewers", type=int, default=500, help="Seeded viewers (leaderboard size)")
+    parser.add_argument("--videos", type=int, default=50, help="Seeded catalog videos")
+    parser.add_argument("--messages", type=int, default=50, help="Seeded chat messages")
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--mongo-url", help="Use a real local mongod instead of mongomock-motor")
+    parser.add_argument("--out", help="Write JSON report to this path")
+    parser.add_argument("--compare", help="Previous JSON report to diff against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(rendered + "\n")
+        logger.info(f"📄 Report written to {args.out}")
+    else:
+        print(rendered)
+
+    if args.compare:
+        before = json.loads(Path(args.compare).read_text())
+        for line in compare_reports(before, report):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,19 @@
 Track and display top viewers by points
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 import logging
 
+from fast_json import get_payload_cache
+
 logger = logging.getLogger("leaderboard")
 
+LEADERBOARD_CACHE_SECONDS = 5
+TOP_BADGES = {1: "🥇 Champion", 2: "🥈 Runner-up", 3: "🥉 Top 3"}
+
 leaderboard_router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
 # Pydantic models
@@ -32,9 +37,7 @@ def get_database():
     from server import get_database as get_db
     return get_db()
 
-@leaderboard_router.get("/top")
-async def get_top_viewers(limit: int = 10):
-    """Get top viewers by points - PUBLIC"""
+async def _load_top_viewers(limit: int) -> dict:
     try:
         db = get_database()
         
@@ -44,35 +47,32 @@ async def get_top_viewers(limit: int = 10):
             {"_id": 0, "user_id": 1, "username": 1, "points": 1, "level": 1}
         ).sort("points", -1).limit(limit).to_list(length=limit)
         
-        # Assign ranks and badges
-        leaderboard = []
-        for idx, viewer in enumerate(viewers):
-            rank = idx + 1
-            badge = None
-            
-            # Assign badges for top 3
-            if rank == 1:
-                badge = "🥇 Champion"
-            elif rank == 2:
-                badge = "🥈 Runner-up"
-            elif rank == 3:
-                badge = "🥉 Top 3"
-            
-            leaderboard.append(LeaderboardEntry(
-                rank=rank,
-                user_id=viewer.get("user_id", ""),
-                username=viewer.get("username", "Unknown"),
-                points=viewer.get("points", 0),
-                level=viewer.get("level", 1),
-                badge=badge
-            ))
-        
-        return {"leaderboard": [entry.dict() for entry in leaderboard]}
+        # LeaderboardEntry-shaped dicts, ranks and badges for the top 3
+        leaderboard = [
+            {
+                "rank": rank,
+                "user_id": viewer.get("user_id", ""),
+                "username": viewer.get("username", "Unknown"),
+                "points": viewer.get("points", 0),
+                "level": viewer.get("level", 1),
+                "badge": TOP_BADGES.get(rank)
+            }
+            for rank, viewer in enumerate(viewers, start=1)
+        ]
+        return {"leaderboard": leaderboard}
         
     except Exception as e:
         logger.error(f"❌ Get top viewers error: {e}")
         raise HTTPException(status_code=500, detail="Failed to get leaderboard")
 
+@leaderboard_router.get("/top")
+async def get_top_viewers(request: Request, limit: int = 10):
+    """Get top viewers by points - PUBLIC (encoded response cached for a few seconds)"""
+    limit = max(1, min(limit, 100))
+    return await get_payload_cache().respond(
+        request, f"leaderboard:top:{limit}", lambda: _load_top_viewers(limit), ttl=LEADERBOARD_CACHE_SECONDS
+    )
+
 @leaderboard_router.get("/user/{user_id}")
 async def get_user_rank(user_id: str):
     """Get a specific user's rank and position - PUBLIC"""
@@ -134,7 +134,8 @@ async def update_leaderboard(request: UpdatePointsRequest):
                     "username": request.username,
                     "points": request.points,
                     "level": request.level,
-                    "last_updated": datetime.now().isoformat()
+                    "last_updated": datetime.now().isoformat(),
+                    "points_updated_at": datetime.now()
                 }
             },
             upsert=True
@@ -9,6 +9,10 @@ import secrets
 import string
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+from license_tokens import get_license_token_service
+from pagination import paginate, export_response, register_pagination_index
+from admin_api import get_current_admin
+from dashboard_queries import Count, run_dashboard, get_dashboard_cache
 
 router = APIRouter()
 
@@ -44,6 +48,9 @@ class GenerateLicenseRequest(BaseModel):
 class VerifyLicenseRequest(BaseModel):
     license_key: str
 
+class VerifyLicenseTokenRequest(BaseModel):
+    license_token: str
+
 class DeactivateLicenseRequest(BaseModel):
     license_key: str
     reason: Optional[str] = None
@@ -177,20 +184,56 @@ async def verify_license(request: VerifyLicenseRequest):
             "created_at": license_doc.get("created_at"),
             "activated_at": license_doc.get("activated_at"),
             "expires_at": license_doc.get("expires_at"),
+            # Use for repeat checks via /api/license/verify-token (no database lookup)
+            "license_token": get_license_token_service().issue(license_doc),
             "message": "License key is valid"
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error verifying license: {str(e)}")
 
+@router.post("/api/license/verify-token")
+async def verify_license_token(request: VerifyLicenseTokenRequest):
+    """
+    Verify a signed license token issued by /verify or /activate
+    Public endpoint - signature + revocation set only, no database access
+    """
+    token_service = get_license_token_service()
+    await token_service.ensure_synced()
+    return token_service.verify(request.license_token.strip())
+
+LICENSE_EXPORT_FIELDS = [
+    "license_key", "license_type", "user_email", "user_name", "created_at", "activated_at",
+    "expires_at", "is_active", "assigned_to", "assigned_email", "assigned_nickname"
+]
+
+register_pagination_index(licenses_collection, [("created_at", -1)], "license_key")
+
 @router.get("/api/license/list")
-async def list_licenses():
+async def list_licenses(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    export: Optional[str] = None,
+    admin = Depends(get_current_admin)
+):
     """
-    List all licenses
-    Admin only endpoint (add authentication later)
+    List licenses, newest first - ADMIN ONLY
+    Keyset paged via `cursor`/`next_cursor`; `export=ndjson|csv` streams every license
     """
+    if export:
+        return export_response(
+            licenses_collection, export, "licenses", LICENSE_EXPORT_FIELDS,
+            sort=[("created_at", -1), ("license_key", -1)], admin=admin
+        )
     try:
-        licenses = await licenses_collection.find().sort("created_at", -1).to_list(length=1000)
+        page = await paginate(
+            licenses_collection,
+            sort=[("created_at", -1)],
+            tiebreaker="license_key",
+            limit=limit,
+            cursor=cursor
+        )
+        licenses = page["items"]
         
         # Remove MongoDB _id field
         for license in licenses:
@@ -199,9 +242,13 @@ async def list_licenses():
         return {
             "success": True,
             "licenses": licenses,
-            "total": len(licenses)
+            "total": len(licenses),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing licenses: {str(e)}")
 
@@ -237,6 +284,9 @@ async def deactivate_license(request: DeactivateLicenseRequest):
             {"$set": update_data}
         )
         
+        # Outstanding license tokens stop verifying
+        await get_license_token_service().revoke(license_key, request.reason)
+        
         return {
             "success": True,
             "message": "License key deactivated successfully"
@@ -252,28 +302,32 @@ async def get_license_stats():
     Admin only endpoint
     """
     try:
-        total = await licenses_collection.count_documents({})
-        active = await licenses_collection.count_documents({"is_active": True})
-        trial = await licenses_collection.count_documents({"license_type": "TRIAL"})
-        basic = await licenses_collection.count_documents({"license_type": "BASIC"})
-        premium = await licenses_collection.count_documents({"license_type": "PREMIUM"})
-        activated = await licenses_collection.count_documents({"activated_at": {"$ne": None}})
-        assigned = await licenses_collection.count_documents({"assigned_to": {"$ne": None}})
-        
-        return {
-            "success": True,
-            "stats": {
-                "total": total,
-                "active": active,
-                "inactive": total - active,
-                "trial": trial,
-                "basic": basic,
-                "premium": premium,
-                "activated": activated,
-                "never_activated": total - activated,
-                "assigned_to_members": assigned
+        async def compute():
+            [counts] = await run_dashboard([(licenses_collection, {
+                "total": Count(),
+                "active": Count({"is_active": True}),
+                "trial": Count({"license_type": "TRIAL"}),
+                "basic": Count({"license_type": "BASIC"}),
+                "premium": Count({"license_type": "PREMIUM"}),
+                "activated": Count({"activated_at": {"$ne": None}}),
+                "assigned": Count({"assigned_to": {"$ne": None}})
+            })])
+            return {
+                "success": True,
+                "stats": {
+                    "total": counts["total"],
+                    "active": counts["active"],
+                    "inactive": counts["total"] - counts["active"],
+                    "trial": counts["trial"],
+                    "basic": counts["basic"],
+                    "premium": counts["premium"],
+                    "activated": counts["activated"],
+                    "never_activated": counts["total"] - counts["activated"],
+                    "assigned_to_members": counts["assigned"]
+                }
             }
-        }
+        
+        return await get_dashboard_cache().get_or_compute("license_stats", compute)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
@@ -295,6 +349,8 @@ async def delete_license(license_key: str):
                 "message": "License key not found"
             }
         
+        await get_license_token_service().revoke(license_key, "deleted")
+        
         return {
             "success": True,
             "message": "License key deleted permanently"
@@ -381,7 +437,8 @@ async def activate_license(request: VerifyLicenseRequest):
         return {
             "success": True,
             "message": "License activated successfully",
-            "license": license_doc
+            "license": license_doc,
+            "license_token": get_license_token_service().issue(license_doc)
         }
     
     except Exception as e:
@@ -0,0 +1,274 @@
+# License Tokens - Stateless License Verification
+# REMZA019 Gaming - Customizable Streamer Website
+#
+# After a license key is verified once against Mongo, the client gets a signed
+# token carrying license key, type, owner and expiry. Re-checks verify the
+# signature in-process and consult an in-memory revocation set that is synced
+# from Mongo in the background - no database round trip per check.
+#
+# Tokens are only issued when a signing secret is configured (LICENSE_TOKEN_SECRET,
+# or one derived from JWT_SECRET); without one, clients fall back to the
+# database-backed /verify. Revocations are forgotten once every token issued
+# before them has expired.
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import jwt
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# MongoDB connection
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'test_database')
+client = AsyncIOMotorClient(MONGO_URL)
+db = client[DB_NAME]
+revocations_collection = db['license_revocations']
+
+
+def _resolve_secret() -> Optional[str]:
+    """LICENSE_TOKEN_SECRET, else a key derived from JWT_SECRET, else None (tokens disabled)"""
+    secret = os.environ.get('LICENSE_TOKEN_SECRET')
+    if secret:
+        return secret
+    jwt_secret = os.environ.get('JWT_SECRET')
+    if jwt_secret:
+        # Separate key per purpose, so an admin/member JWT never verifies as a license token
+        return hmac.new(jwt_secret.encode(), b'remza019-license-token', hashlib.sha256).hexdigest()
+    return None
+
+
+# Token Configuration
+LICENSE_TOKEN_SECRET = _resolve_secret()
+LICENSE_TOKEN_ALGORITHM = 'HS256'
+LICENSE_TOKEN_ISSUER = 'remza019-license'
+# Tokens are re-issued from the license key after this; bounds how long a revocation must be remembered
+LICENSE_TOKEN_TTL_DAYS = int(os.environ.get('LICENSE_TOKEN_TTL_DAYS', '30'))
+REVOCATION_SYNC_SECONDS = int(os.environ.get('LICENSE_REVOCATION_SYNC_SECONDS', '30'))
+# A revocation outlives every token issued before it (plus a day of clock skew), then is dropped
+REVOCATION_RETENTION = timedelta(days=LICENSE_TOKEN_TTL_DAYS + 1)
+
+if LICENSE_TOKEN_SECRET is None:
+    logger.warning("⚠️ LICENSE_TOKEN_SECRET/JWT_SECRET not set - license tokens disabled")
+
+
+def _parse_expiry(expires_at: Optional[str]) -> Optional[datetime]:
+    if not expires_at:
+        return None
+    expiry = datetime.fromisoformat(expires_at)
+    # License documents store naive UTC timestamps
+    return expiry if expiry.tzinfo else expiry.replace(tzinfo=timezone.utc)
+
+
+class LicenseTokenService:
+    """Issues and verifies signed license tokens against an in-memory revocation set"""
+
+    def __init__(self, collection=None, secret: Optional[str] = LICENSE_TOKEN_SECRET):
+        self.collection = collection
+        self.secret = secret
+        # license key -> revoked_at (aware UTC)
+        self.revoked: Dict[str, datetime] = {}
+        self.last_synced_at: Optional[datetime] = None
+        self._sync_cursor: Optional[datetime] = None
+        self._sync_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"issued": 0, "verified": 0, "rejected": 0, "syncs": 0, "pruned": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    async def ensure_indexes(self):
+        """Mongo expires revocation records on the same schedule the in-memory set drops them"""
+        if self.collection is None:
+            return
+        ttl = int(REVOCATION_RETENTION.total_seconds())
+        try:
+            await self.collection.create_index("revoked_at", expireAfterSeconds=ttl)
+        except OperationFailure as e:
+            # LICENSE_TOKEN_TTL_DAYS changed since the index was built: same key, new expiry
+            logger.warning(f"⚠️ license_revocations TTL index out of date ({e}), updating to {ttl}s")
+            try:
+                await self.collection.database.command({
+                    "collMod": self.collection.name,
+                    "index": {"keyPattern": {"revoked_at": 1}, "expireAfterSeconds": ttl},
+                })
+            except OperationFailure:
+                await self.collection.drop_index("revoked_at_1")
+                await self.collection.create_index("revoked_at", expireAfterSeconds=ttl)
+
+    # ---------- tokens ----------
+    def issue(self, license_doc: Dict, owner: Optional[str] = None) -> Optional[str]:
+        """
+        Sign a token for a license document that was just verified against the database.
+        Returns None when no signing secret is configured.
+        """
+        if not self.enabled:
+            return None
+        now = datetime.now(timezone.utc)
+        license_expiry = _parse_expiry(license_doc.get('expires_at'))
+        token_expiry = now + timedelta(days=LICENSE_TOKEN_TTL_DAYS)
+        if license_expiry and license_expiry < token_expiry:
+            token_expiry = license_expiry
+
+        payload = {
+            'iss': LICENSE_TOKEN_ISSUER,
+            'sub': owner or license_doc.get('assigned_to') or license_doc.get('user_email'),
+            'lk': license_doc['license_key'],
+            'typ': license_doc.get('license_type'),
+            'lexp': license_doc.get('expires_at'),
+            'iat': now,
+            'exp': token_expiry,
+        }
+        self.stats["issued"] += 1
+        return jwt.encode(payload, self.secret, algorithm=LICENSE_TOKEN_ALGORITHM)
+
+    def verify(self, token: str) -> Dict:
+        """
+        CPU-only verification. Returns the verify endpoint's response shape:
+        valid + license details, or valid=False with a message.
+        """
+        if not self.enabled:
+            self.stats["rejected"] += 1
+            return {
+                "success": False,
+                "valid": False,
+                "reverify": True,
+                "message": "License tokens are not enabled - verify the license key",
+            }
+        try:
+            payload = jwt.decode(
+                token,
+                self.secret,
+                algorithms=[LICENSE_TOKEN_ALGORITHM],
+                issuer=LICENSE_TOKEN_ISSUER,
+                options={"require": ["exp", "lk"]},
+            )
+        except jwt.ExpiredSignatureError:
+            self.stats["rejected"] += 1
+            claims = jwt.decode(token, options={"verify_signature": False})
+            license_expiry = _parse_expiry(claims.get('lexp'))
+            if license_expiry and datetime.now(timezone.utc) > license_expiry:
+                message = "Trial license has expired" if claims.get('typ') == "TRIAL" else "License has expired"
+                return {"success": False, "valid": False, "message": message}
+            return {
+                "success": False,
+                "valid": False,
+                "reverify": True,
+                "message": "License token has expired - verify the license key again",
+            }
+        except jwt.InvalidTokenError:
+            self.stats["rejected"] += 1
+            return {"success": False, "valid": False, "message": "Invalid license token"}
+
+        if payload['lk'] in self.revoked:
+            self.stats["rejected"] += 1
+            return {"success": False, "valid": False, "message": "License key has been deactivated"}
+
+        self.stats["verified"] += 1
+        return {
+            "success": True,
+            "valid": True,
+            "license_key": payload['lk'],
+            "license_type": payload.get('typ'),
+            "owner": payload.get('sub'),
+            "expires_at": payload.get('lexp'),
+            "token_expires_at": datetime.fromtimestamp(payload['exp'], timezone.utc).isoformat(),
+            "message": "License key is valid",
+        }
+
+    # ---------- revocation ----------
+    async def revoke(self, license_key: str, reason: Optional[str] = None):
+        """Revoke a license key locally and record it for the other workers"""
+        revoked_at = datetime.now(timezone.utc)
+        self.revoked[license_key] = revoked_at
+        if self.collection is None:
+            return
+        await self.collection.update_one(
+            {"license_key": license_key},
+            {"$set": {"license_key": license_key, "reason": reason, "revoked_at": revoked_at}},
+            upsert=True,
+        )
+
+    async def sync(self):
+        """Pull revocations recorded since the last sync (full load the first time)"""
+        if self.collection is None:
+            return
+        async with self._sync_lock:
+            query = {"revoked_at": {"$gte": self._sync_cursor}} if self._sync_cursor else {}
+            cursor = self.collection.find(query, {"_id": 0, "license_key": 1, "revoked_at": 1})
+            now = datetime.now(timezone.utc)
+            async for doc in cursor:
+                revoked_at = doc.get("revoked_at")
+                if revoked_at is None:
+                    # Legacy record without a timestamp: keep it for a full retention window
+                    revoked_at = now
+                else:
+                    if revoked_at.tzinfo is None:
+                        revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+                    if self._sync_cursor is None or revoked_at > self._sync_cursor:
+                        self._sync_cursor = revoked_at
+                self.revoked[doc["license_key"]] = revoked_at
+            self.prune(now)
+            self.last_synced_at = now
+            self.stats["syncs"] += 1
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop revocations older than any token that could still be valid"""
+        cutoff = (now or datetime.now(timezone.utc)) - REVOCATION_RETENTION
+        expired = [key for key, revoked_at in self.revoked.items() if revoked_at < cutoff]
+        for key in expired:
+            del self.revoked[key]
+        self.stats["pruned"] += len(expired)
+        return len(expired)
+
+    async def ensure_synced(self):
+        """Make sure the revocation set was loaded at least once before trusting it"""
+        if self.last_synced_at is None:
+            await self.sync()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ License revocation sync failed: {e}")
+            await asyncio.sleep(REVOCATION_SYNC_SECONDS)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "revoked_keys": len(self.revoked),
+            "last_synced_at": self.last_synced_at.isoformat() if self.last_synced_at else None,
+        }
+
+
+# Global license token service
+license_token_service = LicenseTokenService(revocations_collection)
+
+def get_license_token_service() -> LicenseTokenService:
+    """Get global license token service"""
+    return license_token_service
@@ -0,0 +1,29 @@
+"""
+REMZA019 Gaming - Live Status API
+Cached, merged Twitch/YouTube/admin live status (no upstream calls per request)
+"""
+from fastapi import APIRouter, Depends
+import logging
+from admin_api import get_current_admin
+from live_status_service import get_live_status_service
+
+logger = logging.getLogger(__name__)
+
+live_status_router = APIRouter(prefix="/api/live", tags=["live"])
+
+@live_status_router.get("/status")
+async def get_live_status():
+    """Current merged live status - memory read of the poller's last result"""
+    return get_live_status_service().get_status()
+
+@live_status_router.post("/refresh")
+async def refresh_live_status(admin = Depends(get_current_admin)):
+    """Force an immediate poll of every platform (admin only - YouTube checks cost API quota)"""
+    status = await get_live_status_service().refresh(force=True)
+    logger.info(f"📡 Live status refreshed by {admin.get('username')}: is_live={status['is_live']}")
+    return status
+
+@live_status_router.get("/stats")
+async def get_live_status_stats(admin = Depends(get_current_admin)):
+    """Poller counters and current cadence"""
+    return get_live_status_service().get_stats()
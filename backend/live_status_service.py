@@ -0,0 +1,357 @@
+"""
+REMZA019 Gaming - Unified Live Status
+One background poller for Twitch + YouTube live state, merged with the
+admin override and kept in memory. Status endpoints read the cached state;
+transitions are pushed to WebSocket/SSE clients and in-process subscribers
+(e.g. the Discord bot) instead of every consumer polling on its own timer.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Stream schedule times are stored as CET wall-clock times
+SCHEDULE_TZ = ZoneInfo("Europe/Belgrade")
+DAY_INDEX = {"MON": 0, "TUE": 1, "WED": 2, "THU": 3, "FRI": 4, "SAT": 5, "SUN": 6}
+
+# Poll cadence (seconds): fast while live or around a scheduled start, slow otherwise
+LIVE_POLL_INTERVAL = int(os.environ.get("LIVE_STATUS_LIVE_INTERVAL", "60"))
+NEAR_SCHEDULE_POLL_INTERVAL = int(os.environ.get("LIVE_STATUS_NEAR_SCHEDULE_INTERVAL", "30"))
+IDLE_POLL_INTERVAL = int(os.environ.get("LIVE_STATUS_IDLE_INTERVAL", "300"))
+# YouTube search.list costs 100 quota units per call - never poll it faster than this
+YOUTUBE_MIN_INTERVAL = int(os.environ.get("LIVE_STATUS_YOUTUBE_MIN_INTERVAL", "180"))
+YOUTUBE_IDLE_INTERVAL = int(os.environ.get("LIVE_STATUS_YOUTUBE_IDLE_INTERVAL", "1800"))
+
+# "Near schedule" = from 15 minutes before a slot until 45 minutes after it
+SCHEDULE_LEAD = timedelta(minutes=15)
+SCHEDULE_GRACE = timedelta(minutes=45)
+SCHEDULE_RELOAD_SECONDS = 600
+
+StatusListener = Callable[[Dict, Dict], Awaitable[None]]
+
+
+def _offline_platform() -> Dict:
+    return {"is_live": False, "title": None, "game": None, "viewer_count": None, "checked_at": None, "error": None}
+
+
+class LiveStatusService:
+    """
+    Owns the live-status poll loop and the merged, cached result.
+
+    Readers call get_status() (memory read). Anything that reacts to a stream
+    going live/offline registers with subscribe(); listeners get
+    (status, previous_status) on every transition.
+    """
+
+    def __init__(
+        self,
+        twitch_checker: Optional[Callable[[], Awaitable[Dict]]] = None,
+        youtube_checker: Optional[Callable[[], Awaitable[Dict]]] = None,
+    ):
+        self._twitch_checker = twitch_checker or self._check_twitch
+        self._youtube_checker = youtube_checker or self._check_youtube
+        self.db = None
+
+        self._platforms: Dict[str, Dict] = {"twitch": _offline_platform(), "youtube": _offline_platform()}
+        self._last_polled: Dict[str, Optional[float]] = {"twitch": None, "youtube": None}
+        self._status: Dict = self._merge(None)
+        self._schedule: List[tuple] = []
+        self._schedule_loaded_at = 0.0
+        self._listeners: List[StatusListener] = []
+        self._listener_tasks: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refresh_lock = asyncio.Lock()
+        self.next_poll_at: Optional[float] = None
+        self.stats = {"polls": 0, "transitions": 0, "twitch_calls": 0, "youtube_calls": 0}
+
+    # ---------- platform checks ----------
+    async def _check_twitch(self) -> Dict:
+        from twitch_service import twitch_service
+        data = await twitch_service.check_if_live()
+        return {
+            "is_live": bool(data.get("is_live")),
+            "title": data.get("title"),
+            "game": data.get("game_name"),
+            "viewer_count": data.get("viewer_count"),
+            "started_at": data.get("started_at"),
+            "thumbnail_url": data.get("thumbnail_url"),
+            "error": data.get("error"),
+        }
+
+    async def _check_youtube(self) -> Dict:
+        from youtube_sync import get_sync_manager
+        manager = await get_sync_manager()
+        data = await manager.check_live_status()
+        return {
+            "is_live": bool(data.get("is_live")),
+            "title": data.get("live_title"),
+            "game": None,
+            "viewer_count": None,
+            "video_id": data.get("live_video_id"),
+            "thumbnail_url": data.get("live_thumbnail"),
+            "error": data.get("error"),
+        }
+
+    # ---------- schedule-aware cadence ----------
+    async def _load_schedule(self):
+        if self.db is None or time.monotonic() - self._schedule_loaded_at < SCHEDULE_RELOAD_SECONDS:
+            return
+        self._schedule_loaded_at = time.monotonic()
+        try:
+            items = await self.db.stream_schedule.find(
+                {"is_active": True}, {"_id": 0, "day": 1, "time": 1}
+            ).to_list(length=50)
+        except Exception as e:
+            logger.warning(f"⚠️ Live status: schedule load failed: {e}")
+            return
+        slots = []
+        for item in items:
+            day = DAY_INDEX.get(str(item.get("day", "")).upper())
+            try:
+                hour, minute = (int(part) for part in str(item.get("time", "")).split(":")[:2])
+            except ValueError:
+                continue
+            if day is not None:
+                slots.append((day, hour, minute))
+        self._schedule = slots
+
+    def is_near_schedule(self, now: Optional[datetime] = None) -> bool:
+        """True when `now` falls in the lead/grace window of any scheduled stream"""
+        local = (now or datetime.now(timezone.utc)).astimezone(SCHEDULE_TZ)
+        for day, hour, minute in self._schedule:
+            # Check this week's and last week's occurrence (grace window can cross midnight)
+            for week_offset in (0, -7):
+                slot = (local + timedelta(days=day - local.weekday() + week_offset)).replace(
+                    hour=hour, minute=minute, second=0, microsecond=0
+                )
+                if slot - SCHEDULE_LEAD <= local <= slot + SCHEDULE_GRACE:
+                    return True
+        return False
+
+    def next_interval(self, now: Optional[datetime] = None) -> int:
+        if self._status["is_live"]:
+            return LIVE_POLL_INTERVAL
+        if self.is_near_schedule(now):
+            return NEAR_SCHEDULE_POLL_INTERVAL
+        return IDLE_POLL_INTERVAL
+
+    def _youtube_due(self, now: float) -> bool:
+        interval = YOUTUBE_MIN_INTERVAL if (self._status["is_live"] or self.is_near_schedule()) else YOUTUBE_IDLE_INTERVAL
+        last = self._last_polled["youtube"]
+        return last is None or now - last >= interval
+
+    # ---------- merge ----------
+    def _merge(self, override: Optional[Dict]) -> Dict:
+        twitch, youtube = self._platforms["twitch"], self._platforms["youtube"]
+        if override is not None:
+            is_live = bool(override.get("is_live"))
+            source = "admin_override"
+            game = override.get("live_game")
+            viewers = override.get("current_viewers") or "0"
+            title = None
+        else:
+            primary = twitch if twitch["is_live"] else youtube if youtube["is_live"] else None
+            is_live = primary is not None
+            source = ("twitch" if primary is twitch else "youtube") if primary else None
+            game = (twitch["game"] if twitch["is_live"] else None) or (primary or {}).get("game")
+            viewers = str(twitch["viewer_count"] or 0) if twitch["is_live"] else "0"
+            title = (primary or {}).get("title")
+        return {
+            "is_live": is_live,
+            "source": source,
+            "live_game": game,
+            "current_viewers": viewers,
+            "title": title,
+            "manual_override": override is not None,
+            "platforms": {name: dict(state) for name, state in self._platforms.items()},
+        }
+
+    async def _read_override(self) -> Optional[Dict]:
+        if self.db is None:
+            return None
+        try:
+            return await self.db.channel_stats.find_one(
+                {"admin_override": True}, {"_id": 0, "is_live": 1, "current_viewers": 1, "live_game": 1}
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Live status: override lookup failed: {e}")
+            return None
+
+    # ---------- refresh ----------
+    async def refresh(self, force: bool = False, push: bool = True, poll: bool = True) -> Dict:
+        """
+        Poll the platforms that are due (all of them when force=True), merge
+        with the admin override and fan out on transitions.
+        poll=False only re-reads the admin override (no platform API calls).
+        push=False skips the WebSocket/SSE broadcast (caller already sent one)
+        but still notifies in-process subscribers.
+        """
+        async with self._refresh_lock:
+            await self._load_schedule()
+            now = time.monotonic()
+            checks = {"twitch": self._twitch_checker} if poll else {}
+            if poll and (force or self._youtube_due(now)):
+                checks["youtube"] = self._youtube_checker
+
+            results = await asyncio.gather(*(check() for check in checks.values()), return_exceptions=True)
+            checked_at = datetime.now(timezone.utc).isoformat()
+            for name, result in zip(checks, results):
+                self._last_polled[name] = now
+                self.stats[f"{name}_calls"] += 1
+                if isinstance(result, Exception):
+                    logger.warning(f"⚠️ Live status: {name} check failed: {result}")
+                    # Keep the last known state; a flaky API shouldn't flap the status
+                    self._platforms[name] = {**self._platforms[name], "checked_at": checked_at, "error": str(result)}
+                else:
+                    self._platforms[name] = {**_offline_platform(), **result, "checked_at": checked_at}
+
+            previous = self._status
+            merged = self._merge(await self._read_override())
+            changed = (merged["is_live"], merged["live_game"]) != (previous["is_live"], previous["live_game"])
+            merged["checked_at"] = checked_at
+            merged["changed_at"] = checked_at if changed else previous.get("changed_at")
+            self._status = merged
+            self.stats["polls"] += 1
+
+        if changed:
+            self.stats["transitions"] += 1
+            state = "LIVE" if merged["is_live"] else "OFFLINE"
+            logger.info(f"🔴 Live status changed: {state} (source={merged['source']}, game={merged['live_game']})")
+            await self._persist(merged)
+            if push:
+                await self._broadcast(merged)
+            self._notify(merged, previous)
+        return self.get_status()
+
+    async def _persist(self, status: Dict):
+        """Mirror auto-detected transitions into channel_stats for existing readers"""
+        if self.db is None or status["manual_override"]:
+            return
+        try:
+            await self.db.channel_stats.update_one(
+                {},
+                {"$set": {
+                    "is_live": status["is_live"],
+                    "current_viewers": status["current_viewers"],
+                    "live_game": status["live_game"],
+                    "updated_at": datetime.now(timezone.utc),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Live status: channel_stats update failed: {e}")
+
+    async def _broadcast(self, status: Dict):
+        from admin_api import broadcast_admin_update
+        await broadcast_admin_update("live_status_update", {
+            "is_live": status["is_live"],
+            "current_viewers": status["current_viewers"],
+            "live_game": status["live_game"],
+            # Field names used by websocket_manager.broadcast_live_status consumers
+            "viewer_count": status["current_viewers"],
+            "game": status["live_game"],
+            "status_text": "LIVE NOW" if status["is_live"] else "OFFLINE",
+            "source": status["source"],
+            "manual_override": status["manual_override"],
+        })
+
+    def _notify(self, status: Dict, previous: Dict):
+        # Listeners run as tasks so a slow consumer (Discord DMs) never delays the poller
+        for listener in list(self._listeners):
+            task = asyncio.create_task(self._run_listener(listener, dict(status), dict(previous)))
+            self._listener_tasks.add(task)
+            task.add_done_callback(self._listener_tasks.discard)
+
+    @staticmethod
+    async def _run_listener(listener: StatusListener, status: Dict, previous: Dict):
+        try:
+            await listener(status, previous)
+        except Exception as e:
+            logger.error(f"❌ Live status listener failed: {e}")
+
+    # ---------- public API ----------
+    def get_status(self) -> Dict:
+        status = dict(self._status)
+        status["platforms"] = {name: dict(state) for name, state in self._status["platforms"].items()}
+        if self.next_poll_at is not None:
+            status["next_check_in"] = max(0, round(self.next_poll_at - time.monotonic()))
+        return status
+
+    def subscribe(self, listener: StatusListener) -> Callable[[], None]:
+        """Register an async listener(status, previous) for transitions; returns an unsubscribe function"""
+        self._listeners.append(listener)
+
+        def unsubscribe():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+        return unsubscribe
+
+    def request_refresh(self):
+        """Wake the poller early instead of waiting out the current interval"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def invalidate_schedule(self):
+        """Reload stream_schedule on the next poll (admin edited the schedule)"""
+        self._schedule_loaded_at = 0.0
+
+    async def _run(self):
+        logger.info("📡 Live status poller started")
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Live status poll failed: {e}")
+            interval = self.next_interval()
+            self.next_poll_at = time.monotonic() + interval
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, db=None):
+        if self._task is not None and not self._task.done():
+            return
+        self.db = db
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        try:
+            from twitch_service import twitch_service
+            await twitch_service.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Twitch session close failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "subscribers": len(self._listeners),
+            "scheduled_slots": len(self._schedule),
+            "near_schedule": self.is_near_schedule(),
+            "poll_interval": self.next_interval(),
+        }
+
+
+# Global live status service instance
+live_status_service = LiveStatusService()
+
+def get_live_status_service() -> LiveStatusService:
+    """Get global live status service"""
+    return live_status_service
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - In-Process Load Harness
+Boots the FastAPI app inside this process against a local MongoDB stand-in and
+replays stream-start surge scenarios (go-live WebSocket burst, chat spam with
+point awards, mass poll voting, leaderboard polling).
+
+The JSON report (throughput, latency percentiles, event-loop lag) uses sorted
+keys and fixed rounding so two runs can be diffed between commits:
+
+    python load_harness.py --out before.json
+    git checkout my-branch
+    python load_harness.py --out after.json --compare before.json
+
+Mongo stand-in: mongomock-motor (pip install -r requirements-dev.txt) by default, or a
+real local mongod via --mongo-url mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("load_harness")
+
+BACKEND_DIR = Path(__file__).parent
+HARNESS_DB_NAME = "remza019_gaming"
+
+
+# ============== MONGO STAND-IN ==============
+def install_mongo_standin(mongo_url: Optional[str]):
+    """
+    Point every module at the same database before server.py is imported.
+    With no URL, AsyncIOMotorClient is replaced by a single shared
+    mongomock-motor client so all modules see one in-memory store.
+    """
+    os.environ["DB_NAME"] = HARNESS_DB_NAME
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+        return "mongod:" + mongo_url
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("❌ mongomock-motor not installed - pip install -r requirements-dev.txt or pass --mongo-url")
+
+    import motor.motor_asyncio
+
+    os.environ["MONGO_URL"] = "mongodb://load-harness.invalid:27017"
+    shared_client = AsyncMongoMockClient()
+
+    def _shared_client(*args, **kwargs):
+        return shared_client
+
+    motor.motor_asyncio.AsyncIOMotorClient = _shared_client
+    return "mongomock-motor"
+
+
+# ============== IN-PROCESS ASGI WEBSOCKET CLIENT ==============
+class ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking the ASGI protocol directly"""
+
+    def __init__(self, app, path: str, subprotocols: Optional[List[str]] = None):
+        self.app = app
+        self.path = path
+        self.subprotocols = subprotocols or []
+        self._inbound: asyncio.Queue = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.received = 0
+        self.bytes_received = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _send(self, message):
+        kind = message["type"]
+        if kind == "websocket.accept":
+            self.accepted.set()
+        elif kind == "websocket.send":
+            self.received += 1
+            payload = message.get("text") or message.get("bytes") or b""
+            self.bytes_received += len(payload)
+        elif kind == "websocket.close":
+            self.accepted.set()
+            self.closed.set()
+
+    async def connect(self, timeout: float = 10.0):
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", random.randint(1024, 65535)),
+            "server": ("testserver", 80),
+            "subprotocols": self.subprotocols,
+        }
+        await self._inbound.put({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._inbound.get, self._send))
+        await asyncio.wait_for(self.accepted.wait(), timeout)
+        if self.closed.is_set():
+            raise ConnectionError(f"WebSocket rejected: {self.path}")
+
+    async def send_text(self, text: str):
+        await self._inbound.put({"type": "websocket.receive", "text": text})
+
+    async def close(self):
+        await self._inbound.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, 5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+
+
+# ============== MEASUREMENT ==============
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50": round(percentile(ordered, 50) * 1000, 2),
+        "p90": round(percentile(ordered, 90) * 1000, 2),
+        "p95": round(percentile(ordered, 95) * 1000, 2),
+        "p99": round(percentile(ordered, 99) * 1000, 2),
+        "max": round((ordered[-1] if ordered else 0.0) * 1000, 2),
+    }
+
+
+class LoopLagSampler:
+    """Records event-loop scheduling delay while a scenario runs"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return summarize_ms(self.samples)
+
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self.errors = 0
+        self.extra: Dict[str, float] = {}
+        self.duration = 0.0
+        self.loop_lag: Dict[str, float] = {}
+
+    def record(self, latency: float, status: str, ok: bool):
+        self.latencies.append(latency)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def to_dict(self) -> Dict:
+        operations = len(self.latencies)
+        return {
+            "operations": operations,
+            "errors": self.errors,
+            "status_counts": dict(sorted(self.status_counts.items())),
+            "duration_s": round(self.duration, 3),
+            "throughput_ops_s": round(operations / self.duration, 1) if self.duration else 0.0,
+            "latency_ms": summarize_ms(self.latencies),
+            "event_loop_lag_ms": self.loop_lag,
+            **{k: round(v, 3) if isinstance(v, float) else v for k, v in sorted(self.extra.items())},
+        }
+
+
+# ============== HARNESS ==============
+class LoadHarness:
+    def __init__(self, scale: int, concurrency: int, seed: int, ws_subprotocol: Optional[str] = None):
+        self.scale = scale
+        # Offered on every harness WebSocket (None = legacy v1 JSON frames)
+        self.ws_subprotocols = [ws_subprotocol] if ws_subprotocol else []
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+        self.app = None
+        self.db = None
+        self.http = None
+        self.admin_token = None
+        self.viewer_ids: List[str] = []
+
+    async def boot(self):
+        import httpx
+
+        sys.path.insert(0, str(BACKEND_DIR))
+        import server
+
+        self.app = server.app
+        self.db = server.get_database()
+        await self.app.router.startup()
+        transport = httpx.ASGITransport(app=self.app)
+        self.http = httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=60)
+        await self._seed()
+
+    async def shutdown(self):
+        if self.http:
+            await self.http.aclose()
+        try:
+            await self.app.router.shutdown()
+        except Exception as e:
+            logger.warning(f"Shutdown handlers failed: {e}")
+
+    async def _seed(self):
+        from admin_api import create_access_token
+
+        admin = await self.db.admin_users.find_one({"username": "admin"})
+        self.admin_token = create_access_token(admin["id"]) if admin else None
+
+        viewers = []
+        for index in range(self.scale):
+            user_id = str(uuid.uuid4())
+            viewers.append({
+                "user_id": user_id,
+                "id": user_id,
+                "username": f"loadviewer{index}",
+                "email": f"loadviewer{index}@example.com",
+                "points": self.random.randint(0, 3000),
+                "level": 1,
+                "created_at": datetime.now(),
+                "last_active": datetime.now(),
+                "total_activities": 0,
+                "unlocked_features": ["chat"],
+                "email_verified": False,
+            })
+        await self.db.viewers.delete_many({"username": {"$regex": "^loadviewer"}})
+        await self.db.viewers.insert_many(viewers)
+        self.viewer_ids = [viewer["user_id"] for viewer in viewers]
+
+    async def _run_requests(self, result: ScenarioResult, count: int, make_request: Callable):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(index: int):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await make_request(index)
+                    result.record(time.perf_counter() - started, str(response.status_code), response.status_code < 400)
+                except Exception as e:
+                    result.record(time.perf_counter() - started, type(e).__name__, False)
+
+        await asyncio.gather(*(one(i) for i in range(count)))
+
+    async def _timed(self, name: str, body: Callable) -> Dict:
+        result = ScenarioResult(name)
+        sampler = LoopLagSampler()
+        sampler.start()
+        started = time.perf_counter()
+        await body(result)
+        result.duration = time.perf_counter() - started
+        result.loop_lag = await sampler.stop()
+        logger.info(f"✅ {name}: {len(result.latencies)} ops in {result.duration:.2f}s ({result.errors} errors)")
+        return result.to_dict()
+
+    # ---------- scenarios ----------
+    async def scenario_go_live_ws_burst(self) -> Dict:
+        """N viewers connect at once, then the go-live broadcast fans out to all of them"""
+        from websocket_manager import get_ws_manager
+
+        sockets: List[ASGIWebSocket] = []
+
+        async def body(result: ScenarioResult):
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def connect(index: int):
+                async with semaphore:
+                    socket = ASGIWebSocket(self.app, f"/api/ws/load-{index}", self.ws_subprotocols)
+                    started = time.perf_counter()
+                    try:
+                        await socket.connect()
+                        sockets.append(socket)
+                        result.record(time.perf_counter() - started, "accepted", True)
+                    except Exception as e:
+                        result.record(time.perf_counter() - started, type(e).__name__, False)
+
+            await asyncio.gather(*(connect(i) for i in range(self.scale)))
+
+            fan_out_started = time.perf_counter()
+            await get_ws_manager().broadcast_live_status(True, viewer_count=len(sockets), game="FORTNITE")
+            result.extra["broadcast_fanout_ms"] = (time.perf_counter() - fan_out_started) * 1000
+            result.extra["connected_clients"] = len(sockets)
+            result.extra["ws_bytes_per_client"] = (
+                sum(s.bytes_received for s in sockets) / len(sockets) if sockets else 0.0
+            )
+
+        try:
+            return await self._timed("go_live_ws_burst", body)
+        finally:
+            await asyncio.gather(*(s.close() for s in sockets), return_exceptions=True)
+
+    async def scenario_chat_spam(self) -> Dict:
+        """Viewers spam the group chat; every message awards points"""
+
+        async def body(result: ScenarioResult):
+            def make_request(index: int):
+                user_id = self.viewer_ids[index % len(self.viewer_ids)]
+                return self.http.post("/api/viewer/chat/send", json={
+                    "user_id": user_id,
+                    "username": f"loadviewer{index % len(self.viewer_ids)}",
+                    "message": f"GG {index} Kappa",
+                    "level": 1,
+                })
+
+            await self._run_requests(result, self.scale * 2, make_request)
+
+        return await self._timed("chat_spam_with_points", body)
+
+    async def scenario_poll_voting(self) -> Dict:
+        """Admin opens a poll and every viewer votes while public sockets watch"""
+        headers = {"Authorization": f"Bearer {self.admin_token}"} if self.admin_token else {}
+        response = await self.http.post("/api/polls/create", headers=headers, json={
+            "question": "Next game?",
+            "options": ["FORTNITE", "COD WARZONE", "ROCKET RACING", "MODERN WARFARE"],
+        })
+        if response.status_code >= 400:
+            logger.warning(f"⚠️ Poll creation failed ({response.status_code}) - skipping poll scenario")
+            return {"skipped": f"poll creation returned {response.status_code}"}
+        poll = response.json()["poll"]
+        option_ids = [option["id"] for option in poll["options"]]
+
+        watchers = [
+            ASGIWebSocket(self.app, f"/api/ws/poll-watch-{i}", self.ws_subprotocols)
+            for i in range(min(self.scale, 200))
+        ]
+        await asyncio.gather(*(w.connect() for w in watchers))
+
+        async def body(result: ScenarioResult):
+            def make_request(index: int):
+                return self.http.post("/api/polls/vote", json={
+                    "poll_id": poll["id"],
+                    "option_id": self.random.choice(option_ids),
+                    "user_id": self.viewer_ids[index],
+                    "username": f"loadviewer{index}",
+                })
+
+            await self._run_requests(result, len(self.viewer_ids), make_request)
+            result.extra["watchers"] = len(watchers)
+            result.extra["ws_bytes_per_watcher"] = (
+                sum(w.bytes_received for w in watchers) / len(watchers) if watchers else 0.0
+            )
+
+        try:
+            return await self._timed("mass_poll_voting", body)
+        finally:
+            await asyncio.gather(*(w.close() for w in watchers), return_exceptions=True)
+
+    async def scenario_leaderboard_polling(self) -> Dict:
+        """Overlay widgets and viewers poll the public leaderboard"""
+
+        async def body(result: ScenarioResult):
+            await self._run_requests(
+                result, self.scale * 2,
+                lambda index: self.http.get("/api/leaderboard/top", params={"limit": 10})
+            )
+
+        return await self._timed("leaderboard_polling", body)
+
+
+SCENARIOS = {
+    "go_live_ws_burst": LoadHarness.scenario_go_live_ws_burst,
+    "chat_spam": LoadHarness.scenario_chat_spam,
+    "poll_voting": LoadHarness.scenario_poll_voting,
+    "leaderboard_polling": LoadHarness.scenario_leaderboard_polling,
+}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def compare_reports(before: Dict, after: Dict) -> List[str]:
+    """Human-readable deltas for throughput and tail latency"""
+    lines = []
+    for name, current in sorted(after.get("scenarios", {}).items()):
+        previous = before.get("scenarios", {}).get(name)
+        if not previous or "latency_ms" not in previous or "latency_ms" not in current:
+            continue
+        for label, old, new in (
+            ("throughput_ops_s", previous["throughput_ops_s"], current["throughput_ops_s"]),
+            ("p50_ms", previous["latency_ms"]["p50"], current["latency_ms"]["p50"]),
+            ("p99_ms", previous["latency_ms"]["p99"], current["latency_ms"]["p99"]),
+            ("loop_lag_p99_ms", previous["event_loop_lag_ms"]["p99"], current["event_loop_lag_ms"]["p99"]),
+        ):
+            change = ((new - old) / old * 100) if old else 0.0
+            lines.append(f"{name:24} {label:18} {old:>10} -> {new:>10} ({change:+.1f}%)")
+    return lines
+
+
+async def run(args) -> Dict:
+    backend = install_mongo_standin(args.mongo_url)
+    harness = LoadHarness(scale=args.scale, concurrency=args.concurrency, seed=args.seed,
+                          ws_subprotocol=args.ws_protocol)
+    await harness.boot()
+
+    selected = args.scenario or list(SCENARIOS)
+    results = {}
+    try:
+        for name in selected:
+            results[name] = await SCENARIOS[name](harness)
+    finally:
+        await harness.shutdown()
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "mongo_backend": backend.split(":", 1)[0],
+            "scale": args.scale,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "ws_protocol": args.ws_protocol or "v1",
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="REMZA019 in-process load harness")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--scale", type=int, default=500, help="Viewers / sockets per scenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent in-flight requests")
+    parser.add_argument("--seed", type=int, default=19, help="Random seed for reproducible payloads")
+    parser.add_argument("--mongo-url", help="Use a real local mongod instead of mongomock-motor")
+    parser.add_argument("--ws-protocol", choices=["remza019.v2.json", "remza019.v2.msgpack"],
+                        help="WebSocket subprotocol the harness sockets offer (default: legacy v1 JSON)")
+    parser.add_argument("--out", help="Write JSON report to this path")
+    parser.add_argument("--compare", help="Previous JSON report to diff against")
+    parser.add_argument("--verbose", action="store_true", help="Keep application INFO logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not args.verbose:
+        # App modules log every request/broadcast at INFO - that would dominate the measurement
+        logging.getLogger().setLevel(logging.WARNING)
+        logger.setLevel(logging.INFO)
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(rendered + "\n")
+        logger.info(f"📄 Report written to {args.out}")
+    else:
+        print(rendered)
+
+    if args.compare:
+        before = json.loads(Path(args.compare).read_text())
+        for line in compare_reports(before, report):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
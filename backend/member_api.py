@@ -18,6 +18,10 @@ logger = logging.getLogger(__name__)
 
 # Import email service
 from email_service import email_service
+from license_tokens import get_license_token_service
+from pagination import paginate, export_response, register_pagination_index
+from admin_api import get_current_admin
+from dashboard_queries import Count, run_dashboard, get_dashboard_cache
 
 # MongoDB connection
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
@@ -447,7 +451,8 @@ async def activate_member_license(data: ActivateLicenseRequest, member = Depends
             "success": True,
             "message": "License activated successfully!",
             "license_type": license_type,
-            "expires_at": expires_at
+            "expires_at": expires_at,
+            "license_token": get_license_token_service().issue(license_doc, owner=member['member_id'])
         }
     
     except HTTPException:
@@ -499,22 +504,49 @@ async def get_pending_members():
         logger.error(f"Get pending members error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+MEMBER_EXPORT_FIELDS = [
+    "member_id", "nickname", "email", "discord_id", "email_verified", "license_type",
+    "license_key", "license_expires_at", "created_at", "last_login"
+]
+# Never leave the database through list/export endpoints
+MEMBER_PRIVATE_FIELDS = {"_id": 0, "verification_code": 0, "verification_expires": 0}
+register_pagination_index(members_collection, [("created_at", -1)], "member_id")
+
 @router.get("/admin/all-members")
-async def get_all_members():
+async def get_all_members(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    export: Optional[str] = None,
+    admin = Depends(get_current_admin)
+):
     """
-    Get all members (Admin only)
+    Get members, newest first (Admin only)
+    Keyset paged via `cursor`/`next_cursor`; `export=ndjson|csv` streams every member
     """
+    if export:
+        return export_response(
+            members_collection, export, "members", MEMBER_EXPORT_FIELDS,
+            sort=[("created_at", -1), ("member_id", -1)], projection=MEMBER_PRIVATE_FIELDS, admin=admin
+        )
     try:
-        members = await members_collection.find(
-            {},
-            {"_id": 0}
-        ).sort("created_at", -1).to_list(length=1000)
+        page = await paginate(
+            members_collection,
+            sort=[("created_at", -1)],
+            tiebreaker="member_id",
+            projection=MEMBER_PRIVATE_FIELDS,
+            limit=limit,
+            cursor=cursor
+        )
         
         return {
             "success": True,
-            "members": members,
-            "total": len(members)
+            "members": page["items"],
+            "total": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get all members error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -619,24 +651,18 @@ async def get_admin_member_stats():
     Get member statistics for admin dashboard
     """
     try:
-        total = await members_collection.count_documents({})
-        verified = await members_collection.count_documents({"email_verified": True})
-        pending = await members_collection.count_documents({"email_verified": False})
-        active = await members_collection.count_documents({"is_active": True})
-        banned = await members_collection.count_documents({"is_banned": True})
-        with_license = await members_collection.count_documents({"license_type": {"$ne": "NONE"}})
-        
-        return {
-            "success": True,
-            "stats": {
-                "total": total,
-                "verified": verified,
-                "pending": pending,
-                "active": active,
-                "banned": banned,
-                "with_license": with_license
-            }
-        }
+        async def compute():
+            [stats] = await run_dashboard([(members_collection, {
+                "total": Count(),
+                "verified": Count({"email_verified": True}),
+                "pending": Count({"email_verified": False}),
+                "active": Count({"is_active": True}),
+                "banned": Count({"is_banned": True}),
+                "with_license": Count({"license_type": {"$ne": "NONE"}})
+            })])
+            return {"success": True, "stats": stats}
+        
+        return await get_dashboard_cache().get_or_compute("member_stats", compute)
     except Exception as e:
         logger.error(f"Get member stats error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
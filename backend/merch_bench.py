@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - Merch Drop Surge Benchmark
+Simulates a merch drop announced on stream: a limited product goes on sale
+and every viewer hits the catalog, polls stock and tries to order at once.
+Reports catalog latency before and during the surge, order outcomes, and
+checks the inventory invariants (no oversell, available + reserved + sold
+equals the stock put on sale):
+
+    python merch_bench.py --viewers 2000 --stock 150 --out drop.json
+
+Boots and seeds the app exactly like load_harness.py (same Mongo stand-in).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from load_harness import LoadHarness, git_revision, install_mongo_standin, summarize_ms
+
+logger = logging.getLogger("merch_bench")
+
+DROP_PRODUCT = {
+    "product_id": "bench-drop-hoodie",
+    "name": "REMZA019 Limited Drop Hoodie",
+    "description": "Numbered run, announced live on stream.",
+    "price": 59.99,
+    "image_url": "https://remza019.gaming/merch/drop-hoodie.png",
+    "sizes": ["S", "M", "L", "XL"],
+    "colors": ["black"],
+    "category": "hoodie",
+}
+CATALOG_PRODUCTS = 40
+
+
+async def seed(harness: LoadHarness, stock: int) -> Dict:
+    headers = {"Authorization": f"Bearer {harness.admin_token}"}
+    for index in range(CATALOG_PRODUCTS):
+        await harness.http.post("/api/merch/admin/products", headers=headers, json={
+            "product_id": f"bench-pod-{index:03d}",
+            "name": f"REMZA019 Tee #{index}",
+            "description": "Print on demand. " * 10,
+            "price": 24.99,
+            "image_url": f"https://remza019.gaming/merch/tee-{index}.png",
+            "sizes": ["S", "M", "L", "XL", "XXL"],
+            "colors": ["black", "white", "red"],
+            "category": "tshirt",
+        })
+    response = await harness.http.post("/api/merch/admin/products", headers=headers, json={**DROP_PRODUCT, "stock": stock})
+    response.raise_for_status()
+    return headers
+
+
+async def timed_catalog(harness: LoadHarness, latencies: List[float], statuses: Dict[str, int]):
+    started = time.perf_counter()
+    response = await harness.http.get("/api/merch/products")
+    latencies.append(time.perf_counter() - started)
+    statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+
+async def catalog_phase(harness: LoadHarness, count: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(harness.concurrency)
+
+    async def one():
+        async with semaphore:
+            await timed_catalog(harness, latencies, statuses)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return {"requests": count, "status_counts": statuses, "latency_ms": summarize_ms(latencies)}
+
+
+async def surge_phase(harness: LoadHarness, viewers: int, max_quantity: int) -> Dict:
+    catalog_latencies: List[float] = []
+    catalog_statuses: Dict[str, int] = {}
+    order_latencies: List[float] = []
+    outcomes: Dict[str, int] = {}
+    units_ordered = 0
+    semaphore = asyncio.Semaphore(harness.concurrency)
+    product_id = DROP_PRODUCT["product_id"]
+
+    async def viewer(index: int):
+        nonlocal units_ordered
+        quantity = harness.random.randint(1, max_quantity)
+        async with semaphore:
+            await timed_catalog(harness, catalog_latencies, catalog_statuses)
+            await harness.http.get("/api/merch/stock", params={"product_ids": product_id})
+            started = time.perf_counter()
+            response = await harness.http.post("/api/merch/order", params={
+                "user_id": harness.viewer_ids[index % len(harness.viewer_ids)], "product_id": product_id,
+                "size": harness.random.choice(DROP_PRODUCT["sizes"]), "color": "black", "quantity": quantity,
+            })
+            order_latencies.append(time.perf_counter() - started)
+            outcome = {200: "reserved", 409: "sold_out"}.get(response.status_code, f"http_{response.status_code}")
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            if response.status_code == 200:
+                units_ordered += quantity
+
+    started = time.perf_counter()
+    await asyncio.gather(*(viewer(index) for index in range(viewers)))
+    duration = time.perf_counter() - started
+    return {
+        "viewers": viewers,
+        "duration_s": round(duration, 3),
+        "catalog": {"requests": len(catalog_latencies), "status_counts": catalog_statuses,
+                    "latency_ms": summarize_ms(catalog_latencies)},
+        "orders": {"outcomes": outcomes, "units_reserved": units_ordered,
+                   "orders_per_s": round(viewers / duration, 1) if duration else 0.0,
+                   "latency_ms": summarize_ms(order_latencies)},
+    }
+
+
+async def check_inventory(harness: LoadHarness, stock: int, units_reserved: int) -> Dict:
+    product_id = DROP_PRODUCT["product_id"]
+    inventory = await harness.db.merch_inventory.find_one({"_id": product_id})
+    held = await harness.db.orders.aggregate([
+        {"$match": {"product_id": product_id, "status": {"$in": ["pending", "paid"]}}},
+        {"$group": {"_id": None, "units": {"$sum": "$quantity"}}},
+    ]).to_list(length=1)
+    units_in_orders = held[0]["units"] if held else 0
+    return {
+        "stock": stock,
+        "available": inventory["available"],
+        "reserved": inventory["reserved"],
+        "sold": inventory["sold"],
+        "units_in_orders": units_in_orders,
+        "oversold": max(units_in_orders - stock, 0),
+        "balanced": inventory["available"] + inventory["reserved"] + inventory["sold"] == stock
+                    and inventory["reserved"] == units_in_orders == units_reserved,
+    }
+
+
+async def run(args) -> Dict:
+    backend = install_mongo_standin(args.mongo_url)
+    harness = LoadHarness(scale=min(args.viewers, 2000), concurrency=args.concurrency, seed=args.seed)
+    await harness.boot()
+
+    from merch_store import get_merch_store
+    store = get_merch_store()
+    try:
+        await seed(harness, args.stock)
+        await catalog_phase(harness, min(20, args.catalog_requests))  # warm-up
+        builds_before = store.stats["catalog_builds"]
+        quiet = await catalog_phase(harness, args.catalog_requests)
+        logger.info(f"✅ quiet catalog p50 {quiet['latency_ms']['p50']} ms p99 {quiet['latency_ms']['p99']} ms")
+        surge = await surge_phase(harness, args.viewers, args.max_quantity)
+        logger.info(f"✅ surge catalog p50 {surge['catalog']['latency_ms']['p50']} ms "
+                    f"p99 {surge['catalog']['latency_ms']['p99']} ms, orders {surge['orders']['outcomes']}")
+        inventory = await check_inventory(harness, args.stock, surge["orders"]["units_reserved"])
+        logger.info(f"{'✅' if inventory['balanced'] and not inventory['oversold'] else '❌'} inventory {inventory}")
+        catalog_builds = store.stats["catalog_builds"] - builds_before
+    finally:
+        await harness.shutdown()
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "mongo_backend": backend.split(":", 1)[0],
+            "viewers": args.viewers,
+            "stock": args.stock,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "quiet_catalog": quiet,
+        "surge": surge,
+        "inventory": inventory,
+        # Catalog snapshots rebuilt from Mongo while measuring (0 = every view served from memory)
+        "catalog_builds_during_run": catalog_builds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a merch drop: catalog latency and stock reservations")
+    parser.add_argument("--viewers", type=int, default=1000, help="Viewers rushing the drop")
+    parser.add_argument("--stock", type=int, default=100, help="Units put on sale")
+    parser.add_argument("--max-quantity", type=int, default=3, help="Units per order (uniform 1..N)")
+    parser.add_argument("--catalog-requests", type=int, default=500, help="Catalog views in the quiet phase")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--mongo-url", help="Use a real local mongod instead of mongomock-motor")
+    parser.add_argument("--out", help="Write JSON report to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(rendered + "\n")
+        logger.info(f"📄 Report written to {args.out}")
+    else:
+        print(rendered)
+
+
+if __name__ == "__main__":
+    main()
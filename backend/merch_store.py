@@ -0,0 +1,390 @@
+"""
+REMZA019 Gaming - Merch Catalog & Inventory
+The product catalog is served from an in-memory snapshot built with one query.
+Product writes go through this module, which drops the local snapshot and bumps
+a generation counter in Mongo; other worker processes notice the bump within
+MERCH_CATALOG_CHECK_SECONDS - a catalog view never reads Mongo per request.
+
+Limited products (merch drops) have a `merch_inventory` document
+{_id: product_id, available, reserved, sold}; products without one are
+print-on-demand and unlimited. An order reserves stock with one conditional
+$inc ({available: {$gte: quantity}}), so concurrent buyers can never take more
+than is left. Whether a product is limited is decided by that inventory
+document at order time, never by the (possibly stale) catalog snapshot. The order then stays "pending" until it is paid (reserved ->
+sold) or its reservation expires / is cancelled (reserved -> available again).
+Every status transition is a conditional update on the order, so a release and
+a payment racing for the same order cannot both apply.
+
+So that a crash mid-order cannot leak units, the order is written first with
+stock_state "reserving"; the stock $inc also adds the order id to the
+inventory's `holds`, and the order is finalised before the hold is pulled.
+release_expired() first reconciles orders stuck in "reserving": a hold means
+the units were taken (the order keeps them and expires normally), no hold
+means they never were (the order is failed).
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MERCH_CATALOG_CHECK_SECONDS = float(os.environ.get("MERCH_CATALOG_CHECK_SECONDS", "5"))
+MERCH_RESERVATION_MINUTES = int(os.environ.get("MERCH_RESERVATION_MINUTES", "15"))
+MERCH_MAX_ORDER_QUANTITY = int(os.environ.get("MERCH_MAX_ORDER_QUANTITY", "10"))
+RELEASE_BATCH_SIZE = 500
+# An order still "reserving" after this long was abandoned by a crashed worker
+RESERVING_GRACE_SECONDS = 60
+
+PRODUCT_PROJECTION = {"_id": 0}
+INVENTORY_PROJECTION = {"_id": 1, "available": 1, "reserved": 1, "sold": 1}
+
+
+class CatalogSnapshot:
+    """All active products as loaded at one catalog generation"""
+    __slots__ = ("generation", "products", "by_id", "limited", "built_at")
+
+    def __init__(self, generation: int, products: List[Dict], limited: set):
+        self.generation = generation
+        self.products = products
+        self.by_id = {product["product_id"]: product for product in products}
+        self.limited = limited
+        self.built_at = datetime.now(timezone.utc).isoformat()
+
+    def view(self, category: Optional[str] = None) -> Dict:
+        products = [p for p in self.products if p.get("category") == category] if category else self.products
+        return {"products": products, "count": len(products)}
+
+
+class MerchStore:
+    """Cached catalog, stock reservations and order state transitions"""
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        self._generation = 0
+        self._generation_checked = 0.0
+        # Bumped on every local drop so a build that raced a write is not kept
+        self._epoch = 0
+        self._indexes_ready = False
+        self.stats = {"catalog_builds": 0, "invalidations": 0, "reserved": 0, "sold_out": 0,
+                      "paid": 0, "released": 0}
+
+    def _db(self):
+        from server import get_database
+        return get_database()
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        db = self._db()
+        try:
+            await db.merchandise.create_index("product_id", unique=True)
+            await db.orders.create_index("order_id", unique=True)
+            await db.orders.create_index([("status", 1), ("reservation_expires_at", 1)])
+            await db.orders.create_index([("user_id", 1), ("created_at", -1)])
+            await db.orders.create_index([("stock_state", 1), ("created_at", 1)])
+        except Exception as e:
+            logger.warning(f"⚠️ Merch index creation failed: {e}")
+        self._indexes_ready = True
+
+    # ---------- catalog ----------
+    async def _check_generation(self):
+        now = time.monotonic()
+        if now - self._generation_checked < MERCH_CATALOG_CHECK_SECONDS:
+            return
+        self._generation_checked = now
+        try:
+            state = await self._db().merch_state.find_one({"_id": "catalog"}, {"generation": 1})
+        except Exception as e:
+            logger.warning(f"⚠️ Merch catalog generation check failed: {e}")
+            return
+        generation = (state or {}).get("generation", 0)
+        if generation != self._generation:
+            self._generation = generation
+            self._drop_snapshot()
+
+    def _drop_snapshot(self):
+        self._snapshot = None
+        self._epoch += 1
+        from fast_json import get_payload_cache
+        get_payload_cache().invalidate("merch:")
+
+    async def catalog(self) -> CatalogSnapshot:
+        """Current catalog; rebuilt (single-flight) only after a product write"""
+        await self._check_generation()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                db = self._db()
+                generation, epoch = self._generation, self._epoch
+                products, inventory = await asyncio.gather(
+                    db.merchandise.find({"is_active": {"$ne": False}}, PRODUCT_PROJECTION)
+                    .sort("product_id", 1).to_list(length=None),
+                    db.merch_inventory.find({}, {"_id": 1}).to_list(length=None),
+                )
+                snapshot = CatalogSnapshot(generation, products, {doc["_id"] for doc in inventory})
+                if epoch == self._epoch:
+                    self._snapshot = snapshot
+                self.stats["catalog_builds"] += 1
+                logger.info(f"🛍️ Merch catalog built: {len(products)} products (generation {generation})")
+            return snapshot
+
+    async def invalidate(self, reason: str):
+        """Call after every product / inventory-tracking write"""
+        self.stats["invalidations"] += 1
+        self._drop_snapshot()
+        try:
+            result = await self._db().merch_state.find_one_and_update(
+                {"_id": "catalog"},
+                {"$inc": {"generation": 1}, "$set": {"reason": reason, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            self._generation = result["generation"]
+            self._generation_checked = time.monotonic()
+        except Exception as e:
+            logger.warning(f"⚠️ Merch catalog generation bump failed: {e}")
+        logger.info(f"🛍️ Merch catalog invalidated: {reason}")
+
+    # ---------- product writes ----------
+    async def upsert_product(self, product: Dict, stock: Optional[int] = None) -> Dict:
+        db = self._db()
+        await self.ensure_indexes()
+        product = {**product, "is_active": True, "updated_at": datetime.now(timezone.utc)}
+        await db.merchandise.update_one(
+            {"product_id": product["product_id"]},
+            {"$set": product, "$setOnInsert": {"created_at": product["updated_at"]}},
+            upsert=True,
+        )
+        if stock is not None:
+            await self.set_stock(product["product_id"], stock, invalidate=False)
+        await self.invalidate(f"product {product['product_id']} saved")
+        return await db.merchandise.find_one({"product_id": product["product_id"]}, PRODUCT_PROJECTION)
+
+    async def delete_product(self, product_id: str) -> bool:
+        # Soft delete: orders keep pointing at the product
+        result = await self._db().merchandise.update_one(
+            {"product_id": product_id}, {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc)}}
+        )
+        if result.matched_count:
+            await self.invalidate(f"product {product_id} removed")
+        return bool(result.matched_count)
+
+    async def set_stock(self, product_id: str, available: int, invalidate: bool = True) -> Dict:
+        """Set sellable stock (reserved/sold are kept); the product becomes limited"""
+        inventory = await self._db().merch_inventory.find_one_and_update(
+            {"_id": product_id},
+            {"$set": {"available": max(available, 0), "updated_at": datetime.now(timezone.utc)},
+             "$setOnInsert": {"reserved": 0, "sold": 0}},
+            upsert=True, projection=INVENTORY_PROJECTION, return_document=ReturnDocument.AFTER,
+        )
+        if invalidate and (self._snapshot is None or product_id not in self._snapshot.limited):
+            await self.invalidate(f"stock tracking enabled for {product_id}")
+        return inventory
+
+    async def stock(self, product_ids: List[str]) -> Dict[str, Optional[int]]:
+        """Available units per product (None = unlimited)"""
+        snapshot = await self.catalog()
+        levels = {pid: None for pid in product_ids if pid in snapshot.by_id}
+        if levels:
+            # Read from the inventory itself so a product that just became limited shows its stock
+            for doc in await self._db().merch_inventory.find({"_id": {"$in": list(levels)}}, INVENTORY_PROJECTION).to_list(length=None):
+                levels[doc["_id"]] = doc["available"]
+        return levels
+
+    # ---------- orders ----------
+    async def reserve(self, user_id: str, product_id: str, size: str, color: str, quantity: int) -> Dict:
+        """Create a pending order holding `quantity` units until it is paid or expires"""
+        if not 1 <= quantity <= MERCH_MAX_ORDER_QUANTITY:
+            raise HTTPException(status_code=400, detail=f"Quantity must be between 1 and {MERCH_MAX_ORDER_QUANTITY}")
+        snapshot = await self.catalog()
+        product = snapshot.by_id.get(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        if product.get("sizes") and size not in product["sizes"]:
+            raise HTTPException(status_code=400, detail="Size not available")
+        if product.get("colors") and color not in product["colors"]:
+            raise HTTPException(status_code=400, detail="Color not available")
+
+        db = self._db()
+        now = datetime.now(timezone.utc)
+        order = {
+            "order_id": f"ORD-{uuid.uuid4().hex[:12].upper()}",
+            "user_id": user_id,
+            "product_id": product_id,
+            "size": size,
+            "color": color,
+            "quantity": quantity,
+            "unit_price": product["price"],
+            "total": round(product["price"] * quantity, 2),
+            "status": "pending",
+            "stock_reserved": False,
+            "stock_state": "reserving",
+            "reservation_expires_at": now + timedelta(minutes=MERCH_RESERVATION_MINUTES),
+            "created_at": now,
+        }
+        await db.orders.insert_one(order)
+        order.pop("_id", None)
+        try:
+            limited = await self._hold_stock(product_id, quantity, order["order_id"])
+        except HTTPException:
+            await db.orders.delete_one({"order_id": order["order_id"]})
+            raise
+        await db.orders.update_one(
+            {"order_id": order["order_id"]}, {"$set": {"stock_reserved": limited}, "$unset": {"stock_state": ""}}
+        )
+        if limited:
+            await db.merch_inventory.update_one({"_id": product_id}, {"$pull": {"holds": order["order_id"]}})
+        order["stock_reserved"] = limited
+        del order["stock_state"]
+        self.stats["reserved"] += 1
+        return order
+
+    async def _hold_stock(self, product_id: str, quantity: int, order_id: str) -> bool:
+        """Take `quantity` units for `order_id` if the product tracks stock; True if units were held"""
+        for _ in range(3):
+            held = await self._db().merch_inventory.update_one(
+                {"_id": product_id, "available": {"$gte": quantity}, "holds": {"$ne": order_id}},
+                {"$inc": {"available": -quantity, "reserved": quantity}, "$addToSet": {"holds": order_id}},
+            )
+            if held.modified_count:
+                return True
+            inventory = await self._db().merch_inventory.find_one({"_id": product_id}, {"available": 1})
+            if inventory is None:
+                return False  # print on demand
+            if inventory["available"] < quantity:
+                self.stats["sold_out"] += 1
+                raise HTTPException(status_code=409, detail="Not enough stock left")
+            # Restocked between the two reads - try the conditional $inc again
+        self.stats["sold_out"] += 1
+        raise HTTPException(status_code=409, detail="Not enough stock left")
+
+    async def mark_paid(self, order_id: str) -> Optional[Dict]:
+        """pending -> paid; reserved units become sold. None if the order is not pending"""
+        db = self._db()
+        paid_at = datetime.now(timezone.utc)
+        order = await db.orders.find_one_and_update(
+            {"order_id": order_id, "status": "pending", "stock_state": {"$exists": False}},
+            {"$set": {"status": "paid", "paid_at": paid_at}},
+            projection={"_id": 0},
+        )
+        if order is None:
+            return None
+        order.update(status="paid", paid_at=paid_at)
+        if order.get("stock_reserved"):
+            await db.merch_inventory.update_one(
+                {"_id": order["product_id"]}, {"$inc": {"reserved": -order["quantity"], "sold": order["quantity"]}}
+            )
+        self.stats["paid"] += 1
+        return order
+
+    async def cancel(self, order_id: str, user_id: str) -> bool:
+        """Buyer abandons a pending order; the units go back on sale right away"""
+        order = await self._db().orders.find_one_and_update(
+            {"order_id": order_id, "user_id": user_id, "status": "pending", "stock_state": {"$exists": False}},
+            {"$set": {"status": "cancelled", "released_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0, "product_id": 1, "quantity": 1, "stock_reserved": 1},
+        )
+        if order is None:
+            return False
+        await self._restock([order])
+        return True
+
+    async def reconcile_reserving(self) -> int:
+        """Finish orders a crashed worker left in "reserving"; returns orders resolved"""
+        db = self._db()
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=RESERVING_GRACE_SECONDS)
+        stuck = await db.orders.find(
+            {"stock_state": "reserving", "created_at": {"$lt": cutoff}},
+            {"_id": 0, "order_id": 1, "product_id": 1},
+        ).limit(RELEASE_BATCH_SIZE).to_list(length=RELEASE_BATCH_SIZE)
+        for order in stuck:
+            order_id, product_id = order["order_id"], order["product_id"]
+            inventory = await db.merch_inventory.find_one({"_id": product_id}, {"holds": 1})
+            if inventory is not None and order_id in inventory.get("holds", []):
+                update = {"$set": {"stock_reserved": True}, "$unset": {"stock_state": ""}}
+            elif inventory is None:
+                update = {"$set": {"stock_reserved": False}, "$unset": {"stock_state": ""}}
+            else:
+                update = {"$set": {"status": "failed", "released_at": datetime.now(timezone.utc)},
+                          "$unset": {"stock_state": ""}}
+            await db.orders.update_one({"order_id": order_id, "stock_state": "reserving"}, update)
+        # Holds whose order is settled (including ones a crash left behind) are dropped
+        for inventory in await db.merch_inventory.find({"holds.0": {"$exists": True}}, {"holds": 1}).to_list(length=None):
+            reserving = {doc["order_id"] for doc in await db.orders.find(
+                {"order_id": {"$in": inventory["holds"]}, "stock_state": "reserving"}, {"_id": 0, "order_id": 1}
+            ).to_list(length=None)}
+            settled = [order_id for order_id in inventory["holds"] if order_id not in reserving]
+            if settled:
+                await db.merch_inventory.update_one({"_id": inventory["_id"]}, {"$pullAll": {"holds": settled}})
+        if stuck:
+            logger.warning(f"⚠️ Reconciled {len(stuck)} merch orders left mid-reservation")
+        return len(stuck)
+
+    async def release_expired(self) -> int:
+        """Expire pending orders past their reservation; returns released order count"""
+        db = self._db()
+        await self.ensure_indexes()
+        await self.reconcile_reserving()
+        now = datetime.now(timezone.utc)
+        candidates = await db.orders.find(
+            {"status": "pending", "reservation_expires_at": {"$lt": now}, "stock_state": {"$exists": False}},
+            {"_id": 0, "order_id": 1},
+        ).limit(RELEASE_BATCH_SIZE).to_list(length=RELEASE_BATCH_SIZE)
+
+        released = []
+        for candidate in candidates:
+            # Conditional per order: a payment landing meanwhile wins and keeps its units
+            order = await db.orders.find_one_and_update(
+                {"order_id": candidate["order_id"], "status": "pending", "stock_state": {"$exists": False}},
+                {"$set": {"status": "expired", "released_at": now}},
+                projection={"_id": 0, "product_id": 1, "quantity": 1, "stock_reserved": 1},
+            )
+            if order is not None:
+                released.append(order)
+        await self._restock(released)
+        if released:
+            logger.info(f"🛍️ Released {len(released)} expired merch reservations")
+        return len(released)
+
+    async def _restock(self, orders: List[Dict]):
+        totals: Dict[str, int] = {}
+        for order in orders:
+            if order.get("stock_reserved"):
+                totals[order["product_id"]] = totals.get(order["product_id"], 0) + order["quantity"]
+        if totals:
+            await self._db().merch_inventory.bulk_write([
+                UpdateOne({"_id": product_id}, {"$inc": {"available": quantity, "reserved": -quantity}})
+                for product_id, quantity in totals.items()
+            ], ordered=False)
+        self.stats["released"] += len(orders)
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            "catalog_generation": self._generation,
+            "catalog_products": len(snapshot.products) if snapshot else None,
+            "limited_products": len(snapshot.limited) if snapshot else None,
+            "catalog_built_at": snapshot.built_at if snapshot else None,
+        }
+
+
+# Global merch store
+merch_store = None
+
+def get_merch_store() -> MerchStore:
+    """Get the global merch store"""
+    global merch_store
+    if merch_store is None:
+        merch_store = MerchStore()
+    return merch_store
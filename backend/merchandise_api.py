@@ -1,20 +1,24 @@
 """
 019 Solutions - Merchandise Store Integration
 Printful/Teespring print-on-demand merch store
+Catalog reads come from the in-memory catalog in merch_store; orders reserve
+stock for limited drops (see merch_store for the reservation rules).
 """
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
 import logging
+from admin_api import get_current_admin
+from fast_json import get_payload_cache
+from merch_store import get_merch_store, MERCH_CATALOG_CHECK_SECONDS, MERCH_RESERVATION_MINUTES
 
 logger = logging.getLogger(__name__)
 
 merch_router = APIRouter(prefix="/api/merch", tags=["merchandise"])
 
-def get_database():
-    from server import get_database as get_db
-    return get_db()
+# Stock levels change on every order; a one-second cache absorbs drop-time polling
+STOCK_CACHE_SECONDS = 1.0
 
 class Product(BaseModel):
     product_id: str
@@ -26,64 +30,109 @@ class Product(BaseModel):
     colors: List[str]
     category: str  # "tshirt", "hoodie", "mug", "poster"
 
+class ProductWrite(Product):
+    price: float = Field(..., gt=0)
+    stock: Optional[int] = Field(None, ge=0)  # None = print on demand (unlimited)
+
+class StockUpdate(BaseModel):
+    available: int = Field(..., ge=0)
+
 @merch_router.get("/products")
-async def get_products(category: Optional[str] = None):
-    """Get all merchandise products"""
+async def get_products(request: Request, category: Optional[str] = None):
+    """Get all merchandise products - served from the in-memory catalog"""
     try:
-        db = get_database()
-        
-        filter_query = {}
-        if category:
-            filter_query["category"] = category
-        
-        products = await db.merchandise.find(filter_query).to_list(length=100)
-        
-        return {
-            "products": products,
-            "count": len(products)
-        }
-        
+        catalog = await get_merch_store().catalog()
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    # Only real categories get a cache entry - arbitrary query strings must not grow the cache
+    if category and not any(p.get("category") == category for p in catalog.products):
+        return JSONResponse({"products": [], "count": 0})
+    # Keyed by catalog generation, so a product write is never served stale
+    return await get_payload_cache().respond(
+        request, f"merch:products:{catalog.generation}:{category or '*'}",
+        lambda: _catalog_view(catalog, category), ttl=MERCH_CATALOG_CHECK_SECONDS
+    )
+
+async def _catalog_view(catalog, category: Optional[str]):
+    return catalog.view(category)
+
+@merch_router.get("/stock")
+async def get_stock(request: Request, product_ids: str):
+    """Units left per product (null = unlimited), comma-separated product_ids"""
+    catalog = await get_merch_store().catalog()
+    ids = sorted({pid for pid in product_ids.split(",") if pid in catalog.by_id})[:50]
+
+    async def load():
+        return {"stock": await get_merch_store().stock(ids)}
+    # Cache the single-product poll a drop page makes (bounded by the catalog);
+    # arbitrary id combinations are read directly instead of each getting an entry
+    if len(ids) != 1:
+        return JSONResponse(await load())
+    return await get_payload_cache().respond(request, f"merch:stock:{ids[0]}", load, ttl=STOCK_CACHE_SECONDS)
 
 @merch_router.post("/order")
 async def create_order(user_id: str, product_id: str, size: str, color: str, quantity: int):
-    """Create a merchandise order"""
+    """Create a merchandise order (holds limited stock until paid or expired)"""
     try:
-        db = get_database()
-        
-        product = await db.merchandise.find_one({"product_id": product_id})
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        # Calculate total
-        total = product["price"] * quantity
-        
-        # Create order (integrate with Printful API in production)
-        order = {
-            "order_id": f"ORD-{datetime.now().timestamp()}",
-            "user_id": user_id,
-            "product_id": product_id,
-            "size": size,
-            "color": color,
-            "quantity": quantity,
-            "total": total,
-            "status": "pending",
-            "created_at": datetime.now()
-        }
-        
-        await db.orders.insert_one(order)
-        
+        order = await get_merch_store().reserve(user_id, product_id, size, color, quantity)
+
         return {
             "success": True,
             "order_id": order["order_id"],
-            "total": total,
-            "message": "Order created! Proceed to payment."
+            "total": order["total"],
+            "reservation_expires_at": order["reservation_expires_at"].isoformat(),
+            "message": f"Order created! Complete payment within {MERCH_RESERVATION_MINUTES} minutes."
         }
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error creating order: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@merch_router.post("/order/{order_id}/cancel")
+async def cancel_order(order_id: str, user_id: str):
+    """Abandon a pending order - reserved stock goes back on sale immediately"""
+    if not await get_merch_store().cancel(order_id, user_id):
+        raise HTTPException(status_code=404, detail="No pending order found")
+    return {"success": True, "message": "Order cancelled"}
+
+# ============== ADMIN ==============
+@merch_router.post("/admin/products")
+async def save_product(product: ProductWrite, admin = Depends(get_current_admin)):
+    """Create or update a product; `stock` turns it into a limited drop - ADMIN ONLY"""
+    data = product.dict(exclude={"stock"})
+    saved = await get_merch_store().upsert_product(data, stock=product.stock)
+    logger.info(f"🛍️ Product {product.product_id} saved by {admin['username']}")
+    return {"success": True, "product": saved}
+
+@merch_router.delete("/admin/products/{product_id}")
+async def remove_product(product_id: str, admin = Depends(get_current_admin)):
+    """Take a product off the catalog (existing orders are kept) - ADMIN ONLY"""
+    if not await get_merch_store().delete_product(product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"success": True}
+
+@merch_router.put("/admin/products/{product_id}/stock")
+async def update_stock(product_id: str, update: StockUpdate, admin = Depends(get_current_admin)):
+    """Set sellable units for a limited product - ADMIN ONLY"""
+    catalog = await get_merch_store().catalog()
+    if product_id not in catalog.by_id:
+        raise HTTPException(status_code=404, detail="Product not found")
+    inventory = await get_merch_store().set_stock(product_id, update.available)
+    get_payload_cache().invalidate("merch:stock:")
+    return {"success": True, "inventory": inventory}
+
+@merch_router.post("/admin/orders/{order_id}/paid")
+async def mark_order_paid(order_id: str, admin = Depends(get_current_admin)):
+    """Confirm payment - reserved units become sold - ADMIN ONLY"""
+    order = await get_merch_store().mark_paid(order_id)
+    if order is None:
+        raise HTTPException(status_code=409, detail="Order is not pending (expired, cancelled or already paid)")
+    return {"success": True, "order_id": order_id, "status": order["status"]}
+
+@merch_router.get("/admin/stats")
+async def merch_stats(admin = Depends(get_current_admin)):
+    """Catalog cache and reservation counters for this worker - ADMIN ONLY"""
+    return get_merch_store().get_stats()
@@ -0,0 +1,402 @@
+"""
+REMZA019 Gaming - Runtime Metrics & Instrumentation
+Per-route latency histograms, MongoDB command timings, event-loop lag,
+WebSocket fan-out time and background queue depths in Prometheus text format
+"""
+import asyncio
+import bisect
+import hmac
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets (seconds) - tuned for API p50..p99 visibility
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Bearer token the scraper sends; /api/metrics serves nothing while it is unset
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key)
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Gauge with labels; values can be set directly or pulled from callbacks"""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._callbacks: Dict[LabelKey, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        self.inc(-amount, labels)
+
+    def set_function(self, fn: Callable[[], float], labels: Optional[Dict[str, str]] = None):
+        """Evaluate fn at scrape time (e.g. queue.qsize)"""
+        with self._lock:
+            self._callbacks[_label_key(labels)] = fn
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = dict(self._values)
+            callbacks = list(self._callbacks.items())
+        for key, fn in callbacks:
+            try:
+                items[key] = float(fn())
+            except Exception as e:
+                logger.debug(f"Gauge callback {self.name} failed: {e}")
+        for key, value in items.items():
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels (Prometheus semantics)"""
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # {labels: [bucket_counts..., sum, count]}
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, labels: Optional[Dict[str, str]] = None):
+        """Context manager that observes the elapsed wall time"""
+        return _Timer(self, labels)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(series[-1])}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Optional[Dict[str, str]]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Holds all metrics and renders the text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry instance
+registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the global metrics registry"""
+    return registry
+
+def metrics_authorized(authorization: Optional[str], token: Optional[str] = None) -> bool:
+    """Check an `Authorization: Bearer <METRICS_TOKEN>` header"""
+    token = METRICS_TOKEN if token is None else token
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if not token or scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(credentials.strip().encode(), token.encode())
+
+
+# ============== CORE METRICS ==============
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template"
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+)
+HTTP_REQUESTS_TOTAL = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status"
+)
+MONGO_COMMAND_DURATION = registry.histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command"
+)
+MONGO_COMMAND_FAILURES = registry.counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command"
+)
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds", "Delay between scheduled and actual event-loop wakeups",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+WS_BROADCAST_DURATION = registry.histogram(
+    "websocket_broadcast_duration_seconds", "Time to fan a WebSocket broadcast out to all target clients"
+)
+WS_BROADCAST_RECIPIENTS = registry.counter(
+    "websocket_broadcast_messages_total", "WebSocket messages sent by broadcast fan-out"
+)
+WS_BROADCAST_BYTES = registry.counter(
+    "websocket_broadcast_bytes_total", "Payload bytes sent by broadcast fan-out, by wire format"
+)
+BACKGROUND_QUEUE_DEPTH = registry.gauge(
+    "background_queue_depth", "Pending items in background/in-process queues"
+)
+JOB_RUN_DURATION = registry.histogram(
+    "scheduler_job_duration_seconds", "Scheduled job run time by job and outcome",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+JOB_RUNS_TOTAL = registry.counter(
+    "scheduler_job_runs_total", "Scheduled job runs by job and outcome (ok/error/timeout)"
+)
+WEBHOOK_EVENTS_TOTAL = registry.counter(
+    "webhook_events_total", "Webhook events by provider and outcome (accepted/duplicate/processed/retry/dead)"
+)
+
+
+def register_queue_depth(name: str, fn: Callable[[], float]):
+    """Expose a background queue depth (evaluated on scrape)"""
+    BACKGROUND_QUEUE_DEPTH.set_function(fn, {"queue": name})
+
+
+# ============== ASGI MIDDLEWARE ==============
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency and in-flight counts per route template.
+    Labels use the matched route path (e.g. /api/polls/{poll_id}/vote) so cardinality
+    stays bounded by the number of endpoints, not the number of URLs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(labels={"method": method})
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_REQUESTS_IN_FLIGHT.dec(labels={"method": method})
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.observe(elapsed, {"method": method, "route": route_path})
+            HTTP_REQUESTS_TOTAL.inc(labels={
+                "method": method,
+                "route": route_path,
+                "status": str(status_holder["status"])
+            })
+
+
+# ============== MONGODB COMMAND LISTENER ==============
+class MongoCommandMetrics(monitoring.CommandListener):
+    """PyMongo command listener timing every command by collection and name"""
+
+    def __init__(self):
+        # {(connection_id, request_id): (command_name, collection)}
+        self._pending: Dict[Tuple, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _collection(event: monitoring.CommandStartedEvent) -> str:
+        value = event.command.get(event.command_name)
+        if isinstance(value, str):
+            return value
+        return "admin" if event.database_name == "admin" else "-"
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                event.command_name, self._collection(event)
+            )
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            command_name, collection = self._pending.pop(
+                (event.connection_id, event.request_id), (event.command_name, "-")
+            )
+        labels = {"collection": collection, "command": command_name}
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1_000_000, labels)
+        if failed:
+            MONGO_COMMAND_FAILURES.inc(labels=labels)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+_mongo_listener_registered = False
+
+def install_mongo_listener():
+    """
+    Register the command listener globally. Must run before any
+    AsyncIOMotorClient is created - PyMongo binds listeners at client construction.
+    """
+    global _mongo_listener_registered
+    if not _mongo_listener_registered:
+        monitoring.register(MongoCommandMetrics())
+        _mongo_listener_registered = True
+        logger.info("📈 MongoDB command metrics listener registered")
+
+
+# ============== EVENT LOOP LAG ==============
+class EventLoopLagMonitor:
+    """Samples event-loop scheduling delay at a fixed interval"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("📈 Event-loop lag monitor started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_lag_monitor = EventLoopLagMonitor()
+
+def get_loop_lag_monitor() -> EventLoopLagMonitor:
+    """Get the global event-loop lag monitor"""
+    return loop_lag_monitor
@@ -112,6 +112,10 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class ChangePasswordRequest(BaseModel):
+    current_password: str
+    new_password: str
+
 class LoginResponse(BaseModel):
     success: bool
     token: Optional[str] = None
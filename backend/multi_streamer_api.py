@@ -3,12 +3,18 @@ Multi-Streamer Support API
 Allows simultaneous viewing of multiple streamers with synchronized chat and switching
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
+import asyncio
+import logging
 import uuid
 
+from chat_merge import get_chat_merge_hub, register_chat_adapter, TwitchChatSource
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/multi-streamer", tags=["multi-streamer"])
 
 class StreamerProfile(BaseModel):
@@ -31,45 +37,57 @@ class MultiViewLayout(BaseModel):
 active_streamers = {}
 user_layouts = {}
 
+# Demo data - would fetch from actual APIs
+demo_streamers = [
+    StreamerProfile(
+        streamer_id="remza019",
+        username="REMZA019",
+        platform="youtube",
+        channel_url="http://www.youtube.com/@remza019",
+        is_live=True,
+        viewer_count=256,
+        game="Fortnite Rocket Racing",
+        thumbnail_url="https://img.youtube.com/vi/XnEtSLaI5Vo/hqdefault.jpg"
+    ),
+    StreamerProfile(
+        streamer_id="remza019_twitch",
+        username="REMZA019",
+        platform="twitch",
+        channel_url="https://www.twitch.tv/remza019",
+        is_live=False,
+        viewer_count=0,
+        game="Fortnite",
+        thumbnail_url="https://static-cdn.jtvnw.net/jtv_user_pictures/default-profile-picture-300x300.png"
+    ),
+    StreamerProfile(
+        streamer_id="demo_fortnite_1",
+        username="ProPlayer123",
+        platform="youtube",
+        channel_url="https://www.youtube.com/watch?v=GUhc9NBBxBM",
+        is_live=True,
+        viewer_count=1200,
+        game="Fortnite Battle Royale",
+        thumbnail_url="https://img.youtube.com/vi/GUhc9NBBxBM/hqdefault.jpg"
+    )
+]
+
+def _streamer_platforms(streamer_ids: List[str]) -> Dict[str, str]:
+    platforms = {s.streamer_id: s.platform for s in demo_streamers}
+    return {streamer_id: platforms.get(streamer_id, "unknown") for streamer_id in streamer_ids}
+
+def _twitch_chat_source(streamer_id: str) -> TwitchChatSource:
+    """Chat of a Twitch streamer: the channel login is the last segment of its channel URL"""
+    urls = {s.streamer_id: s.channel_url for s in demo_streamers}
+    channel = urls.get(streamer_id, "").rstrip("/").rsplit("/", 1)[-1] or streamer_id
+    return TwitchChatSource(streamer_id, channel)
+
+register_chat_adapter("twitch", _twitch_chat_source)
+
 @router.get("/streamers/available", response_model=List[StreamerProfile])
 async def get_available_streamers():
     """
     Get list of available streamers for multi-view
     """
-    # Demo data - would fetch from actual APIs
-    demo_streamers = [
-        StreamerProfile(
-            streamer_id="remza019",
-            username="REMZA019",
-            platform="youtube",
-            channel_url="http://www.youtube.com/@remza019",
-            is_live=True,
-            viewer_count=256,
-            game="Fortnite Rocket Racing",
-            thumbnail_url="https://img.youtube.com/vi/XnEtSLaI5Vo/hqdefault.jpg"
-        ),
-        StreamerProfile(
-            streamer_id="remza019_twitch",
-            username="REMZA019",
-            platform="twitch",
-            channel_url="https://www.twitch.tv/remza019",
-            is_live=False,
-            viewer_count=0,
-            game="Fortnite",
-            thumbnail_url="https://static-cdn.jtvnw.net/jtv_user_pictures/default-profile-picture-300x300.png"
-        ),
-        StreamerProfile(
-            streamer_id="demo_fortnite_1",
-            username="ProPlayer123",
-            platform="youtube",
-            channel_url="https://www.youtube.com/watch?v=GUhc9NBBxBM",
-            is_live=True,
-            viewer_count=1200,
-            game="Fortnite Battle Royale",
-            thumbnail_url="https://img.youtube.com/vi/GUhc9NBBxBM/hqdefault.jpg"
-        )
-    ]
-    
     return demo_streamers
 
 @router.post("/layout/create")
@@ -152,34 +170,74 @@ async def delete_layout(layout_id: str, user_id: str):
 async def sync_multi_chat(streamer_ids: List[str]):
     """
     Sync chat from multiple streamers into unified feed
-    Returns combined chat with color-coded sources
+    Returns the most recent merged messages; live updates come from /chat/ws
     """
-    # Demo implementation - would integrate with actual chat APIs
-    demo_messages = [
-        {
-            "id": str(uuid.uuid4()),
-            "streamer_id": streamer_ids[0],
-            "username": "Viewer123",
-            "message": "This multi-view is amazing!",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "color": "#00ff00"
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "streamer_id": streamer_ids[0] if len(streamer_ids) > 0 else "demo",
-            "username": "GamerPro",
-            "message": "Love watching multiple POVs!",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "color": "#ff00ff"
-        }
-    ]
+    hub = get_chat_merge_hub()
+    key, factories, unsupported = hub.resolve_sources(_streamer_platforms(streamer_ids))
+    engine = hub.engines.get(key)
+    if engine is not None:
+        messages = list(engine.recent)
+    elif "site" in factories:
+        from chat_api import recent_messages
+        messages = [
+            {"id": m["id"], "streamer_id": "site", "source": "site", "username": m["user"],
+             "user_id": m["user_id"], "level": m["level"], "message": m["text"], "timestamp": m["timestamp"]}
+            for m in recent_messages
+        ]
+    else:
+        messages = []
     
     return {
-        "messages": demo_messages,
+        "messages": messages,
         "streamer_count": len(streamer_ids),
-        "sync_status": "active"
+        "sources": list(key),
+        "unsupported": unsupported,
+        "sync_status": "active" if engine is not None else "idle"
     }
 
+@router.websocket("/chat/ws")
+async def multi_chat_websocket(websocket: WebSocket, streamers: str):
+    """
+    One connection for the merged chat of every streamer in the view
+    (?streamers=id1,id2,...); messages arrive in timestamp order
+    """
+    streamer_ids = [s for s in streamers.split(",") if s][:4]
+    hub = get_chat_merge_hub()
+    key, factories, unsupported = hub.resolve_sources(_streamer_platforms(streamer_ids))
+    await websocket.accept()
+    if not key:
+        await websocket.send_json({"type": "error", "message": "No chat sources available", "unsupported": unsupported})
+        await websocket.close()
+        return
+    
+    engine = hub.acquire(key, factories)
+    subscriber_id, queue = engine.subscribe()
+    
+    async def forward():
+        while True:
+            message = await queue.get()
+            await websocket.send_json({"type": "chat_message", "message": message})
+    
+    sender = asyncio.create_task(forward())
+    try:
+        await websocket.send_json({
+            "type": "history",
+            "messages": list(engine.recent),
+            "sources": list(key),
+            "unsupported": unsupported
+        })
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_json({"type": "pong"})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"❌ Multi-chat WebSocket error: {e}")
+    finally:
+        sender.cancel()
+        await hub.release(key, subscriber_id)
+
 @router.get("/stats")
 async def get_multi_view_stats():
     """
@@ -189,5 +247,6 @@ async def get_multi_view_stats():
         "total_layouts": sum(len(layouts) for layouts in user_layouts.values()),
         "active_users": len(user_layouts),
         "popular_layout": "grid",
-        "average_streamers_per_view": 2.5
+        "average_streamers_per_view": 2.5,
+        "chat_merge": get_chat_merge_hub().get_stats()
     }
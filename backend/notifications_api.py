@@ -15,6 +15,8 @@ import os
 import logging
 from dotenv import load_dotenv
 from pathlib import Path
+from live_status_service import get_live_status_service
+from web_push import get_web_push_engine, is_push_endpoint_allowed
 
 # Load environment variables
 load_dotenv(Path(__file__).parent / '.env')
@@ -199,6 +201,8 @@ async def subscribe_email(email_data: EmailNotification):
 @notifications_router.post("/subscribe/push")
 async def subscribe_push(push_data: PushSubscription):
     """Subscribe to push notifications"""
+    if not is_push_endpoint_allowed(push_data.endpoint):
+        raise HTTPException(status_code=400, detail="Push endpoint must be an https URL on a known push service")
     try:
         db = get_database()
         
@@ -211,6 +215,17 @@ async def subscribe_push(push_data: PushSubscription):
                     'push_keys': push_data.keys,
                     'preferences.push_notifications': True,
                     'updated_at': datetime.now()
+                },
+                # A push-only subscriber gets the same defaults as an email signup,
+                # otherwise the go-live query (is_active + live_notifications) never matches
+                '$setOnInsert': {
+                    'id': str(uuid.uuid4()),
+                    'is_active': True,
+                    'preferences.live_notifications': True,
+                    'preferences.schedule_updates': True,
+                    'preferences.new_videos': True,
+                    'subscribed_at': datetime.now(),
+                    'timezone': "CET"
                 }
             },
             upsert=True
@@ -372,18 +387,22 @@ async def process_notifications(subscribers: List[Dict], notification: Notificat
         success_count = 0
         error_count = 0
         
+        # Push goes out as one concurrent batch (see web_push); email stays per subscriber
+        push_subscribers = [
+            subscriber for subscriber in subscribers
+            if subscriber.get('preferences', {}).get('push_notifications', False) and subscriber.get('push_endpoint')
+        ]
+        if push_subscribers:
+            report = await send_push_batch(push_subscribers, notification, db)
+            success_count += report['delivered']
+            error_count += report['failed']
+        
         for subscriber in subscribers:
             try:
                 # Send email notification
                 if subscriber.get('preferences', {}).get('email_notifications', False):
                     await send_email_notification(subscriber['email'], notification)
                     success_count += 1
-                
-                # Send push notification 
-                if (subscriber.get('preferences', {}).get('push_notifications', False) and 
-                    subscriber.get('push_endpoint')):
-                    await send_push_notification(subscriber, notification)
-                    success_count += 1
                     
             except Exception as e:
                 logger.error(f"❌ Failed to send notification to {subscriber.get('email')}: {e}")
@@ -486,38 +505,88 @@ async def send_email_notification(email: str, notification: NotificationRequest)
     except Exception as e:
         logger.error(f"❌ Email notification error: {e}")
 
+def _push_message(notification: NotificationRequest) -> Dict:
+    """Payload the service worker receives (kept well under the 4 KB push limit)"""
+    return {
+        "type": notification.type,
+        "title": notification.title,
+        "body": notification.message,
+        "url": notification.url or "/",
+        "tag": f"remza019-{notification.type}",
+    }
+
+async def send_push_batch(subscribers: List[Dict], notification: NotificationRequest, db=None) -> Dict:
+    """Web Push `notification` to every subscriber with a push endpoint; prunes gone endpoints"""
+    subscriptions = [
+        {"endpoint": subscriber['push_endpoint'], "keys": subscriber.get('push_keys') or {}}
+        # Rows stored before endpoints were validated are skipped, never fetched
+        for subscriber in subscribers
+        if subscriber.get('push_endpoint') and is_push_endpoint_allowed(subscriber['push_endpoint'])
+    ]
+    live = notification.type == "live"
+    return await get_web_push_engine().send_batch(
+        subscriptions,
+        _push_message(notification),
+        # A go-live alert is worthless an hour later; announcements can wait a day
+        ttl=900 if live else 86400,
+        urgency="high" if live else "normal",
+        topic=notification.type,
+        db=db,
+    )
+
 async def send_push_notification(subscriber: Dict, notification: NotificationRequest):
-    """Send push notification"""
+    """Send push notification to a single subscriber"""
     try:
-        # Push notification implementation would go here
-        logger.info(f"✅ Push notification sent to {subscriber['email']}: {notification.title}")
+        report = await send_push_batch([subscriber], notification, get_database())
+        if report['delivered']:
+            logger.info(f"✅ Push notification sent to {subscriber['email']}: {notification.title}")
         
     except Exception as e:
         logger.error(f"❌ Push notification error: {e}")
 
+async def push_live_notification(game: str) -> Dict:
+    """Go-live push to every push subscriber (used by the admin live toggle)"""
+    db = get_database()
+    subscribers = await db.subscribers.find(
+        {'is_active': True, 'preferences.live_notifications': True,
+         'preferences.push_notifications': True, 'push_endpoint': {'$exists': True}},
+        {'_id': 0, 'email': 1, 'push_endpoint': 1, 'push_keys': 1}
+    ).to_list(length=None)
+    if not subscribers:
+        return {"total": 0}
+    notification = NotificationRequest(
+        type="live",
+        title="🔴 REMZA019 IS LIVE!",
+        message=f"Join the stream now! Playing {game}.",
+        url="/"
+    )
+    return await send_push_batch(subscribers, notification, db)
+
 # PUBLIC ENDPOINTS
+@notifications_router.get("/push/vapid-public-key")
+async def get_vapid_public_key():
+    """applicationServerKey for PushManager.subscribe()"""
+    public_key = get_web_push_engine().signer.public_key
+    if not public_key:
+        raise HTTPException(status_code=503, detail="Push notifications are not configured")
+    return {"public_key": public_key}
+
+@notifications_router.get("/push/stats")
+async def get_push_stats():
+    """Web Push delivery counters for this worker"""
+    return get_web_push_engine().get_stats()
+
 @notifications_router.get("/live-status")
 async def get_live_status():
-    """Get current live stream status for viewers"""
-    try:
-        db = get_database()
-        
-        # Get latest channel stats
-        stats = await db.channel_stats.find_one({}, sort=[('updated_at', -1)])
-        
-        if not stats:
-            return {"is_live": False, "message": "Stream offline"}
-        
-        return {
-            "is_live": stats.get('is_live', False),
-            "current_viewers": stats.get('current_viewers', '0'),  # Fixed: use 'current_viewers' to match admin API
-            "game": stats.get('live_game', 'FORTNITE'),
-            "last_updated": stats.get('updated_at', datetime.now())
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Live status error: {e}")
-        return {"is_live": False, "message": "Status unavailable"}
+    """Get current live stream status for viewers (served from the live status poller's cache)"""
+    status = get_live_status_service().get_status()
+    return {
+        "is_live": status["is_live"],
+        "current_viewers": status["current_viewers"],
+        "game": status["live_game"] or "FORTNITE",
+        "last_updated": status.get("checked_at") or datetime.now(),
+        **({} if status["is_live"] else {"message": "Stream offline"}),
+    }
 
 @notifications_router.get("/next-stream")
 async def get_next_stream():
@@ -0,0 +1,251 @@
+"""
+REMZA019 Gaming - Keyset Pagination & Streaming Exports
+Shared helpers for admin list endpoints: opaque keyset cursors instead of
+skip/limit or to_list(None), and NDJSON/CSV exports streamed straight from a
+Motor cursor so memory stays flat no matter how many documents match.
+
+Supporting indexes are declared with register_pagination_index() next to the
+endpoint and built once by ensure_pagination_indexes() at startup, never on a
+request. Exports require the authenticated admin from the calling endpoint.
+"""
+import base64
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+SortSpec = Sequence[Tuple[str, int]]
+
+# (collection or zero-arg callable returning it, sort) pairs built at startup
+_registered_indexes: List[Tuple[Any, List[Tuple[str, int]]]] = []
+
+
+# ---------- cursors ----------
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+    return value
+
+
+def encode_cursor(values: List) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != expected_length:
+            raise ValueError("cursor shape")
+        return [_decode_value(v) for v in values]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _get_field(doc: Dict, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def keyset_filter(sort: SortSpec, values: List) -> Dict:
+    """
+    Match documents strictly after `values` in `sort` order:
+    (a < va) OR (a == va AND b < vb) ... for descending keys.
+    """
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[i] for i, (prev_field, _) in enumerate(sort[:index])}
+        value = values[index]
+        if value is None:
+            # Nulls sort lowest: ascending, every real value comes after; descending, only other nulls (next key decides)
+            if direction > 0:
+                clause[field] = {"$ne": None}
+            else:
+                continue
+        else:
+            clause[field] = {"$gt" if direction > 0 else "$lt": value}
+            if direction < 0:
+                # Descending, nulls/missing values come after every real value
+                clauses.append({**clause, field: None})
+        clauses.append(clause)
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+
+def _with_tiebreaker(sort: SortSpec, tiebreaker: str) -> List[Tuple[str, int]]:
+    sort = list(sort)
+    if all(field != tiebreaker for field, _ in sort):
+        sort.append((tiebreaker, sort[-1][1] if sort else -1))
+    return sort
+
+
+def _query_projection(projection: Optional[Dict], sort: SortSpec) -> Tuple[Optional[Dict], List[str]]:
+    """Projection that also carries the sort keys, plus the keys to strip again afterwards"""
+    if not projection:
+        return projection, []
+    inclusive = any(v for k, v in projection.items() if k != "_id")
+    extra = []
+    projection = dict(projection)
+    for field, _ in sort:
+        if inclusive and not projection.get(field):
+            projection[field] = 1
+            extra.append(field)
+        elif not inclusive and field in projection and not projection[field]:
+            del projection[field]
+            extra.append(field)
+    return projection, extra
+
+
+def register_pagination_index(collection, sort: SortSpec, tiebreaker: str = "_id"):
+    """Declare the index a paginated listing needs; `collection` may be a callable resolved at startup"""
+    _registered_indexes.append((collection, _with_tiebreaker(sort, tiebreaker)))
+
+
+async def ensure_pagination_indexes():
+    """Build every registered pagination index - call once from startup"""
+    for collection, sort in _registered_indexes:
+        if callable(collection) and not hasattr(collection, "create_index"):
+            collection = collection()
+        try:
+            await collection.create_index(list(sort), background=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create pagination index on {collection.name}: {e}")
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+# ---------- pages ----------
+async def paginate(
+    collection,
+    query: Optional[Dict] = None,
+    sort: SortSpec = (("created_at", -1),),
+    tiebreaker: str = "_id",
+    projection: Optional[Dict] = None,
+    limit: Optional[int] = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Dict:
+    """
+    One page of `collection`. Returns {"items", "next_cursor", "has_more"};
+    pass next_cursor back as `cursor` for the following page.
+    `tiebreaker` must be unique so pages never skip or repeat documents.
+    """
+    limit = clamp_page_size(limit)
+    sort = _with_tiebreaker(sort, tiebreaker)
+
+    filters = dict(query or {})
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor, len(sort)))
+        filters = {"$and": [filters, after]} if filters else after
+
+    find_projection, extra_fields = _query_projection(projection, sort)
+    docs = await collection.find(filters, find_projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor([_get_field(docs[-1], field) for field, _ in sort]) if has_more else None
+    for doc in docs:
+        for field in extra_fields:
+            doc.pop(field, None)
+    return {"items": docs, "next_cursor": next_cursor, "has_more": has_more}
+
+
+# ---------- exports ----------
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    return value
+
+
+async def _ndjson_rows(cursor) -> AsyncIterator[bytes]:
+    async for doc in cursor:
+        yield (json.dumps(doc, default=_json_default) + "\n").encode()
+
+
+async def _csv_rows(cursor, fields: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode()
+    async for doc in cursor:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([_csv_value(_get_field(doc, field)) for field in fields])
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    collection,
+    export_format: str,
+    filename: str,
+    fields: Iterable[str],
+    query: Optional[Dict] = None,
+    sort: SortSpec = (("created_at", -1),),
+    projection: Optional[Dict] = None,
+    *,
+    admin: Optional[Dict],
+) -> StreamingResponse:
+    """
+    Stream every matching document as NDJSON or CSV. `fields` are the CSV
+    columns (NDJSON rows carry the full projected document). `admin` is the
+    caller's Depends(get_current_admin) result - exports are admin only.
+    """
+    if not admin:
+        raise HTTPException(status_code=403, detail="Exports require admin authentication")
+    export_format = export_format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {export_format}")
+
+    fields = list(fields)
+    if projection is None:
+        projection = {"_id": 0}
+    cursor = collection.find(query or {}, projection).sort(list(sort)).batch_size(EXPORT_BATCH_SIZE)
+    body = _ndjson_rows(cursor) if export_format == "ndjson" else _csv_rows(cursor, fields)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - Breached Password Screening
+Common/breached passwords live in a Bloom filter built offline into one compact
+binary file, which every worker maps read-only (the pages are shared through
+the OS page cache). A lookup is one SHA-1 plus k bit probes, a few
+microseconds, with no false negatives and a false-positive rate fixed at build
+time:
+
+    python password_screen.py build rockyou.txt pwned-passwords-sha1.txt \
+        --out breached.bloom --fp-rate 0.001
+    python password_screen.py check breached.bloom "hunter2"
+    python password_screen.py bench breached.bloom
+
+Input lines are plaintext passwords or SHA-1 hex digests (the HIBP
+"HASH:COUNT" download format works as-is), so both kinds of list share one
+filter. Sizing is m = -n·ln(p)/ln(2)² bits and k = m/n·ln(2) probes: ~1.2 bytes
+per entry at 1%, ~1.8 bytes at 0.1%.
+
+PASSWORD_BLOOM_PATH points workers at the file; without it only the small
+built-in list of the most common passwords is screened.
+"""
+import argparse
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_BLOOM_PATH = os.environ.get('PASSWORD_BLOOM_PATH', '')
+
+MAGIC = b"RZBLOOM1"
+# magic, m (bits), k (probes), n (entries), target fp rate, built at (unix)
+HEADER = struct.Struct("<8sQIQdQ")
+HEADER_SIZE = 64  # bit array starts cache-line aligned
+
+BUILD_BATCH = 1_000_000
+
+# Screened even when no filter file is deployed
+BUILTIN_COMMON = (
+    "123456", "123456789", "12345678", "12345", "1234567", "1234567890", "111111",
+    "000000", "123123", "654321", "password", "password1", "password123", "passw0rd",
+    "qwerty", "qwerty123", "qwertyuiop", "abc123", "iloveyou", "admin", "admin123",
+    "welcome", "welcome1", "letmein", "monkey", "dragon", "football", "baseball",
+    "sunshine", "princess", "master", "shadow", "superman", "trustno1", "fortnite",
+    "minecraft", "gaming123", "remza019",
+)
+
+
+def password_key(password: str) -> bytes:
+    """SHA-1 of the UTF-8 password - the same key HIBP publishes"""
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+
+def _line_key(line: bytes) -> Optional[bytes]:
+    """Filter key for one input line: SHA-1 hex (optionally ':count') or plaintext"""
+    line = line.rstrip(b"\r\n")
+    if not line:
+        return None
+    head = line.split(b":", 1)[0]
+    if len(head) == 40:
+        try:
+            return bytes.fromhex(head.decode("ascii"))
+        except (UnicodeDecodeError, ValueError):
+            pass
+    return hashlib.sha1(line).digest()
+
+
+def _probes(key: bytes, m: int, k: int) -> Iterator[int]:
+    # Kirsch-Mitzenmacher double hashing over two 64-bit halves of the digest
+    h1 = int.from_bytes(key[:8], "little")
+    h2 = int.from_bytes(key[8:16], "little") | 1
+    for i in range(k):
+        yield (h1 + i * h2) % m
+
+
+def optimal_parameters(n: int, fp_rate: float):
+    """Bits and probe count for `n` entries at `fp_rate`"""
+    n = max(n, 1)
+    m = max(64, math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2)))
+    m = (m + 7) // 8 * 8
+    k = max(1, round(m / n * math.log(2)))
+    return m, k
+
+
+class BreachedPasswordFilter:
+    """Read-only, memory-mapped Bloom filter"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, "rb") as handle:
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.m, self.k, self.n, self.fp_rate, self.built_at = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not a password Bloom filter")
+        if len(self._mm) < HEADER_SIZE + self.m // 8:
+            self._mm.close()
+            raise ValueError(f"{self.path} is truncated")
+
+    def contains_key(self, key: bytes) -> bool:
+        mm = self._mm
+        for bit in _probes(key, self.m, self.k):
+            if not mm[HEADER_SIZE + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_key(password_key(password))
+
+    def close(self):
+        self._mm.close()
+
+    def get_info(self) -> Dict:
+        return {
+            "path": self.path,
+            "entries": self.n,
+            "bits": self.m,
+            "probes": self.k,
+            "target_fp_rate": self.fp_rate,
+            "size_bytes": HEADER_SIZE + self.m // 8,
+            "built_at": self.built_at,
+        }
+
+
+def _iter_keys(paths: Iterable[str]) -> Iterator[bytes]:
+    for path in paths:
+        with open(path, "rb") as handle:
+            for line in handle:
+                key = _line_key(line)
+                if key is not None:
+                    yield key
+
+
+def _count_lines(paths: Iterable[str]) -> int:
+    total = 0
+    for path in paths:
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                total += block.count(b"\n")
+    return total
+
+
+def _set_batch(bits, keys, m: int, k: int):
+    if np is not None:
+        halves = np.frombuffer(b"".join(key[:16] for key in keys), dtype="<u8").reshape(-1, 2)
+        h1 = halves[:, 0]
+        h2 = halves[:, 1] | np.uint64(1)
+        # Same arithmetic as _probes, reduced mod m at each step to stay exact in uint64
+        m64 = np.uint64(m)
+        step = h2 % m64
+        position = h1 % m64
+        for _ in range(k):
+            np.bitwise_or.at(bits, position >> np.uint64(3),
+                             (np.uint8(1) << (position & np.uint64(7)).astype(np.uint8)))
+            position = (position + step) % m64
+        return
+    for key in keys:
+        for bit in _probes(key, m, k):
+            bits[bit >> 3] |= 1 << (bit & 7)
+
+
+def build_filter(sources, out_path: str, fp_rate: float = 0.001, expected: Optional[int] = None) -> Dict:
+    """Stream `sources` into a new filter file at `out_path` (written via a temp file)"""
+    sources = [str(source) for source in sources]
+    n = expected or _count_lines(sources)
+    m, k = optimal_parameters(n, fp_rate)
+    out_path = Path(out_path)
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    started = time.perf_counter()
+
+    with open(tmp_path, "wb+") as handle:
+        handle.truncate(HEADER_SIZE + m // 8)
+        with mmap.mmap(handle.fileno(), 0) as mm:
+            bits = np.frombuffer(mm, dtype=np.uint8, offset=HEADER_SIZE) if np is not None else memoryview(mm)[HEADER_SIZE:]
+            added = 0
+            batch = []
+            for key in _iter_keys(sources):
+                batch.append(key)
+                if len(batch) >= BUILD_BATCH:
+                    _set_batch(bits, batch, m, k)
+                    added += len(batch)
+                    batch = []
+                    logger.info(f"🔐 {added:,} entries added")
+            if batch:
+                _set_batch(bits, batch, m, k)
+                added += len(batch)
+            del bits
+            HEADER.pack_into(mm, 0, MAGIC, m, k, added, fp_rate, int(time.time()))
+            mm.flush()
+    os.replace(tmp_path, out_path)
+
+    info = {
+        "entries": added,
+        "bits": m,
+        "probes": k,
+        "target_fp_rate": fp_rate,
+        "size_bytes": HEADER_SIZE + m // 8,
+        "build_seconds": round(time.perf_counter() - started, 2),
+    }
+    if added > n:
+        logger.warning(f"⚠️ {added:,} entries exceed the {n:,} the filter was sized for - fp rate will be higher")
+    return info
+
+
+class PasswordScreen:
+    """Process-wide breached-password check: the mapped filter plus the built-in list"""
+
+    def __init__(self, path: str = PASSWORD_BLOOM_PATH):
+        self.path = path
+        self.filter: Optional[BreachedPasswordFilter] = None
+        self._builtin = frozenset(password_key(p) for p in BUILTIN_COMMON)
+        self.stats = {"checks": 0, "rejected": 0}
+        if path:
+            try:
+                self.filter = BreachedPasswordFilter(path)
+                logger.info(f"🔐 Breached-password filter mapped: {self.filter.n:,} entries from {path}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Breached-password filter unavailable ({e}) - using built-in list only")
+
+    def is_breached(self, password: str) -> bool:
+        """True when `password` is (probably) on a common/breached list"""
+        self.stats["checks"] += 1
+        key = password_key(password)
+        breached = key in self._builtin or (self.filter is not None and self.filter.contains_key(key))
+        if breached:
+            self.stats["rejected"] += 1
+        return breached
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "builtin_entries": len(self._builtin),
+            "filter": self.filter.get_info() if self.filter else None,
+        }
+
+
+# Global password screen
+password_screen = None
+
+def get_password_screen() -> PasswordScreen:
+    """Get the global password screen (maps the filter on first use)"""
+    global password_screen
+    if password_screen is None:
+        password_screen = PasswordScreen()
+    return password_screen
+
+
+def _bench(bloom: BreachedPasswordFilter, lookups: int) -> Dict:
+    import secrets
+    candidates = [secrets.token_urlsafe(12) for _ in range(lookups)]
+    started = time.perf_counter()
+    hits = sum(1 for candidate in candidates if candidate in bloom)
+    elapsed = time.perf_counter() - started
+    return {
+        "lookups": lookups,
+        "us_per_lookup": round(elapsed / lookups * 1e6, 2),
+        # Random tokens are never on the list, so every hit is a false positive
+        "observed_fp_rate": round(hits / lookups, 6),
+        "target_fp_rate": bloom.fp_rate,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the breached-password Bloom filter")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build a filter from password / SHA-1 lists")
+    build.add_argument("sources", nargs="+", help="Files with one password or SHA-1 hex per line")
+    build.add_argument("--out", required=True)
+    build.add_argument("--fp-rate", type=float, default=0.001)
+    build.add_argument("--expected", type=int, help="Entry count (skips the counting pass)")
+
+    check = sub.add_parser("check", help="Check passwords against a filter")
+    check.add_argument("filter")
+    check.add_argument("passwords", nargs="+")
+
+    bench = sub.add_parser("bench", help="Measure lookup latency and false-positive rate")
+    bench.add_argument("filter")
+    bench.add_argument("--lookups", type=int, default=200_000)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "build":
+        info = build_filter(args.sources, args.out, args.fp_rate, args.expected)
+        logger.info(f"✅ {args.out}: {info}")
+    elif args.command == "check":
+        bloom = BreachedPasswordFilter(args.filter)
+        for password in args.passwords:
+            print(f"{'BREACHED' if password in bloom else 'ok':8} {password}")
+    elif args.command == "bench":
+        print(_bench(BreachedPasswordFilter(args.filter), args.lookups))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ REMZA019 Gaming - Polls System
 Real-time polling system for viewer engagement
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime
@@ -11,12 +11,15 @@ import logging
 import uuid
 
 from admin_api import get_current_admin
+from fast_json import get_payload_cache
 from websocket_manager import get_ws_manager
 
 logger = logging.getLogger("polls")
 
 polls_router = APIRouter(prefix="/polls", tags=["polls"])
 
+ACTIVE_POLLS_CACHE_SECONDS = 60  # every poll change invalidates, the TTL is only a backstop
+
 # Pydantic models
 class PollOption(BaseModel):
     id: str
@@ -80,14 +83,16 @@ async def create_poll(
         
         active_polls[poll.id] = poll
         poll_votes[poll.id] = {}
+        get_payload_cache().invalidate("polls:")
         
         logger.info(f"✅ Poll created: {poll.question} by {admin['username']}")
         
         # Broadcast new poll to all clients
         ws_manager = get_ws_manager()
-        await ws_manager.broadcast({
+        state = poll.dict()
+        await ws_manager.publish_state(f"poll:{poll.id}", state, {
             "type": "new_poll",
-            "poll": poll.dict()
+            "poll": state
         })
         
         return {"success": True, "poll": poll.dict()}
@@ -96,16 +101,20 @@ async def create_poll(
         logger.error(f"❌ Create poll error: {e}")
         raise HTTPException(status_code=500, detail="Failed to create poll")
 
-@polls_router.get("/active")
-async def get_active_polls():
-    """Get all active polls - PUBLIC"""
+async def _active_polls_payload() -> dict:
     try:
-        active = [poll.dict() for poll in active_polls.values() if poll.active]
-        return {"polls": active}
+        return {"polls": [poll.dict() for poll in active_polls.values() if poll.active]}
     except Exception as e:
         logger.error(f"❌ Get active polls error: {e}")
         raise HTTPException(status_code=500, detail="Failed to get active polls")
 
+@polls_router.get("/active")
+async def get_active_polls(request: Request):
+    """Get all active polls - PUBLIC (encoded once per poll change)"""
+    return await get_payload_cache().respond(
+        request, "polls:active", _active_polls_payload, ttl=ACTIVE_POLLS_CACHE_SECONDS
+    )
+
 @polls_router.post("/vote")
 async def vote_in_poll(request: VoteRequest):
     """Vote in a poll - PUBLIC"""
@@ -136,14 +145,16 @@ async def vote_in_poll(request: VoteRequest):
         # Record vote
         poll_votes[request.poll_id][request.user_id] = request.option_id
         poll.total_votes += 1
+        get_payload_cache().invalidate("polls:")
         
         logger.info(f"✅ Vote recorded: {request.username} voted in poll {poll.question}")
         
-        # Broadcast updated poll results
+        # Broadcast updated poll results (v2 clients only get the changed counters)
         ws_manager = get_ws_manager()
-        await ws_manager.broadcast({
+        state = poll.dict()
+        await ws_manager.publish_state(f"poll:{poll.id}", state, {
             "type": "poll_update",
-            "poll": poll.dict()
+            "poll": state
         })
         
         return {"success": True, "poll": poll.dict()}
@@ -168,15 +179,17 @@ async def end_poll(
         
         poll.active = False
         poll.ended_at = datetime.now().isoformat()
+        get_payload_cache().invalidate("polls:")
         
         logger.info(f"✅ Poll ended: {poll.question} by {admin['username']}")
         
         # Broadcast poll ended
         ws_manager = get_ws_manager()
-        await ws_manager.broadcast({
+        state = poll.dict()
+        await ws_manager.publish_state(f"poll:{poll.id}", state, {
             "type": "poll_ended",
-            "poll": poll.dict()
-        })
+            "poll": state
+        }, final=True)
         
         return {"success": True, "poll": poll.dict()}
         
@@ -231,12 +244,13 @@ async def delete_poll(
             del active_polls[poll_id]
             if poll_id in poll_votes:
                 del poll_votes[poll_id]
+            get_payload_cache().invalidate("polls:")
             
             logger.info(f"✅ Poll deleted: {poll_id} by {admin['username']}")
             
             # Broadcast poll deletion
             ws_manager = get_ws_manager()
-            await ws_manager.broadcast({
+            await ws_manager.drop_state(f"poll:{poll_id}", {
                 "type": "poll_deleted",
                 "poll_id": poll_id
             })
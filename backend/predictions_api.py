@@ -50,6 +50,17 @@ class ResolvePredictionRequest(BaseModel):
 active_predictions: Dict[str, Prediction] = {}
 prediction_votes: Dict[str, Dict[str, str]] = {}  # {prediction_id: {user_id: choice}}
 
+def _public_view(prediction: Prediction) -> dict:
+    """Live state shown to viewers - per-option counts stay hidden until resolved"""
+    return {
+        "id": prediction.id,
+        "question": prediction.question,
+        "option_a": prediction.option_a,
+        "option_b": prediction.option_b,
+        "total_votes": prediction.total_votes,
+        "active": prediction.active
+    }
+
 @predictions_router.post("/create")
 async def create_prediction(
     request: CreatePredictionRequest,
@@ -77,7 +88,7 @@ async def create_prediction(
         
         # Broadcast new prediction
         ws_manager = get_ws_manager()
-        await ws_manager.broadcast({
+        await ws_manager.publish_state(f"prediction:{prediction.id}", _public_view(prediction), {
             "type": "new_prediction",
             "prediction": prediction.dict()
         })
@@ -130,16 +141,10 @@ async def make_prediction(request: PredictRequest):
         
         # Broadcast updated prediction (hide vote counts until resolved)
         ws_manager = get_ws_manager()
-        await ws_manager.broadcast({
+        state = _public_view(prediction)
+        await ws_manager.publish_state(f"prediction:{prediction.id}", state, {
             "type": "prediction_update",
-            "prediction": {
-                "id": prediction.id,
-                "question": prediction.question,
-                "option_a": prediction.option_a,
-                "option_b": prediction.option_b,
-                "total_votes": prediction.total_votes,
-                "active": prediction.active
-            }
+            "prediction": state
         })
         
         return {"success": True, "message": f"Prediction recorded: {request.choice}"}
@@ -179,12 +184,13 @@ async def resolve_prediction(
         
         # Broadcast resolution with full results
         ws_manager = get_ws_manager()
-        await ws_manager.broadcast({
+        state = {**prediction.dict(), "accuracy": round(accuracy, 1), "correct_votes": correct_votes}
+        await ws_manager.publish_state(f"prediction:{prediction.id}", state, {
             "type": "prediction_resolved",
             "prediction": prediction.dict(),
             "accuracy": round(accuracy, 1),
             "correct_votes": correct_votes
-        })
+        }, final=True)
         
         return {
             "success": True,
@@ -259,7 +265,7 @@ async def delete_prediction(
             
             # Broadcast deletion
             ws_manager = get_ws_manager()
-            await ws_manager.broadcast({
+            await ws_manager.drop_state(f"prediction:{prediction_id}", {
                 "type": "prediction_deleted",
                 "prediction_id": prediction_id
             })
@@ -0,0 +1,442 @@
+"""
+REMZA019 Gaming - Presence & Unique Viewers
+Heartbeat-based presence: an open WebSocket counts as present until it
+disconnects (uvicorn's protocol pings drop dead sockets); HTTP / client pings
+keep a viewer present for PRESENCE_TTL_SECONDS. Each worker holds its own
+presence table and every PRESENCE_FLUSH_SECONDS:
+  - merges its HyperLogLog sketches for "unique viewers per day / stream /
+    room" into presence_sketches (register-wise max, compare-and-swap)
+  - publishes a sketch of who is online right now to presence_workers, so
+    concurrency across workers is the union of those sketches, not a sum
+A leased job samples that union into presence_samples for history.
+
+A sketch is 2^PRESENCE_HLL_PRECISION one-byte registers (4 KB at p=12,
+~1.6% standard error) no matter how many viewers it has seen.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL_SECONDS = int(os.environ.get("PRESENCE_TTL_SECONDS", "90"))
+PRESENCE_FLUSH_SECONDS = int(os.environ.get("PRESENCE_FLUSH_SECONDS", "15"))
+PRESENCE_SAMPLE_SECONDS = int(os.environ.get("PRESENCE_SAMPLE_SECONDS", "60"))
+PRESENCE_HLL_PRECISION = int(os.environ.get("PRESENCE_HLL_PRECISION", "12"))
+PRESENCE_SAMPLE_RETENTION_DAYS = int(os.environ.get("PRESENCE_SAMPLE_RETENTION_DAYS", "90"))
+
+# Days roll over on the channel's local clock (same zone as the stream schedule)
+PRESENCE_TZ = ZoneInfo("Europe/Belgrade")
+ROOM_PATTERN = re.compile(r"^[a-z0-9_-]{1,32}$")
+CAS_RETRIES = 5
+
+
+# ============== HYPERLOGLOG ==============
+class HyperLogLog:
+    """Mergeable cardinality sketch over 64-bit blake2b hashes"""
+    __slots__ = ("p", "m", "registers")
+
+    def __init__(self, p: int = PRESENCE_HLL_PRECISION, registers: Optional[bytes] = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"HyperLogLog: expected {self.m} registers, got {len(self.registers)}")
+
+    def add(self, item: str) -> bool:
+        """Add `item`; True if a register changed"""
+        value = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        index = value >> (64 - self.p)
+        rest_bits = 64 - self.p
+        rank = rest_bits - (value & ((1 << rest_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Register-wise max (in place): the sketch of the union"""
+        if other.p != self.p:
+            raise ValueError("HyperLogLog: cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(_INVERSE_POWERS[r] for r in self.registers)
+        if estimate <= 2.5 * m:
+            zeros = self.registers.count(0)
+            if zeros:
+                # Linear counting is near-exact for small audiences
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def is_empty(self) -> bool:
+        return not any(self.registers)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, p: int = PRESENCE_HLL_PRECISION) -> "HyperLogLog":
+        return cls(p, data)
+
+
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+
+
+def local_day(moment: Optional[datetime] = None) -> str:
+    return (moment or datetime.now(timezone.utc)).astimezone(PRESENCE_TZ).date().isoformat()
+
+
+# ============== PRESENCE SERVICE ==============
+class PresenceService:
+    """Per-worker presence table plus sketch flushing and cross-worker queries"""
+
+    def __init__(self, ttl: int = PRESENCE_TTL_SECONDS, precision: int = PRESENCE_HLL_PRECISION):
+        self.ttl = ttl
+        self.precision = precision
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.db = None
+        # room -> viewer -> connection -> expiry (monotonic; math.inf while a socket is open).
+        # A viewer stays present while any of its connections (tabs, sockets) is
+        self._present: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # Unflushed sketch increments: key -> (sketch, document fields)
+        self._pending: Dict[str, tuple] = {}
+        self.stream_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._unsubscribe = None
+        self.stats = {"heartbeats": 0, "flushes": 0, "sketch_merges": 0, "cas_conflicts": 0, "samples": 0}
+
+    # ---------- heartbeats ----------
+    def heartbeat(self, viewer: str, room: str = "public", connected: bool = False, connection: str = ""):
+        """
+        Mark `viewer` present in `room` through `connection` (one tab or socket).
+        connected=True pins it until leave() (an open WebSocket); otherwise it
+        expires after the TTL.
+        """
+        if not viewer or not ROOM_PATTERN.match(room):
+            return
+        self.stats["heartbeats"] += 1
+        connections = self._present.setdefault(room, {}).setdefault(viewer, {})
+        expiry = math.inf if connected else time.monotonic() + self.ttl
+        if connections.get(connection, 0) < expiry:
+            connections[connection] = expiry
+        self._record(room, [viewer])
+
+    def _record(self, room: str, viewers: Iterable[str]):
+        """Count `viewers` towards today's and the current stream's uniques"""
+        day = local_day()
+        sketches = [self._sketch(f"day:{day}:{room}", {"kind": "day", "day": day, "room": room})]
+        if self.stream_id:
+            sketches.append(self._sketch(
+                f"stream:{self.stream_id}:{room}", {"kind": "stream", "stream_id": self.stream_id, "room": room}
+            ))
+        for viewer in viewers:
+            for sketch in sketches:
+                sketch.add(viewer)
+
+    def leave(self, viewer: str, room: Optional[str] = None, connection: Optional[str] = None):
+        """
+        Drop one `connection` of `viewer` (or all of them) from `room` (or every
+        room) immediately; the viewer stays present while other connections remain
+        """
+        rooms = [room] if room else list(self._present)
+        for name in rooms:
+            members = self._present.get(name, {})
+            connections = members.get(viewer)
+            if connections is None:
+                continue
+            if connection is not None:
+                connections.pop(connection, None)
+            if connection is None or not connections:
+                del members[viewer]
+
+    def _sketch(self, key: str, fields: Dict) -> HyperLogLog:
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = (HyperLogLog(self.precision), fields)
+        return entry[0]
+
+    def _expire(self):
+        now = time.monotonic()
+        for room, members in list(self._present.items()):
+            for viewer, connections in list(members.items()):
+                for connection in [c for c, expiry in connections.items() if expiry <= now]:
+                    del connections[connection]
+                if not connections:
+                    del members[viewer]
+            if not members:
+                del self._present[room]
+
+    def local_online(self, room: Optional[str] = None) -> int:
+        """Viewers present on this worker only"""
+        self._expire()
+        if room:
+            return len(self._present.get(room, ()))
+        return len(set().union(*self._present.values())) if self._present else 0
+
+    # ---------- persistence ----------
+    async def _merge_sketch(self, key: str, sketch: HyperLogLog, fields: Dict):
+        """Fold `sketch` into the stored one: read, max registers, write if unchanged since read"""
+        collection = self.db.presence_sketches
+        for _ in range(CAS_RETRIES):
+            doc = await collection.find_one({"_id": key}, {"registers": 1, "version": 1})
+            now = datetime.now(timezone.utc)
+            if doc is None:
+                try:
+                    await collection.insert_one({
+                        "_id": key, **fields, "p": self.precision, "registers": sketch.to_bytes(),
+                        "version": 1, "created_at": now, "updated_at": now,
+                    })
+                    return
+                except DuplicateKeyError:
+                    self.stats["cas_conflicts"] += 1
+                    continue
+            merged = HyperLogLog.from_bytes(doc["registers"], self.precision).merge(sketch)
+            result = await collection.update_one(
+                {"_id": key, "version": doc["version"]},
+                {"$set": {"registers": merged.to_bytes(), "updated_at": now}, "$inc": {"version": 1}},
+            )
+            if result.matched_count:
+                return
+            self.stats["cas_conflicts"] += 1
+        logger.warning(f"⚠️ Presence: gave up merging sketch {key} after {CAS_RETRIES} conflicts")
+        # Keep the increment for the next flush rather than losing it
+        self._sketch(key, fields).merge(sketch)
+
+    async def flush(self):
+        """Persist pending sketch increments and this worker's online snapshot"""
+        if self.db is None:
+            return
+        # Open sockets don't heartbeat again - re-count everyone present so they
+        # land in a stream that started, or a day that began, after they joined
+        self._expire()
+        for room, members in self._present.items():
+            self._record(room, members)
+        pending, self._pending = self._pending, {}
+        for key, (sketch, fields) in pending.items():
+            try:
+                await self._merge_sketch(key, sketch, fields)
+                self.stats["sketch_merges"] += 1
+            except Exception as e:
+                logger.error(f"❌ Presence: sketch merge failed for {key}: {e}")
+                self._sketch(key, fields).merge(sketch)
+
+        rooms = {}
+        for room, members in self._present.items():
+            online = HyperLogLog(self.precision)
+            online.update(members)
+            rooms[room] = {"online": len(members), "sketch": online.to_bytes()}
+        now = datetime.now(timezone.utc)
+        await self.db.presence_workers.replace_one({"_id": self.worker_id}, {
+            "_id": self.worker_id,
+            "rooms": rooms,
+            "stream_id": self.stream_id,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=PRESENCE_FLUSH_SECONDS * 3),
+        }, upsert=True)
+        self.stats["flushes"] += 1
+
+    async def online(self, room: Optional[str] = None) -> Dict:
+        """Concurrent viewers across all workers (union of live worker sketches)"""
+        if self.db is None:
+            count = self.local_online(room)
+            return {"online": count, "workers": 1, "rooms": {room: count} if room else {}}
+
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=PRESENCE_FLUSH_SECONDS * 3)
+        workers = await self.db.presence_workers.find({"updated_at": {"$gte": cutoff}}).to_list(length=None)
+        per_room: Dict[str, HyperLogLog] = {}
+        for worker in workers:
+            for name, entry in (worker.get("rooms") or {}).items():
+                if room and name != room:
+                    continue
+                sketch = per_room.setdefault(name, HyperLogLog(self.precision))
+                sketch.merge(HyperLogLog.from_bytes(entry["sketch"], self.precision))
+        union = HyperLogLog(self.precision)
+        for sketch in per_room.values():
+            union.merge(sketch)
+        return {
+            "online": union.count(),
+            "workers": len(workers),
+            "rooms": {name: sketch.count() for name, sketch in per_room.items()},
+        }
+
+    async def unique_viewers(self, day: Optional[str] = None, stream_id: Optional[str] = None,
+                             room: Optional[str] = None) -> Dict:
+        """Estimated unique viewers for a day or a stream, in one room or across all rooms"""
+        query: Dict = {"kind": "stream", "stream_id": stream_id} if stream_id else {"kind": "day", "day": day or local_day()}
+        if room:
+            query["room"] = room
+        union = HyperLogLog(self.precision)
+        rooms = {}
+        async for doc in self.db.presence_sketches.find(query, {"room": 1, "registers": 1}):
+            sketch = HyperLogLog.from_bytes(doc["registers"], self.precision)
+            rooms[doc["room"]] = sketch.count()
+            union.merge(sketch)
+        # Increments this worker hasn't flushed yet
+        for sketch, fields in self._pending.values():
+            if all(fields.get(k) == v for k, v in query.items()):
+                union.merge(sketch)
+        return {
+            **({"stream_id": stream_id} if stream_id else {"day": query["day"]}),
+            "room": room,
+            "unique_viewers": union.count(),
+            "rooms": rooms,
+            "sketch_bytes": len(rooms) * (1 << self.precision),
+        }
+
+    async def unique_viewers_by_stream(self, stream_ids: List[str]) -> Dict[str, int]:
+        """Unique-viewer estimates for several streams (all rooms) in one query"""
+        unions: Dict[str, HyperLogLog] = {stream_id: HyperLogLog(self.precision) for stream_id in stream_ids}
+        query = {"kind": "stream", "stream_id": {"$in": list(unions)}}
+        async for doc in self.db.presence_sketches.find(query, {"stream_id": 1, "registers": 1}):
+            unions[doc["stream_id"]].merge(HyperLogLog.from_bytes(doc["registers"], self.precision))
+        for sketch, fields in self._pending.values():
+            if fields.get("kind") == "stream" and fields.get("stream_id") in unions:
+                unions[fields["stream_id"]].merge(sketch)
+        return {stream_id: union.count() for stream_id, union in unions.items()}
+
+    async def sample(self):
+        """Record current concurrency (one sample per period across workers, via the job scheduler)"""
+        snapshot = await self.online()
+        await self.db.presence_samples.insert_one({
+            "at": datetime.now(timezone.utc),
+            "stream_id": self.stream_id,
+            "online": snapshot["online"],
+            "rooms": snapshot["rooms"],
+        })
+        self.stats["samples"] += 1
+
+    async def history(self, hours: int = 24, room: Optional[str] = None,
+                      stream_id: Optional[str] = None) -> List[Dict]:
+        query: Dict = {"stream_id": stream_id} if stream_id else {
+            "at": {"$gte": datetime.now(timezone.utc) - timedelta(hours=hours)}
+        }
+        samples = []
+        async for doc in self.db.presence_samples.find(query, {"_id": 0}).sort("at", 1):
+            value = doc["rooms"].get(room, 0) if room else doc["online"]
+            samples.append({"at": doc["at"].isoformat(), "online": value, "stream_id": doc.get("stream_id")})
+        return samples
+
+    async def get_streams(self, limit: int = 20) -> List[Dict]:
+        return await self.db.presence_streams.find(
+            {"_id": {"$ne": "live"}}, {"_id": 0}
+        ).sort("started_at", -1).limit(limit).to_list(length=limit)
+
+    # ---------- stream tracking ----------
+    async def _on_live_status(self, status: Dict, previous: Dict):
+        """Every worker converges on one stream id through the single "live" document"""
+        if self.db is None:
+            return
+        now = datetime.now(timezone.utc)
+        if status["is_live"]:
+            try:
+                doc = await self.db.presence_streams.find_one_and_update(
+                    {"_id": "live"},
+                    {"$setOnInsert": {"stream_id": uuid.uuid4().hex[:12], "started_at": now,
+                                      "game": status.get("live_game"), "source": status.get("source")}},
+                    upsert=True, return_document=ReturnDocument.AFTER,
+                )
+            except DuplicateKeyError:
+                doc = await self.db.presence_streams.find_one({"_id": "live"})
+            self.stream_id = doc["stream_id"]
+            logger.info(f"👥 Presence: tracking stream {self.stream_id}")
+        elif self.stream_id:
+            live = await self.db.presence_streams.find_one_and_delete({"_id": "live", "stream_id": self.stream_id})
+            if live is not None:
+                await self.db.presence_streams.insert_one({
+                    "_id": live["stream_id"], "stream_id": live["stream_id"], "started_at": live["started_at"],
+                    "ended_at": now, "game": live.get("game"), "source": live.get("source"),
+                })
+            self.stream_id = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(PRESENCE_FLUSH_SECONDS)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Presence flush failed: {e}")
+
+    async def _ensure_indexes(self):
+        try:
+            await self.db.presence_sketches.create_index([("kind", 1), ("day", 1), ("stream_id", 1), ("room", 1)])
+            await self.db.presence_workers.create_index("expires_at", expireAfterSeconds=0)
+            await self.db.presence_samples.create_index(
+                "at", expireAfterSeconds=PRESENCE_SAMPLE_RETENTION_DAYS * 86400
+            )
+            await self.db.presence_samples.create_index([("stream_id", 1), ("at", 1)])
+        except Exception as e:
+            logger.warning(f"⚠️ Presence: index creation failed: {e}")
+
+    async def start(self, db=None):
+        if self._task is not None and not self._task.done():
+            return
+        self.db = db
+        if db is not None:
+            await self._ensure_indexes()
+            live = await db.presence_streams.find_one({"_id": "live"})
+            self.stream_id = live["stream_id"] if live else None
+        from live_status_service import get_live_status_service
+        self._unsubscribe = get_live_status_service().subscribe(self._on_live_status)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"👥 Presence service started (worker {self.worker_id})")
+
+    async def stop(self):
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        # Final flush so the last interval's viewers are counted; drop our online snapshot
+        try:
+            await self.flush()
+            if self.db is not None:
+                await self.db.presence_workers.delete_one({"_id": self.worker_id})
+        except Exception as e:
+            logger.warning(f"⚠️ Presence: final flush failed: {e}")
+
+    def get_stats(self) -> Dict:
+        self._expire()
+        return {
+            **self.stats,
+            "worker_id": self.worker_id,
+            "stream_id": self.stream_id,
+            "local_online": {room: len(members) for room, members in self._present.items()},
+            "pending_sketches": len(self._pending),
+            "precision": self.precision,
+            "sketch_bytes": 1 << self.precision,
+        }
+
+
+# Global presence service
+presence_service = PresenceService()
+
+def get_presence_service() -> PresenceService:
+    """Get the global presence service"""
+    return presence_service
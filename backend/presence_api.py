@@ -0,0 +1,115 @@
+"""
+REMZA019 Gaming - Presence API
+Heartbeats for clients without an open WebSocket (overlays, embedded players)
+and the cross-worker "who is online" count. History and unique-viewer
+analytics live under /api/stats.
+
+Heartbeats are anonymous, so each client IP gets a budget: a request rate and
+a number of distinct viewer ids it may keep present at once (one household or
+NAT shares it), which caps how far a single client can inflate the count.
+Behind a reverse proxy (Render) the peer address is the proxy's, so the client
+address is read from X-Forwarded-For, TRUSTED_PROXY_HOPS entries from the right
+(entries further left are client-supplied and can be forged).
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+import logging
+import os
+import time
+from admin_api import get_current_admin
+from presence import get_presence_service, ROOM_PATTERN, PRESENCE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+presence_router = APIRouter(prefix="/api/presence", tags=["presence"])
+
+PRESENCE_IDS_PER_IP = int(os.environ.get("PRESENCE_IDS_PER_IP", "20"))
+PRESENCE_REQUESTS_PER_IP_MINUTE = int(os.environ.get("PRESENCE_REQUESTS_PER_IP_MINUTE", "120"))
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = connect directly)
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+# Budgets of idle IPs are swept once this many are tracked
+PRESENCE_IP_BUDGETS_MAX = 10000
+
+class HeartbeatRequest(BaseModel):
+    viewer_id: str = Field(..., min_length=1, max_length=128)
+    room: str = "public"
+    # One per tab/player, so leaving from one tab keeps the viewer's other tabs present
+    connection_id: str = Field("", max_length=64)
+
+class _IpBudget:
+    """Per-IP request window plus the viewer ids the IP kept present within the TTL"""
+
+    def __init__(self):
+        self._windows: Dict[str, List[float]] = {}  # ip -> [window start, requests]
+        self._viewers: Dict[str, Dict[str, float]] = {}  # ip -> viewer -> last heartbeat
+        self.rejected = 0
+
+    def allow(self, ip: str, viewer: Optional[str] = None) -> bool:
+        now = time.monotonic()
+        if len(self._windows) > PRESENCE_IP_BUDGETS_MAX:
+            self._sweep(now)
+        window = self._windows.get(ip)
+        if window is None or now - window[0] >= 60:
+            window = self._windows[ip] = [now, 0]
+        window[1] += 1
+        if window[1] > PRESENCE_REQUESTS_PER_IP_MINUTE:
+            self.rejected += 1
+            return False
+        if viewer is None:
+            return True
+        viewers = self._viewers.setdefault(ip, {})
+        if viewer not in viewers:
+            for stale in [v for v, seen in viewers.items() if now - seen > PRESENCE_TTL_SECONDS]:
+                del viewers[stale]
+            if len(viewers) >= PRESENCE_IDS_PER_IP:
+                self.rejected += 1
+                return False
+        viewers[viewer] = now
+        return True
+
+    def _sweep(self, now: float):
+        idle = max(60, PRESENCE_TTL_SECONDS)
+        for ip in [ip for ip, window in self._windows.items() if now - window[0] > idle]:
+            del self._windows[ip]
+            self._viewers.pop(ip, None)
+
+_ip_budget = _IpBudget()
+
+def _client_ip(request: Request, hops: Optional[int] = None) -> str:
+    hops = TRUSTED_PROXY_HOPS if hops is None else hops
+    forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+    if hops > 0 and forwarded:
+        return forwarded[-min(hops, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+def _check_budget(request: Request, viewer: Optional[str] = None):
+    ip = _client_ip(request)
+    if not _ip_budget.allow(ip, viewer):
+        raise HTTPException(status_code=429, detail="Too many presence heartbeats from this address")
+
+@presence_router.post("/heartbeat")
+async def presence_heartbeat(heartbeat: HeartbeatRequest, request: Request):
+    """Keep a viewer present for the presence TTL - send every TTL/3 seconds"""
+    if not ROOM_PATTERN.match(heartbeat.room):
+        raise HTTPException(status_code=400, detail="Invalid room")
+    _check_budget(request, heartbeat.viewer_id)
+    get_presence_service().heartbeat(heartbeat.viewer_id, heartbeat.room, connection=heartbeat.connection_id)
+    return {"success": True, "ttl_seconds": PRESENCE_TTL_SECONDS}
+
+@presence_router.post("/leave")
+async def presence_leave(heartbeat: HeartbeatRequest, request: Request):
+    """Drop this connection right away (page unload) instead of waiting for the TTL"""
+    _check_budget(request)
+    get_presence_service().leave(heartbeat.viewer_id, heartbeat.room, connection=heartbeat.connection_id)
+    return {"success": True}
+
+@presence_router.get("/online")
+async def presence_online(room: Optional[str] = None):
+    """Concurrent viewers across all workers, optionally for one room"""
+    return await get_presence_service().online(room=room)
+
+@presence_router.get("/stats")
+async def presence_stats(admin = Depends(get_current_admin)):
+    """This worker's presence table and flush counters - ADMIN ONLY"""
+    return {**get_presence_service().get_stats(), "heartbeats_rejected": _ip_budget.rejected}
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - Web Push Delivery Benchmark
+Pushes one go-live message to N synthetic subscriptions through the
+WebPushEngine against a local push-service stand-in (in-process ASGI app with
+configurable latency and a share of 410 Gone endpoints), once per crypto
+worker setting, and reports deliveries per second:
+
+    python push_bench.py --subscriptions 20000 --workers 0,2,4 --latency-ms 40
+    python push_bench.py --gone-ratio 0.05 --out push.json
+
+--workers 0 encrypts on the event loop's default thread pool (the GIL-bound
+baseline). The stand-in decrypts a sample of the bodies it receives with the
+subscriber keys and checks the VAPID header, so a broken payload shows up as
+failed deliveries rather than a fast number.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from load_harness import git_revision
+from web_push import (
+    VapidSigner, WebPushEngine, b64url_decode, b64url_encode, generate_vapid_keys, _hkdf_expand_one,
+)
+
+logger = logging.getLogger("push_bench")
+
+ORIGINS = ("fcm.bench.local", "updates.push.bench.local", "web.push.bench.local")
+UA_KEYS = 64  # distinct subscriber key pairs, reused across endpoints
+
+
+def decrypt_body(body: bytes, ua_private, auth_secret: bytes) -> bytes:
+    """User-agent side of RFC 8291 - what the browser does with the request body"""
+    salt = body[:16]
+    record_size, id_length = struct.unpack("!IB", body[16:21])
+    as_public = body[21:21 + id_length]
+    ciphertext = body[21 + id_length:]
+    ua_public = ua_private.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    ecdh_secret = ua_private.exchange(
+        ec.ECDH(), ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), as_public)
+    )
+    prk_key = hmac.new(auth_secret, ecdh_secret, hashlib.sha256).digest()
+    ikm = _hkdf_expand_one(prk_key, b"WebPush: info\x00" + ua_public + as_public, 32)
+    prk = hmac.new(salt, ikm, hashlib.sha256).digest()
+    cek = _hkdf_expand_one(prk, b"Content-Encoding: aes128gcm\x00", 16)
+    nonce = _hkdf_expand_one(prk, b"Content-Encoding: nonce\x00", 12)
+    plaintext = AESGCM(cek).decrypt(nonce, ciphertext, None)
+    if len(body) - 21 - id_length > record_size or not plaintext.endswith(b"\x02"):
+        raise ValueError("bad record")
+    return plaintext[:-1]
+
+
+def verify_vapid(authorization: str, audience: str) -> bool:
+    """Check the `vapid t=..., k=...` header the way a push service does"""
+    fields = dict(part.strip().split("=", 1) for part in authorization[len("vapid "):].split(","))
+    header, claims, signature = fields["t"].split(".")
+    public_key = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), b64url_decode(fields["k"]))
+    raw = b64url_decode(signature)
+    der = encode_dss_signature(int.from_bytes(raw[:32], "big"), int.from_bytes(raw[32:], "big"))
+    try:
+        public_key.verify(der, f"{header}.{claims}".encode(), ec.ECDSA(hashes.SHA256()))
+    except InvalidSignature:
+        return False
+    decoded = json.loads(b64url_decode(claims))
+    return decoded["aud"] == audience and decoded["exp"] > time.time()
+
+
+class PushServiceStandIn:
+    """ASGI push service: 201 for live endpoints, 410 for expired ones, with latency"""
+
+    def __init__(self, keys: Dict[str, Tuple], gone: set, latency_s: float, verify_every: int, expected: bytes):
+        self.keys = keys
+        self.gone = gone
+        self.latency_s = latency_s
+        self.verify_every = verify_every
+        self.expected = expected
+        self.requests = 0
+        self.verified = 0
+        self.invalid = 0
+
+    async def __call__(self, scope, receive, send):
+        body = b""
+        while True:
+            event = await receive()
+            body += event.get("body", b"")
+            if not event.get("more_body"):
+                break
+        self.requests += 1
+        endpoint = f"https://{dict(scope['headers'])[b'host'].decode()}{scope['path']}"
+        status = 410 if endpoint in self.gone else 201
+
+        if status == 201 and self.requests % self.verify_every == 0:
+            headers = dict(scope["headers"])
+            ua_private, auth_secret = self.keys[endpoint]
+            try:
+                valid = (verify_vapid(headers[b"authorization"].decode(), endpoint.rsplit("/", 2)[0])
+                         and decrypt_body(body, ua_private, auth_secret) == self.expected)
+            except Exception:
+                valid = False
+            if valid:
+                self.verified += 1
+            else:
+                self.invalid += 1
+                status = 400
+
+        await asyncio.sleep(self.latency_s)
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def make_subscriptions(count: int, gone_ratio: float, seed: int):
+    rng = random.Random(seed)
+    key_pairs = []
+    for _ in range(UA_KEYS):
+        private = ec.generate_private_key(ec.SECP256R1())
+        public = private.public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+        )
+        key_pairs.append((private, b64url_encode(public), os.urandom(16)))
+
+    subscriptions: List[Dict] = []
+    keys: Dict[str, Tuple] = {}
+    gone = set()
+    for index in range(count):
+        private, p256dh, auth = key_pairs[index % UA_KEYS]
+        # The real split is roughly FCM-heavy; /send/ mirrors the path shape push services use
+        origin = rng.choices(ORIGINS, weights=(70, 20, 10))[0]
+        endpoint = f"https://{origin}/send/{index:07d}-{zlib.crc32(str(index).encode()):08x}"
+        subscriptions.append({"endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": b64url_encode(auth)}})
+        keys[endpoint] = (private, auth)
+        if rng.random() < gone_ratio:
+            gone.add(endpoint)
+    return subscriptions, keys, gone
+
+
+async def run_once(args, workers: int, subscriptions, keys, gone, signer: VapidSigner) -> Dict:
+    message = {"type": "live", "title": "🔴 REMZA019 IS LIVE!", "body": "Join the stream now! Playing FORTNITE.",
+               "url": "/", "tag": "remza019-live"}
+    expected = json.dumps(message, separators=(",", ":")).encode()
+    standin = PushServiceStandIn(keys, gone, args.latency_ms / 1000, args.verify_every, expected)
+    engine = WebPushEngine(signer=signer, transport=httpx.ASGITransport(app=standin),
+                           crypto_workers=workers, per_origin=args.per_origin)
+    try:
+        started = time.perf_counter()
+        report = await engine.send_batch(subscriptions, message, ttl=900, urgency="high", topic="live")
+        wall = time.perf_counter() - started
+    finally:
+        await engine.close()
+    return {
+        **report,
+        "wall_s": round(wall, 3),
+        "delivered_per_s": round(report["delivered"] / wall, 1) if wall else 0.0,
+        "verified_samples": standin.verified,
+        "invalid_samples": standin.invalid,
+        "vapid_signatures": signer.signatures,
+    }
+
+
+async def run(args) -> Dict:
+    subscriptions, keys, gone = make_subscriptions(args.subscriptions, args.gone_ratio, args.seed)
+    results: Dict[str, Dict] = {}
+    for workers in args.workers:
+        signer = VapidSigner(generate_vapid_keys()["VAPID_PRIVATE_KEY"], "mailto:bench@remza019.gaming")
+        results[f"workers={workers}"] = result = await run_once(args, workers, subscriptions, keys, gone, signer)
+        logger.info(f"✅ workers={workers}: {result['delivered']} delivered, {result['gone']} gone in "
+                    f"{result['wall_s']}s ({result['delivered_per_s']}/s, {result['invalid_samples']} invalid)")
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "subscriptions": args.subscriptions,
+            "gone_ratio": args.gone_ratio,
+            "latency_ms": args.latency_ms,
+            "per_origin": args.per_origin,
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+        },
+        "runs": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Web Push delivery against a local push service")
+    parser.add_argument("--subscriptions", type=int, default=10000)
+    parser.add_argument("--workers", default="0,2,4", help="Comma-separated crypto worker counts to compare")
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="Push service response latency")
+    parser.add_argument("--gone-ratio", type=float, default=0.02, help="Share of endpoints answering 410 Gone")
+    parser.add_argument("--per-origin", type=int, default=200, help="Concurrent requests per push service")
+    parser.add_argument("--verify-every", type=int, default=50, help="Decrypt every Nth delivered body")
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--out", help="Write JSON report to this path")
+    args = parser.parse_args()
+    args.workers = [int(value) for value in args.workers.split(",")]
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(rendered + "\n")
+        logger.info(f"📄 Report written to {args.out}")
+    else:
+        print(rendered)
+
+
+if __name__ == "__main__":
+    main()
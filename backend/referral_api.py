@@ -9,6 +9,7 @@ from datetime import datetime
 import uuid
 import secrets
 import logging
+from referral_engine import REFERRAL_REWARDS, get_referral_engine
 
 logger = logging.getLogger(__name__)
 
@@ -19,24 +20,6 @@ def get_database():
     from server import get_database as get_db
     return get_db()
 
-# Referral Rewards
-REFERRAL_REWARDS = {
-    "referrer": {
-        "signup": 50,  # Points for referrer when someone signs up
-        "first_activity": 100,  # Bonus when referred user completes first activity
-        "subscription": 500  # Bonus when referred user subscribes
-    },
-    "referred": {
-        "signup": 50  # Welcome bonus for using referral code
-    },
-    "milestones": {
-        10: {"points": 1000, "badge": "Recruiter Bronze"},
-        25: {"points": 2500, "badge": "Recruiter Silver"},
-        50: {"points": 5000, "badge": "Recruiter Gold"},
-        100: {"points": 15000, "badge": "Recruiter Diamond"}
-    }
-}
-
 # Pydantic Models
 class ReferralCode(BaseModel):
     code: str
@@ -83,6 +66,8 @@ async def generate_referral_code(user_id: str, username: str):
             "uses": 0,
             "total_points_earned": 0,
             "referred_users": [],
+            "milestones_awarded": [],
+            "milestones_tracked": True,
             "is_active": True
         }
         
@@ -105,94 +90,15 @@ async def generate_referral_code(user_id: str, username: str):
 async def use_referral_code(request: UseReferralRequest):
     """
     Apply a referral code when new user signs up
+    (race-safe: see referral_engine for the conditional write chain)
     """
     try:
-        db = get_database()
-        
-        # Find referral code
-        referral = await db.referrals.find_one({"code": request.referral_code})
-        
-        if not referral:
-            raise HTTPException(status_code=404, detail="Invalid referral code")
-        
-        if not referral["is_active"]:
-            raise HTTPException(status_code=400, detail="Referral code is inactive")
-        
-        # Check if user already used a referral code
-        existing_use = await db.referral_uses.find_one({
-            "referred_user_id": request.referred_user_id
-        })
-        
-        if existing_use:
-            return {
-                "success": False,
-                "message": "User already used a referral code"
-            }
-        
-        # Reward referrer
-        referrer_reward = REFERRAL_REWARDS["referrer"]["signup"]
-        await db.viewers.update_one(
-            {"user_id": referral["user_id"]},
-            {"$inc": {"points": referrer_reward}}
+        result = await get_referral_engine().redeem(
+            request.referral_code, request.referred_user_id, request.referred_username
         )
-        
-        # Reward referred user
-        referred_reward = REFERRAL_REWARDS["referred"]["signup"]
-        await db.viewers.update_one(
-            {"user_id": request.referred_user_id},
-            {"$inc": {"points": referred_reward}}
-        )
-        
-        # Record referral use
-        await db.referral_uses.insert_one({
-            "referral_code": request.referral_code,
-            "referrer_id": referral["user_id"],
-            "referrer_username": referral["username"],
-            "referred_user_id": request.referred_user_id,
-            "referred_username": request.referred_username,
-            "created_at": datetime.now(),
-            "rewards_given": {
-                "referrer": referrer_reward,
-                "referred": referred_reward
-            }
-        })
-        
-        # Update referral stats
-        new_uses = referral["uses"] + 1
-        await db.referrals.update_one(
-            {"code": request.referral_code},
-            {
-                "$inc": {
-                    "uses": 1,
-                    "total_points_earned": referrer_reward
-                },
-                "$push": {"referred_users": request.referred_user_id}
-            }
-        )
-        
-        # Check for milestone rewards
-        milestone_reward = REFERRAL_REWARDS["milestones"].get(new_uses)
-        if milestone_reward:
-            await db.viewers.update_one(
-                {"user_id": referral["user_id"]},
-                {
-                    "$inc": {"points": milestone_reward["points"]},
-                    "$push": {"badges": milestone_reward["badge"]}
-                }
-            )
-            
-            logger.info(f"🎉 Milestone reached! {referral['username']} reached {new_uses} referrals!")
-        
-        logger.info(f"✅ Referral code used: {request.referral_code} by {request.referred_username}")
-        
-        return {
-            "success": True,
-            "referrer_reward": referrer_reward,
-            "referred_reward": referred_reward,
-            "milestone_reached": milestone_reward is not None,
-            "milestone_reward": milestone_reward,
-            "message": f"Referral code applied! You earned {referred_reward} bonus points!"
-        }
+        if result["success"]:
+            logger.info(f"✅ Referral code used: {request.referral_code} by {request.referred_username}")
+        return result
         
     except HTTPException:
         raise
@@ -216,10 +122,11 @@ async def get_referral_stats(user_id: str):
                 "message": "No referral code generated yet"
             }
         
-        # Get detailed stats
-        referral_uses = await db.referral_uses.find({
-            "referrer_id": user_id
-        }).to_list(length=1000)
+        # Get detailed stats (newest 10 off the referrer_id/created_at index)
+        referral_uses = await db.referral_uses.find(
+            {"referrer_id": user_id}, {"_id": 0}
+        ).sort("created_at", -1).limit(10).to_list(length=10)
+        referral_uses.reverse()
         
         # Calculate next milestone
         current_uses = referral["uses"]
@@ -240,7 +147,7 @@ async def get_referral_stats(user_id: str):
             "total_referrals": referral["uses"],
             "total_points_earned": referral.get("total_points_earned", 0),
             "referred_users": referral.get("referred_users", []),
-            "recent_referrals": referral_uses[-10:],  # Last 10
+            "recent_referrals": referral_uses,  # Last 10
             "next_milestone": next_milestone,
             "milestones_achieved": [
                 m for m in REFERRAL_REWARDS["milestones"].keys()
@@ -315,51 +222,16 @@ async def reward_referral_activity(referred_user_id: str, activity_type: str):
     """
     Reward referrer when referred user completes activities
     activity_type: "first_activity", "subscription", etc.
+    The bonus is claimed immediately; referrer points are written in batches.
     """
     try:
-        db = get_database()
-        
-        # Find who referred this user
-        referral_use = await db.referral_uses.find_one({
-            "referred_user_id": referred_user_id
-        })
-        
-        if not referral_use:
-            return {
-                "success": False,
-                "message": "User was not referred"
-            }
-        
-        # Check if bonus already given
-        bonus_key = f"bonus_{activity_type}"
-        if referral_use.get(bonus_key):
-            return {
-                "success": False,
-                "message": "Bonus already claimed"
-            }
-        
-        # Award bonus to referrer
-        bonus = REFERRAL_REWARDS["referrer"].get(activity_type, 0)
-        if bonus > 0:
-            await db.viewers.update_one(
-                {"user_id": referral_use["referrer_id"]},
-                {"$inc": {"points": bonus}}
-            )
-            
-            # Mark bonus as given
-            await db.referral_uses.update_one(
-                {"referred_user_id": referred_user_id},
-                {"$set": {bonus_key: True, f"{bonus_key}_at": datetime.now()}}
-            )
-            
-            logger.info(f"✅ Referral bonus: {bonus} points to {referral_use['referrer_username']} for {activity_type}")
-        
-        return {
-            "success": True,
-            "bonus": bonus,
-            "message": f"Referrer earned {bonus} bonus points!"
-        }
+        return await get_referral_engine().reward_activity(referred_user_id, activity_type)
         
     except Exception as e:
         logger.error(f"Error rewarding referral activity: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@referral_router.get("/engine-stats")
+async def get_referral_engine_stats():
+    """Redemption and bonus batching counters for this worker"""
+    return get_referral_engine().get_stats()
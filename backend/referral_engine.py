@@ -0,0 +1,352 @@
+"""
+REMZA019 Gaming - Referral Redemption Engine
+A redemption is a chain of conditional writes - each step only succeeds if the
+state it depends on still holds, so concurrent signups cannot double-grant:
+
+  1. claim the referral_uses record with an upsert on referred_user_id
+     ($setOnInsert) - a user that already redeemed any code finds their old
+     record instead of creating one. The unique index on referred_user_id
+     closes the concurrent-upsert race; without it redemption is refused
+  2. find_one_and_update on the code ({is_active: true}) increments `uses`
+     and returns the new count - exactly one redemption observes each count,
+     so each milestone is granted exactly once
+  3. one bulk_write grants referrer (signup + milestone) and referred points
+
+If step 2 fails (code deactivated meanwhile) the record from step 1 is removed.
+
+Every point grant is persisted before it is paid: the referral_uses record
+carries `unpaid_grants.<name>` (and an `unpaid_count`) from the moment it is
+claimed, and a viewer $inc only applies if the grant id is not yet in the
+viewer's `referral_grants`, so paying twice is a no-op. A crash or failed
+bulk_write leaves the marker behind and the periodic sweep pays it from the DB.
+
+Activity bonuses are claimed atomically on the referral_uses record right away
+(find_one_and_update on `bonus_<type> != true`, which also stores the unpaid
+grant), and the sweep pays all outstanding grants with one bulk_write every
+REFERRAL_BONUS_FLUSH_SECONDS (and on shutdown). Milestones are recorded in
+`milestones_awarded` on the referral; the sweep also pays milestones a crash
+skipped, for codes that track them (`milestones_tracked`, set at generation).
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+REFERRAL_BONUS_FLUSH_SECONDS = float(os.environ.get("REFERRAL_BONUS_FLUSH_SECONDS", "5"))
+# Redemptions pay their own grants inline; the sweep only picks them up after this
+REFERRAL_GRANT_GRACE_SECONDS = 60
+REFERRAL_SWEEP_BATCH = 500
+
+# Referral Rewards
+REFERRAL_REWARDS = {
+    "referrer": {
+        "signup": 50,  # Points for referrer when someone signs up
+        "first_activity": 100,  # Bonus when referred user completes first activity
+        "subscription": 500  # Bonus when referred user subscribes
+    },
+    "referred": {
+        "signup": 50  # Welcome bonus for using referral code
+    },
+    "milestones": {
+        10: {"points": 1000, "badge": "Recruiter Bronze"},
+        25: {"points": 2500, "badge": "Recruiter Silver"},
+        50: {"points": 5000, "badge": "Recruiter Gold"},
+        100: {"points": 15000, "badge": "Recruiter Diamond"}
+    }
+}
+
+
+class ReferralEngine:
+    """Race-safe referral redemption and batched activity bonuses"""
+
+    def __init__(self):
+        self.db = None
+        self._indexes_ready = False
+        self._unique_uses = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"redemptions": 0, "rejected": 0, "milestones": 0,
+                      "bonuses_claimed": 0, "bonus_flushes": 0, "bonus_writes": 0,
+                      "grants_recovered": 0}
+
+    def _db(self):
+        if self.db is None:
+            from server import get_database
+            self.db = get_database()
+        return self.db
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        db = self._db()
+        try:
+            await db.referrals.create_index("code", unique=True)
+            await db.referrals.create_index("user_id")
+            await db.referrals.create_index([("is_active", 1), ("uses", -1)])
+            await db.referral_uses.create_index([("referrer_id", 1), ("created_at", -1)])
+            await db.referral_uses.create_index([("unpaid_count", 1), ("created_at", 1)])
+        except Exception as e:
+            logger.warning(f"⚠️ Referral index creation failed: {e}")
+        try:
+            await db.referral_uses.create_index("referred_user_id", unique=True)
+            self._unique_uses = True
+        except Exception as e:
+            # Legacy duplicate uses keep the index from building: redemption stays off
+            # until they are cleaned up, since one-code-per-user depends on it
+            logger.error(f"❌ referral_uses.referred_user_id unique index missing ({e}) - "
+                         f"remove duplicate referral_uses to re-enable referral redemption")
+            return
+        self._indexes_ready = True
+
+    # ---------- grants ----------
+    @staticmethod
+    def _grant_op(user_id: str, grant_id: str, points: int, badge: Optional[str] = None) -> UpdateOne:
+        """Idempotent viewer credit - applies once per grant id"""
+        add = {"referral_grants": grant_id}
+        if badge:
+            add["badges"] = badge
+        return UpdateOne(
+            {"user_id": user_id, "referral_grants": {"$ne": grant_id}},
+            {"$inc": {"points": points}, "$set": {"points_updated_at": datetime.now()}, "$addToSet": add},
+        )
+
+    def _milestone_op(self, code: str, referrer_id: str, uses: int) -> UpdateOne:
+        reward = REFERRAL_REWARDS["milestones"][uses]
+        return self._grant_op(referrer_id, f"{code}:milestone_{uses}", reward["points"], reward["badge"])
+
+    async def _pay(self, uses: List[Dict], extra_ops: Optional[List[UpdateOne]] = None) -> int:
+        """Pay the unpaid grants stored on referral_uses records, then clear the markers"""
+        db = self._db()
+        viewer_ops = list(extra_ops or [])
+        paid_ops = []
+        for use in uses:
+            for name, grant in (use.get("unpaid_grants") or {}).items():
+                # Bonus grants go to the referrer, who is already on the record
+                user_id = grant.get("user_id") or use["referrer_id"]
+                viewer_ops.append(self._grant_op(user_id, f"{use['referred_user_id']}:{name}", grant["points"]))
+                paid_ops.append(UpdateOne(
+                    {"_id": use["_id"], f"unpaid_grants.{name}": {"$exists": True}},
+                    {"$unset": {f"unpaid_grants.{name}": ""}, "$inc": {"unpaid_count": -1}},
+                ))
+        if not viewer_ops:
+            return 0
+        await db.viewers.bulk_write(viewer_ops, ordered=False)
+        if paid_ops:
+            await db.referral_uses.bulk_write(paid_ops, ordered=False)
+        return len(viewer_ops)
+
+    # ---------- redemption ----------
+    async def redeem(self, code: str, referred_user_id: str, referred_username: str) -> Dict:
+        db = self._db()
+        await self.ensure_indexes()
+        if not self._unique_uses:
+            raise HTTPException(status_code=503, detail="Referral redemption is temporarily unavailable")
+
+        referral = await db.referrals.find_one({"code": code}, {"_id": 0, "user_id": 1, "username": 1, "is_active": 1})
+        if not referral:
+            raise HTTPException(status_code=404, detail="Invalid referral code")
+        if not referral["is_active"]:
+            raise HTTPException(status_code=400, detail="Referral code is inactive")
+        if referral["user_id"] == referred_user_id:
+            raise HTTPException(status_code=400, detail="You cannot use your own referral code")
+
+        referrer_reward = REFERRAL_REWARDS["referrer"]["signup"]
+        referred_reward = REFERRAL_REWARDS["referred"]["signup"]
+        use = {
+            "referral_code": code,
+            "referrer_id": referral["user_id"],
+            "referrer_username": referral["username"],
+            "referred_user_id": referred_user_id,
+            "referred_username": referred_username,
+            "created_at": datetime.now(),
+            "rewards_given": {
+                "referrer": referrer_reward,
+                "referred": referred_reward
+            },
+            "unpaid_grants": {
+                "signup_referrer": {"user_id": referral["user_id"], "points": referrer_reward},
+                "signup_referred": {"user_id": referred_user_id, "points": referred_reward},
+            },
+            "unpaid_count": 2,
+        }
+        try:
+            earlier = await db.referral_uses.find_one_and_update(
+                {"referred_user_id": referred_user_id},
+                {"$setOnInsert": use},
+                upsert=True,
+                projection={"_id": 0, "referred_user_id": 1},
+            )
+        except DuplicateKeyError:
+            # Lost a concurrent upsert for the same user
+            earlier = True
+        if earlier is not None:
+            self.stats["rejected"] += 1
+            return {"success": False, "message": "User already used a referral code"}
+
+        updated = await db.referrals.find_one_and_update(
+            {"code": code, "is_active": True},
+            {
+                "$inc": {"uses": 1, "total_points_earned": referrer_reward},
+                "$push": {"referred_users": referred_user_id}
+            },
+            projection={"_id": 0, "uses": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is None:
+            await db.referral_uses.delete_one({"referred_user_id": referred_user_id, "referral_code": code})
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=400, detail="Referral code is inactive")
+
+        new_uses = updated["uses"]
+        milestone_reward = REFERRAL_REWARDS["milestones"].get(new_uses)
+        milestone_ops = [self._milestone_op(code, referral["user_id"], new_uses)] if milestone_reward else []
+        stored = await db.referral_uses.find_one(
+            {"referred_user_id": referred_user_id}, {"_id": 1, "referred_user_id": 1, "referrer_id": 1, "unpaid_grants": 1}
+        )
+        try:
+            await self._pay([stored] if stored else [], milestone_ops)
+            if milestone_reward:
+                await db.referrals.update_one({"code": code}, {"$addToSet": {"milestones_awarded": new_uses}})
+        except Exception as e:
+            # The grants stay marked unpaid on the records; the sweep retries them
+            logger.error(f"❌ Referral grant payment deferred for {referred_user_id}: {e}")
+
+        self.stats["redemptions"] += 1
+        if milestone_reward:
+            self.stats["milestones"] += 1
+            logger.info(f"🎉 Milestone reached! {referral['username']} reached {new_uses} referrals!")
+
+        return {
+            "success": True,
+            "referrer_reward": referrer_reward,
+            "referred_reward": referred_reward,
+            "milestone_reached": milestone_reward is not None,
+            "milestone_reward": milestone_reward,
+            "message": f"Referral code applied! You earned {referred_reward} bonus points!"
+        }
+
+    # ---------- activity bonuses ----------
+    async def reward_activity(self, referred_user_id: str, activity_type: str) -> Dict:
+        bonus = REFERRAL_REWARDS["referrer"].get(activity_type, 0)
+        if activity_type == "signup" or bonus <= 0:
+            return {"success": True, "bonus": 0, "message": "Referrer earned 0 bonus points!"}
+
+        db = self._db()
+        bonus_key = f"bonus_{activity_type}"
+        claimed = await db.referral_uses.find_one_and_update(
+            {"referred_user_id": referred_user_id, bonus_key: {"$ne": True}},
+            {
+                "$set": {bonus_key: True, f"{bonus_key}_at": datetime.now(),
+                         f"unpaid_grants.{bonus_key}": {"points": bonus}},
+                "$inc": {"unpaid_count": 1},
+            },
+            projection={"_id": 0, "referrer_id": 1, "referrer_username": 1},
+        )
+        if claimed is None:
+            # Only the rejection path pays for a second read, to say why
+            if await db.referral_uses.find_one({"referred_user_id": referred_user_id}, {"_id": 1}):
+                return {"success": False, "message": "Bonus already claimed"}
+            return {"success": False, "message": "User was not referred"}
+
+        self.stats["bonuses_claimed"] += 1
+        logger.info(f"✅ Referral bonus: {bonus} points to {claimed['referrer_username']} for {activity_type}")
+        return {
+            "success": True,
+            "bonus": bonus,
+            "message": f"Referrer earned {bonus} bonus points!"
+        }
+
+    async def flush_bonuses(self) -> int:
+        """Pay every grant still marked unpaid in the DB; returns the number of grants written"""
+        db = self._db()
+        written = 0
+        # Bonus grants are paid here as soon as they are claimed; fresh signup grants
+        # are left to the redemption that created them for a grace period
+        fresh = datetime.now() - timedelta(seconds=REFERRAL_GRANT_GRACE_SECONDS)
+        uses = await db.referral_uses.find(
+            {"unpaid_count": {"$gt": 0}},
+            {"_id": 1, "referred_user_id": 1, "referrer_id": 1, "unpaid_grants": 1, "created_at": 1},
+        ).limit(REFERRAL_SWEEP_BATCH).to_list(length=REFERRAL_SWEEP_BATCH)
+        for use in uses:
+            if use.get("created_at") and use["created_at"] > fresh:
+                use["unpaid_grants"] = {name: grant for name, grant in (use.get("unpaid_grants") or {}).items()
+                                        if name.startswith("bonus_")}
+        written += await self._pay(uses)
+        written += await self._recover_milestones()
+        if written:
+            self.stats["bonus_flushes"] += 1
+            self.stats["bonus_writes"] += written
+        return written
+
+    async def _recover_milestones(self) -> int:
+        """Pay milestones whose redemption crashed before recording them"""
+        db = self._db()
+        recovered = 0
+        for threshold in REFERRAL_REWARDS["milestones"]:
+            missed = await db.referrals.find(
+                {"milestones_tracked": True, "uses": {"$gte": threshold},
+                 "milestones_awarded": {"$ne": threshold}},
+                {"_id": 0, "code": 1, "user_id": 1},
+            ).limit(REFERRAL_SWEEP_BATCH).to_list(length=REFERRAL_SWEEP_BATCH)
+            if not missed:
+                continue
+            await db.viewers.bulk_write(
+                [self._milestone_op(ref["code"], ref["user_id"], threshold) for ref in missed], ordered=False
+            )
+            await db.referrals.update_many(
+                {"code": {"$in": [ref["code"] for ref in missed]}}, {"$addToSet": {"milestones_awarded": threshold}}
+            )
+            recovered += len(missed)
+        self.stats["grants_recovered"] += recovered
+        return recovered
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(REFERRAL_BONUS_FLUSH_SECONDS)
+            try:
+                await self.flush_bonuses()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Referral bonus flush failed: {e}")
+
+    async def start(self, db=None):
+        if self._task is not None and not self._task.done():
+            return
+        if db is not None:
+            self.db = db
+        await self.ensure_indexes()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        try:
+            await self.flush_bonuses()
+        except Exception as e:
+            logger.warning(f"⚠️ Referral bonus final flush failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+# Global referral engine
+referral_engine = None
+
+def get_referral_engine() -> ReferralEngine:
+    """Get the global referral engine"""
+    global referral_engine
+    if referral_engine is None:
+        referral_engine = ReferralEngine()
+    return referral_engine
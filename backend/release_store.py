@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - Desktop Release Store
+Content-addressed distribution for the desktop app. Publishing a release
+splits the archive into content-defined chunks (gear rolling hash, so an edit
+early in the zip does not shift every later chunk boundary), stores each chunk
+once under its SHA-256 and writes a manifest per version/platform. Clients on
+an older version get a delta plan: which chunks they can copy from the archive
+they already have and which ones to fetch. Downloads are served with strong
+ETags and single-range (resumable) support.
+
+    python release_store.py publish dist/REMZA019-Gaming-Portable-1.1.0-Windows.zip --version 1.1.0 --platform windows
+    python release_store.py delta 1.0.0 1.1.0 --platform windows
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fast_json import etag_matches
+
+logger = logging.getLogger(__name__)
+
+RELEASES_DIR = Path(os.environ.get('RELEASES_DIR', Path(__file__).parent / 'static' / 'releases'))
+CHECKSUMS_FILE = Path(__file__).parent / 'static' / 'downloads' / 'CHECKSUMS.txt'
+
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+CHUNK_MASK = (1 << 16) - 1  # ~64 KiB average chunk
+READ_BLOCK = 64 * 1024
+
+# Fixed gear table - changing the seed changes every boundary and defeats dedup across releases
+_gear_rng = random.Random(19)
+_GEAR = tuple(_gear_rng.getrandbits(64) for _ in range(256))
+_U64 = (1 << 64) - 1
+
+
+def version_key(version: str) -> Tuple:
+    """'1.10.2' sorts after '1.9.0'; non-numeric parts sort as text"""
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in version.split("."))
+
+
+# ---------- chunking ----------
+def _cut_point(data, start: int, end: int) -> int:
+    if end - start <= MIN_CHUNK:
+        return end
+    limit = min(end, start + MAX_CHUNK)
+    gear, mask = _GEAR, CHUNK_MASK
+    h = 0
+    for i in range(start + MIN_CHUNK, limit):
+        h = ((h << 1) + gear[data[i]]) & _U64
+        if not h & mask:
+            return i + 1
+    return limit
+
+
+def iter_chunks(data) -> Iterator[Tuple[int, int]]:
+    """(offset, size) of each content-defined chunk of `data` (bytes or mmap)"""
+    offset, end = 0, len(data)
+    while offset < end:
+        cut = _cut_point(data, offset, end)
+        yield offset, cut - offset
+        offset = cut
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ---------- store ----------
+class ReleaseStore:
+    """Chunk objects, full archives and per-version manifests under RELEASES_DIR"""
+
+    def __init__(self, root: Path = RELEASES_DIR):
+        self.root = Path(root)
+        self._manifests: Dict[Tuple[str, str], Dict] = {}
+        self._manifests_mtime: Optional[float] = None
+        self._file_hashes: Dict[str, Tuple[float, int, str]] = {}
+
+    def chunk_path(self, sha256: str) -> Path:
+        return self.root / "chunks" / sha256[:2] / sha256
+
+    def artifact_path(self, sha256: str) -> Path:
+        return self.root / "artifacts" / sha256
+
+    def _manifest_path(self, version: str, platform: str) -> Path:
+        return self.root / "manifests" / f"{version}-{platform}.json"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # ---------- publishing ----------
+    def publish(self, archive: Path, version: str, platform: str, notes: str = "") -> Dict:
+        """Chunk `archive`, store new chunks and the archive itself, write the manifest"""
+        archive = Path(archive)
+        chunks: List[Dict] = []
+        new_chunks = 0
+        whole = hashlib.sha256()
+        with open(archive, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                raise ValueError(f"{archive} is empty")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset, length in iter_chunks(data):
+                    piece = data[offset:offset + length]
+                    whole.update(piece)
+                    digest = hashlib.sha256(piece).hexdigest()
+                    path = self.chunk_path(digest)
+                    if not path.exists():
+                        self._write_atomic(path, piece)
+                        new_chunks += 1
+                    chunks.append({"offset": offset, "size": length, "sha256": digest})
+
+        sha256 = whole.hexdigest()
+        artifact = self.artifact_path(sha256)
+        if not artifact.exists():
+            artifact.parent.mkdir(parents=True, exist_ok=True)
+            tmp = artifact.with_name(f".tmp-{sha256}")
+            shutil.copyfile(archive, tmp)
+            os.replace(tmp, artifact)
+
+        manifest = {
+            "version": version,
+            "platform": platform,
+            "filename": archive.name,
+            "size": size,
+            "sha256": sha256,
+            "chunking": {"algorithm": "gear-cdc", "min": MIN_CHUNK, "avg": CHUNK_MASK + 1, "max": MAX_CHUNK},
+            "chunks": chunks,
+            "notes": notes,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._write_atomic(self._manifest_path(version, platform), json.dumps(manifest, indent=1).encode())
+        self._manifests_mtime = None
+        self.write_checksums()
+        logger.info(f"📦 Published {archive.name} v{version} ({platform}): {len(chunks)} chunks, {new_chunks} new")
+        return manifest
+
+    def write_checksums(self):
+        """Regenerate static/downloads/CHECKSUMS.txt (sha256sum format) from the manifests"""
+        lines = [f"{m['sha256']}  {m['filename']}" for m in sorted(
+            self._load_manifests().values(), key=lambda m: (version_key(m["version"]), m["platform"])
+        )]
+        self._write_atomic(CHECKSUMS_FILE, ("\n".join(lines) + "\n").encode() if lines else b"")
+
+    # ---------- reads ----------
+    def _load_manifests(self) -> Dict[Tuple[str, str], Dict]:
+        directory = self.root / "manifests"
+        try:
+            mtime = directory.stat().st_mtime
+        except FileNotFoundError:
+            return {}
+        if mtime != self._manifests_mtime:
+            manifests = {}
+            for path in directory.glob("*.json"):
+                manifest = json.loads(path.read_text())
+                manifests[(manifest["version"], manifest["platform"])] = manifest
+            self._manifests, self._manifests_mtime = manifests, mtime
+        return self._manifests
+
+    def get_manifest(self, version: str, platform: str) -> Optional[Dict]:
+        return self._load_manifests().get((version, platform))
+
+    def latest(self, platform: str) -> Optional[Dict]:
+        candidates = [m for (_, p), m in self._load_manifests().items() if p == platform]
+        return max(candidates, key=lambda m: version_key(m["version"]), default=None)
+
+    def list_releases(self) -> List[Dict]:
+        return [
+            {k: m[k] for k in ("version", "platform", "filename", "size", "sha256", "published_at")}
+            for m in sorted(self._load_manifests().values(), key=lambda m: version_key(m["version"]), reverse=True)
+        ]
+
+    def delta_plan(self, current: Dict, target: Dict) -> Dict:
+        """
+        Rebuild `target` from `current`: "copy" ops read the client's existing
+        archive at source_offset, "fetch" ops download a chunk (by hash, or as a
+        byte range of the target archive). Ops are in target order.
+        """
+        have = {}
+        for chunk in current["chunks"]:
+            have.setdefault(chunk["sha256"], chunk["offset"])
+        ops = []
+        download_bytes = 0
+        for chunk in target["chunks"]:
+            source_offset = have.get(chunk["sha256"])
+            if source_offset is not None:
+                ops.append({"op": "copy", "sha256": chunk["sha256"], "size": chunk["size"],
+                            "source_offset": source_offset, "target_offset": chunk["offset"]})
+            else:
+                download_bytes += chunk["size"]
+                ops.append({"op": "fetch", "sha256": chunk["sha256"], "size": chunk["size"],
+                            "target_offset": chunk["offset"]})
+        return {
+            "from_version": current["version"],
+            "to_version": target["version"],
+            "platform": target["platform"],
+            "target_size": target["size"],
+            "target_sha256": target["sha256"],
+            "download_bytes": download_bytes,
+            "reused_bytes": target["size"] - download_bytes,
+            "fetch_chunks": sum(1 for op in ops if op["op"] == "fetch"),
+            "ops": ops,
+        }
+
+    async def cached_file_sha256(self, path: Path) -> str:
+        """SHA-256 of a loose file, recomputed only when its size/mtime change"""
+        stat = path.stat()
+        cached = self._file_hashes.get(str(path))
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        digest = await asyncio.to_thread(file_sha256, path)
+        self._file_hashes[str(path)] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+
+# ---------- ranged responses ----------
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single 'bytes=' range -> (start, end inclusive); None = serve whole file
+    (absent, malformed or invalid header - RFC 9110 says ignore it); ValueError =
+    a valid range the file can't satisfy (416)
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None  # absent, other unit or multi-range: a full 200 is always allowed
+    first, sep, last = header[6:].strip().partition("-")
+    if not sep or not (first or last) or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+    if first == "":
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("unsatisfiable suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None  # last-pos before first-pos: invalid, not unsatisfiable
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(READ_BLOCK, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def ranged_file_response(request, path: Path, etag: str, media_type: str = "application/octet-stream",
+                         filename: Optional[str] = None, immutable: bool = False):
+    """
+    File response with a strong ETag, If-None-Match/If-Range and single byte-range
+    support. `immutable` is only for content-hashed URLs: the bytes behind them can
+    never change, so clients may skip revalidation for a year.
+    """
+    from fastapi import HTTPException
+    from fastapi.responses import Response, StreamingResponse
+
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        # Manifest points at an artifact that was pruned or never uploaded
+        raise HTTPException(status_code=404, detail="File not found")
+    size = stat.st_size
+    quoted = f'"{etag}"'
+    headers = {
+        "ETag": quoted,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable" if immutable else "no-cache",
+    }
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if etag_matches(request.headers.get("if-none-match"), quoted):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    # A resumed download only gets the tail if the file is still the one it started
+    if if_range is None or if_range == quoted:
+        try:
+            byte_range = _parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_iter_file(path, 0, size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(_iter_file(path, start, end - start + 1), status_code=206,
+                             media_type=media_type, headers=headers)
+
+
+# Global release store
+release_store = ReleaseStore()
+
+def get_release_store() -> ReleaseStore:
+    """Get the global desktop release store"""
+    return release_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish desktop releases into the content-addressed store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="Chunk and publish a release archive")
+    publish.add_argument("archive")
+    publish.add_argument("--version", required=True)
+    publish.add_argument("--platform", required=True, choices=["windows", "linux", "macos"])
+    publish.add_argument("--notes", default="")
+    delta = commands.add_parser("delta", help="Show the delta plan between two published versions")
+    delta.add_argument("from_version")
+    delta.add_argument("to_version")
+    delta.add_argument("--platform", required=True)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = get_release_store()
+    if args.command == "publish":
+        manifest = store.publish(Path(args.archive), args.version, args.platform, args.notes)
+        print(json.dumps({k: v for k, v in manifest.items() if k != "chunks"}, indent=2))
+    else:
+        current = store.get_manifest(args.from_version, args.platform)
+        target = store.get_manifest(args.to_version, args.platform)
+        if not current or not target:
+            raise SystemExit("❌ Both versions must be published for this platform")
+        plan = store.delta_plan(current, target)
+        plan.pop("ops")
+        print(json.dumps(plan, indent=2))
+
+
+if __name__ == "__main__":
+    main()
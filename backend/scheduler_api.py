@@ -0,0 +1,35 @@
+"""
+REMZA019 Gaming - Job Scheduler API
+Job status, run history and manual triggers for the background scheduler
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+import logging
+from admin_api import get_current_admin
+from job_scheduler import get_job_scheduler
+
+logger = logging.getLogger(__name__)
+
+scheduler_router = APIRouter(prefix="/api/scheduler", tags=["scheduler"])
+
+@scheduler_router.get("/jobs")
+async def list_jobs(admin = Depends(get_current_admin)):
+    """Registered jobs with trigger, next run and last outcome/duration (this worker's view)"""
+    scheduler = get_job_scheduler()
+    return {"success": True, "owner": scheduler.owner, "jobs": scheduler.get_jobs()}
+
+@scheduler_router.get("/runs")
+async def list_runs(job: Optional[str] = None, limit: int = 50, admin = Depends(get_current_admin)):
+    """Recent runs across all workers, newest first"""
+    runs = await get_job_scheduler().get_runs(job=job, limit=limit)
+    return {"success": True, "runs": runs, "total": len(runs)}
+
+@scheduler_router.post("/jobs/{name}/run")
+async def run_job(name: str, admin = Depends(get_current_admin)):
+    """Run a job now (skipped if another worker currently holds its lease)"""
+    try:
+        result = await get_job_scheduler().run_job_now(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {name}")
+    logger.info(f"⏱️ Job {name} triggered manually by {admin.get('username')}")
+    return {"success": True, **result}
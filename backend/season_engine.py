@@ -0,0 +1,206 @@
+"""
+REMZA019 Gaming - Season Engine
+Seasons rank viewers by points earned during the season, not all-time points.
+At season start every viewer's points are copied into `season_baselines` with
+one $merge aggregation; a periodic refresh computes (points - baseline) in the
+database and $merges it into `season_standings`, indexed by season and
+season points. Only viewers whose `points_updated_at` moved since the last
+refresh are recomputed, so every write that changes viewer points must stamp
+it. Ending a season freezes its final top-N onto the season document, so
+current and past season pages are indexed reads.
+
+reset_season() inserts the next season before it closes the current one and
+get_active_season() reads the newest active season, so readers switch from
+one season to the next without ever seeing none. The new season records the
+season it replaces in `previous_season_id` (unique), so two concurrent resets
+cannot both start a season.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+SEASON_LENGTH_DAYS = 90
+ARCHIVE_TOP_N = 100
+STANDINGS_REFRESH_SECONDS = 60
+
+STANDINGS_PROJECTION = {"_id": 0, "user_id": 1, "username": 1, "level": 1, "season_points": 1, "total_points": 1}
+
+# Viewers created before user_id existed only carry the legacy id
+VIEWER_ID = {"$ifNull": ["$user_id", "$id"]}
+
+
+class SeasonEngine:
+    """Season baselines, season-delta standings and final snapshots"""
+
+    def __init__(self, db):
+        self.db = db
+        self._indexes_ready = False
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        await self.db.seasons.create_index("season_id", unique=True)
+        await self.db.seasons.create_index([("status", 1), ("start_date", -1)])
+        await self.db.seasons.create_index("previous_season_id", unique=True, sparse=True)
+        await self.db.season_standings.create_index([("season_id", 1), ("season_points", -1), ("_id", 1)])
+        await self.db.viewers.create_index("points_updated_at")
+        self._indexes_ready = True
+
+    async def get_active_season(self) -> Optional[Dict]:
+        # Newest wins: during a reset the next season is active before the old one is closed
+        return await self.db.seasons.find_one(
+            {"status": "active"}, {"_id": 0, "final_standings": 0}, sort=[("start_date", -1)]
+        )
+
+    # ---------- season lifecycle ----------
+    async def record_baselines(self, season_id: str):
+        """Copy every viewer's current points into season_baselines (existing baselines are kept)"""
+        await self.db.viewers.aggregate([
+            {"$project": {
+                "_id": {"$concat": [season_id, ":", VIEWER_ID]},
+                "season_id": season_id,
+                "user_id": VIEWER_ID,
+                "baseline_points": {"$ifNull": ["$points", 0]},
+            }},
+            {"$merge": {"into": "season_baselines", "on": "_id",
+                        "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+        ]).to_list(length=None)
+
+    async def start_season(self, name: Optional[str] = None, length_days: int = SEASON_LENGTH_DAYS,
+                           previous_season_id: Optional[str] = None) -> Dict:
+        """Open a season; raises DuplicateKeyError if `previous_season_id` was already replaced"""
+        await self.ensure_indexes()
+        now = datetime.now()
+        season = {
+            "season_id": str(uuid.uuid4()),
+            "name": name or f"Season {now.year}",
+            "start_date": now,
+            "end_date": now + timedelta(days=length_days),
+            "status": "active",
+            "created_at": now,
+            "standings_refreshed_at": None,
+        }
+        if previous_season_id:
+            season["previous_season_id"] = previous_season_id
+        # Baselines first: a season is only visible once its starting points are recorded
+        await self.record_baselines(season["season_id"])
+        await self.db.seasons.insert_one(season)
+        season.pop("_id", None)
+        logger.info(f"🏁 Season started: {season['name']} ({season['season_id']})")
+        return season
+
+    async def refresh_standings(self, season: Optional[Dict] = None, full: bool = False):
+        """
+        Recompute season points for viewers active since the last refresh
+        (or everyone when `full`) and $merge them into season_standings
+        """
+        season = season or await self.get_active_season()
+        if not season:
+            return
+        season_id = season["season_id"]
+        started = datetime.now()
+        since = None if full else season.get("standings_refreshed_at")
+
+        pipeline: List[Dict] = []
+        if since:
+            pipeline.append({"$match": {"points_updated_at": {"$gte": since}}})
+        pipeline += [
+            {"$addFields": {"_season_key": {"$concat": [season_id, ":", VIEWER_ID]}}},
+            {"$lookup": {"from": "season_baselines", "localField": "_season_key",
+                         "foreignField": "_id", "as": "_baseline"}},
+            {"$project": {
+                "_id": "$_season_key",
+                "season_id": season_id,
+                "user_id": VIEWER_ID,
+                "username": 1,
+                "level": 1,
+                "total_points": {"$ifNull": ["$points", 0]},
+                "season_points": {"$subtract": [
+                    {"$ifNull": ["$points", 0]},
+                    # No baseline = joined after the season started, every point counts
+                    {"$ifNull": [{"$first": "$_baseline.baseline_points"}, 0]},
+                ]},
+                "updated_at": started,
+            }},
+            {"$merge": {"into": "season_standings", "on": "_id",
+                        "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+        await self.db.viewers.aggregate(pipeline).to_list(length=None)
+        # Next refresh picks up from when this one started, so concurrent awards aren't missed
+        await self.db.seasons.update_one({"season_id": season_id}, {"$set": {"standings_refreshed_at": started}})
+
+    async def reset_season(self, name: Optional[str] = None,
+                           length_days: int = SEASON_LENGTH_DAYS) -> Tuple[Optional[Dict], Dict]:
+        """
+        Close the active season (final standings frozen) and open the next one.
+        Returns (ended season or None, new season); raises DuplicateKeyError when
+        another reset of the same season got there first.
+        """
+        await self.ensure_indexes()
+        current = await self.get_active_season()
+        final: List[Dict] = []
+        if current:
+            await self.refresh_standings(current, full=True)
+            final = await self.top_players(current["season_id"], ARCHIVE_TOP_N)
+
+        new_season = await self.start_season(
+            name, length_days, previous_season_id=current["season_id"] if current else None
+        )
+        if not current:
+            return None, new_season
+
+        ended_at = datetime.now()
+        await self.db.seasons.update_one(
+            {"season_id": current["season_id"]},
+            {"$set": {"status": "ended", "ended_at": ended_at, "final_standings": final}}
+        )
+        # Older seasons a crashed reset left active are closed too
+        await self.db.seasons.update_many(
+            {"status": "active", "start_date": {"$lt": current["start_date"]}},
+            {"$set": {"status": "ended", "ended_at": ended_at}}
+        )
+        logger.info(f"🏆 Season ended: {current['name']} ({len(final)} players archived)")
+        return {**current, "status": "ended", "final_standings": final}, new_season
+
+    # ---------- reads ----------
+    async def top_players(self, season_id: str, limit: int = 50) -> List[Dict]:
+        """Indexed read of the season leaderboard"""
+        rows = await self.db.season_standings.find(
+            {"season_id": season_id, "season_points": {"$gt": 0}}, STANDINGS_PROJECTION
+        ).sort([("season_points", -1), ("_id", 1)]).limit(limit).to_list(length=limit)
+        return [{"rank": index + 1, **row} for index, row in enumerate(rows)]
+
+    async def get_season(self, season_id: str, limit: int = 50) -> Optional[Dict]:
+        season = await self.db.seasons.find_one({"season_id": season_id}, {"_id": 0})
+        if not season:
+            return None
+        if season.get("status") == "ended" and season.get("final_standings") is not None:
+            season["top_players"] = season.pop("final_standings")[:limit]
+        else:
+            season.pop("final_standings", None)
+            season["top_players"] = await self.top_players(season_id, limit)
+        return season
+
+    async def list_seasons(self, limit: int = 20) -> List[Dict]:
+        return await self.db.seasons.find(
+            {}, {"_id": 0, "final_standings": 0}
+        ).sort("start_date", -1).limit(limit).to_list(length=limit)
+
+
+# Global season engine
+_engine: Optional[SeasonEngine] = None
+
+def get_season_engine(db=None) -> SeasonEngine:
+    """Season engine bound to the main database"""
+    global _engine
+    if _engine is None:
+        if db is None:
+            from server import get_database
+            db = get_database()
+        _engine = SeasonEngine(db)
+    return _engine
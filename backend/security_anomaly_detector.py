@@ -0,0 +1,217 @@
+"""
+REMZA019 Gaming - Streaming Security Anomaly Detector
+Fed directly from login/activity/points events instead of aggregating
+user_activity_log on every dashboard request. Per-IP and per-account
+sliding windows live in small ring buffers (O(1) per event); alerts are
+pushed to the admin WebSocket room the moment a threshold is crossed.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (events, window seconds) thresholds
+FAILED_LOGINS_PER_IP = (int(os.environ.get("SECURITY_FAILED_LOGINS_PER_IP", "10")), 300)
+FAILED_LOGINS_PER_ACCOUNT = (int(os.environ.get("SECURITY_FAILED_LOGINS_PER_ACCOUNT", "8")), 300)
+STUFFING_ACCOUNTS_PER_IP = (int(os.environ.get("SECURITY_STUFFING_ACCOUNTS_PER_IP", "5")), 600)
+POINTS_PER_ACCOUNT = (int(os.environ.get("SECURITY_POINTS_PER_ACCOUNT", "500")), 600)
+POINT_EVENTS_PER_ACCOUNT = (int(os.environ.get("SECURITY_POINT_EVENTS_PER_ACCOUNT", "60")), 600)
+
+# Same alert for the same key is not repeated within this many seconds
+ALERT_COOLDOWN_SECONDS = 600
+# Upper bound on tracked keys per counter family (least recently seen are dropped)
+MAX_TRACKED_KEYS = 50000
+RING_BUCKETS = 30
+
+
+class SlidingWindowCounter:
+    """
+    Ring of fixed time buckets covering `window` seconds. add() advances the
+    ring, expiring stale buckets from the running total - amortized O(1).
+    """
+    __slots__ = ("bucket_seconds", "counts", "epochs", "total")
+
+    def __init__(self, window: float, buckets: int = RING_BUCKETS):
+        self.bucket_seconds = window / buckets
+        self.counts = [0] * buckets
+        self.epochs = [-1] * buckets
+        self.total = 0
+
+    def add(self, now: float, amount: int = 1) -> int:
+        epoch = int(now // self.bucket_seconds)
+        slot = epoch % len(self.counts)
+        if self.epochs[slot] != epoch:
+            self.total -= self.counts[slot]
+            self.counts[slot] = 0
+            self.epochs[slot] = epoch
+        self.counts[slot] += amount
+        self.total += amount
+        return self.value(now)
+
+    def value(self, now: float) -> int:
+        oldest = int(now // self.bucket_seconds) - len(self.counts) + 1
+        for slot, epoch in enumerate(self.epochs):
+            if 0 <= epoch < oldest and self.counts[slot]:
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        return self.total
+
+
+class DistinctWindow:
+    """Distinct members seen within `window` seconds (LRU order, lazily expired)"""
+    __slots__ = ("window", "members", "limit")
+
+    def __init__(self, window: float, limit: int = 256):
+        self.window = window
+        self.members: "OrderedDict[str, float]" = OrderedDict()
+        self.limit = limit
+
+    def add(self, member: str, now: float) -> int:
+        self.members[member] = now
+        self.members.move_to_end(member)
+        cutoff = now - self.window
+        while self.members and (next(iter(self.members.values())) < cutoff or len(self.members) > self.limit):
+            self.members.popitem(last=False)
+        return len(self.members)
+
+
+class _KeyedWindows:
+    """Bounded map key -> window structure, least recently touched evicted first"""
+
+    def __init__(self, factory: Callable[[], object], max_keys: int = MAX_TRACKED_KEYS):
+        self.factory = factory
+        self.max_keys = max_keys
+        self.items: "OrderedDict[str, object]" = OrderedDict()
+
+    def get(self, key: str):
+        window = self.items.get(key)
+        if window is None:
+            window = self.factory()
+            self.items[key] = window
+            if len(self.items) > self.max_keys:
+                self.items.popitem(last=False)
+        else:
+            self.items.move_to_end(key)
+        return window
+
+    def __len__(self):
+        return len(self.items)
+
+
+class SecurityAnomalyDetector:
+    """Streaming detector for failed-login bursts, credential stuffing and point farming"""
+
+    def __init__(self):
+        self.failed_by_ip = _KeyedWindows(lambda: SlidingWindowCounter(FAILED_LOGINS_PER_IP[1]))
+        self.failed_by_account = _KeyedWindows(lambda: SlidingWindowCounter(FAILED_LOGINS_PER_ACCOUNT[1]))
+        self.accounts_by_ip = _KeyedWindows(lambda: DistinctWindow(STUFFING_ACCOUNTS_PER_IP[1]))
+        self.points_by_account = _KeyedWindows(lambda: SlidingWindowCounter(POINTS_PER_ACCOUNT[1]))
+        self.point_events_by_account = _KeyedWindows(lambda: SlidingWindowCounter(POINT_EVENTS_PER_ACCOUNT[1]))
+
+        self.recent_alerts: deque = deque(maxlen=200)
+        self._last_alert: Dict[tuple, float] = {}
+        self._pending: set = set()
+        self.db = None
+        self.stats = {"events": 0, "alerts": 0}
+
+    # ---------- events ----------
+    def record_login_failure(self, ip_address: Optional[str], account: Optional[str], scope: str = "viewer"):
+        now = time.monotonic()
+        self.stats["events"] += 1
+        ip = ip_address or "unknown"
+        account = account or "unknown"
+
+        ip_failures = self.failed_by_ip.get(ip).add(now)
+        if ip_failures >= FAILED_LOGINS_PER_IP[0]:
+            self._alert("failed_login_burst", "high", ip, now, ip_address=ip, scope=scope,
+                        attempt_count=ip_failures, window_seconds=FAILED_LOGINS_PER_IP[1])
+
+        account_failures = self.failed_by_account.get(f"{scope}:{account}").add(now)
+        if account_failures >= FAILED_LOGINS_PER_ACCOUNT[0]:
+            self._alert("account_brute_force", "high", f"{scope}:{account}", now, account=account, scope=scope,
+                        attempt_count=account_failures, window_seconds=FAILED_LOGINS_PER_ACCOUNT[1])
+
+        distinct_accounts = self.accounts_by_ip.get(ip).add(f"{scope}:{account}", now)
+        if distinct_accounts >= STUFFING_ACCOUNTS_PER_IP[0]:
+            self._alert("credential_stuffing", "critical", ip, now, ip_address=ip, scope=scope,
+                        distinct_accounts=distinct_accounts, window_seconds=STUFFING_ACCOUNTS_PER_IP[1])
+
+    def record_points(self, account: str, points: int, activity: Optional[str] = None):
+        if points <= 0:
+            return
+        now = time.monotonic()
+        self.stats["events"] += 1
+        total = self.points_by_account.get(account).add(now, points)
+        events = self.point_events_by_account.get(account).add(now)
+        if total >= POINTS_PER_ACCOUNT[0] or events >= POINT_EVENTS_PER_ACCOUNT[0]:
+            self._alert("point_farming", "medium", account, now, account=account, points=total,
+                        award_count=events, last_activity=activity, window_seconds=POINTS_PER_ACCOUNT[1])
+
+    def record_activity(self, activity_type: str, user_id: Optional[str], ip_address: Optional[str]):
+        """Hook for user_memory_system.log_user_activity"""
+        if activity_type == "failed_login":
+            self.record_login_failure(ip_address, user_id)
+
+    # ---------- alerts ----------
+    def _alert(self, alert_type: str, severity: str, key: str, now: float, **details):
+        last = self._last_alert.get((alert_type, key))
+        if last is not None and now - last < ALERT_COOLDOWN_SECONDS:
+            return
+        self._last_alert[(alert_type, key)] = now
+        if len(self._last_alert) > MAX_TRACKED_KEYS:
+            self._last_alert.pop(next(iter(self._last_alert)))
+
+        alert = {"type": alert_type, "severity": severity, "timestamp": datetime.now(timezone.utc).isoformat(), **details}
+        self.recent_alerts.appendleft(alert)
+        self.stats["alerts"] += 1
+        logger.warning(f"🚨 Security alert: {alert_type} ({key})")
+        try:
+            task = asyncio.get_running_loop().create_task(self._publish(alert))
+        except RuntimeError:
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _publish(self, alert: Dict):
+        try:
+            from websocket_manager import get_ws_manager
+            await get_ws_manager().broadcast({"type": "security_alert", "data": alert}, room="admin")
+        except Exception as e:
+            logger.warning(f"⚠️ Security alert push failed: {e}")
+        try:
+            from audit_logger import audit_log
+            audit_log.log_security_event(alert["type"], alert["severity"], alert.get("ip_address") or "n/a", alert)
+        except Exception:
+            pass
+        if self.db is not None:
+            try:
+                # Alerts are rare; stored so every worker's dashboard sees them
+                await self.db.security_alerts.insert_one({**alert, "created_at": datetime.now(timezone.utc)})
+            except Exception as e:
+                logger.warning(f"⚠️ Security alert store failed: {e}")
+
+    def get_alerts(self, limit: int = 50) -> List[Dict]:
+        return list(self.recent_alerts)[:limit]
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "tracked_ips": len(self.failed_by_ip),
+            "tracked_accounts": len(self.failed_by_account) + len(self.points_by_account),
+        }
+
+
+# Global detector instance
+_detector: Optional[SecurityAnomalyDetector] = None
+
+def get_anomaly_detector() -> SecurityAnomalyDetector:
+    """Get or create the security anomaly detector"""
+    global _detector
+    if _detector is None:
+        _detector = SecurityAnomalyDetector()
+    return _detector
@@ -60,6 +60,12 @@ class SecurityAuditor:
             feedback["issues"].append("Password contains common patterns")
             feedback["score"] -= 20
         
+        # Known common/breached password (memory-mapped Bloom filter)
+        from password_screen import get_password_screen
+        if get_password_screen().is_breached(password):
+            feedback["issues"].append("Password appears in a list of breached passwords")
+            feedback["score"] -= 50
+        
         # Determine if valid (score >= 75 and no critical issues)
         feedback["is_valid"] = feedback["score"] >= 75 and len(feedback["issues"]) == 0
         
@@ -10,10 +10,10 @@
 # - Viewer engagement system
 # - Live streaming notifications
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 import uuid
@@ -29,11 +29,22 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+# Import metrics first - the Mongo command listener must be registered
+# before any module creates its AsyncIOMotorClient
+from metrics import (
+    MetricsMiddleware, get_metrics_registry, get_loop_lag_monitor,
+    install_mongo_listener, metrics_authorized, register_queue_depth
+)
+install_mongo_listener()
+
 # Import WebSocket manager
 from websocket_manager import get_ws_manager
+from presence import get_presence_service, PRESENCE_SAMPLE_SECONDS
+from web_push import get_web_push_engine
+from referral_engine import get_referral_engine
 
 # Import admin functionality
-from admin_api import admin_router, create_default_admin
+from admin_api import admin_router, create_default_admin, get_current_admin
 from customization_api import customization_router
 # Removed: schedule_api.py (consolidated into admin_api.py and server.py)
 from multi_streamer_api import router as multistreamer_router
@@ -58,7 +69,8 @@ from notifications_api import notifications_router
 # Import viewer system functionality
 from viewer_api import viewer_router
 # Import donation system functionality
-from donation_api import donation_router
+from donation_api import donation_router, ensure_donation_indexes, get_database as get_donation_database
+from webhook_ingest import get_webhook_queue
 # Import chat system functionality
 from chat_api import chat_router
 # Import polls system functionality
@@ -112,6 +124,14 @@ except ImportError:
     
     emergent_client = MockEmergentClient()
 from youtube_api_client import get_youtube_client
+from chat_assistant import init_chat_assistant
+from live_status_service import get_live_status_service
+from license_tokens import get_license_token_service
+from job_scheduler import get_job_scheduler, IntervalTrigger, CronTrigger
+from pagination import paginate, ensure_pagination_indexes
+from fast_json import DefaultJSONResponse, get_payload_cache
+from release_store import get_release_store, ranged_file_response
+from ws_protocol import LEGACY as LEGACY_WIRE_FORMAT, receive_frame
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -135,7 +155,8 @@ app = FastAPI(
     license_info={
         "name": "Proprietary - 019Solutions",
         "url": "https://019solutions.com/license"
-    }
+    },
+    default_response_class=DefaultJSONResponse
 )
 
 
@@ -278,6 +299,20 @@ try:
 except ImportError as e:
     print(f"⚠️ Twitch API not available: {e}")
 
+try:
+    from scheduler_api import scheduler_router
+    app.include_router(scheduler_router)  # Already has /api prefix
+    print("✅ Scheduler API loaded")
+except ImportError as e:
+    print(f"⚠️ Scheduler API not available: {e}")
+
+try:
+    from live_status_api import live_status_router
+    app.include_router(live_status_router)  # Already has /api prefix
+    print("✅ Live Status API loaded")
+except ImportError as e:
+    print(f"⚠️ Live Status API not available: {e}")
+
 try:
     from auto_highlights_api import router as highlights_router
     app.include_router(highlights_router)  # Already has /api prefix
@@ -299,6 +334,20 @@ try:
 except ImportError as e:
     print(f"⚠️ Features API not available: {e}")
 
+try:
+    from site_bootstrap_api import site_bootstrap_router
+    app.include_router(site_bootstrap_router)  # Already has /api prefix
+    print("✅ Site Bootstrap API loaded")
+except ImportError as e:
+    print(f"⚠️ Site Bootstrap API not available: {e}")
+
+try:
+    from presence_api import presence_router
+    app.include_router(presence_router)  # Already has /api prefix
+    print("✅ Presence API loaded")
+except ImportError as e:
+    print(f"⚠️ Presence API not available: {e}")
+
 try:
     from email_verification_api import email_verification_router
     app.include_router(email_verification_router)  # Already has /api prefix
@@ -356,11 +405,12 @@ async def download_page():
     return FileResponse("downloads-page/index.html", media_type="text/html")
 
 @app.get("/download/{filename}")
-async def download_file(filename: str):
-    """Direct file download"""
-    file_path = f"downloads-page/{filename}"
-    if os.path.exists(file_path):
-        return FileResponse(file_path, filename=filename)
+async def download_file(filename: str, request: Request):
+    """Direct file download - strong ETag, resumable with Range"""
+    file_path = Path("downloads-page") / Path(filename).name
+    if file_path.is_file():
+        etag = await get_release_store().cached_file_sha256(file_path)
+        return ranged_file_response(request, file_path, etag, filename=file_path.name)
     raise HTTPException(status_code=404, detail="File not found")
 
 # Mount static files for downloads
@@ -368,12 +418,20 @@ app.mount("/downloads", StaticFiles(directory="static/downloads", html=True), na
 
 # Desktop app download endpoint
 @app.get("/get-desktop-app")
-async def get_desktop_app():
-    """Direct download for desktop app"""
-    file_path = "static/desktop-app.zip"
-    if os.path.exists(file_path):
-        return FileResponse(
-            file_path, 
+async def get_desktop_app(request: Request, platform: str = "windows"):
+    """Direct download for desktop app - latest published release, legacy zip as fallback"""
+    store = get_release_store()
+    latest = store.latest(platform)
+    if latest is not None:
+        return ranged_file_response(
+            request, store.artifact_path(latest["sha256"]), latest["sha256"],
+            media_type="application/zip", filename=latest["filename"]
+        )
+    file_path = Path("static/desktop-app.zip")
+    if file_path.is_file():
+        etag = await store.cached_file_sha256(file_path)
+        return ranged_file_response(
+            request, file_path, etag,
             media_type="application/zip",
             filename="REMZA019-Gaming-Desktop.zip"
         )
@@ -464,9 +522,11 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         # Handle incoming messages
         while True:
             try:
-                # Receive message from client
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                # Receive message from client (JSON text, or MessagePack binary on v2 msgpack)
+                data = await receive_frame(websocket, ws_manager.formats.get(client_id, LEGACY_WIRE_FORMAT))
+                message = json.loads(data) if isinstance(data, str) else data
+                if not isinstance(message, dict):
+                    raise ValueError("message must be an object")
                 
                 # Handle message
                 await ws_manager.handle_client_message(client_id, message)
@@ -474,8 +534,8 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             except WebSocketDisconnect:
                 logger.info(f"WebSocket client {client_id} disconnected normally")
                 break
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON from client {client_id}: {e}")
+            except ValueError as e:
+                logger.error(f"Invalid message from client {client_id}: {e}")
                 await ws_manager.send_personal_message(client_id, {
                     "type": "error",
                     "message": "Invalid JSON format"
@@ -511,8 +571,10 @@ async def websocket_admin_endpoint(websocket: WebSocket, client_id: str):
         # Handle incoming messages
         while True:
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                data = await receive_frame(websocket, ws_manager.formats.get(client_id, LEGACY_WIRE_FORMAT))
+                message = json.loads(data) if isinstance(data, str) else data
+                if not isinstance(message, dict):
+                    raise ValueError("message must be an object")
                 await ws_manager.handle_client_message(client_id, message)
                 
             except WebSocketDisconnect:
@@ -529,6 +591,21 @@ async def websocket_admin_endpoint(websocket: WebSocket, client_id: str):
         await ws_manager.disconnect(client_id)
 
 
+@app.get("/api/metrics")
+async def metrics_endpoint(authorization: Optional[str] = Header(None)):
+    """
+    Runtime metrics in Prometheus text exposition format
+    Per-route latency, MongoDB command timings, event-loop lag, WebSocket fan-out
+    Requires `Authorization: Bearer $METRICS_TOKEN` (Prometheus `authorization` scrape config)
+    """
+    if not metrics_authorized(authorization):
+        raise HTTPException(status_code=401, detail="Metrics token required", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(
+        get_metrics_registry().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/api/ws/stats")
 async def websocket_stats():
     """
@@ -545,6 +622,12 @@ async def websocket_stats():
     }
 
 
+@app.get("/api/payload-cache/stats")
+async def payload_cache_stats():
+    """Precompressed response cache hit rate and bytes sent vs uncompressed"""
+    return {"status": "success", "stats": get_payload_cache().get_stats()}
+
+
 # CORS middleware - Production-ready configuration
 # Get allowed origins from environment variable or use default
 ALLOWED_ORIGINS = os.environ.get('ALLOWED_ORIGINS', 'https://gaming-creator-pwa.preview.019solutionsagent.com,https://remza019.ch').split(',')
@@ -584,6 +667,9 @@ async def input_sanitization_middleware(request: Request, call_next):
     response = await call_next(request)
     return response
 
+# Request metrics - added last so it wraps (and times) every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Chatbot Models
 class ChatMessage(BaseModel):
     message: str
@@ -727,65 +813,30 @@ class SearchQuery(BaseModel):
     limit: int = 10
     type_filter: Optional[str] = None
 
+def _create_llm_chat(session_id: str, system_message: str):
+    """Build an LLM chat bound to one session (reused by the chat assistant)"""
+    # Get 019SOLUTIONS_LLM_KEY from environment
+    api_key = os.environ.get('019SOLUTIONS_LLM_KEY')
+    if not api_key:
+        raise HTTPException(status_code=500, detail="LLM API key not configured")
+    
+    return LlmChat(
+        api_key=api_key,
+        session_id=session_id,
+        system_message=system_message
+    ).with_model("openai", "gpt-4o-mini")
+
+chat_assistant = init_chat_assistant(_create_llm_chat, lambda text: UserMessage(text=text))
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_with_bot(chat_message: ChatMessage):
     """AI Gaming Chatbot for 019 Solutions Website"""
     try:
-        # Gaming-focused system message
-        gaming_system_message = """You are 019 Solutions Assistant, a friendly AI helper for the 019 Solutions website. 
-
-ABOUT REMZA019:
-- Serbia-based casual gamer focused on FORTNITE, Call of Duty, and Modern Warfare
-- Specializes in FORTNITE ROCKET RACING (tournament competitor)
-- Streams honest gameplay with real statistics - NO fake content or exaggerated claims
-- NOT an esports representative - just a passionate gamer
-- Timezone: CET (Central European Time)
-- YouTube Channel: @remza019
-
-STREAMING SCHEDULE (CET):
-- Monday 19:00 - FORTNITE
-- Tuesday 20:00 - COD Multiplayer  
-- Wednesday 19:30 - ROCKET RACING
-- Thursday 20:00 - MODERN WARFARE
-- Friday 19:00 - FORTNITE Weekend
-- Saturday 18:00 - ROCKET RACING Tournament
-- Sunday - REST DAY (No Stream)
-
-COMMUNITY LINKS:
-- Discord: https://discord.gg/remza019
-- YouTube: http://www.youtube.com/@remza019
-- Twitch: https://www.twitch.tv/remza019
-- Twitter/X: https://twitter.com/remza019
-
-GAMING PHILOSOPHY:
-- Real gameplay sessions only
-- Honest gaming content approach
-- Focus on improving skills, not fake highlights
-- Community-first mindset
-- Help other gamers learn and improve
-
-Answer questions about gaming, streaming schedule, community, and provide helpful gaming tips. Keep responses friendly, authentic, and gaming-focused. Always maintain the honest, no-fake-content approach that REMZA019 represents."""
-
         # Generate session ID if not provided
-        session_id = chat_message.session_id or f"gaming_chat_{int(asyncio.get_event_loop().time())}"
-        
-        # Get 019SOLUTIONS_LLM_KEY from environment
-        api_key = os.environ.get('019SOLUTIONS_LLM_KEY')
-        if not api_key:
-            raise HTTPException(status_code=500, detail="LLM API key not configured")
-        
-        # Initialize LLM Chat
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=session_id,
-            system_message=gaming_system_message
-        ).with_model("openai", "gpt-4o-mini")
+        session_id = chat_message.session_id or f"gaming_chat_{uuid.uuid4().hex[:12]}"
         
-        # Create user message
-        user_message = UserMessage(text=chat_message.message)
-        
-        # Send message and get response
-        response = await chat.send_message(user_message)
+        # Repeated questions (schedule, links, "who is REMZA019") are served from cache
+        response, _cached = await chat_assistant.answer(chat_message.message, session_id, db)
         
         return ChatResponse(
             response=response,
@@ -795,30 +846,70 @@ Answer questions about gaming, streaming schedule, community, and provide helpfu
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
-@app.get("/api/youtube/latest-videos", response_model=List[VideoInfo])
-async def get_latest_videos():
-    """Fetch latest videos from REMZA019 YouTube channel - Real YouTube API"""
+@app.post("/api/chat/stream")
+async def chat_with_bot_stream(chat_message: ChatMessage):
+    """AI Gaming Chatbot - Server-Sent Events, tokens forwarded as they arrive"""
+    session_id = chat_message.session_id or f"gaming_chat_{uuid.uuid4().hex[:12]}"
+    
+    async def token_stream():
+        cached = False
+        try:
+            async for token, cached in chat_assistant.stream(chat_message.message, session_id, db):
+                yield f"event: token\ndata: {json.dumps({'text': token})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'session_id': session_id, 'cached': cached})}\n\n"
+        except Exception as e:
+            logger.error(f"❌ Chat stream failed: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': f'Chat failed: {str(e)}'})}\n\n"
+    
+    return StreamingResponse(
+        token_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@app.get("/api/chat/assistant-stats")
+async def chat_assistant_stats(admin = Depends(get_current_admin)):
+    """Chat assistant cache/session statistics"""
+    return {"success": True, "stats": chat_assistant.get_stats()}
+
+LATEST_VIDEOS_CACHE_SECONDS = 30
+
+def _video_info_from_doc(doc: dict) -> dict:
+    """VideoInfo-shaped dict from a catalog document (trusted data, no model validation)"""
+    return {
+        "id": doc['video_id'],
+        "video_id": doc['video_id'],
+        "title": doc.get('title') or '',
+        "description": doc.get('description') or '',
+        "thumbnail_url": doc.get('thumbnail_url') or '',
+        "watch_url": doc.get('watch_url') or f"https://www.youtube.com/watch?v={doc['video_id']}",
+        "published_at": str(doc.get('published_at') or ''),
+        "view_count": str(doc.get('view_count') or '0'),
+        "duration": doc.get('duration') or 'N/A'
+    }
+
+VIDEO_LIST_PROJECTION = {
+    "_id": 0, "video_id": 1, "title": 1, "description": 1, "thumbnail_url": 1,
+    "watch_url": 1, "published_at": 1, "view_count": 1, "duration": 1
+}
+
+async def _load_latest_videos(limit: int) -> List[dict]:
     try:
-        logger.info("🎬 Fetching REAL REMZA019 videos via YouTube API...")
+        local_videos = await db.videos.find({}, VIDEO_LIST_PROJECTION).sort(
+            [("published_at", -1), ("video_id", -1)]
+        ).limit(limit).to_list(length=limit)
+        if local_videos:
+            return [_video_info_from_doc(doc) for doc in local_videos]
+        
+        logger.info("🎬 Local video catalog empty - fetching REAL REMZA019 videos via YouTube API...")
         
         # Use real YouTube API client
         youtube_client = get_youtube_client()
-        videos_data = await youtube_client.get_latest_videos(max_results=5)
-        
-        videos = []
-        for item in videos_data:
-            video_info = VideoInfo(
-                id=item['id'],
-                video_id=item['video_id'],
-                title=item['title'],
-                description=item['description'],
-                thumbnail_url=item['thumbnail_url'],
-                watch_url=item['watch_url'],
-                published_at=item['published_at'],
-                view_count=item['view_count'],
-                duration=item['duration']
-            )
-            videos.append(video_info)
+        videos_data = await youtube_client.get_latest_videos(max_results=limit)
+        videos = [_video_info_from_doc(item) for item in videos_data]
             
         logger.info(f"✅ Successfully fetched {len(videos)} REAL videos from @remza019")
         return videos
@@ -827,6 +918,31 @@ async def get_latest_videos():
         logger.error(f"❌ YouTube API failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch YouTube videos: {str(e)}")
 
+@app.get("/api/youtube/latest-videos", response_model=List[VideoInfo])
+async def get_latest_videos(request: Request, limit: int = 5):
+    """Latest REMZA019 videos - served from the synced local catalog, live YouTube API only as fallback"""
+    limit = max(1, min(limit, 50))
+    return await get_payload_cache().respond(
+        request, f"youtube:latest:{limit}", lambda: _load_latest_videos(limit), ttl=LATEST_VIDEOS_CACHE_SECONDS
+    )
+
+@app.get("/api/youtube/videos")
+async def list_catalog_videos(limit: int = 24, cursor: Optional[str] = None):
+    """Full synced video catalog, newest first - keyset paged from the local videos collection"""
+    page = await paginate(
+        db.videos,
+        sort=[("published_at", -1)],
+        tiebreaker="video_id",
+        projection=VIDEO_LIST_PROJECTION,
+        limit=limit,
+        cursor=cursor
+    )
+    return {
+        "videos": [_video_info_from_doc(doc) for doc in page["items"]],
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"]
+    }
+
 @app.get("/api/youtube/channel-stats", response_model=ChannelStats)
 async def get_channel_stats():
     """Fetch REMZA019 channel statistics - Real YouTube API"""
@@ -873,9 +989,9 @@ async def get_featured_video():
 
 # Add missing endpoints that frontend expects
 @app.get("/api/youtube/latest")
-async def get_latest_videos_alias():
+async def get_latest_videos_alias(request: Request):
     """Alias for /api/youtube/latest-videos - Frontend compatibility"""
-    return await get_latest_videos()
+    return await get_latest_videos(request)
 
 @app.get("/api/youtube/stats") 
 async def get_channel_stats_alias():
@@ -1138,6 +1254,14 @@ logger = logging.getLogger("remza019gaming")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await get_loop_lag_monitor().stop()
+    await get_live_status_service().stop()
+    await get_presence_service().stop()
+    await get_referral_engine().stop()
+    await get_license_token_service().stop()
+    await get_job_scheduler().stop()
+    await get_webhook_queue().stop()
+    await get_web_push_engine().close()
     client.close()
 
 # Email notification function
@@ -1456,6 +1580,53 @@ frontend_build_path = Path(__file__).parent.parent / "frontend" / "build"
 # Frontend is served separately by supervisor on port 3000
 logger.info("🎮 Backend API ready - Frontend served separately on port 3000")
 
+def register_scheduled_jobs():
+    """Register periodic background jobs with the job scheduler"""
+    scheduler = get_job_scheduler()
+    if scheduler.jobs:
+        return
+    
+    if os.environ.get('YOUTUBE_API_KEY'):
+        async def youtube_sync_job():
+            from youtube_sync import get_sync_manager
+            manager = await get_sync_manager()
+            await manager.run_sync_cycle()
+        scheduler.add_job("youtube_sync", youtube_sync_job, IntervalTrigger(300, jitter=30), timeout=240, run_on_start=True)
+    else:
+        logger.info("🔄 YouTube sync job not scheduled (YOUTUBE_API_KEY not set)")
+    
+    async def session_cleanup_job():
+        from session_manager import get_session_manager
+        await get_session_manager().cleanup_expired_sessions()
+    scheduler.add_job("session_cleanup", session_cleanup_job, IntervalTrigger(3600, jitter=120), timeout=120)
+    
+    async def activity_log_cleanup_job():
+        from user_memory_system import get_user_memory_system
+        await get_user_memory_system().cleanup_old_logs(days=90)
+    scheduler.add_job("activity_log_cleanup", activity_log_cleanup_job, CronTrigger("30 3 * * *", jitter=60), timeout=600)
+    
+    scheduler.add_job("scheduler_history_cleanup", scheduler.prune_run_history, CronTrigger("45 3 * * *"), timeout=120)
+    
+    from season_engine import get_season_engine, STANDINGS_REFRESH_SECONDS
+    
+    async def season_standings_job():
+        await get_season_engine().refresh_standings()
+    scheduler.add_job("season_standings", season_standings_job, IntervalTrigger(STANDINGS_REFRESH_SECONDS, jitter=10), timeout=120)
+    
+    async def season_standings_full_job():
+        # Catches point changes written without points_updated_at
+        await get_season_engine().refresh_standings(full=True)
+    scheduler.add_job("season_standings_full", season_standings_full_job, CronTrigger("15 4 * * *", jitter=60), timeout=600)
+    
+    async def presence_sample_job():
+        await get_presence_service().sample()
+    scheduler.add_job("presence_sample", presence_sample_job, IntervalTrigger(PRESENCE_SAMPLE_SECONDS), timeout=30)
+    
+    async def merch_reservation_release_job():
+        from merch_store import get_merch_store
+        await get_merch_store().release_expired()
+    scheduler.add_job("merch_reservation_release", merch_reservation_release_job, IntervalTrigger(60, jitter=10), timeout=60)
+
 # Startup event to initialize admin and sync
 @app.on_event("startup")
 async def startup_event():
@@ -1469,14 +1640,59 @@ async def startup_event():
         await initialize_default_features(db)
         logger.info("🎯 Features system initialized successfully")
         
-        # Start YouTube sync scheduler in background
-        # asyncio.create_task(start_sync_scheduler())
-        logger.info("🔄 YouTube sync scheduler disabled for testing")
+        # Keyset pagination indexes for the admin listings (built here, not on first request)
+        await ensure_pagination_indexes()
+        
+        # Periodic jobs (one run per period across all workers via Mongo leases)
+        register_scheduled_jobs()
+        get_job_scheduler().start(db)
+        
+        # Runtime metrics: event-loop lag sampling and SSE queue depths
+        get_loop_lag_monitor().start()
+        register_queue_depth("sse_pending_events", lambda: sum(q.qsize() for q in list(sse_queues.values())))
+        
+        # License revocation set for CPU-only license token checks
+        await _start_background("License revocation index", get_license_token_service().ensure_indexes)
+        await _start_background("License token service", get_license_token_service().start)
+        
+        # Payment webhook workers (events are stored in the donations database)
+        await _start_background("Donation indexes", ensure_donation_indexes)
+        await _start_background("Webhook queue", _start_webhook_queue)
+        
+        # Single live-status poller (Twitch + YouTube + admin override) with push fan-out
+        live_status = get_live_status_service()
+        await _start_background("Live status service", lambda: live_status.start(db))
+        
+        # Heartbeat presence + unique-viewer sketches (flushed per worker)
+        await _start_background("Presence service", lambda: get_presence_service().start(db))
+        
+        # Referral indexes (unique redemption per user) + batched activity bonus writes
+        await _start_background("Referral engine", lambda: get_referral_engine().start(db))
+        
+        if os.environ.get('DISCORD_BOT_IN_PROCESS', 'false').lower() == 'true':
+            try:
+                from discord_bot import start_discord_bot_in_process
+                asyncio.create_task(start_discord_bot_in_process(live_status))
+            except ImportError as e:
+                logger.warning(f"⚠️ Discord bot not available: {e}")
+        
         
     except Exception as e:
         logger.error(f"❌ Startup initialization failed: {e}")
 
+async def _start_background(name: str, start):
+    """Start one background service; a failure is logged and never keeps the others from starting"""
+    try:
+        result = start()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        logger.error(f"❌ {name} failed to start: {e}")
+
+async def _start_webhook_queue():
+    await get_webhook_queue().start(await get_donation_database())
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get('PORT', 8001))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=port, ws="websockets", ws_per_message_deflate=True)
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+REMZA019 Gaming - Site Bootstrap Bundle
+Every page load used to fetch theme, customization, about content, about tags,
+features and schedule separately, each re-reading Mongo. Here they are
+materialized into one JSON snapshot (plus a gzip copy) whose version is a hash
+of its content. The snapshot is rebuilt only after an admin write path calls
+invalidate_site_bootstrap(); the new version is then announced on the public
+WebSocket room. Requests are served from memory with a strong ETag, so a
+returning visitor costs one conditional request and no database reads.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+REBUILD_DEBOUNCE_SECONDS = 0.25  # coalesces bursts like a feature reorder into one rebuild
+# Other worker processes learn about invalidations through a generation counter in
+# Mongo, checked at most this often - never once per request
+GENERATION_CHECK_SECONDS = float(os.environ.get('SITE_BOOTSTRAP_CHECK_SECONDS', '5'))
+GZIP_MIN_BYTES = 1024
+
+
+class Snapshot:
+    """One immutable, serialized version of the bundle"""
+    __slots__ = ("version", "etag", "body", "gzip_body", "built_at")
+
+    def __init__(self, payload: Dict, built_at: str):
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+        self.version = hashlib.sha256(canonical).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        self.built_at = built_at
+        self.body = json.dumps(
+            {"version": self.version, "built_at": built_at, **payload},
+            separators=(",", ":"), default=str
+        ).encode()
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0) if len(self.body) >= GZIP_MIN_BYTES else None
+
+
+class SiteBootstrap:
+    """Materialized public site configuration, rebuilt on admin writes"""
+
+    def __init__(self):
+        self._snapshot: Optional[Snapshot] = None
+        self._dirty = True
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._generation = 0
+        self._epoch = 0  # local invalidations, so one landing mid-rebuild is not absorbed
+        self._generation_checked = 0.0
+        self.stats = {"builds": 0, "invalidations": 0, "served": 0, "not_modified": 0}
+
+    def _db(self):
+        from server import get_database
+        return get_database()
+
+    # ---------- build ----------
+    async def _collect(self) -> Dict:
+        """The same reads the individual public endpoints do, run concurrently"""
+        from theme_api import get_current_theme
+        from customization_api import get_customization
+        from admin_api import get_about_content, get_about_tags
+        from server import get_public_schedule
+
+        db = self._db()
+        theme, customization, about, tags, features, schedule = await asyncio.gather(
+            get_current_theme(),
+            get_customization(),
+            get_about_content(),
+            get_about_tags(),
+            db.features.find({"enabled": True}, {"_id": 0}).sort("order", 1).to_list(100),
+            get_public_schedule(),
+        )
+        return {
+            "theme": theme["theme"],
+            "customization": customization["data"],
+            "about": {"content": about["content"], "tags": tags["tags"]},
+            "features": features,
+            "schedule": schedule["schedule"],
+        }
+
+    async def _build(self) -> Snapshot:
+        snapshot = Snapshot(await self._collect(), datetime.now(timezone.utc).isoformat())
+        self.stats["builds"] += 1
+        return snapshot
+
+    async def get(self) -> Snapshot:
+        """Current snapshot; rebuilds (single-flight) only when invalidated"""
+        await self._check_generation()
+        if self._snapshot is not None and not self._dirty:
+            return self._snapshot
+        async with self._lock:
+            if self._snapshot is None or self._dirty:
+                previous = self._snapshot
+                self._dirty = False
+                try:
+                    self._snapshot = await self._build()
+                except Exception:
+                    self._dirty = True
+                    if previous is None:
+                        raise
+                    logger.exception("❌ Site bootstrap rebuild failed - serving previous version")
+                    return previous
+                if previous is None or previous.version != self._snapshot.version:
+                    logger.info(f"📦 Site bootstrap built: v{self._snapshot.version} ({len(self._snapshot.body)} bytes)")
+                if previous is not None and previous.version != self._snapshot.version:
+                    # Each worker process announces to its own WebSocket clients
+                    asyncio.create_task(self._announce(self._snapshot))
+        return self._snapshot
+
+    # ---------- invalidation ----------
+    async def _check_generation(self):
+        now = time.monotonic()
+        if now - self._generation_checked < GENERATION_CHECK_SECONDS:
+            return
+        self._generation_checked = now
+        try:
+            state = await self._db().site_bootstrap_state.find_one({"_id": "bundle"}, {"generation": 1})
+        except Exception as e:
+            logger.warning(f"⚠️ Site bootstrap generation check failed: {e}")
+            return
+        generation = (state or {}).get("generation", 0)
+        if generation != self._generation:
+            self._generation = generation
+            self._dirty = True
+
+    def invalidate(self, reason: str):
+        """Mark the bundle stale and schedule a debounced rebuild"""
+        self._dirty = True
+        self._epoch += 1
+        self.stats["invalidations"] += 1
+        logger.info(f"📦 Site bootstrap invalidated: {reason}")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = loop.create_task(self._rebuild(reason))
+
+    async def _rebuild(self, reason: str):
+        while True:
+            await asyncio.sleep(REBUILD_DEBOUNCE_SECONDS)
+            epoch = self._epoch
+            try:
+                result = await self._db().site_bootstrap_state.find_one_and_update(
+                    {"_id": "bundle"},
+                    {"$inc": {"generation": 1}, "$set": {"reason": reason, "updated_at": datetime.now(timezone.utc)}},
+                    upsert=True, return_document=ReturnDocument.AFTER,
+                )
+                self._generation = (result or {}).get("generation", self._generation + 1)
+                self._generation_checked = time.monotonic()
+            except Exception as e:
+                logger.warning(f"⚠️ Site bootstrap generation bump failed: {e}")
+
+            try:
+                await self.get()
+            except Exception as e:
+                logger.error(f"❌ Site bootstrap rebuild error: {e}")
+            # Another write landed while this build was reading: other workers may already
+            # hold the generation just published with a pre-write snapshot, so bump again
+            if self._epoch == epoch:
+                return
+            reason = "invalidated during rebuild"
+
+    async def _announce(self, snapshot: Snapshot):
+        try:
+            from websocket_manager import get_ws_manager
+            await get_ws_manager().broadcast({
+                "type": "site_bootstrap_version",
+                "data": {"version": snapshot.version, "built_at": snapshot.built_at},
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }, room="public")
+        except Exception as e:
+            logger.warning(f"⚠️ Site bootstrap version broadcast failed: {e}")
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            **self.stats,
+            "version": snapshot.version if snapshot else None,
+            "built_at": snapshot.built_at if snapshot else None,
+            "bytes": len(snapshot.body) if snapshot else 0,
+            "gzip_bytes": len(snapshot.gzip_body) if snapshot and snapshot.gzip_body else None,
+            "dirty": self._dirty,
+            "generation": self._generation,
+        }
+
+
+# Global site bootstrap
+site_bootstrap = SiteBootstrap()
+
+def get_site_bootstrap() -> SiteBootstrap:
+    """Get the global site bootstrap bundle"""
+    return site_bootstrap
+
+def invalidate_site_bootstrap(reason: str):
+    """Invalidate the bundle - call from admin write paths that change public site configuration"""
+    site_bootstrap.invalidate(reason)
@@ -0,0 +1,45 @@
+"""
+REMZA019 Gaming - Site Bootstrap API
+One conditional request for all public site configuration (theme, customization,
+about, features, schedule). Served from memory with a strong ETag.
+"""
+from fastapi import APIRouter, Depends, Header, Response
+from typing import Optional
+import logging
+from admin_api import get_current_admin
+from site_bootstrap import get_site_bootstrap
+from fast_json import accepted_encodings, etag_matches
+
+logger = logging.getLogger(__name__)
+
+site_bootstrap_router = APIRouter(prefix="/api/site", tags=["site"])
+
+@site_bootstrap_router.get("/bootstrap")
+async def get_site_bootstrap_bundle(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+):
+    """Versioned site bootstrap bundle - 304 when the client's ETag is current"""
+    bootstrap = get_site_bootstrap()
+    snapshot = await bootstrap.get()
+    headers = {
+        "ETag": snapshot.etag,
+        # Always revalidate; a matching ETag makes that a body-less 304
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(if_none_match, snapshot.etag):
+        bootstrap.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+
+    bootstrap.stats["served"] += 1
+    if snapshot.gzip_body is not None and accepted_encodings(accept_encoding).get("gzip", 0) > 0:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@site_bootstrap_router.get("/bootstrap/stats")
+async def get_site_bootstrap_stats(admin = Depends(get_current_admin)):
+    """Bundle version, size and build/304 counters"""
+    return get_site_bootstrap().get_stats()
@@ -4,13 +4,20 @@ Friends, DM, profiles, watch parties
 """
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime
+import asyncio
 import uuid
 import logging
 
+from pagination import paginate
+
 logger = logging.getLogger(__name__)
 
+# Public profile fields joined into friend lists and conversation lists
+PROFILE_PROJECTION = {"_id": 0, "user_id": 1, "username": 1, "level": 1, "points": 1, "last_active": 1}
+_indexes_ready = False
+
 social_router = APIRouter(prefix="/api/social", tags=["social"])
 
 def get_database():
@@ -27,6 +34,96 @@ class DirectMessage(BaseModel):
     to_user_id: str
     message: str
 
+def conversation_id(user_a: str, user_b: str) -> str:
+    """Canonical ID for the conversation between two users (order independent)"""
+    low, high = sorted([user_a, user_b])
+    return f"{low}|{high}"
+
+def _participant_index(conv_id: str, user_id: str) -> int:
+    # Unread counters are stored positionally ([low, high]) so user IDs never become field names
+    return 0 if conv_id.split("|", 1)[0] == user_id else 1
+
+DM_SUMMARY_BACKFILL_ID = "dm_summaries_backfill"
+
+# Conversation summaries for messages stored before dm_conversations existed.
+# Existing summaries (conversations active since) are kept as they are.
+_CONVERSATION_BACKFILL = [
+    {"$match": {"conversation_id": {"$exists": True}}},
+    {"$sort": {"conversation_id": 1, "created_at": -1}},
+    {"$addFields": {"_low": {"$arrayElemAt": [{"$split": ["$conversation_id", "|"]}, 0]},
+                    "_unread": {"$eq": ["$read", False]}}},
+    {"$group": {
+        "_id": "$conversation_id",
+        "last_message": {"$first": {"message_id": "$message_id", "from_user_id": "$from_user_id",
+                                    "message": {"$substrCP": ["$message", 0, 200]}}},
+        "last_message_at": {"$first": "$created_at"},
+        "unread_low": {"$sum": {"$cond": [{"$and": ["$_unread", {"$eq": ["$to_user_id", "$_low"]}]}, 1, 0]}},
+        "unread_high": {"$sum": {"$cond": [{"$and": ["$_unread", {"$ne": ["$to_user_id", "$_low"]}]}, 1, 0]}},
+    }},
+    {"$project": {
+        "participants": {"$split": ["$_id", "|"]},
+        "last_message": 1,
+        "last_message_at": 1,
+        "unread": {"0": "$unread_low", "1": "$unread_high"},
+    }},
+    {"$merge": {"into": "dm_conversations", "on": "_id", "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+]
+
+# Per-user unread totals rebuilt from the summaries, so they match what mark-read subtracts
+_UNREAD_BACKFILL = [
+    {"$unwind": {"path": "$participants", "includeArrayIndex": "slot"}},
+    {"$group": {"_id": "$participants", "total": {"$sum": {"$cond": [
+        {"$eq": ["$slot", 0]}, {"$ifNull": ["$unread.0", 0]}, {"$ifNull": ["$unread.1", 0]}
+    ]}}}},
+    {"$merge": {"into": "dm_unread", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+]
+
+async def _backfill_dm_summaries(db):
+    """One-time: conversation summaries and unread totals for messages older than those collections"""
+    if await db.sync_state.find_one({"_id": DM_SUMMARY_BACKFILL_ID}):
+        return
+    await db.direct_messages.aggregate(_CONVERSATION_BACKFILL, allowDiskUse=True).to_list(length=None)
+    await db.dm_conversations.aggregate(_UNREAD_BACKFILL, allowDiskUse=True).to_list(length=None)
+    await db.sync_state.update_one(
+        {"_id": DM_SUMMARY_BACKFILL_ID}, {"$set": {"completed_at": datetime.now()}}, upsert=True
+    )
+    logger.info("💬 Backfilled DM conversation summaries and unread counters")
+
+async def ensure_social_indexes(db):
+    """Indexes for conversation paging/unread counters; backfills pre-existing messages once"""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    await db.direct_messages.create_index([("conversation_id", 1), ("created_at", -1), ("message_id", -1)])
+    await db.direct_messages.create_index([("conversation_id", 1), ("to_user_id", 1), ("read", 1)])
+    await db.dm_conversations.create_index([("participants", 1), ("last_message_at", -1), ("_id", -1)])
+    await db.friendships.create_index("user1_id")
+    await db.friendships.create_index("user2_id")
+    try:
+        # Messages stored before conversation IDs existed
+        await db.direct_messages.update_many(
+            {"conversation_id": {"$exists": False}},
+            [{"$set": {"conversation_id": {"$concat": [
+                {"$min": ["$from_user_id", "$to_user_id"]}, "|", {"$max": ["$from_user_id", "$to_user_id"]}
+            ]}}}]
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not backfill conversation IDs: {e}")
+    try:
+        await _backfill_dm_summaries(db)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not backfill DM conversation summaries: {e}")
+        return  # retried on the next request
+    _indexes_ready = True
+
+async def get_profiles(db, user_ids: Iterable[str]) -> Dict[str, Dict]:
+    """Public profiles for many users with a single $in query"""
+    ids = list(set(user_ids))
+    if not ids:
+        return {}
+    profiles = await db.viewers.find({"user_id": {"$in": ids}}, PROFILE_PROJECTION).to_list(length=len(ids))
+    return {profile["user_id"]: profile for profile in profiles}
+
 @social_router.post("/friends/request")
 async def send_friend_request(request: FriendRequest):
     """Send a friend request"""
@@ -85,17 +182,30 @@ async def accept_friend_request(from_user_id: str, to_user_id: str):
 
 @social_router.get("/friends/{user_id}")
 async def get_friends(user_id: str):
-    """Get user's friend list"""
+    """Get user's friend list with friend profiles"""
     try:
         db = get_database()
+        await ensure_social_indexes(db)
         
-        friendships = await db.friendships.find({
-            "$or": [{"user1_id": user_id}, {"user2_id": user_id}]
-        }).to_list(length=500)
+        friendships = await db.friendships.find(
+            {"$or": [{"user1_id": user_id}, {"user2_id": user_id}]},
+            {"_id": 0}
+        ).to_list(length=500)
+        
+        friend_ids = [f["user2_id"] if f["user1_id"] == user_id else f["user1_id"] for f in friendships]
+        profiles = await get_profiles(db, friend_ids)
+        friends = [
+            {
+                "user_id": friend_id,
+                "friends_since": friendship.get("created_at"),
+                "profile": profiles.get(friend_id)
+            }
+            for friend_id, friendship in zip(friend_ids, friendships)
+        ]
         
         return {
-            "friends": friendships,
-            "count": len(friendships)
+            "friends": friends,
+            "count": len(friends)
         }
         
     except Exception as e:
@@ -107,40 +217,164 @@ async def send_direct_message(message: DirectMessage):
     """Send a direct message"""
     try:
         db = get_database()
+        await ensure_social_indexes(db)
         
-        await db.direct_messages.insert_one({
+        conv_id = conversation_id(message.from_user_id, message.to_user_id)
+        now = datetime.now()
+        document = {
             "message_id": str(uuid.uuid4()),
+            "conversation_id": conv_id,
             "from_user_id": message.from_user_id,
             "to_user_id": message.to_user_id,
             "message": message.message,
             "read": False,
-            "created_at": datetime.now()
-        })
+            "created_at": now
+        }
+        await db.direct_messages.insert_one(document)
+        
+        # Conversation summary + recipient's unread counters, maintained on write
+        recipient_slot = _participant_index(conv_id, message.to_user_id)
+        await asyncio.gather(
+            db.dm_conversations.update_one(
+                {"_id": conv_id},
+                {
+                    "$set": {
+                        "last_message": {
+                            "message_id": document["message_id"],
+                            "from_user_id": message.from_user_id,
+                            "message": message.message[:200]
+                        },
+                        "last_message_at": now
+                    },
+                    "$setOnInsert": {"participants": sorted([message.from_user_id, message.to_user_id])},
+                    "$inc": {f"unread.{recipient_slot}": 1, f"unread.{1 - recipient_slot}": 0}
+                },
+                upsert=True
+            ),
+            db.dm_unread.update_one({"_id": message.to_user_id}, {"$inc": {"total": 1}}, upsert=True)
+        )
         
-        return {"success": True, "message": "Message sent!"}
+        return {"success": True, "message": "Message sent!", "message_id": document["message_id"]}
         
     except Exception as e:
         logger.error(f"Error sending message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @social_router.get("/messages/{user_id}")
-async def get_direct_messages(user_id: str, with_user_id: str):
-    """Get DM conversation between two users"""
+async def get_direct_messages(user_id: str, with_user_id: str, limit: int = 50, before: Optional[str] = None):
+    """
+    Get DM conversation between two users, newest page first.
+    Messages within a page are oldest->newest; pass next_cursor as `before` for older ones.
+    """
     try:
         db = get_database()
+        await ensure_social_indexes(db)
         
-        messages = await db.direct_messages.find({
-            "$or": [
-                {"from_user_id": user_id, "to_user_id": with_user_id},
-                {"from_user_id": with_user_id, "to_user_id": user_id}
-            ]
-        }).sort("created_at", 1).to_list(length=500)
+        page = await paginate(
+            db.direct_messages,
+            query={"conversation_id": conversation_id(user_id, with_user_id)},
+            sort=[("created_at", -1)],
+            tiebreaker="message_id",
+            projection={"_id": 0},
+            limit=min(limit, 200),
+            cursor=before
+        )
+        messages = list(reversed(page["items"]))
         
         return {
             "messages": messages,
-            "count": len(messages)
+            "count": len(messages),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching messages: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@social_router.post("/messages/{user_id}/read")
+async def mark_conversation_read(user_id: str, with_user_id: str):
+    """Mark every message from `with_user_id` as read and reset the unread counters"""
+    try:
+        db = get_database()
+        conv_id = conversation_id(user_id, with_user_id)
+        slot = _participant_index(conv_id, user_id)
+        
+        # Atomic swap: whatever was unread at this instant is subtracted from the user total
+        previous = await db.dm_conversations.find_one_and_update(
+            {"_id": conv_id},
+            {"$set": {f"unread.{slot}": 0}},
+            projection={"unread": 1}
+        )
+        cleared = (previous or {}).get("unread", {})
+        cleared = cleared.get(str(slot), 0) if isinstance(cleared, dict) else 0
+        
+        await asyncio.gather(
+            db.direct_messages.update_many(
+                {"conversation_id": conv_id, "to_user_id": user_id, "read": False},
+                {"$set": {"read": True}}
+            ),
+            db.dm_unread.update_one({"_id": user_id}, {"$inc": {"total": -cleared}}) if cleared else asyncio.sleep(0)
+        )
+        
+        return {"success": True, "cleared": cleared}
+        
+    except Exception as e:
+        logger.error(f"Error marking messages read: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@social_router.get("/messages/{user_id}/unread")
+async def get_unread_count(user_id: str):
+    """Total unread direct messages for the user (maintained counter, no scan)"""
+    db = get_database()
+    await ensure_social_indexes(db)
+    counter = await db.dm_unread.find_one({"_id": user_id})
+    return {"user_id": user_id, "unread": max((counter or {}).get("total", 0), 0)}
+
+@social_router.get("/conversations/{user_id}")
+async def get_conversations(user_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """User's conversations, most recent activity first, with unread counts and partner profiles"""
+    try:
+        db = get_database()
+        await ensure_social_indexes(db)
+        
+        page = await paginate(
+            db.dm_conversations,
+            query={"participants": user_id},
+            sort=[("last_message_at", -1)],
+            limit=min(limit, 100),
+            cursor=cursor
+        )
+        
+        partners = {}
+        for conv in page["items"]:
+            low, high = conv["_id"].split("|", 1)
+            partners[conv["_id"]] = high if low == user_id else low
+        profiles = await get_profiles(db, partners.values())
+        
+        conversations = []
+        for conv in page["items"]:
+            unread = conv.get("unread", {})
+            slot = str(_participant_index(conv["_id"], user_id))
+            conversations.append({
+                "conversation_id": conv["_id"],
+                "with_user_id": partners[conv["_id"]],
+                "profile": profiles.get(partners[conv["_id"]]),
+                "last_message": conv.get("last_message"),
+                "last_message_at": conv.get("last_message_at"),
+                "unread": unread.get(slot, 0) if isinstance(unread, dict) else 0
+            })
+        
+        return {
+            "conversations": conversations,
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching conversations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
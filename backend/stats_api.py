@@ -231,3 +231,53 @@ async def get_engagement_rate():
     except Exception as e:
         logger.error(f"❌ Get engagement rate error: {e}")
         raise HTTPException(status_code=500, detail="Failed to get engagement rate")
+
+@stats_router.get("/concurrent-viewers")
+async def get_concurrent_viewers(hours: int = 24, room: Optional[str] = None, stream_id: Optional[str] = None):
+    """Concurrent-viewer history sampled by the presence service - PUBLIC"""
+    try:
+        from presence import get_presence_service, PRESENCE_SAMPLE_SECONDS
+        presence = get_presence_service()
+        
+        samples = await presence.history(hours=min(max(hours, 1), 24 * 30), room=room, stream_id=stream_id)
+        peak = max((sample["online"] for sample in samples), default=0)
+        
+        return {
+            "current": (await presence.online(room=room))["online"],
+            "peak": peak,
+            "sample_interval_seconds": PRESENCE_SAMPLE_SECONDS,
+            "samples": samples
+        }
+        
+    except Exception as e:
+        logger.error(f"❌ Get concurrent viewers error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get concurrent viewers")
+
+@stats_router.get("/unique-viewers")
+async def get_unique_viewers(day: Optional[str] = None, stream_id: Optional[str] = None, room: Optional[str] = None):
+    """Estimated unique viewers for a day (default today) or a stream - PUBLIC"""
+    try:
+        from presence import get_presence_service
+        return await get_presence_service().unique_viewers(day=day, stream_id=stream_id, room=room)
+        
+    except Exception as e:
+        logger.error(f"❌ Get unique viewers error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get unique viewers")
+
+@stats_router.get("/streams")
+async def get_stream_audiences(limit: int = 20):
+    """Recent streams with unique-viewer estimates - PUBLIC"""
+    try:
+        from presence import get_presence_service
+        presence = get_presence_service()
+        
+        streams = await presence.get_streams(limit=min(max(limit, 1), 100))
+        audiences = await presence.unique_viewers_by_stream([stream["stream_id"] for stream in streams])
+        for stream in streams:
+            stream["unique_viewers"] = audiences[stream["stream_id"]]
+        
+        return {"streams": streams}
+        
+    except Exception as e:
+        logger.error(f"❌ Get stream audiences error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get stream audiences")
@@ -7,16 +7,23 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import hashlib
+import hmac
 import httpx
+import json
 import os
 import logging
 
+from webhook_ingest import get_webhook_queue
+
 logger = logging.getLogger(__name__)
 
 streamlabs_router = APIRouter(prefix="/api/streamlabs", tags=["streamlabs"])
 
 # StreamLabs Configuration (in production, use real OAuth tokens)
 STREAMLABS_API_URL = "https://streamlabs.com/api/v1.0"
+# Shared secret the webhook sender puts in X-Streamlabs-Secret
+STREAMLABS_WEBHOOK_SECRET = os.environ.get("STREAMLABS_WEBHOOK_SECRET", "")
 
 # Models
 class DonationData(BaseModel):
@@ -217,7 +224,7 @@ async def get_connection_status():
             "donations": True,
             "alerts": True,
             "statistics": True,
-            "webhooks": False  # Not implemented yet
+            "webhooks": bool(STREAMLABS_WEBHOOK_SECRET)
         }
     }
 
@@ -240,17 +247,44 @@ async def sync_donations(admin = Depends(lambda: {"username": "admin"})):
         logger.error(f"❌ Sync error: {e}")
         raise HTTPException(status_code=500, detail="Failed to sync donations")
 
+async def handle_streamlabs_donation(event: Dict):
+    """Webhook worker: record each donation in the event once (keyed by StreamLabs donation ID)"""
+    from donation_api import process_successful_donation
+    
+    for donation in event["payload"].get("message", []):
+        await process_successful_donation({
+            "session_id": f"streamlabs:{donation.get('donation_id') or donation['id']}",
+            "amount": float(donation.get("amount", 0)),
+            "currency": (donation.get("currency") or "USD").lower(),
+            "package_name": "StreamLabs Donation",
+            "donor_name": donation.get("name"),
+            "donor_email": None,
+            "message": donation.get("message") or "",
+        })
+
+get_webhook_queue().register_handler("streamlabs", "donation", handle_streamlabs_donation)
+
 # Webhook endpoint (for real-time donation notifications)
 @streamlabs_router.post("/webhook/donation")
 async def receive_donation_webhook(request: Request):
-    """Receive donation webhook from StreamLabs"""
+    """Receive donation webhook from StreamLabs - stored and acknowledged, processed by the webhook queue"""
+    body = await request.body()
+    
+    if not STREAMLABS_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="StreamLabs webhook secret not configured")
+    if not hmac.compare_digest(request.headers.get("X-Streamlabs-Secret", ""), STREAMLABS_WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    
     try:
-        body = await request.body()
-        logger.info(f"📬 Donation webhook received: {body}")
-        
-        # Process webhook (validate signature, parse data, save to DB, trigger alerts)
-        return {"success": True, "message": "Webhook processed"}
-        
+        event = json.loads(body)
+        # Redeliveries carry the same event_id; fall back to the payload hash
+        event_id = event.get("event_id") or hashlib.sha256(body).hexdigest()
+        result = await get_webhook_queue().ingest("streamlabs", event_id, event.get("type", "donation"), event)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
     except Exception as e:
         logger.error(f"❌ Webhook error: {e}")
-        raise HTTPException(status_code=500, detail="Webhook processing failed")
+        raise HTTPException(status_code=503, detail="Webhook could not be stored")
+    
+    logger.info(f"📬 Donation webhook stored: {event_id}")
+    return {"success": True, "duplicate": result["duplicate"]}
@@ -11,6 +11,8 @@ import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 import uuid
 
+from dashboard_queries import Count, run_dashboard, get_dashboard_cache
+
 logger = logging.getLogger(__name__)
 
 subscription_router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
@@ -318,41 +320,33 @@ async def get_subscription_stats():
     try:
         db = get_database()
         
-        total = await db.subscriptions.count_documents({})
-        active = await db.subscriptions.count_documents({"status": "active"})
-        
-        # Count by plan
-        basic_count = await db.subscriptions.count_documents({
-            "status": "active",
-            "plan": "basic"
-        })
-        pro_count = await db.subscriptions.count_documents({
-            "status": "active",
-            "plan": "pro"
-        })
-        vip_count = await db.subscriptions.count_documents({
-            "status": "active",
-            "plan": "vip"
-        })
-        
-        # Calculate monthly revenue
-        monthly_revenue = (
-            basic_count * SUBSCRIPTION_PLANS["basic"]["price"] +
-            pro_count * SUBSCRIPTION_PLANS["pro"]["price"] +
-            vip_count * SUBSCRIPTION_PLANS["vip"]["price"]
-        )
+        async def compute():
+            # One $facet pass: totals plus active subscriptions grouped by plan
+            [counts] = await run_dashboard([(db.subscriptions, {
+                "total": Count(),
+                "active": Count({"status": "active"}),
+                "by_plan": [
+                    {"$match": {"status": "active"}},
+                    {"$group": {"_id": "$plan", "count": {"$sum": 1}}}
+                ]
+            })])
+            by_plan = {plan: 0 for plan in ("basic", "pro", "vip")}
+            for row in counts["by_plan"]:
+                if row["_id"] in by_plan:
+                    by_plan[row["_id"]] = row["count"]
+            
+            # Calculate monthly revenue
+            monthly_revenue = sum(count * SUBSCRIPTION_PLANS[plan]["price"] for plan, count in by_plan.items())
+            
+            return {
+                "total_subscriptions": counts["total"],
+                "active_subscriptions": counts["active"],
+                "by_plan": by_plan,
+                "monthly_revenue": round(monthly_revenue, 2),
+                "currency": "USD"
+            }
         
-        return {
-            "total_subscriptions": total,
-            "active_subscriptions": active,
-            "by_plan": {
-                "basic": basic_count,
-                "pro": pro_count,
-                "vip": vip_count
-            },
-            "monthly_revenue": round(monthly_revenue, 2),
-            "currency": "USD"
-        }
+        return await get_dashboard_cache().get_or_compute("subscription_stats", compute)
         
     except Exception as e:
         logger.error(f"Error fetching subscription stats: {e}")
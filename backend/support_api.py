@@ -8,6 +8,9 @@ from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+from pagination import paginate, export_response, register_pagination_index
+from admin_api import get_optional_admin
+from dashboard_queries import Count, run_dashboard, get_dashboard_cache
 
 logger = logging.getLogger(__name__)
 
@@ -148,31 +151,61 @@ async def get_ticket(ticket_id: str):
         logger.error(f"Get ticket error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+TICKET_EXPORT_FIELDS = [
+    "ticket_id", "member_email", "subject", "category", "priority", "status",
+    "created_at", "updated_at", "resolved_at"
+]
+
+register_pagination_index(support_tickets_collection, [("created_at", -1)], "ticket_id")
+
 @router.get("/tickets")
-async def list_tickets(member_email: Optional[str] = None, status: Optional[str] = None):
+async def list_tickets(
+    member_email: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    export: Optional[str] = None,
+    admin = Depends(get_optional_admin)
+):
     """
-    List support tickets (filtered by member email or status)
+    List support tickets (filtered by member email or status), newest first
+    Keyset paged via `cursor`/`next_cursor`; `export=ndjson|csv` streams every match (admin only)
     """
+    query = {}
+    
+    if member_email:
+        query['member_email'] = member_email
+    
+    if status:
+        query['status'] = status
+    
+    if export:
+        return export_response(
+            support_tickets_collection, export, "support_tickets", TICKET_EXPORT_FIELDS,
+            query=query, sort=[("created_at", -1), ("ticket_id", -1)], admin=admin
+        )
+    
     try:
-        query = {}
-        
-        if member_email:
-            query['member_email'] = member_email
-        
-        if status:
-            query['status'] = status
-        
-        tickets = await support_tickets_collection.find(
-            query,
-            {"_id": 0}
-        ).sort("created_at", -1).to_list(length=100)
+        page = await paginate(
+            support_tickets_collection,
+            query=query,
+            sort=[("created_at", -1)],
+            tiebreaker="ticket_id",
+            projection={"_id": 0},
+            limit=limit,
+            cursor=cursor
+        )
         
         return {
             "success": True,
-            "tickets": tickets,
-            "total": len(tickets)
+            "tickets": page["items"],
+            "total": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"List tickets error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -218,22 +251,24 @@ async def get_support_stats():
     Get support statistics (admin only)
     """
     try:
-        total = await support_tickets_collection.count_documents({})
-        open_tickets = await support_tickets_collection.count_documents({"status": "OPEN"})
-        in_progress = await support_tickets_collection.count_documents({"status": "IN_PROGRESS"})
-        resolved = await support_tickets_collection.count_documents({"status": "RESOLVED"})
-        closed = await support_tickets_collection.count_documents({"status": "CLOSED"})
-        
-        return {
-            "success": True,
-            "stats": {
-                "total": total,
-                "open": open_tickets,
-                "in_progress": in_progress,
-                "resolved": resolved,
-                "closed": closed
+        async def compute():
+            [counts] = await run_dashboard([(support_tickets_collection, {
+                "total": Count(),
+                "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+            })])
+            by_status = {row["_id"]: row["count"] for row in counts["by_status"]}
+            return {
+                "success": True,
+                "stats": {
+                    "total": counts["total"],
+                    "open": by_status.get("OPEN", 0),
+                    "in_progress": by_status.get("IN_PROGRESS", 0),
+                    "resolved": by_status.get("RESOLVED", 0),
+                    "closed": by_status.get("CLOSED", 0)
+                }
             }
-        }
+        
+        return await get_dashboard_cache().get_or_compute("support_stats", compute)
     
     except Exception as e:
         logger.error(f"Stats error: {e}")
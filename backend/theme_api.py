@@ -6,10 +6,12 @@ Pre-configured themes and full site customization
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import copy
 import logging
 from datetime import datetime
 
 from admin_api import get_current_admin
+from site_bootstrap import invalidate_site_bootstrap
 
 logger = logging.getLogger("theme_api")
 
@@ -200,13 +202,13 @@ async def get_current_theme():
         
         if not theme_config:
             # Return default theme
-            default_theme = PREDEFINED_THEMES["matrix_green"].copy()
+            default_theme = copy.deepcopy(PREDEFINED_THEMES["matrix_green"])
             default_theme["id"] = "matrix_green"
             logger.info("📝 Returning default theme: matrix_green")
             return {"success": True, "theme": default_theme}
         
         theme_id = theme_config.get("themeId", "matrix_green")
-        theme_data = PREDEFINED_THEMES.get(theme_id, PREDEFINED_THEMES["matrix_green"]).copy()
+        theme_data = copy.deepcopy(PREDEFINED_THEMES.get(theme_id, PREDEFINED_THEMES["matrix_green"]))
         
         # Apply custom overrides if any
         if "customColors" in theme_config and theme_config["customColors"]:
@@ -262,6 +264,7 @@ async def apply_theme(
         )
         
         logger.info(f"✅ Theme applied: {theme_id} by {admin['username']}")
+        invalidate_site_bootstrap("theme applied")
         
         # Broadcast to all clients
         from admin_api import broadcast_admin_update
@@ -312,6 +315,7 @@ async def customize_theme(
         )
         
         logger.info(f"✅ Theme customized by {admin['username']}")
+        invalidate_site_bootstrap("theme customized")
         
         # Broadcast
         from admin_api import broadcast_admin_update
@@ -332,6 +336,7 @@ async def reset_theme(admin = Depends(get_current_admin)):
         await db.theme_config.delete_one({"type": "active_theme"})
         
         logger.info(f"✅ Theme reset to default by {admin['username']}")
+        invalidate_site_bootstrap("theme reset")
         
         # Broadcast
         from admin_api import broadcast_admin_update
@@ -9,6 +9,9 @@ from datetime import datetime, timedelta
 import uuid
 import logging
 
+from pymongo.errors import DuplicateKeyError
+from season_engine import get_season_engine
+
 logger = logging.getLogger(__name__)
 
 tournament_router = APIRouter(prefix="/api/tournaments", tags=["tournaments"])
@@ -165,7 +168,7 @@ async def join_tournament(entry: TournamentEntry):
         # Deduct entry fee
         await db.viewers.update_one(
             {"user_id": entry.user_id},
-            {"$inc": {"points": -tournament["entry_fee"]}}
+            {"$inc": {"points": -tournament["entry_fee"]}, "$set": {"points_updated_at": datetime.now()}}
         )
         
         # Add participant
@@ -247,7 +250,7 @@ async def vote_prediction(vote: PredictionVote):
         # Deduct points
         await db.viewers.update_one(
             {"user_id": vote.user_id},
-            {"$inc": {"points": -vote.points_wagered}}
+            {"$inc": {"points": -vote.points_wagered}, "$set": {"points_updated_at": datetime.now()}}
         )
         
         # Record vote
@@ -315,7 +318,7 @@ async def complete_challenge(user_id: str, challenge_id: str):
         # Award points
         await db.viewers.update_one(
             {"user_id": user_id},
-            {"$inc": {"points": challenge["points_reward"]}}
+            {"$inc": {"points": challenge["points_reward"]}, "$set": {"points_updated_at": datetime.now()}}
         )
         
         # Mark as completed
@@ -338,16 +341,13 @@ async def complete_challenge(user_id: str, challenge_id: str):
 
 # SEASONS
 @tournament_router.get("/season/current")
-async def get_current_season():
+async def get_current_season(limit: int = 50):
     """
-    Get current season information and leaderboard
+    Get current season information and leaderboard (points earned this season)
     """
     try:
-        db = get_database()
-        
-        season = await db.seasons.find_one({
-            "status": "active"
-        })
+        engine = get_season_engine()
+        season = await engine.get_active_season()
         
         if not season:
             return {
@@ -355,60 +355,69 @@ async def get_current_season():
                 "message": "No active season"
             }
         
-        # Get top players
-        top_players = await db.viewers.find().sort("points", -1).limit(50).to_list(length=50)
-        
-        season["top_players"] = [
-            {
-                "rank": i + 1,
-                "username": player["username"],
-                "points": player.get("points", 0),
-                "level": player.get("level", 1)
-            }
-            for i, player in enumerate(top_players)
-        ]
+        if season.get("standings_refreshed_at") is None:
+            # First read of a new season - don't wait for the periodic refresh
+            await engine.refresh_standings(season)
         
+        season["top_players"] = await engine.top_players(season["season_id"], min(limit, 100))
         return season
         
     except Exception as e:
         logger.error(f"Error fetching current season: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@tournament_router.get("/seasons")
+async def list_seasons(limit: int = 20):
+    """
+    Past and current seasons, newest first
+    """
+    try:
+        seasons = await get_season_engine().list_seasons(min(limit, 100))
+        return {"seasons": seasons, "count": len(seasons)}
+        
+    except Exception as e:
+        logger.error(f"Error listing seasons: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@tournament_router.get("/season/{season_id}")
+async def get_season(season_id: str, limit: int = 50):
+    """
+    Season details with its leaderboard (final snapshot for ended seasons)
+    """
+    try:
+        season = await get_season_engine().get_season(season_id, min(limit, 100))
+        if not season:
+            raise HTTPException(status_code=404, detail="Season not found")
+        return season
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching season: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @tournament_router.post("/season/reset")
 async def reset_season():
     """
     End current season and start new one (admin only)
     """
     try:
-        db = get_database()
-        
-        # End current season
-        await db.seasons.update_many(
-            {"status": "active"},
-            {"$set": {"status": "ended", "ended_at": datetime.now()}}
-        )
-        
-        # Create new season
-        season_id = str(uuid.uuid4())
-        new_season = {
-            "season_id": season_id,
-            "name": f"Season {datetime.now().year}",
-            "start_date": datetime.now(),
-            "end_date": datetime.now() + timedelta(days=90),
-            "status": "active",
-            "created_at": datetime.now()
-        }
-        
-        await db.seasons.insert_one(new_season)
-        
-        # Optional: Reset viewer points or create season snapshot
+        # Ends the current season (final standings archived on its document) and
+        # opens the next one with a points baseline for every viewer
+        try:
+            ended, new_season = await get_season_engine().reset_season()
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail="Season was already reset")
         
         return {
             "success": True,
-            "season_id": season_id,
+            "season_id": new_season["season_id"],
+            "ended_season_id": ended["season_id"] if ended else None,
             "message": "New season started!"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error resetting season: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -8,6 +8,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 import logging
 from twitch_service import twitch_service
+from live_status_service import get_live_status_service
 
 logger = logging.getLogger(__name__)
 
@@ -48,9 +49,18 @@ async def get_stream_status():
     Returns stream information if live, or is_live: false if offline
     """
     try:
-        status = await twitch_service.check_if_live()
-        logger.info(f"Stream status check: {status.get('is_live', False)}")
-        return StreamStatus(**status)
+        # Memory read - the live status poller owns the Helix calls
+        twitch = get_live_status_service().get_status()["platforms"]["twitch"]
+        return StreamStatus(
+            is_live=twitch["is_live"],
+            title=twitch.get("title"),
+            game_name=twitch.get("game"),
+            viewer_count=twitch.get("viewer_count"),
+            started_at=twitch.get("started_at"),
+            thumbnail_url=twitch.get("thumbnail_url"),
+            user_name=twitch_service.channel_name if twitch["is_live"] else None,
+            error=twitch.get("error"),
+        )
     except Exception as e:
         logger.error(f"Error checking stream status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to check stream status: {str(e)}")
@@ -133,7 +143,10 @@ async def refresh_stream_status():
         twitch_service.user_id = None
         await twitch_service.get_user_id()
         
-        status = await twitch_service.check_if_live()
+        # Poll through the shared service so the cache and subscribers see the result too
+        refreshed = await get_live_status_service().refresh(force=True)
+        twitch = refreshed["platforms"]["twitch"]
+        status = {**twitch, "game_name": twitch.get("game")}
         logger.info(f"Stream status refreshed: {status.get('is_live', False)}")
         
         return {
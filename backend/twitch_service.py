@@ -21,6 +21,23 @@ class TwitchService:
         self.base_url = "https://api.twitch.tv/helix"
         self.channel_name = "remza019"
         self.user_id: Optional[str] = None
+        # One pooled session for all Helix calls (keep-alive instead of a TLS handshake per request)
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session, created lazily on the running event loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10),
+                connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300),
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the pooled HTTP session (app shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     async def get_access_token(self) -> str:
         """Obtain or refresh app access token using Client Credentials flow"""
@@ -39,19 +56,19 @@ class TwitchService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(auth_url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        self.access_token = data["access_token"]
-                        expires_in = data["expires_in"]
-                        self.token_expires_at = datetime.now() + timedelta(seconds=expires_in - 60)
-                        logger.info("✅ Twitch access token obtained successfully!")
-                        return self.access_token
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Failed to get Twitch access token: {response.status} - {error_text}")
-                        return None
+            session = self._get_session()
+            async with session.post(auth_url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    self.access_token = data["access_token"]
+                    expires_in = data["expires_in"]
+                    self.token_expires_at = datetime.now() + timedelta(seconds=expires_in - 60)
+                    logger.info("✅ Twitch access token obtained successfully!")
+                    return self.access_token
+                else:
+                    error_text = await response.text()
+                    logger.error(f"❌ Failed to get Twitch access token: {response.status} - {error_text}")
+                    return None
         except Exception as e:
             logger.error(f"❌ Twitch authentication error: {e}")
             return None
@@ -75,16 +92,16 @@ class TwitchService:
         url = f"{self.base_url}/users?login={username}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("data"):
-                            self.user_id = data["data"][0]["id"]
-                            logger.info(f"✅ Twitch user ID for {username}: {self.user_id}")
-                            return self.user_id
-                        return None
+            session = self._get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("data"):
+                        self.user_id = data["data"][0]["id"]
+                        logger.info(f"✅ Twitch user ID for {username}: {self.user_id}")
+                        return self.user_id
                     return None
+                return None
         except Exception as e:
             logger.error(f"❌ Error getting Twitch user ID: {e}")
             return None
@@ -109,25 +126,25 @@ class TwitchService:
         url = f"{self.base_url}/streams?user_id={self.user_id}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("data"):
-                            stream = data["data"][0]
-                            return {
-                                "is_live": True,
-                                "title": stream.get("title"),
-                                "game_name": stream.get("game_name"),
-                                "viewer_count": stream.get("viewer_count"),
-                                "started_at": stream.get("started_at"),
-                                "thumbnail_url": stream.get("thumbnail_url").replace("{width}", "1920").replace("{height}", "1080") if stream.get("thumbnail_url") else None,
-                                "user_name": stream.get("user_name"),
-                                "language": stream.get("language")
-                            }
-                        else:
-                            return {"is_live": False}
-                    return {"is_live": False, "error": f"HTTP {response.status}"}
+            session = self._get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("data"):
+                        stream = data["data"][0]
+                        return {
+                            "is_live": True,
+                            "title": stream.get("title"),
+                            "game_name": stream.get("game_name"),
+                            "viewer_count": stream.get("viewer_count"),
+                            "started_at": stream.get("started_at"),
+                            "thumbnail_url": stream.get("thumbnail_url").replace("{width}", "1920").replace("{height}", "1080") if stream.get("thumbnail_url") else None,
+                            "user_name": stream.get("user_name"),
+                            "language": stream.get("language")
+                        }
+                    else:
+                        return {"is_live": False}
+                return {"is_live": False, "error": f"HTTP {response.status}"}
         except Exception as e:
             logger.error(f"❌ Error checking Twitch live status: {e}")
             return {"is_live": False, "error": str(e)}
@@ -152,24 +169,24 @@ class TwitchService:
         url = f"{self.base_url}/videos?user_id={self.user_id}&type=archive&first={limit}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        vods = []
-                        for vod in data.get("data", []):
-                            vods.append({
-                                "id": vod.get("id"),
-                                "title": vod.get("title"),
-                                "created_at": vod.get("created_at"),
-                                "duration": vod.get("duration"),
-                                "view_count": vod.get("view_count"),
-                                "thumbnail_url": vod.get("thumbnail_url"),
-                                "url": vod.get("url")
-                            })
-                        logger.info(f"✅ Retrieved {len(vods)} VODs for {self.channel_name}")
-                        return vods
-                    return None
+            session = self._get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    vods = []
+                    for vod in data.get("data", []):
+                        vods.append({
+                            "id": vod.get("id"),
+                            "title": vod.get("title"),
+                            "created_at": vod.get("created_at"),
+                            "duration": vod.get("duration"),
+                            "view_count": vod.get("view_count"),
+                            "thumbnail_url": vod.get("thumbnail_url"),
+                            "url": vod.get("url")
+                        })
+                    logger.info(f"✅ Retrieved {len(vods)} VODs for {self.channel_name}")
+                    return vods
+                return None
         except Exception as e:
             logger.error(f"❌ Error fetching Twitch VODs: {e}")
             return None
@@ -194,21 +211,21 @@ class TwitchService:
         url = f"{self.base_url}/channels?broadcaster_id={self.user_id}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("data"):
-                            channel = data["data"][0]
-                            return {
-                                "broadcaster_name": channel.get("broadcaster_name"),
-                                "broadcaster_language": channel.get("broadcaster_language"),
-                                "game_name": channel.get("game_name"),
-                                "title": channel.get("title"),
-                                "delay": channel.get("delay")
-                            }
-                        return None
+            session = self._get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("data"):
+                        channel = data["data"][0]
+                        return {
+                            "broadcaster_name": channel.get("broadcaster_name"),
+                            "broadcaster_language": channel.get("broadcaster_language"),
+                            "game_name": channel.get("game_name"),
+                            "title": channel.get("title"),
+                            "delay": channel.get("delay")
+                        }
                     return None
+                return None
         except Exception as e:
             logger.error(f"❌ Error fetching Twitch channel info: {e}")
             return None
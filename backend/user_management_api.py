@@ -8,6 +8,7 @@ import logging
 
 from session_manager import require_admin_auth, get_current_user_from_cookie
 from user_memory_system import get_user_memory_system
+from pagination import register_pagination_index
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,34 @@ async def get_users_summary(admin: dict = Depends(require_admin_auth)):
         logger.error(f"Failed to get users summary: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch user summary")
 
+register_pagination_index(lambda: get_user_memory_system().db.viewers, [("created_at", -1)], "user_id")
+
+@user_mgmt_router.get("/users")
+async def list_users(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    export: Optional[str] = None,
+    admin: dict = Depends(require_admin_auth)
+):
+    """List user accounts, newest first (Admin only) - keyset paged, or streamed with export=ndjson|csv"""
+    memory_system = get_user_memory_system()
+    if export:
+        return memory_system.export_users(export, admin)
+    try:
+        page = await memory_system.list_users(limit=limit, cursor=cursor)
+        return {
+            "success": True,
+            "data": page["items"],
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to list users: {e}")
+        raise HTTPException(status_code=500, detail="Failed to list users")
+
 @user_mgmt_router.get("/users/{user_id}/memory")
 async def get_user_memory(
     user_id: str,
@@ -86,7 +115,8 @@ async def get_security_alerts(admin: dict = Depends(require_admin_auth)):
         
         return {
             "success": True,
-            "alerts": alerts
+            "alerts": alerts,
+            "detector": memory_system.detector.get_stats()
         }
         
     except Exception as e:
@@ -7,9 +7,19 @@ from typing import Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 import logging
 import os
+from pagination import paginate, export_response
+from dashboard_queries import Count, run_dashboard, get_dashboard_cache
+from security_anomaly_detector import get_anomaly_detector
 
 logger = logging.getLogger(__name__)
 
+VIEWER_EXPORT_FIELDS = [
+    "user_id", "username", "email", "email_verified", "points", "level",
+    "total_activities", "created_at", "last_active"
+]
+# Never leave the database through list/export endpoints
+VIEWER_PRIVATE_FIELDS = {"_id": 0, "verification_code": 0, "verification_expires": 0}
+
 class UserMemorySystem:
     """Enhanced memory system for tracking users and admins"""
     
@@ -17,6 +27,9 @@ class UserMemorySystem:
         self.mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
         self.client = AsyncIOMotorClient(self.mongo_url)
         self.db = self.client.test_database
+        self.detector = get_anomaly_detector()
+        if self.detector.db is None:
+            self.detector.db = self.db
     
     async def log_user_activity(
         self,
@@ -37,6 +50,8 @@ class UserMemorySystem:
             "user_agent": user_agent
         }
         
+        # Feed the streaming detector before the write so alerts don't wait on Mongo
+        self.detector.record_activity(activity_type, user_id, ip_address)
         await self.db.user_activity_log.insert_one(activity)
         logger.info(f"📝 Activity logged: {user_id} - {activity_type}")
     
@@ -137,75 +152,57 @@ class UserMemorySystem:
     async def get_all_users_summary(self) -> Dict:
         """Get summary of all users for admin dashboard"""
         
-        # Total counts
-        total_users = await self.db.viewers.count_documents({})
-        verified_users = await self.db.viewers.count_documents({"email_verified": True})
-        active_sessions = await self.db.sessions.count_documents({
-            "active": True,
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
-        
-        # Recent registrations (last 7 days)
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        recent_registrations = await self.db.viewers.count_documents({
-            "registration_date": {"$gte": seven_days_ago}
-        })
-        
-        # Top users by points
-        top_users = await self.db.viewers.find(
-            {},
-            {"_id": 0, "username": 1, "points": 1, "level": 1}
-        ).sort("points", -1).limit(10).to_list(10)
-        
-        return {
-            "total_users": total_users,
-            "verified_users": verified_users,
-            "active_sessions": active_sessions,
-            "recent_registrations": recent_registrations,
-            "top_users": top_users
-        }
+        async def compute():
+            seven_days_ago = datetime.utcnow() - timedelta(days=7)
+            # viewers and sessions are queried concurrently, one $facet pass each
+            viewers, sessions = await run_dashboard([
+                (self.db.viewers, {
+                    "total_users": Count(),
+                    "verified_users": Count({"email_verified": True}),
+                    # Recent registrations (last 7 days)
+                    "recent_registrations": Count({"registration_date": {"$gte": seven_days_ago}}),
+                    # Top users by points
+                    "top_users": [
+                        {"$sort": {"points": -1}},
+                        {"$limit": 10},
+                        {"$project": {"_id": 0, "username": 1, "points": 1, "level": 1}}
+                    ]
+                }),
+                (self.db.sessions, {
+                    "active_sessions": Count({"active": True, "expires_at": {"$gt": datetime.utcnow()}})
+                })
+            ])
+            return {**viewers, **sessions}
+        
+        return await get_dashboard_cache().get_or_compute("users_summary", compute)
+    
+    async def list_users(self, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """One keyset page of viewer accounts, newest first"""
+        return await paginate(
+            self.db.viewers,
+            sort=[("created_at", -1)],
+            tiebreaker="user_id",
+            projection=VIEWER_PRIVATE_FIELDS,
+            limit=limit,
+            cursor=cursor
+        )
+    
+    def export_users(self, export_format: str, admin: Dict):
+        """Stream every viewer account as NDJSON/CSV"""
+        return export_response(
+            self.db.viewers, export_format, "users", VIEWER_EXPORT_FIELDS,
+            sort=[("created_at", -1), ("user_id", -1)], projection=VIEWER_PRIVATE_FIELDS, admin=admin
+        )
     
-    async def get_security_alerts(self) -> List[Dict]:
-        """Get security alerts (multiple failed logins, suspicious activity)"""
-        
-        alerts = []
-        
-        # Multiple failed login attempts in last hour
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        
-        # Group by IP and count failed attempts
-        pipeline = [
-            {
-                "$match": {
-                    "activity_type": "failed_login",
-                    "timestamp": {"$gte": one_hour_ago}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$ip_address",
-                    "count": {"$sum": 1},
-                    "users": {"$addToSet": "$user_id"}
-                }
-            },
-            {
-                "$match": {"count": {"$gte": 5}}  # 5+ failed attempts
-            }
-        ]
-        
-        suspicious_ips = await self.db.user_activity_log.aggregate(pipeline).to_list(100)
-        
-        for item in suspicious_ips:
-            alerts.append({
-                "type": "multiple_failed_logins",
-                "severity": "high",
-                "ip_address": item["_id"],
-                "attempt_count": item["count"],
-                "affected_users": item["users"],
-                "timestamp": datetime.utcnow()
-            })
-        
-        return alerts
+    async def get_security_alerts(self, limit: int = 50) -> List[Dict]:
+        """Get security alerts raised by the streaming anomaly detector (newest first)"""
+        
+        # Stored alerts include those raised by other workers; fall back to this process' buffer
+        try:
+            return await self.db.security_alerts.find({}, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load stored security alerts: {e}")
+            return self.detector.get_alerts(limit)
     
     async def cleanup_old_logs(self, days: int = 90):
         """Clean up activity logs older than specified days"""
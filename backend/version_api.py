@@ -1,15 +1,21 @@
 """
 REMZA019 Gaming - Version Management API
-Simple version tracking for app updates
+Version tracking, update checks with chunk-level delta plans and
+resumable release downloads (see release_store.py)
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
 import logging
+import re
+
+from release_store import get_release_store, ranged_file_response, version_key
 
 logger = logging.getLogger("version_api")
 
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
 version_router = APIRouter(prefix="/version", tags=["version"])
 
 # Current app version
@@ -25,6 +31,11 @@ class UpdateCheckResponse(BaseModel):
     current_version: str
     latest_version: str
     message: str
+    platform: Optional[str] = None
+    download_url: Optional[str] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    delta: Optional[dict] = None
 
 @version_router.get("/current")
 async def get_current_version():
@@ -42,11 +53,79 @@ async def get_current_version():
     )
 
 @version_router.get("/check-update")
-async def check_for_updates(current_version: Optional[str] = None):
-    """Check if updates are available"""
-    return UpdateCheckResponse(
-        update_available=False,
-        current_version=current_version or CURRENT_VERSION,
-        latest_version=CURRENT_VERSION,
-        message="You are running the latest version!"
+async def check_for_updates(current_version: Optional[str] = None, platform: str = "windows", delta: bool = True):
+    """
+    Check if updates are available. When the client's version is also published
+    for its platform, the answer includes a chunk-level delta plan so only
+    changed chunks need to be downloaded.
+    """
+    current_version = current_version or CURRENT_VERSION
+    store = get_release_store()
+    latest = store.latest(platform)
+
+    if latest is None or version_key(latest["version"]) <= version_key(current_version):
+        return UpdateCheckResponse(
+            update_available=False,
+            current_version=current_version,
+            latest_version=latest["version"] if latest else CURRENT_VERSION,
+            message="You are running the latest version!",
+            platform=platform
+        )
+
+    response = UpdateCheckResponse(
+        update_available=True,
+        current_version=current_version,
+        latest_version=latest["version"],
+        message=f"Version {latest['version']} is available",
+        platform=platform,
+        download_url=f"/api/version/download/{latest['version']}/{platform}",
+        size=latest["size"],
+        sha256=latest["sha256"]
     )
+    installed = store.get_manifest(current_version, platform) if delta else None
+    if installed is not None:
+        response.delta = store.delta_plan(installed, latest)
+        logger.info(
+            f"📦 Delta {current_version} -> {latest['version']} ({platform}): "
+            f"{response.delta['download_bytes']}/{latest['size']} bytes to fetch"
+        )
+    return response
+
+@version_router.get("/releases")
+async def list_releases():
+    """Published desktop releases, newest first"""
+    return {"releases": get_release_store().list_releases()}
+
+@version_router.get("/manifest/{version}/{platform}")
+async def get_release_manifest(version: str, platform: str):
+    """Content-addressed manifest (chunk offsets, sizes and hashes) of a release"""
+    manifest = get_release_store().get_manifest(version, platform)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Release not found")
+    return manifest
+
+@version_router.get("/download/{version}/{platform}")
+async def download_release(version: str, platform: str, request: Request):
+    """
+    Full release archive - strong ETag (its SHA-256), resumable with Range/If-Range.
+    Not immutable: the URL names a version, not content, so clients revalidate
+    """
+    store = get_release_store()
+    manifest = store.get_manifest(version, platform)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Release not found")
+    return ranged_file_response(
+        request, store.artifact_path(manifest["sha256"]), manifest["sha256"],
+        media_type="application/zip" if manifest["filename"].endswith(".zip") else "application/octet-stream",
+        filename=manifest["filename"]
+    )
+
+@version_router.get("/chunks/{sha256}")
+async def download_chunk(sha256: str, request: Request):
+    """One content-addressed chunk - immutable, cacheable forever"""
+    if not SHA256_RE.match(sha256):
+        raise HTTPException(status_code=400, detail="Invalid chunk hash")
+    path = get_release_store().chunk_path(sha256)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Chunk not found")
+    return ranged_file_response(request, path, sha256, immutable=True)
@@ -16,6 +16,7 @@ import logging
 from dotenv import load_dotenv
 from pathlib import Path
 from email_service import email_service
+from security_anomaly_detector import get_anomaly_detector
 
 # Load environment variables
 load_dotenv(Path(__file__).parent / '.env')
@@ -516,6 +517,7 @@ async def award_points(user_id: str, activity: str, points: int, metadata: Dict
         }
         
         await db.activities.insert_one(activity_record)
+        get_anomaly_detector().record_points(user_id, points, activity)
         
         # Update viewer points and level
         new_points = viewer["points"] + points
@@ -535,7 +537,8 @@ async def award_points(user_id: str, activity: str, points: int, metadata: Dict
                     "points": new_points,
                     "level": new_level,
                     "unlocked_features": unlocked_features,
-                    "last_active": datetime.now()
+                    "last_active": datetime.now(),
+                    "points_updated_at": datetime.now()
                 },
                 "$inc": {"total_activities": 1}
             }
@@ -620,6 +623,7 @@ async def send_chat_message(message: ChatMessage):
         }
         
         await db.chat_messages.insert_one(chat_message)
+        chat_message.pop("_id", None)
         
         # Award points for chatting
         await award_points(message.user_id, "chat_message", 2)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - Web Push Delivery Engine
+Sends browser push messages (RFC 8030) with VAPID authentication (RFC 8292)
+and aes128gcm payload encryption (RFC 8291 / RFC 8188), implemented directly
+on `cryptography`.
+
+A batch send works as a pipeline:
+  - encryption runs on a process pool, in chunks of WEB_PUSH_CHUNK_SIZE
+    (one ephemeral ECDH + AES-GCM per subscription is the CPU cost)
+  - a VAPID JWT is signed once per push-service origin and reused until
+    close to expiry, not once per message
+  - delivery uses one shared httpx client (HTTP/2 when `h2` is installed,
+    so each push service gets one multiplexed connection) from a fixed pool
+    of WEB_PUSH_SEND_WORKERS senders, with a concurrency cap per origin
+  - 404/410 responses are collected and pruned from Mongo in one update;
+    429/5xx are retried honouring Retry-After
+
+Keys:
+    python web_push.py generate-vapid    # prints VAPID_PRIVATE_KEY / VAPID_PUBLIC_KEY
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+VAPID_PRIVATE_KEY = os.environ.get("VAPID_PRIVATE_KEY", "")
+VAPID_SUBJECT = os.environ.get("VAPID_SUBJECT", "mailto:admin@remza019.gaming")
+
+WEB_PUSH_CRYPTO_WORKERS = int(os.environ.get("WEB_PUSH_CRYPTO_WORKERS", str(min(os.cpu_count() or 1, 8))))
+WEB_PUSH_CHUNK_SIZE = int(os.environ.get("WEB_PUSH_CHUNK_SIZE", "250"))
+WEB_PUSH_PER_ORIGIN_CONCURRENCY = int(os.environ.get("WEB_PUSH_PER_ORIGIN_CONCURRENCY", "200"))
+WEB_PUSH_SEND_WORKERS = int(os.environ.get("WEB_PUSH_SEND_WORKERS", "400"))  # requests in flight per batch
+WEB_PUSH_TIMEOUT_SECONDS = float(os.environ.get("WEB_PUSH_TIMEOUT_SECONDS", "10"))
+WEB_PUSH_MAX_RETRIES = 2
+WEB_PUSH_DEFAULT_TTL = 3600
+
+# Browser push services (FCM, Mozilla autopush, Apple, WNS) - subscriptions may only point here;
+# subdomains match too (web.push.apple.com, wns2-*.notify.windows.com)
+PUSH_SERVICE_HOSTS = (
+    "fcm.googleapis.com",
+    "android.googleapis.com",
+    "updates.push.services.mozilla.com",
+    "push.apple.com",
+    "notify.windows.com",
+) + tuple(host.strip().lower() for host in os.environ.get("WEB_PUSH_ALLOWED_HOSTS", "").split(",") if host.strip())
+
+VAPID_TOKEN_LIFETIME = 12 * 3600
+VAPID_TOKEN_REFRESH_MARGIN = 3600
+RECORD_SIZE = 4096
+# 4096 record - 16 tag - 1 delimiter - 86 header; push services cap bodies at 4 KB
+MAX_PAYLOAD_BYTES = 3993
+
+
+def b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def is_push_endpoint_allowed(endpoint: str) -> bool:
+    """True for https URLs on a known push service (the server POSTs to whatever is stored)"""
+    try:
+        parts = urlsplit(endpoint)
+        port = parts.port
+    except ValueError:
+        return False
+    host = (parts.hostname or "").lower()
+    if parts.scheme != "https" or parts.username or parts.password or port not in (None, 443):
+        return False
+    return any(host == allowed or host.endswith("." + allowed) for allowed in PUSH_SERVICE_HOSTS)
+
+
+def _hkdf_expand_one(prk: bytes, info: bytes, length: int) -> bytes:
+    # HKDF-Expand with a single block (length <= 32)
+    return hmac.new(prk, info + b"\x01", hashlib.sha256).digest()[:length]
+
+
+# ============== PAYLOAD ENCRYPTION (RFC 8291) ==============
+def encrypt_payload(payload: bytes, p256dh: str, auth: str, salt: Optional[bytes] = None) -> bytes:
+    """aes128gcm-encrypt `payload` for one subscription; returns the full request body"""
+    if len(payload) > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"Push payload too large ({len(payload)} > {MAX_PAYLOAD_BYTES} bytes)")
+    ua_public = b64url_decode(p256dh)
+    auth_secret = b64url_decode(auth)
+    salt = salt or os.urandom(16)
+
+    as_private = ec.generate_private_key(ec.SECP256R1())
+    as_public = as_private.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    ua_key = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256R1(), ua_public)
+    ecdh_secret = as_private.exchange(ec.ECDH(), ua_key)
+
+    prk_key = hmac.new(auth_secret, ecdh_secret, hashlib.sha256).digest()
+    ikm = _hkdf_expand_one(prk_key, b"WebPush: info\x00" + ua_public + as_public, 32)
+    prk = hmac.new(salt, ikm, hashlib.sha256).digest()
+    cek = _hkdf_expand_one(prk, b"Content-Encoding: aes128gcm\x00", 16)
+    nonce = _hkdf_expand_one(prk, b"Content-Encoding: nonce\x00", 12)
+
+    # Single record: payload + 0x02 (last-record delimiter)
+    ciphertext = AESGCM(cek).encrypt(nonce, payload + b"\x02", None)
+    header = salt + struct.pack("!IB", RECORD_SIZE, len(as_public)) + as_public
+    return header + ciphertext
+
+
+def _encrypt_chunk(payload: bytes, subscriptions: List[Tuple[str, str, str]]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """Process-pool task: [(endpoint, p256dh, auth)] -> [(endpoint, body | None, error | None)]"""
+    results = []
+    for endpoint, p256dh, auth in subscriptions:
+        try:
+            results.append((endpoint, encrypt_payload(payload, p256dh, auth), None))
+        except Exception as e:
+            results.append((endpoint, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+# ============== VAPID (RFC 8292) ==============
+class VapidSigner:
+    """ES256 JWTs for the push service's origin, cached until close to expiry"""
+
+    def __init__(self, private_key: str = VAPID_PRIVATE_KEY, subject: str = VAPID_SUBJECT):
+        self.subject = subject
+        self._key = self._load_key(private_key) if private_key else None
+        self.public_key = b64url_encode(self._key.public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+        )) if self._key else None
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self.signatures = 0
+
+    @staticmethod
+    def _load_key(value: str):
+        if "BEGIN" in value:
+            return serialization.load_pem_private_key(value.encode(), password=None)
+        # Raw 32-byte private scalar, base64url (the format generate-vapid prints)
+        return ec.derive_private_key(int.from_bytes(b64url_decode(value), "big"), ec.SECP256R1())
+
+    @property
+    def configured(self) -> bool:
+        return self._key is not None
+
+    def authorization(self, endpoint: str) -> str:
+        parts = urlsplit(endpoint)
+        audience = f"{parts.scheme}://{parts.netloc}"
+        token, expires = self._tokens.get(audience, (None, 0.0))
+        now = time.time()
+        if token is None or expires - now < VAPID_TOKEN_REFRESH_MARGIN:
+            expires = now + VAPID_TOKEN_LIFETIME
+            token = self._sign({"aud": audience, "exp": int(expires), "sub": self.subject})
+            self._tokens[audience] = (token, expires)
+        return f"vapid t={token}, k={self.public_key}"
+
+    def _sign(self, claims: Dict) -> str:
+        header = b64url_encode(json.dumps({"typ": "JWT", "alg": "ES256"}, separators=(",", ":")).encode())
+        body = b64url_encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{header}.{body}".encode()
+        r, s = decode_dss_signature(self._key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+        self.signatures += 1
+        return f"{header}.{body}.{b64url_encode(r.to_bytes(32, 'big') + s.to_bytes(32, 'big'))}"
+
+
+def generate_vapid_keys() -> Dict[str, str]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    private = key.private_numbers().private_value.to_bytes(32, "big")
+    public = key.public_key().public_bytes(serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+    return {"VAPID_PRIVATE_KEY": b64url_encode(private), "VAPID_PUBLIC_KEY": b64url_encode(public)}
+
+
+# ============== DELIVERY ==============
+class DeliveryReport:
+    def __init__(self, total: int):
+        self.total = total
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.gone: List[str] = []
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def error(self, reason: str):
+        self.failed += 1
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "delivered": self.delivered,
+            "gone": len(self.gone),
+            "failed": self.failed,
+            "retried": self.retried,
+            "errors": self.errors,
+            "duration_s": round(self.duration, 3),
+            "per_second": round(self.total / self.duration, 1) if self.duration else 0.0,
+        }
+
+
+class WebPushEngine:
+    """Batch Web Push sender: pooled encryption, per-origin concurrency, bulk pruning"""
+
+    def __init__(self, signer: Optional[VapidSigner] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 crypto_workers: int = WEB_PUSH_CRYPTO_WORKERS, per_origin: int = WEB_PUSH_PER_ORIGIN_CONCURRENCY,
+                 send_workers: int = WEB_PUSH_SEND_WORKERS):
+        self.signer = signer or VapidSigner()
+        self.crypto_workers = crypto_workers
+        self.per_origin = per_origin
+        self.send_workers = send_workers
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._origin_limits: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"batches": 0, "sent": 0, "delivered": 0, "gone": 0, "failed": 0, "pruned": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.signer.configured
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                http2=HTTP2_AVAILABLE and self._transport is None,
+                timeout=WEB_PUSH_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=100),
+            )
+        return self._client
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.crypto_workers <= 0:
+            return None
+        if self._pool is None:
+            # spawn, not fork: forking a process that runs an event loop, Motor's threads
+            # and open sockets copies their locks and descriptors into the workers
+            self._pool = ProcessPoolExecutor(max_workers=self.crypto_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def _encrypted_chunks(self, payload: bytes, subscriptions: List[Tuple[str, str, str]], out: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        chunks = [subscriptions[i:i + WEB_PUSH_CHUNK_SIZE] for i in range(0, len(subscriptions), WEB_PUSH_CHUNK_SIZE)]
+        # All chunks are submitted at once; the pool works through them while earlier ones are delivered
+        futures = [loop.run_in_executor(executor, _encrypt_chunk, payload, chunk) for chunk in chunks]
+        for future in asyncio.as_completed(futures):
+            for item in await future:
+                await out.put(item)
+        await out.put(None)
+
+    def _origin_limit(self, endpoint: str) -> asyncio.Semaphore:
+        origin = urlsplit(endpoint).netloc
+        limit = self._origin_limits.get(origin)
+        if limit is None:
+            limit = self._origin_limits[origin] = asyncio.Semaphore(self.per_origin)
+        return limit
+
+    async def _deliver(self, endpoint: str, body: bytes, ttl: int, urgency: str,
+                       topic: Optional[str], report: DeliveryReport):
+        headers = {
+            "Content-Encoding": "aes128gcm",
+            "Content-Type": "application/octet-stream",
+            "TTL": str(ttl),
+            "Urgency": urgency,
+        }
+        if topic:
+            headers["Topic"] = topic
+        for attempt in range(WEB_PUSH_MAX_RETRIES + 1):
+            # The origin slot is held for the request only, never across the backoff sleep
+            async with self._origin_limit(endpoint):
+                headers["Authorization"] = self.signer.authorization(endpoint)
+                try:
+                    response = await self._http().post(endpoint, content=body, headers=headers)
+                except httpx.HTTPError as e:
+                    if attempt == WEB_PUSH_MAX_RETRIES:
+                        report.error(type(e).__name__)
+                        return
+                    delay = 0.5 * (attempt + 1)
+                else:
+                    status = response.status_code
+                    if status in (200, 201, 202):
+                        report.delivered += 1
+                        return
+                    if status in (404, 410):
+                        report.gone.append(endpoint)
+                        return
+                    if not (status == 429 or status >= 500) or attempt == WEB_PUSH_MAX_RETRIES:
+                        report.error(f"http_{status}")
+                        return
+                    delay = _retry_after(response, attempt)
+            report.retried += 1
+            await asyncio.sleep(delay)
+
+    async def _send_worker(self, queue: asyncio.Queue, ttl: int, urgency: str,
+                           topic: Optional[str], report: DeliveryReport):
+        while True:
+            item = await queue.get()
+            if item is None:
+                # Pass the end-of-batch marker on to the next worker
+                await queue.put(None)
+                return
+            endpoint, body, error = item
+            if body is None:
+                report.error(f"encrypt: {error}")
+                continue
+            await self._deliver(endpoint, body, ttl, urgency, topic, report)
+
+    async def send_batch(self, subscriptions: List[Dict], message: Dict, ttl: int = WEB_PUSH_DEFAULT_TTL,
+                         urgency: str = "normal", topic: Optional[str] = None, db=None) -> Dict:
+        """
+        Push `message` (JSON) to every subscription ({"endpoint", "keys": {"p256dh", "auth"}}).
+        Expired subscriptions are pruned from db.subscribers when `db` is given.
+        """
+        payload = json.dumps(message, separators=(",", ":")).encode()
+        prepared = []
+        for subscription in subscriptions:
+            keys = subscription.get("keys") or {}
+            if subscription.get("endpoint") and keys.get("p256dh") and keys.get("auth"):
+                prepared.append((subscription["endpoint"], keys["p256dh"], keys["auth"]))
+        report = DeliveryReport(len(prepared))
+        if not self.enabled:
+            logger.warning("⚠️ Web Push disabled (VAPID_PRIVATE_KEY not set)")
+            report.errors["vapid_not_configured"] = len(prepared)
+            report.failed = len(prepared)
+            return report.to_dict()
+
+        # A fixed pool of senders drains the queue, so at most send_workers requests are
+        # in flight and the bounded queue holds back encryption when delivery is slower
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WEB_PUSH_CHUNK_SIZE * 4)
+        producer = asyncio.create_task(self._encrypted_chunks(payload, prepared, queue))
+        workers = [asyncio.create_task(self._send_worker(queue, ttl, urgency, topic, report))
+                   for _ in range(max(1, min(self.send_workers, len(prepared))))]
+        try:
+            await asyncio.gather(producer, *workers)
+        except BaseException:
+            for task in (producer, *workers):
+                task.cancel()
+            raise
+        report.duration = time.perf_counter() - report.started
+
+        if report.gone and db is not None:
+            self.stats["pruned"] += await prune_subscriptions(db, report.gone)
+
+        self.stats["batches"] += 1
+        self.stats["sent"] += report.total
+        self.stats["delivered"] += report.delivered
+        self.stats["gone"] += len(report.gone)
+        self.stats["failed"] += report.failed
+        result = report.to_dict()
+        logger.info(f"📲 Web Push batch: {result['delivered']}/{result['total']} delivered, "
+                    f"{result['gone']} gone, {result['failed']} failed in {result['duration_s']}s")
+        return result
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "http2": HTTP2_AVAILABLE,
+            "crypto_workers": self.crypto_workers,
+            "per_origin_concurrency": self.per_origin,
+            "send_workers": self.send_workers,
+            "vapid_signatures": self.signer.signatures,
+        }
+
+
+def _retry_after(response: httpx.Response, attempt: int) -> float:
+    try:
+        return min(float(response.headers.get("retry-after", "")), 30.0)
+    except ValueError:
+        return 0.5 * (attempt + 1)
+
+
+async def prune_subscriptions(db, endpoints: List[str]) -> int:
+    """Drop push endpoints the push service reported as gone - one update for the whole batch"""
+    result = await db.subscribers.update_many(
+        {"push_endpoint": {"$in": endpoints}},
+        {"$unset": {"push_endpoint": "", "push_keys": ""}, "$set": {"preferences.push_notifications": False}},
+    )
+    if result.modified_count:
+        logger.info(f"🧹 Pruned {result.modified_count} expired push subscriptions")
+    return result.modified_count
+
+
+# Global Web Push engine
+web_push_engine = None
+
+def get_web_push_engine() -> WebPushEngine:
+    """Get the global Web Push engine"""
+    global web_push_engine
+    if web_push_engine is None:
+        web_push_engine = WebPushEngine()
+    return web_push_engine
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["generate-vapid"]:
+        for name, value in generate_vapid_keys().items():
+            print(f"{name}={value}")
+    else:
+        print("usage: python web_push.py generate-vapid")
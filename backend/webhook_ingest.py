@@ -0,0 +1,236 @@
+"""
+REMZA019 Gaming - Webhook Ingestion Queue
+Payment webhooks are persisted raw (unique per provider event ID) and
+acknowledged immediately; a small worker pool claims stored events with a
+lease and runs the provider handler. Duplicate deliveries are absorbed by
+the unique index, failed events are retried with backoff and end up in the
+dead letter state after MAX_ATTEMPTS. Handlers key their side effects by
+event/session so a retried event applies them once.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from metrics import WEBHOOK_EVENTS_TOTAL, register_queue_depth
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = int(os.environ.get('WEBHOOK_WORKERS', '4'))
+MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', '6'))
+LEASE_SECONDS = 120
+IDLE_POLL_SECONDS = 15  # picks up retries and events ingested by other workers
+RETRY_BASE_SECONDS = 10
+
+Handler = Callable[[Dict], Awaitable[None]]
+
+
+class WebhookIngestQueue:
+    """Durable webhook inbox in Mongo (`webhook_events`) with an in-process worker pool"""
+
+    def __init__(self, workers: int = WORKER_COUNT):
+        self.db = None
+        self.workers = workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.handlers: Dict[str, Dict[str, Handler]] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._indexes_ready = False
+        self.in_flight = 0
+        self.stats = {"accepted": 0, "duplicate": 0, "processed": 0, "retried": 0, "dead": 0}
+
+    # ---------- registration ----------
+    def register_handler(self, provider: str, event_type: str, handler: Handler):
+        """Handler for a provider event type ("*" matches any type without its own handler)"""
+        self.handlers.setdefault(provider, {})[event_type] = handler
+
+    def _handler_for(self, provider: str, event_type: str) -> Optional[Handler]:
+        handlers = self.handlers.get(provider, {})
+        return handlers.get(event_type) or handlers.get("*")
+
+    @property
+    def collection(self):
+        return self.db.webhook_events
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        # _id is "<provider>:<event_id>", which already makes ingestion idempotent
+        await self.collection.create_index([("status", 1), ("next_attempt_at", 1)])
+        await self.collection.create_index([("status", 1), ("lease_until", 1)])
+        self._indexes_ready = True
+
+    # ---------- ingestion ----------
+    async def ingest(self, provider: str, event_id: str, event_type: str, payload: Dict,
+                     headers: Optional[Dict] = None) -> Dict:
+        """Persist a verified webhook event; returns {"event_id", "duplicate"}"""
+        if self.db is None:
+            raise RuntimeError("Webhook queue not started")
+        now = datetime.now(timezone.utc)
+        document = {
+            "_id": f"{provider}:{event_id}",
+            "provider": provider,
+            "event_id": event_id,
+            "event_type": event_type,
+            "payload": payload,
+            "headers": headers or {},
+            "status": "pending",
+            "attempts": 0,
+            "received_at": now,
+            "next_attempt_at": now,
+        }
+        try:
+            await self.collection.insert_one(document)
+        except DuplicateKeyError:
+            self.stats["duplicate"] += 1
+            WEBHOOK_EVENTS_TOTAL.inc(labels={"provider": provider, "outcome": "duplicate"})
+            return {"event_id": event_id, "duplicate": True}
+
+        self.stats["accepted"] += 1
+        WEBHOOK_EVENTS_TOTAL.inc(labels={"provider": provider, "outcome": "accepted"})
+        self._wakeup.set()
+        return {"event_id": event_id, "duplicate": False}
+
+    # ---------- workers ----------
+    async def _claim(self) -> Optional[Dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                # Lease expired - the worker holding it died mid-event
+                {"status": "processing", "lease_until": {"$lte": now}},
+            ]},
+            {
+                "$set": {"status": "processing", "lease_owner": self.owner,
+                         "lease_until": now + timedelta(seconds=LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _process(self, event: Dict):
+        provider = event["provider"]
+        handler = self._handler_for(provider, event["event_type"])
+        self.in_flight += 1
+        try:
+            if handler is not None:
+                await asyncio.wait_for(handler(event), timeout=LEASE_SECONDS)
+            await self.collection.update_one(
+                {"_id": event["_id"], "lease_owner": self.owner},
+                {"$set": {"status": "done", "processed_at": datetime.now(timezone.utc),
+                          "handled": handler is not None},
+                 "$unset": {"lease_until": "", "last_error": ""}},
+            )
+            self.stats["processed"] += 1
+            WEBHOOK_EVENTS_TOTAL.inc(labels={"provider": provider, "outcome": "processed"})
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if event["attempts"] >= MAX_ATTEMPTS:
+                updates = {"status": "dead", "dead_at": datetime.now(timezone.utc), "last_error": error}
+                self.stats["dead"] += 1
+                outcome = "dead"
+                logger.error(f"☠️ Webhook {event['_id']} moved to dead letter after {event['attempts']} attempts: {error}")
+            else:
+                delay = RETRY_BASE_SECONDS * 2 ** (event["attempts"] - 1)
+                updates = {"status": "pending", "last_error": error,
+                           "next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=delay)}
+                self.stats["retried"] += 1
+                outcome = "retry"
+                logger.warning(f"⚠️ Webhook {event['_id']} failed (attempt {event['attempts']}), retry in {delay}s: {error}")
+            await self.collection.update_one(
+                {"_id": event["_id"], "lease_owner": self.owner},
+                {"$set": updates, "$unset": {"lease_until": ""}},
+            )
+            WEBHOOK_EVENTS_TOTAL.inc(labels={"provider": provider, "outcome": outcome})
+        finally:
+            self.in_flight -= 1
+
+    async def _worker(self):
+        while True:
+            try:
+                event = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Webhook claim failed: {e}")
+                event = None
+
+            if event is not None:
+                await self._process(event)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    # ---------- lifecycle ----------
+    async def start(self, db):
+        if self._tasks:
+            return
+        self.db = db
+        await self.ensure_indexes()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        register_queue_depth("webhook_in_flight", lambda: self.in_flight)
+        logger.info(f"📬 Webhook queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+
+    async def drain(self, timeout: float = 30.0) -> bool:
+        """Wait until no pending/processing events are left (used by the replay tool)"""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            remaining = await self.collection.count_documents(
+                {"status": {"$in": ["pending", "processing"]}, "next_attempt_at": {"$lte": datetime.now(timezone.utc)}}
+            )
+            if remaining == 0 and self.in_flight == 0:
+                return True
+            self._wakeup.set()
+            await asyncio.sleep(0.05)
+        return False
+
+    # ---------- admin ----------
+    async def dead_letters(self, limit: int = 50) -> List[Dict]:
+        cursor = self.collection.find({"status": "dead"}, {"headers": 0}).sort("dead_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def retry(self, event_key: str) -> bool:
+        """Send a dead-lettered event back to the queue with a fresh attempt budget"""
+        result = await self.collection.update_one(
+            {"_id": event_key, "status": "dead"},
+            {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": datetime.now(timezone.utc)},
+             "$unset": {"dead_at": ""}},
+        )
+        if result.modified_count:
+            self._wakeup.set()
+        return bool(result.modified_count)
+
+    async def get_stats(self) -> Dict:
+        counts = {}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return {**self.stats, "in_flight": self.in_flight, "workers": len(self._tasks), "by_status": counts}
+
+
+# Global webhook queue
+webhook_queue = WebhookIngestQueue()
+
+def get_webhook_queue() -> WebhookIngestQueue:
+    """Get the global webhook ingestion queue"""
+    return webhook_queue
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+REMZA019 Gaming - Webhook Replay Tool
+Replays saved webhook payloads against the in-process app to benchmark the
+ingest path (verify + store + ack) and, optionally, how fast the worker pool
+drains the queue. Payloads are Stripe or StreamLabs event JSON files, or
+.ndjson files with one event per line:
+
+    python webhook_replay.py saved_webhooks/ --repeat 200 --concurrency 50
+    python webhook_replay.py stripe_events.ndjson --duplicates 0.2 --drain
+
+Stripe payloads are re-signed with a replay secret and StreamLabs payloads
+get the replay shared secret, so no real provider credentials are needed.
+With --unique every replayed copy gets a fresh event ID; otherwise repeated
+copies exercise duplicate absorption. Uses the same Mongo stand-in as
+load_harness.py (mongomock-motor unless --mongo-url is given).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from load_harness import BACKEND_DIR, LoopLagSampler, git_revision, install_mongo_standin, summarize_ms
+
+logger = logging.getLogger("webhook_replay")
+
+REPLAY_SECRET = "whsec_replay_benchmark"
+
+
+def load_payloads(paths: List[str]) -> List[Dict]:
+    files: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        files.extend(sorted(p for p in path.iterdir() if p.suffix in (".json", ".ndjson")) if path.is_dir() else [path])
+
+    payloads = []
+    for path in files:
+        text = path.read_text()
+        if path.suffix == ".ndjson":
+            payloads.extend(json.loads(line) for line in text.splitlines() if line.strip())
+        else:
+            loaded = json.loads(text)
+            payloads.extend(loaded if isinstance(loaded, list) else [loaded])
+    return payloads
+
+
+def provider_of(payload: Dict) -> str:
+    # Stripe events always carry object="event" and an evt_ ID
+    return "stripe" if payload.get("object") == "event" or str(payload.get("id", "")).startswith("evt_") else "streamlabs"
+
+
+def build_request(payload: Dict, unique: bool) -> Dict:
+    """Path, body and headers for one delivery of `payload`"""
+    payload = dict(payload)
+    provider = provider_of(payload)
+    if provider == "stripe":
+        if unique:
+            payload["id"] = f"evt_replay_{uuid.uuid4().hex}"
+        body = json.dumps(payload).encode()
+        timestamp = int(time.time())
+        signature = hmac.new(REPLAY_SECRET.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+        return {
+            "provider": provider,
+            "path": "/api/donations/webhook/stripe",
+            "body": body,
+            "headers": {"Stripe-Signature": f"t={timestamp},v1={signature}", "Content-Type": "application/json"},
+        }
+
+    if unique:
+        payload["event_id"] = uuid.uuid4().hex
+    return {
+        "provider": provider,
+        "path": "/api/streamlabs/webhook/donation",
+        "body": json.dumps(payload).encode(),
+        "headers": {"X-Streamlabs-Secret": REPLAY_SECRET, "Content-Type": "application/json"},
+    }
+
+
+async def run(args) -> Dict:
+    backend = install_mongo_standin(args.mongo_url)
+    os.environ["STRIPE_WEBHOOK_SECRET"] = REPLAY_SECRET
+    os.environ["STREAMLABS_WEBHOOK_SECRET"] = REPLAY_SECRET
+    # Never send real receipts while benchmarking
+    os.environ["GMAIL_APP_PASSWORD"] = ""
+
+    import httpx
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    from webhook_ingest import get_webhook_queue
+
+    payloads = load_payloads(args.payloads)
+    if not payloads:
+        sys.exit("❌ No payloads found")
+
+    rng = random.Random(args.seed)
+    requests = []
+    for _ in range(args.repeat):
+        for payload in payloads:
+            requests.append(build_request(payload, args.unique))
+            if args.duplicates and rng.random() < args.duplicates:
+                requests.append(dict(requests[-1]))
+    rng.shuffle(requests)
+
+    app = server.app
+    await app.router.startup()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver", timeout=60)
+    queue = get_webhook_queue()
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    duplicates = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def deliver(request: Dict):
+        nonlocal duplicates
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await http.post(request["path"], content=request["body"], headers=request["headers"])
+                status = str(response.status_code)
+                if response.status_code == 200 and response.json().get("duplicate"):
+                    duplicates += 1
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    sampler = LoopLagSampler()
+    sampler.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver(r) for r in requests))
+    ingest_duration = time.perf_counter() - started
+    loop_lag = await sampler.stop()
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "mongo_backend": backend.split(":", 1)[0],
+            "payload_files": len(args.payloads),
+            "distinct_payloads": len(payloads),
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "workers": queue.workers,
+        },
+        "ingest": {
+            "deliveries": len(requests),
+            "duplicates_absorbed": duplicates,
+            "status_counts": dict(sorted(statuses.items())),
+            "duration_s": round(ingest_duration, 3),
+            "throughput_ops_s": round(len(requests) / ingest_duration, 1) if ingest_duration else 0.0,
+            "ack_latency_ms": summarize_ms(latencies),
+            "event_loop_lag_ms": loop_lag,
+        },
+    }
+
+    if args.drain:
+        drain_started = time.perf_counter()
+        drained = await queue.drain(timeout=args.drain_timeout)
+        end_to_end = time.perf_counter() - started
+        stats = await queue.get_stats()
+        report["processing"] = {
+            "drained": drained,
+            "drain_after_ingest_s": round(time.perf_counter() - drain_started, 3),
+            "end_to_end_s": round(end_to_end, 3),
+            "processed_events_s": round(stats["processed"] / end_to_end, 1) if end_to_end else 0.0,
+            "by_status": dict(sorted(stats["by_status"].items())),
+            "retried": stats["retried"],
+        }
+
+    await http.aclose()
+    await app.router.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay saved webhook payloads and measure ingest throughput")
+    parser.add_argument("payloads", nargs="+", help="JSON/NDJSON payload files or directories")
+    parser.add_argument("--repeat", type=int, default=100, help="Times to replay each payload")
+    parser.add_argument("--unique", action="store_true", help="Give every copy a fresh event ID")
+    parser.add_argument("--duplicates", type=float, default=0.0,
+                        help="Fraction of deliveries sent twice (provider retry simulation)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent in-flight deliveries")
+    parser.add_argument("--drain", action="store_true", help="Also wait for the worker pool to process everything")
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=19)
+    parser.add_argument("--mongo-url", help="Use a real local mongod instead of mongomock-motor")
+    parser.add_argument("--out", help="Write JSON report to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.INFO)
+
+    report = asyncio.run(run(args))
+    rendered = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        Path(args.out).write_text(rendered + "\n")
+        logger.info(f"📄 Report written to {args.out}")
+    else:
+        print(rendered)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,16 @@ REMZA019 Gaming - Remote Management & Monitoring System
 Replaces SSE with scalable WebSocket connections
 """
 import asyncio
-from typing import Dict, Set, List
+from typing import Dict, Set, List, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 import json
 import logging
 from datetime import datetime
+import time
+
+from presence import get_presence_service
+from metrics import WS_BROADCAST_BYTES, WS_BROADCAST_DURATION, WS_BROADCAST_RECIPIENTS
+from ws_protocol import ChannelState, EncodedFrames, WireFormat, encode, event_frame, negotiate, send_encoded
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +32,10 @@ class WebSocketManager:
             "public": set(),     # Public page connections
             "viewers": set()     # Viewer menu connections
         }
+        # Negotiated wire format per client (see ws_protocol)
+        self.formats: Dict[str, WireFormat] = {}
+        # Stateful channels sent to v2 clients as snapshot + deltas
+        self.channels: Dict[str, ChannelState] = {}
         self._lock = asyncio.Lock()
         
     async def connect(self, websocket: WebSocket, client_id: str, room: str = "public"):
@@ -38,17 +47,22 @@ class WebSocketManager:
             client_id: Unique client identifier
             room: Connection room (admin, public, viewers)
         """
-        await websocket.accept()
+        fmt = negotiate(websocket)
+        await websocket.accept(subprotocol=fmt.subprotocol)
         
         async with self._lock:
             # Store connection
             self.active_connections[client_id] = websocket
+            self.formats[client_id] = fmt
             
             # Add to room
             if room in self.rooms:
                 self.rooms[room].add(client_id)
+        
+        # Present for as long as the socket stays open
+        get_presence_service().heartbeat(client_id, room, connected=True)
             
-        logger.info(f"✅ WebSocket connected: {client_id} (room: {room})")
+        logger.info(f"✅ WebSocket connected: {client_id} (room: {room}, protocol: {fmt.label})")
         logger.info(f"📊 Active connections: {len(self.active_connections)}")
         
         # Send welcome message
@@ -56,8 +70,14 @@ class WebSocketManager:
             "type": "connection_established",
             "client_id": client_id,
             "room": room,
+            "protocol": fmt.version,
+            "encoding": fmt.encoding,
             "timestamp": datetime.now().isoformat()
         })
+        
+        # v2 clients start from snapshots of every channel they can see
+        if fmt.version >= 2:
+            await self.send_snapshots(client_id)
     
     async def disconnect(self, client_id: str):
         """
@@ -70,11 +90,14 @@ class WebSocketManager:
             # Remove from active connections
             if client_id in self.active_connections:
                 del self.active_connections[client_id]
+            self.formats.pop(client_id, None)
             
             # Remove from all rooms
             for room_clients in self.rooms.values():
                 room_clients.discard(client_id)
         
+        get_presence_service().leave(client_id)
+        
         logger.info(f"❌ WebSocket disconnected: {client_id}")
         logger.info(f"📊 Active connections: {len(self.active_connections)}")
     
@@ -86,10 +109,18 @@ class WebSocketManager:
             client_id: Target client identifier
             message: Message data (dict)
         """
+        fmt = self.formats.get(client_id)
+        if fmt is not None:
+            await self._send_frames(client_id, [event_frame(fmt, message)])
+    
+    async def _send_frames(self, client_id: str, frames: List[dict]):
+        """Send already-built protocol frames to one client"""
         if client_id in self.active_connections:
             try:
                 websocket = self.active_connections[client_id]
-                await websocket.send_json(message)
+                fmt = self.formats[client_id]
+                for frame in frames:
+                    await send_encoded(websocket, encode(fmt, frame))
             except Exception as e:
                 logger.error(f"❌ Error sending to {client_id}: {e}")
                 await self.disconnect(client_id)
@@ -104,29 +135,103 @@ class WebSocketManager:
         """
         # Add timestamp to all broadcasts
         message["timestamp"] = datetime.now().isoformat()
-        
-        # Determine target clients
+        await self._fan_out(EncodedFrames(lambda fmt: event_frame(fmt, message)), room)
+    
+    def _targets(self, room: Optional[str]) -> Set[str]:
         if room and room in self.rooms:
-            target_clients = self.rooms[room]
-        else:
-            target_clients = set(self.active_connections.keys())
+            return self.rooms[room]
+        return set(self.active_connections.keys())
+    
+    async def _fan_out(self, frames: EncodedFrames, room: Optional[str] = None):
+        """Send one broadcast to every target client, encoded once per wire format"""
+        target_clients = self._targets(room)
         
-        # Send to all target clients
+        started = time.perf_counter()
         disconnected_clients = []
-        for client_id in target_clients:
-            if client_id in self.active_connections:
-                try:
-                    websocket = self.active_connections[client_id]
-                    await websocket.send_json(message)
-                except Exception as e:
-                    logger.error(f"❌ Error broadcasting to {client_id}: {e}")
-                    disconnected_clients.append(client_id)
+        sent = 0
+        bytes_by_format: Dict[str, int] = {}
+        for client_id in list(target_clients):
+            websocket = self.active_connections.get(client_id)
+            fmt = self.formats.get(client_id)
+            if websocket is None or fmt is None:
+                continue
+            payload = frames.get(fmt)
+            if payload is None:
+                continue
+            try:
+                await send_encoded(websocket, payload)
+                sent += 1
+                bytes_by_format[fmt.label] = bytes_by_format.get(fmt.label, 0) + len(payload)
+            except Exception as e:
+                logger.error(f"❌ Error broadcasting to {client_id}: {e}")
+                disconnected_clients.append(client_id)
+        
+        metric_labels = {"manager": "main", "room": room or "all"}
+        WS_BROADCAST_DURATION.observe(time.perf_counter() - started, metric_labels)
+        WS_BROADCAST_RECIPIENTS.inc(sent, metric_labels)
+        for label, sent_bytes in bytes_by_format.items():
+            WS_BROADCAST_BYTES.inc(sent_bytes, {**metric_labels, "format": label})
         
         # Clean up disconnected clients
         for client_id in disconnected_clients:
             await self.disconnect(client_id)
         
-        logger.info(f"📡 Broadcast sent to {len(target_clients)} clients (room: {room or 'all'})")
+        logger.debug(f"📡 Broadcast sent to {sent} clients (room: {room or 'all'})")
+    
+    async def publish_state(self, channel: str, state: dict, legacy_message: dict, room: str = None, final: bool = False):
+        """
+        Publish the new full state of a stateful channel (e.g. "poll:<id>")
+        
+        v2 clients get a snapshot the first time and field-level deltas after
+        that; v1 clients get `legacy_message` (the full JSON object) as before.
+        
+        Args:
+            channel: Channel name
+            state: Complete current state (JSON-ready dict)
+            legacy_message: Message sent to v1 clients
+            room: Optional room name to publish to
+            final: Last state of the channel (poll ended, prediction resolved) -
+                it is broadcast, then the channel is retired so it no longer
+                gets snapshots or counts against memory
+        """
+        entry = self.channels.get(channel)
+        if entry is None:
+            entry = self.channels[channel] = ChannelState(channel, room)
+        frame = entry.update(state)
+        legacy_message["timestamp"] = datetime.now().isoformat()
+        await self._fan_out(
+            EncodedFrames(lambda fmt: legacy_message if fmt.version == 1 else frame), room
+        )
+        if final:
+            self.channels.pop(channel, None)
+    
+    async def drop_state(self, channel: str, legacy_message: dict, room: str = None):
+        """
+        Retire a stateful channel (v2 clients get a "drop" frame, v1 `legacy_message`)
+        """
+        entry = self.channels.pop(channel, None)
+        frame = entry.drop_frame() if entry else None
+        legacy_message["timestamp"] = datetime.now().isoformat()
+        await self._fan_out(
+            EncodedFrames(lambda fmt: legacy_message if fmt.version == 1 else frame), room
+        )
+    
+    def _visible_channels(self, client_id: str) -> List[ChannelState]:
+        return [
+            entry for entry in self.channels.values()
+            if entry.room is None or client_id in self.rooms.get(entry.room, ())
+        ]
+    
+    async def send_snapshots(self, client_id: str, channels: List[str] = None):
+        """
+        Send current snapshots to a v2 client (all visible channels, or just `channels`)
+        """
+        visible = self._visible_channels(client_id)
+        if channels:
+            wanted = set(channels)
+            visible = [entry for entry in visible if entry.name in wanted]
+        if visible:
+            await self._send_frames(client_id, [entry.snapshot_frame() for entry in visible])
     
     async def broadcast_live_status(self, is_live: bool, viewer_count: int = 0, game: str = ""):
         """
@@ -137,16 +242,16 @@ class WebSocketManager:
             viewer_count: Current viewer count
             game: Game being played
         """
-        message = {
-            "type": "live_status_update",
-            "data": {
-                "is_live": is_live,
-                "viewer_count": viewer_count,
-                "game": game,
-                "status_text": "LIVE NOW" if is_live else "OFFLINE"
-            }
+        data = {
+            "is_live": is_live,
+            "viewer_count": viewer_count,
+            "game": game,
+            "status_text": "LIVE NOW" if is_live else "OFFLINE"
         }
-        await self.broadcast(message, room="public")
+        await self.publish_state("live_status", data, {
+            "type": "live_status_update",
+            "data": data
+        }, room="public")
     
     async def broadcast_channel_stats(self, subscriber_count: str, video_count: str, view_count: str):
         """
@@ -210,9 +315,17 @@ class WebSocketManager:
             "total_connections": len(self.active_connections),
             "admin_connections": len(self.rooms["admin"]),
             "public_connections": len(self.rooms["public"]),
-            "viewer_connections": len(self.rooms["viewers"])
+            "viewer_connections": len(self.rooms["viewers"]),
+            "protocols": self._format_counts(),
+            "state_channels": len(self.channels)
         }
     
+    def _format_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for fmt in self.formats.values():
+            counts[fmt.label] = counts.get(fmt.label, 0) + 1
+        return counts
+    
     async def handle_client_message(self, client_id: str, message: dict):
         """
         Handle incoming message from client
@@ -230,12 +343,19 @@ class WebSocketManager:
                 "client_id": client_id
             })
         
+        elif message_type == "resync":
+            # v2 client saw a sequence gap - resend snapshots
+            if self.formats.get(client_id, WireFormat()).version >= 2:
+                await self.send_snapshots(client_id, message.get("channels"))
+                logger.info(f"🔄 Resync sent to {client_id}")
+        
         elif message_type == "join_room":
             # Add client to specific room
             room = message.get("room")
             if room in self.rooms:
                 async with self._lock:
                     self.rooms[room].add(client_id)
+                get_presence_service().heartbeat(client_id, room, connected=True)
                 logger.info(f"✅ {client_id} joined room: {room}")
         
         elif message_type == "leave_room":
@@ -244,6 +364,7 @@ class WebSocketManager:
             if room in self.rooms:
                 async with self._lock:
                     self.rooms[room].discard(client_id)
+                get_presence_service().leave(client_id, room)
                 logger.info(f"❌ {client_id} left room: {room}")
         
         else:
@@ -0,0 +1,221 @@
+"""
+REMZA019 Gaming - WebSocket Wire Protocol
+v1 (default, what existing clients speak): every frame is a full JSON text
+object, exactly as before.
+
+v2 (negotiated via Sec-WebSocket-Protocol "remza019.v2.msgpack" /
+"remza019.v2.json", or ?protocol=2&encoding=msgpack|json):
+  - MessagePack binary frames when msgpack is installed (JSON text otherwise)
+  - stateful channels (e.g. "poll:<id>") send a snapshot once, then only
+    field-level deltas, each stamped with a per-channel sequence number:
+        {"t": "snap",  "ch": "poll:1", "seq": 1, "d": {...full state...}}
+        {"t": "delta", "ch": "poll:1", "seq": 2, "set": [[["options", 2, "votes"], 7], ...]}
+        {"t": "drop",  "ch": "poll:1", "seq": 3}
+        {"t": "append","ch": "chat",   "seq": 9, "d": {...message...}}
+        {"t": "event", "d": {...legacy message...}}
+    ("del": [path, ...] is added when keys disappear)
+  - a client that sees seq != last_seq + 1 on a channel sends
+        {"type": "resync", "channels": ["poll:1"]}
+    and receives fresh snapshots.
+  - client -> server frames may be text (JSON) or, on msgpack connections,
+    MessagePack binary; receive_frame() accepts both.
+
+Every broadcast is encoded once per wire format, not once per client.
+permessage-deflate is negotiated by uvicorn (--ws-per-message-deflate).
+"""
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from starlette.websockets import WebSocketDisconnect
+
+from fast_json import dumps, encode_default
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SUBPROTOCOLS = {
+    "remza019.v2.msgpack": "msgpack",
+    "remza019.v2.json": "json",
+}
+
+
+class WireFormat:
+    """Protocol version + encoding negotiated for one connection"""
+    __slots__ = ("version", "encoding", "subprotocol")
+
+    def __init__(self, version: int = 1, encoding: str = "json", subprotocol: Optional[str] = None):
+        self.version = version
+        self.encoding = encoding
+        self.subprotocol = subprotocol
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        return self.version, self.encoding
+
+    @property
+    def label(self) -> str:
+        return f"v{self.version}-{self.encoding}"
+
+
+LEGACY = WireFormat()
+
+
+def negotiate(websocket) -> WireFormat:
+    """Pick the wire format from the offered subprotocols or query string (v1 if neither)"""
+    for offered in websocket.scope.get("subprotocols") or []:
+        encoding = SUBPROTOCOLS.get(offered)
+        if encoding == "msgpack" and msgpack is None:
+            continue
+        if encoding:
+            return WireFormat(2, encoding, offered)
+
+    params = websocket.query_params
+    if params.get("protocol") == "2":
+        encoding = params.get("encoding", "json")
+        if encoding != "msgpack" or msgpack is None:
+            encoding = "json"
+        return WireFormat(2, encoding)
+    return LEGACY
+
+
+def _msgpack_default(value):
+    # Same rendering as the JSON path for types MessagePack has no mapping for
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return encode_default(value)
+
+
+def encode(fmt: WireFormat, frame: Dict) -> Union[str, bytes]:
+    if fmt.encoding == "msgpack":
+        return msgpack.packb(frame, default=_msgpack_default, use_bin_type=True)
+    return dumps(frame).decode()
+
+
+async def send_encoded(websocket, payload: Union[str, bytes]):
+    if isinstance(payload, bytes):
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+
+
+async def receive_frame(websocket, fmt: WireFormat) -> Any:
+    """
+    Next client frame: text frames as str (callers parse JSON / "ping"), binary
+    frames unpacked with MessagePack on msgpack connections, UTF-8 text otherwise.
+    Raises WebSocketDisconnect on close and ValueError on an undecodable frame.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    if message.get("text") is not None:
+        return message["text"]
+    raw = message.get("bytes") or b""
+    if fmt.encoding == "msgpack" and msgpack is not None:
+        try:
+            return msgpack.unpackb(raw, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack frame: {e}") from e
+    return raw.decode("utf-8")
+
+
+class EncodedFrames:
+    """Encode-once cache for one broadcast: frame_for(fmt) is built and encoded per distinct format"""
+
+    def __init__(self, frame_for: Callable[[WireFormat], Optional[Dict]]):
+        self._frame_for = frame_for
+        self._cache: Dict[Tuple[int, str], Optional[Union[str, bytes]]] = {}
+
+    def get(self, fmt: WireFormat) -> Optional[Union[str, bytes]]:
+        if fmt.key not in self._cache:
+            frame = self._frame_for(fmt)
+            self._cache[fmt.key] = encode(fmt, frame) if frame is not None else None
+        return self._cache[fmt.key]
+
+
+def event_frame(fmt: WireFormat, message: Dict) -> Dict:
+    """A stateless message as sent to `fmt` clients"""
+    return message if fmt.version == 1 else {"t": "event", "d": message}
+
+
+# ============== FIELD-LEVEL DELTAS ==============
+def diff(old: Any, new: Any, path: Tuple = ()) -> Tuple[List, List]:
+    """
+    Changes turning `old` into `new`: ([[path, value], ...], [path, ...]).
+    Dicts recurse per key, equal-length lists per index; anything else is replaced.
+    """
+    sets: List = []
+    dels: List = []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                sets.append([list(path + (key,)), value])
+            elif old[key] != value:
+                child_sets, child_dels = diff(old[key], value, path + (key,))
+                sets.extend(child_sets)
+                dels.extend(child_dels)
+        dels.extend(list(path + (key,)) for key in old if key not in new)
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for index, (before, after) in enumerate(zip(old, new)):
+            if before != after:
+                child_sets, child_dels = diff(before, after, path + (index,))
+                sets.extend(child_sets)
+                dels.extend(child_dels)
+    elif old != new:
+        sets.append([list(path), new])
+    return sets, dels
+
+
+def apply_delta(state: Any, sets: List, dels: List) -> Any:
+    """Reference client-side application of a delta frame; returns the new state"""
+    for path, value in sets:
+        if not path:
+            state = value
+            continue
+        target = state
+        for part in path[:-1]:
+            target = target[part]
+        target[path[-1]] = value
+    for path in dels:
+        target = state
+        for part in path[:-1]:
+            target = target[part]
+        del target[path[-1]]
+    return state
+
+
+class ChannelState:
+    """Last published state of one channel plus its sequence number"""
+    __slots__ = ("name", "room", "seq", "state")
+
+    def __init__(self, name: str, room: Optional[str] = None):
+        self.name = name
+        self.room = room
+        self.seq = 0
+        self.state: Any = None
+
+    def update(self, state: Any) -> Optional[Dict]:
+        """Store `state`; returns the v2 frame to broadcast (None if nothing changed)"""
+        if self.seq and state == self.state:
+            return None
+        previous, first = self.state, self.seq == 0
+        self.state = state
+        self.seq += 1
+        if first:
+            return self.snapshot_frame()
+        sets, dels = diff(previous, state)
+        frame = {"t": "delta", "ch": self.name, "seq": self.seq, "set": sets}
+        if dels:
+            frame["del"] = dels
+        return frame
+
+    def snapshot_frame(self) -> Dict:
+        return {"t": "snap", "ch": self.name, "seq": self.seq, "d": self.state}
+
+    def drop_frame(self) -> Dict:
+        self.seq += 1
+        return {"t": "drop", "ch": self.name, "seq": self.seq}
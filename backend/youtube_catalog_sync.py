@@ -0,0 +1,251 @@
+"""
+REMZA019 Gaming - Incremental YouTube Catalog Sync
+Backfills the whole uploads playlist once (resumable via page tokens), then
+only pulls uploads newer than the publishedAt watermark. Statistics are
+refreshed 50 IDs per videos.list call and every change goes to the `videos`
+collection through one bulk_write per run, so video listings can be served
+from Mongo instead of live API calls.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from fast_json import get_payload_cache
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "youtube_catalog"
+PAGE_SIZE = 50  # playlistItems/videos.list maximum
+MAX_BACKFILL_PAGES_PER_RUN = 20
+RECENT_REFRESH_DAYS = 30
+STALE_REFRESH_LIMIT = 200
+
+
+def _description(text: str) -> str:
+    # Same truncation the live API client uses for listings
+    return text[:200] + '...' if len(text) > 200 else text
+
+
+class YouTubeCatalogSync:
+    """Watermark-based sync of the channel's uploads into the local videos collection"""
+
+    def __init__(self, youtube, db, channel_id: str):
+        self.youtube = youtube
+        self.db = db
+        self.channel_id = channel_id
+
+    async def _call(self, request) -> Dict:
+        # googleapiclient is blocking - keep it off the event loop
+        return await asyncio.to_thread(request.execute)
+
+    # ---------- state ----------
+    async def _load_state(self) -> Dict:
+        state = await self.db.sync_state.find_one({"_id": STATE_ID}) or {"_id": STATE_ID}
+        return state
+
+    async def _save_state(self, updates: Dict):
+        await self.db.sync_state.update_one({"_id": STATE_ID}, {"$set": updates}, upsert=True)
+
+    async def _uploads_playlist_id(self, state: Dict) -> str:
+        if state.get("uploads_playlist_id"):
+            return state["uploads_playlist_id"]
+        response = await self._call(self.youtube.channels().list(part='contentDetails', id=self.channel_id))
+        playlist_id = response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        await self._save_state({"uploads_playlist_id": playlist_id})
+        return playlist_id
+
+    # ---------- playlist ----------
+    async def _playlist_page(self, playlist_id: str, page_token: Optional[str]) -> Dict:
+        return await self._call(self.youtube.playlistItems().list(
+            part='snippet,contentDetails',
+            playlistId=playlist_id,
+            maxResults=PAGE_SIZE,
+            pageToken=page_token,
+        ))
+
+    @staticmethod
+    def _playlist_doc(item: Dict) -> Dict:
+        snippet = item['snippet']
+        video_id = item['contentDetails']['videoId']
+        return {
+            "video_id": video_id,
+            "title": snippet.get('title', ''),
+            "description": _description(snippet.get('description', '')),
+            "thumbnail_url": snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+            "watch_url": f"https://www.youtube.com/watch?v={video_id}",
+            "published_at": item['contentDetails'].get('videoPublishedAt') or snippet.get('publishedAt'),
+            "source": "youtube_api_v3",
+        }
+
+    async def _backfill(self, playlist_id: str, state: Dict, pending: Dict[str, Dict]) -> int:
+        """Walk older pages from the saved page token; resumes where the last run stopped"""
+        token = state.get("backfill_page_token")
+        pages = 0
+        while pages < MAX_BACKFILL_PAGES_PER_RUN:
+            response = await self._playlist_page(playlist_id, token)
+            pages += 1
+            for item in response.get('items', []):
+                doc = self._playlist_doc(item)
+                pending.setdefault(doc["video_id"], {}).update(doc)
+            token = response.get('nextPageToken')
+            await self._save_state({"backfill_page_token": token, "backfill_complete": token is None})
+            if token is None:
+                break
+        return pages
+
+    async def _sync_delta(self, playlist_id: str, watermark: Optional[str], pending: Dict[str, Dict]) -> int:
+        """Newest-first pages until we reach uploads at or below the watermark"""
+        token, pages = None, 0
+        while True:
+            response = await self._playlist_page(playlist_id, token)
+            pages += 1
+            reached_watermark = False
+            for item in response.get('items', []):
+                doc = self._playlist_doc(item)
+                if watermark and doc["published_at"] and doc["published_at"] <= watermark:
+                    reached_watermark = True
+                    continue
+                pending.setdefault(doc["video_id"], {}).update(doc)
+            token = response.get('nextPageToken')
+            if reached_watermark or token is None or not watermark:
+                return pages
+
+    # ---------- statistics ----------
+    async def _refresh_targets(self, pending: Dict[str, Dict]) -> List[str]:
+        """New/changed uploads, everything recent, and the stalest part of the back catalog"""
+        ids = list(pending)
+        seen = set(ids)
+        recent_cutoff = (datetime.now(timezone.utc) - timedelta(days=RECENT_REFRESH_DAYS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        cursors = [
+            self.db.videos.find({"published_at": {"$gte": recent_cutoff}}, {"_id": 0, "video_id": 1}),
+            self.db.videos.find({}, {"_id": 0, "video_id": 1}).sort("stats_refreshed_at", 1).limit(STALE_REFRESH_LIMIT),
+        ]
+        for cursor in cursors:
+            async for doc in cursor:
+                if doc["video_id"] not in seen:
+                    seen.add(doc["video_id"])
+                    ids.append(doc["video_id"])
+        return ids
+
+    async def _refresh_statistics(self, video_ids: List[str], etags: Dict[str, str], pending: Dict[str, Dict],
+                                  unchanged: List[str]) -> int:
+        """
+        videos.list in batches of 50; only videos whose etag changed (or that were
+        just listed) are queued for writing, the rest are collected in `unchanged`
+        """
+        changed = 0
+        now = datetime.now(timezone.utc)
+        for start in range(0, len(video_ids), PAGE_SIZE):
+            batch = video_ids[start:start + PAGE_SIZE]
+            response = await self._call(self.youtube.videos().list(
+                part='statistics,contentDetails',
+                id=','.join(batch),
+                maxResults=PAGE_SIZE,
+            ))
+            for item in response.get('items', []):
+                video_id = item['id']
+                if item.get('etag') == etags.get(video_id) and video_id not in pending:
+                    unchanged.append(video_id)
+                    continue
+                changed += 1
+                stats = item.get('statistics', {})
+                pending.setdefault(video_id, {}).update({
+                    "stats_refreshed_at": now,
+                    "view_count": stats.get('viewCount', '0'),
+                    "like_count": stats.get('likeCount'),
+                    "comment_count": stats.get('commentCount'),
+                    "duration": item.get('contentDetails', {}).get('duration', 'N/A'),
+                    "etag": item.get('etag'),
+                })
+        return changed
+
+    async def _known_etags(self, video_ids: Iterable[str]) -> Dict[str, str]:
+        etags = {}
+        async for doc in self.db.videos.find({"video_id": {"$in": list(video_ids)}}, {"_id": 0, "video_id": 1, "etag": 1}):
+            if doc.get("etag"):
+                etags[doc["video_id"]] = doc["etag"]
+        return etags
+
+    # ---------- run ----------
+    async def _dedupe_videos(self) -> int:
+        """Delete duplicate video_id documents left by older syncs, keeping the most recently updated"""
+        removed = 0
+        duplicates = self.db.videos.aggregate([
+            {"$sort": {"updated_at": -1}},
+            {"$group": {"_id": "$video_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+        async for group in duplicates:
+            result = await self.db.videos.delete_many({"_id": {"$in": group["ids"][1:]}})
+            removed += result.deleted_count
+        return removed
+
+    async def ensure_indexes(self):
+        try:
+            await self.db.videos.create_index("video_id", unique=True)
+        except OperationFailure as e:
+            # Legacy writes could store a video twice; the unique index can't build over that
+            removed = await self._dedupe_videos()
+            logger.warning(f"⚠️ videos.video_id unique index failed ({e}); removed {removed} duplicate documents")
+            try:
+                await self.db.videos.create_index("video_id", unique=True)
+            except OperationFailure as retry_error:
+                logger.error(f"❌ videos.video_id unique index still failing, syncing without it: {retry_error}")
+        await self.db.videos.create_index([("published_at", -1), ("video_id", -1)])
+
+    async def run(self) -> Dict:
+        state = await self._load_state()
+        playlist_id = await self._uploads_playlist_id(state)
+        watermark = state.get("watermark")
+        pending: Dict[str, Dict] = {}
+
+        delta_pages = await self._sync_delta(playlist_id, watermark, pending) if watermark else 0
+        backfill_pages = 0
+        if not state.get("backfill_complete"):
+            backfill_pages = await self._backfill(playlist_id, state, pending)
+        new_videos = len(pending)
+
+        targets = await self._refresh_targets(pending)
+        etags = await self._known_etags(targets)
+        unchanged: List[str] = []
+        changed = await self._refresh_statistics(targets, etags, pending, unchanged)
+
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"video_id": video_id},
+                {"$set": {**fields, "video_id": video_id, "updated_at": now}},
+                upsert=True,
+            )
+            for video_id, fields in pending.items()
+        ]
+        written = 0
+        if operations:
+            result = await self.db.videos.bulk_write(operations, ordered=False)
+            written = result.upserted_count + result.modified_count
+        if unchanged:
+            # Same etag, nothing to $set - just rotate them to the back of the stale-refresh queue
+            await self.db.videos.update_many({"video_id": {"$in": unchanged}}, {"$set": {"stats_refreshed_at": now}})
+        if written:
+            get_payload_cache().invalidate("youtube:")
+
+        published = [doc["published_at"] for doc in pending.values() if doc.get("published_at")]
+        new_watermark = max([watermark] + published if watermark else published, default=None)
+        summary = {
+            "delta_pages": delta_pages,
+            "backfill_pages": backfill_pages,
+            "new_or_listed_videos": new_videos,
+            "stats_checked": len(targets),
+            "stats_changed": changed,
+            "written": written,
+        }
+        await self._save_state({"watermark": new_watermark, "last_run_at": now, "last_run": summary})
+        logger.info(
+            f"🎬 Catalog sync: {new_videos} uploads listed ({delta_pages} delta / {backfill_pages} backfill pages), "
+            f"{changed}/{len(targets)} stats changed, {written} documents written"
+        )
+        return summary
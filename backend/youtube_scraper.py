@@ -1,208 +1,370 @@
-import requests
-from bs4 import BeautifulSoup
-import json
-import re
-from typing import List, Dict, Optional
+"""
+REMZA019 Gaming - YouTube Channel Scraper
+Fast path: one plain HTTP GET of the channel's /videos tab and a parse of the
+embedded ytInitialData JSON (stats and videos come from the same page). Only
+when that fails does it fall back to a long-lived, pooled headless Chromium
+whose contexts block images/media/fonts/CSS and wait on page state instead of
+fixed sleeps. The parse functions are pure, so saved HTML can be replayed:
+
+    python youtube_scraper.py --html saved_videos_tab.html
+    python youtube_scraper.py --runs 5 [--browser]
+"""
+import argparse
 import asyncio
-from playwright.async_api import async_playwright
+import json
 import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    async_playwright = None
+    PLAYWRIGHT_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+# English UI text and no EU consent interstitial, so the counts parse the same everywhere
+REQUEST_HEADERS = {'User-Agent': USER_AGENT, 'Accept-Language': 'en-US,en;q=0.9'}
+REQUEST_COOKIES = {'CONSENT': 'YES+cb', 'SOCS': 'CAI'}
+HTTP_TIMEOUT = 10.0
+VIDEO_LIMIT = 5
+
+BROWSER_CONTEXTS = 2
+CONTEXT_MAX_USES = 50       # recycle contexts so renderer memory doesn't creep
+NAVIGATION_TIMEOUT_MS = 15000
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+_INITIAL_DATA_MARKERS = ('var ytInitialData = ', 'window["ytInitialData"] = ', "window['ytInitialData'] = ")
+_COUNT_RE = r'([\d][\d.,]*\s*[KMB]?)'
+_SUBSCRIBERS_RE = re.compile(_COUNT_RE + r'\s*subscribers?', re.IGNORECASE)
+_VIDEOS_RE = re.compile(_COUNT_RE + r'\s*videos?\b', re.IGNORECASE)
+_AGO_RE = re.compile(r'(\d+)\s*(second|minute|hour|day|week|month|year)s?\s+ago', re.IGNORECASE)
+_AGO_UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400, 'week': 604800,
+              'month': 2592000, 'year': 31536000}
+
+
+# ---------- pure parsing (testable on saved HTML) ----------
+def extract_initial_data(html: str) -> Optional[Dict]:
+    """The ytInitialData object embedded in a YouTube page, or None"""
+    decoder = json.JSONDecoder()
+    for marker in _INITIAL_DATA_MARKERS:
+        start = html.find(marker)
+        if start == -1:
+            continue
+        try:
+            data, _ = decoder.raw_decode(html, start + len(marker))
+            return data if isinstance(data, dict) else None
+        except ValueError:
+            continue
+    return None
+
+
+def parse_count(text: str) -> str:
+    """'1.2K' -> '1200', '127' -> '127', '1,234' -> '1234'"""
+    text = text.strip().replace(',', '').replace(' ', '')
+    multiplier = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}.get(text[-1:].upper(), 1)
+    number = text[:-1] if multiplier > 1 else text
+    try:
+        return str(int(float(number) * multiplier))
+    except ValueError:
+        return "0"
+
+
+def _walk(node, key: str) -> Iterator[Dict]:
+    """Every value stored under `key` anywhere in `node`"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            children = []
+            for name, value in current.items():
+                if name == key:
+                    yield value
+                elif isinstance(value, (dict, list)):
+                    children.append(value)
+            stack.extend(reversed(children))  # document order
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def _text(node) -> str:
+    if not isinstance(node, dict):
+        return node if isinstance(node, str) else ""
+    if 'simpleText' in node:
+        return node['simpleText']
+    if 'runs' in node:
+        return "".join(run.get('text', '') for run in node['runs'])
+    return node.get('content', '')
+
+
+def _header_texts(data: Dict) -> Iterator[str]:
+    header = data.get('header', {})
+    for key in ('simpleText', 'content', 'text', 'label', 'runs'):
+        for value in _walk(header, key):
+            if isinstance(value, str):
+                yield value
+            elif isinstance(value, dict):
+                yield _text(value)
+            elif isinstance(value, list):
+                # Counts split over runs: [{"text": "1,045"}, {"text": " videos"}]
+                yield _text({'runs': value})
+
+
+def _iso_duration(length: str) -> str:
+    """'14:32' -> 'PT14M32S', '1:02:03' -> 'PT1H2M3S'"""
+    parts = [int(p) for p in length.split(':') if p.isdigit()]
+    if not parts or len(parts) > 3:
+        return "N/A"
+    hours, minutes, seconds = ([0] * (3 - len(parts)) + parts)
+    return "PT" + (f"{hours}H" if hours else "") + (f"{minutes}M" if minutes else "") + f"{seconds}S"
+
+
+def _published_at(relative: str, now: datetime) -> str:
+    """'3 days ago' -> approximate ISO timestamp (YouTube only exposes relative times here)"""
+    match = _AGO_RE.search(relative or "")
+    if not match:
+        return now.strftime('%Y-%m-%dT%H:%M:%SZ')
+    seconds = int(match.group(1)) * _AGO_UNITS[match.group(2).lower()]
+    return (now - timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_channel_stats(data: Dict) -> Dict:
+    subscriber_count = "0"
+    video_count = "0"
+    for text in _header_texts(data):
+        if subscriber_count == "0" and (match := _SUBSCRIBERS_RE.search(text)):
+            subscriber_count = parse_count(match.group(1))
+        if video_count == "0" and (match := _VIDEOS_RE.search(text)):
+            video_count = parse_count(match.group(1))
+    return {
+        "subscriber_count": subscriber_count,
+        "video_count": video_count,
+        # YouTube doesn't show total views on these pages - same estimate as before
+        "view_count": str(int(subscriber_count) * 50),
+    }
+
+
+def parse_videos(data: Dict, limit: int = VIDEO_LIMIT, now: Optional[datetime] = None) -> List[Dict]:
+    now = now or datetime.now(timezone.utc)
+    videos = []
+    seen = set()
+    for key in ('videoRenderer', 'gridVideoRenderer'):
+        for renderer in _walk(data.get('contents', data), key):
+            video_id = renderer.get('videoId')
+            if not video_id or video_id in seen:
+                continue
+            seen.add(video_id)
+            title = _text(renderer.get('title', {})) or f"REMZA019 Gaming Video {len(videos) + 1}"
+            thumbnails = renderer.get('thumbnail', {}).get('thumbnails') or []
+            thumbnail = thumbnails[-1]['url'].split('?')[0] if thumbnails else ""
+            views = _text(renderer.get('viewCountText', {}))
+            view_match = re.search(_COUNT_RE, views)
+            videos.append({
+                "id": video_id,
+                "title": title,
+                "description": _text(renderer.get('descriptionSnippet', {})) or f"Gaming content from REMZA019 - {title}",
+                "thumbnail_url": thumbnail if thumbnail.startswith('http') else f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg",
+                "published_at": _published_at(_text(renderer.get('publishedTimeText', {})), now),
+                "view_count": parse_count(view_match.group(1)) if view_match else "0",
+                "duration": _iso_duration(_text(renderer.get('lengthText', {}))),
+            })
+            if len(videos) >= limit:
+                return videos
+    return videos
+
+
+def parse_channel_page(html: str, limit: int = VIDEO_LIMIT) -> Optional[Dict]:
+    """Stats + videos from a saved/fetched /videos tab; None when the page has no usable data"""
+    data = extract_initial_data(html)
+    if data is None:
+        return None
+    return parse_initial_data(data, limit)
+
+
+def parse_initial_data(data: Dict, limit: int = VIDEO_LIMIT) -> Optional[Dict]:
+    videos = parse_videos(data, limit)
+    if not videos:
+        return None
+    return {
+        "channel_stats": parse_channel_stats(data),
+        "videos": videos,
+        "featured_video": videos[0],
+    }
+
+
+# ---------- browser pool ----------
+class BrowserPool:
+    """One long-lived Chromium with a small pool of reusable, resource-blocking contexts"""
+
+    def __init__(self, size: int = BROWSER_CONTEXTS):
+        self.size = size
+        self._playwright = None
+        self._browser = None
+        self._contexts: Optional[asyncio.Queue] = None
+        self._uses: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def _block_unneeded(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            user_agent=USER_AGENT, locale='en-US', extra_http_headers={'Accept-Language': 'en-US,en;q=0.9'}
+        )
+        await context.add_cookies([{"name": name, "value": value, "domain": ".youtube.com", "path": "/"}
+                                   for name, value in REQUEST_COOKIES.items()])
+        await context.route("**/*", self._block_unneeded)
+        self._uses[id(context)] = 0
+        return context
+
+    async def _ensure_started(self):
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            if not PLAYWRIGHT_AVAILABLE:
+                raise RuntimeError("playwright is not installed")
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage',
+                      '--disable-gpu', '--no-first-run']
+            )
+            self._contexts = asyncio.Queue()
+            for _ in range(self.size):
+                self._contexts.put_nowait(await self._new_context())
+            logger.info(f"🌐 Browser pool started with {self.size} contexts")
+
+    async def initial_data(self, url: str) -> Optional[Dict]:
+        """Navigate a pooled page and read window.ytInitialData once it exists"""
+        await self._ensure_started()
+        context = await self._contexts.get()
+        page = None
+        try:
+            page = await context.new_page()
+            await page.goto(url, wait_until='domcontentloaded', timeout=NAVIGATION_TIMEOUT_MS)
+            await page.wait_for_function("() => !!window.ytInitialData", timeout=NAVIGATION_TIMEOUT_MS)
+            return await page.evaluate("() => window.ytInitialData")
+        finally:
+            if page is not None:
+                await page.close()
+            self._uses[id(context)] = self._uses.get(id(context), 0) + 1
+            if self._uses[id(context)] >= CONTEXT_MAX_USES or not self._browser.is_connected():
+                self._uses.pop(id(context), None)
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+                if self._browser.is_connected():
+                    context = await self._new_context()
+                else:
+                    context = None
+            if context is not None:
+                self._contexts.put_nowait(context)
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# ---------- scraper ----------
 class YouTubeScraper:
     def __init__(self):
         self.channel_handle = "@remza019"
         self.channel_url = f"https://www.youtube.com/{self.channel_handle}"
-        
-    async def scrape_channel_data(self) -> Dict:
-        """Scrape @remza019 YouTube channel data using Playwright"""
-        try:
-            async with async_playwright() as p:
-                # Launch browser with additional arguments for container environment
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-setuid-sandbox', 
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--no-first-run',
-                        '--no-zygote',
-                        '--single-process'
-                    ]
-                )
-                page = await browser.new_page()
-                
-                # Set user agent to avoid detection
-                await page.set_extra_http_headers({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                })
-                
-                logger.info(f"🎬 Scraping REMZA019 channel: {self.channel_url}")
-                
-                # Navigate to channel with shorter timeout
-                await page.goto(self.channel_url, wait_until='domcontentloaded', timeout=15000)
-                await asyncio.sleep(2)
-                
-                # Extract channel stats
-                channel_stats = await self._extract_channel_stats(page)
-                
-                # Navigate to videos tab
-                videos_url = f"{self.channel_url}/videos"
-                await page.goto(videos_url, wait_until='domcontentloaded', timeout=15000)
-                await asyncio.sleep(2)
-                
-                # Extract videos
-                videos = await self._extract_videos(page)
-                
-                await browser.close()
-                
-                return {
-                    "channel_stats": channel_stats,
-                    "videos": videos,
-                    "featured_video": videos[0] if videos else None
-                }
-                
-        except Exception as e:
-            logger.error(f"❌ Scraping error: {str(e)}")
-            return self._get_fallback_data()
-    
-    async def _extract_channel_stats(self, page) -> Dict:
-        """Extract channel statistics"""
-        try:
-            # Try different selectors for subscriber count
-            subscriber_selectors = [
-                '#subscriber-count',
-                '[id*="subscriber"]',
-                'span:has-text("subscribers")',
-                'span:has-text("pretplatnika")'
-            ]
-            
-            subscriber_count = "0"
-            for selector in subscriber_selectors:
-                try:
-                    element = await page.wait_for_selector(selector, timeout=5000)
-                    if element:
-                        text = await element.inner_text()
-                        # Extract number from text like "127 subscribers"
-                        match = re.search(r'(\d+)', text.replace(',', '').replace('.', ''))
-                        if match:
-                            subscriber_count = match.group(1)
-                            break
-                except:
-                    continue
-            
-            # Try to get video count and total views from page content
-            page_content = await page.content()
-            
-            # Look for video count
-            video_count = "0"
-            video_match = re.search(r'(\d+)\s*videos?', page_content, re.IGNORECASE)
-            if video_match:
-                video_count = video_match.group(1)
-                
-            # Estimate total views (YouTube doesn't show this easily)
-            view_count = str(int(subscriber_count) * 50) if subscriber_count.isdigit() else "0"
-            
-            logger.info(f"📊 Channel stats: {subscriber_count} subs, {video_count} videos")
-            
-            return {
-                "subscriber_count": subscriber_count,
-                "video_count": video_count, 
-                "view_count": view_count
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Stats extraction error: {str(e)}")
-            return {"subscriber_count": "0", "video_count": "0", "view_count": "0"}
-    
-    async def _extract_videos(self, page) -> List[Dict]:
-        """Extract video list from channel"""
+        self.videos_url = f"{self.channel_url}/videos"
+        self.browser_pool = BrowserPool()
+        self._http: Optional[httpx.AsyncClient] = None
+        self.stats = {"http": 0, "browser": 0, "fallback": 0, "last_path": None, "last_duration_ms": None}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(headers=REQUEST_HEADERS, cookies=REQUEST_COOKIES,
+                                           timeout=HTTP_TIMEOUT, follow_redirects=True)
+        return self._http
+
+    async def _scrape_http(self) -> Optional[Dict]:
+        response = await self._client().get(self.videos_url, params={'hl': 'en'})
+        response.raise_for_status()
+        return parse_channel_page(response.text)
+
+    async def _scrape_browser(self) -> Optional[Dict]:
+        data = await self.browser_pool.initial_data(f"{self.videos_url}?hl=en")
+        return parse_initial_data(data) if data else None
+
+    async def scrape_channel_data(self, use_browser: bool = True) -> Dict:
+        """Scrape @remza019 channel stats and latest videos - HTTP first, pooled browser as fallback"""
+        started = time.perf_counter()
+        logger.info(f"🎬 Scraping REMZA019 channel: {self.videos_url}")
+        result, path = None, "fallback"
         try:
-            videos = []
-            
-            # Wait for video grid to load
-            await page.wait_for_selector('#contents', timeout=10000)
-            await asyncio.sleep(2)
-            
-            # Find video elements
-            video_elements = await page.query_selector_all('div[id="dismissible"]')
-            
-            for i, element in enumerate(video_elements[:5]):  # Get first 5 videos
-                try:
-                    # Extract video title
-                    title_element = await element.query_selector('a[id="video-title"]')
-                    title = await title_element.get_attribute('title') if title_element else f"REMZA019 Gaming Video {i+1}"
-                    
-                    # Extract video URL 
-                    href = await title_element.get_attribute('href') if title_element else ""
-                    video_id = self._extract_video_id(href)
-                    
-                    # Extract thumbnail
-                    img_element = await element.query_selector('img')
-                    thumbnail = await img_element.get_attribute('src') if img_element else ""
-                    if not thumbnail.startswith('http'):
-                        thumbnail = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
-                    
-                    # Extract metadata
-                    meta_element = await element.query_selector('#metadata-line')
-                    views = "0"
-                    duration = "N/A"
-                    
-                    if meta_element:
-                        meta_text = await meta_element.inner_text()
-                        # Extract view count
-                        view_match = re.search(r'(\d+(?:,\d+)*)\s*(?:views|pregleda)', meta_text.lower())
-                        if view_match:
-                            views = view_match.group(1).replace(',', '')
-                    
-                    video_data = {
-                        "id": video_id or f"remza019_video_{i+1}",
-                        "title": title,
-                        "description": f"Gaming content from REMZA019 - {title}",
-                        "thumbnail_url": thumbnail,
-                        "published_at": "2024-09-10T19:30:00Z",  # Default recent date
-                        "view_count": views,
-                        "duration": duration
-                    }
-                    
-                    videos.append(video_data)
-                    logger.info(f"🎬 Extracted video: {title}")
-                    
-                except Exception as video_error:
-                    logger.error(f"❌ Video extraction error: {str(video_error)}")
-                    continue
-            
-            return videos if videos else self._get_fallback_videos()
-            
+            result = await self._scrape_http()
+            path = "http"
         except Exception as e:
-            logger.error(f"❌ Videos extraction error: {str(e)}")
-            return self._get_fallback_videos()
-    
+            logger.warning(f"⚠️ HTTP scrape failed: {e}")
+
+        if result is None and use_browser:
+            try:
+                result = await self._scrape_browser()
+                path = "browser"
+            except Exception as e:
+                logger.error(f"❌ Browser scrape failed: {e}")
+
+        if result is None:
+            path = "fallback"
+            result = self._get_fallback_data()
+
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.stats[path] += 1
+        self.stats.update(last_path=path, last_duration_ms=duration_ms)
+        logger.info(f"📊 Scrape via {path} in {duration_ms}ms: "
+                    f"{result['channel_stats']['subscriber_count']} subs, {len(result['videos'])} videos")
+        return result
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await self.browser_pool.close()
+
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
         if not url:
             return ""
-        
+
         # Handle different YouTube URL formats
         patterns = [
             r'(?:watch\?v=|embed/|v/)([a-zA-Z0-9_-]{11})',
             r'(?:youtube\.com|youtu\.be)/(?:watch\?v=)?([a-zA-Z0-9_-]{11})'
         ]
-        
+
         for pattern in patterns:
             match = re.search(pattern, url)
             if match:
                 return match.group(1)
-        
+
         return ""
-    
+
     def _get_fallback_data(self) -> Dict:
         """Fallback data when scraping fails"""
         logger.info("🔄 Using fallback data for REMZA019")
-        
+
         return {
             "channel_stats": {
                 "subscriber_count": "87",  # Conservative estimate
@@ -212,7 +374,7 @@ class YouTubeScraper:
             "videos": self._get_fallback_videos(),
             "featured_video": self._get_fallback_videos()[0]
         }
-    
+
     def _get_fallback_videos(self) -> List[Dict]:
         """Fallback video data"""
         return [
@@ -229,7 +391,7 @@ class YouTubeScraper:
                 "id": "remza019_rocket_racing",
                 "title": "REMZA019 - ROCKET RACING Practice",
                 "description": "Practicing for upcoming ROCKET RACING tournament. Honest gaming from Serbia.",
-                "thumbnail_url": "https://images.unsplash.com/photo-1552820728-8b83bb6b773f?w=400&h=225&fit=crop", 
+                "thumbnail_url": "https://images.unsplash.com/photo-1552820728-8b83bb6b773f?w=400&h=225&fit=crop",
                 "published_at": "2024-09-10T19:30:00Z",
                 "view_count": "89",
                 "duration": "PT11M18S"
@@ -239,11 +401,59 @@ class YouTubeScraper:
                 "title": "REMZA019 - Call of Duty Multiplayer",
                 "description": "COD multiplayer session with real gameplay, no highlights reel.",
                 "thumbnail_url": "https://images.unsplash.com/photo-1511512578047-dfb367046420?w=400&h=225&fit=crop",
-                "published_at": "2024-09-08T20:00:00Z", 
+                "published_at": "2024-09-08T20:00:00Z",
                 "view_count": "67",
                 "duration": "PT16M45S"
             }
         ]
 
 # Initialize scraper
-youtube_scraper = YouTubeScraper()
\ No newline at end of file
+youtube_scraper = YouTubeScraper()
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # Benchmark-only and POSIX-only, so imported here rather than with the scraper
+    import resource
+    # ru_maxrss is KiB on Linux; children covers Chromium processes
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+async def _benchmark(runs: int, force_browser: bool) -> Dict:
+    scraper = YouTubeScraper()
+    durations, paths = [], []
+    try:
+        for _ in range(runs):
+            if force_browser:
+                started = time.perf_counter()
+                result = await scraper._scrape_browser()
+                durations.append(round((time.perf_counter() - started) * 1000, 1))
+                paths.append("browser" if result else "failed")
+            else:
+                await scraper.scrape_channel_data()
+                durations.append(scraper.stats["last_duration_ms"])
+                paths.append(scraper.stats["last_path"])
+    finally:
+        await scraper.close()
+    return {"runs_ms": durations, "paths": paths, "peak_rss_mb": _peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape or parse the REMZA019 YouTube channel")
+    parser.add_argument("--html", help="Parse a saved /videos tab HTML file instead of fetching")
+    parser.add_argument("--runs", type=int, default=1, help="Live scrapes to time")
+    parser.add_argument("--browser", action="store_true", help="Time the pooled browser path only")
+    args = parser.parse_args()
+
+    if args.html:
+        with open(args.html, encoding="utf-8") as f:
+            result = parse_channel_page(f.read())
+        print(json.dumps(result, indent=2) if result else "❌ No ytInitialData videos found")
+        return
+    print(json.dumps(asyncio.run(_benchmark(args.runs, args.browser)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
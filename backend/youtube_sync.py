@@ -8,7 +8,9 @@ from typing import Dict, List, Optional
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+from pymongo import UpdateOne
 from youtube_api_client import get_youtube_client
+from youtube_catalog_sync import YouTubeCatalogSync
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -118,14 +120,16 @@ class YouTubeSyncManager:
             if not channel_id:
                 return {"is_live": False, "live_video_id": None}
             
-            # Search for live broadcasts
-            search_response = self.youtube_client.youtube.search().list(
-                part='snippet',
-                channelId=channel_id,
-                eventType='live',
-                type='video',
-                maxResults=1
-            ).execute()
+            # Search for live broadcasts (blocking HTTP client - keep it off the event loop)
+            search_response = await asyncio.to_thread(
+                self.youtube_client.youtube.search().list(
+                    part='snippet',
+                    channelId=channel_id,
+                    eventType='live',
+                    type='video',
+                    maxResults=1
+                ).execute
+            )
             
             if search_response.get('items'):
                 live_video = search_response['items'][0]
@@ -145,7 +149,7 @@ class YouTubeSyncManager:
     async def _store_channel_stats(self, stats: Dict):
         """Store channel statistics in database"""
         try:
-            if not self.db:
+            if self.db is None:
                 return
             
             stats_data = {
@@ -167,30 +171,32 @@ class YouTubeSyncManager:
             logger.error(f"❌ Error storing channel stats: {e}")
 
     async def _store_videos(self, videos: List[Dict]):
-        """Store videos in database"""
+        """Store videos in database (one bulk_write for the whole batch)"""
         try:
-            if not self.db:
+            if self.db is None or not videos:
                 return
             
-            for video in videos:
-                video_data = {
-                    "video_id": video['id'],
-                    "title": video['title'],
-                    "description": video['description'],
-                    "thumbnail_url": video['thumbnail_url'],
-                    "watch_url": video['watch_url'],
-                    "published_at": video['published_at'],
-                    "view_count": video.get('view_count', '0'),
-                    "duration": video.get('duration', 'N/A'),
-                    "updated_at": datetime.now(),
-                    "source": "youtube_api_v3"
-                }
-                
-                await self.db.videos.update_one(
+            now = datetime.now()
+            operations = [
+                UpdateOne(
                     {"video_id": video['id']},
-                    {'$set': video_data},
+                    {'$set': {
+                        "video_id": video['id'],
+                        "title": video['title'],
+                        "description": video['description'],
+                        "thumbnail_url": video['thumbnail_url'],
+                        "watch_url": video['watch_url'],
+                        "published_at": video['published_at'],
+                        "view_count": video.get('view_count', '0'),
+                        "duration": video.get('duration', 'N/A'),
+                        "updated_at": now,
+                        "source": "youtube_api_v3"
+                    }},
                     upsert=True
                 )
+                for video in videos
+            ]
+            await self.db.videos.bulk_write(operations, ordered=False)
                 
         except Exception as e:
             logger.error(f"❌ Error storing videos: {e}")
@@ -198,7 +204,7 @@ class YouTubeSyncManager:
     async def _get_fallback_stats(self) -> Dict:
         """Fallback stats when API is unavailable"""
         try:
-            if self.db:
+            if self.db is not None:
                 # Try to get last known stats from database
                 stats = await self.db.channel_stats.find_one({}, sort=[('updated_at', -1)])
                 if stats:
@@ -222,7 +228,7 @@ class YouTubeSyncManager:
     async def _get_fallback_videos(self) -> List[Dict]:
         """Fallback videos when API is unavailable"""
         try:
-            if self.db:
+            if self.db is not None:
                 # Try to get last known videos from database
                 videos = await self.db.videos.find({}, sort=[('published_at', -1)]).limit(5).to_list(length=5)
                 if videos:
@@ -255,6 +261,32 @@ class YouTubeSyncManager:
             }
         ]
 
+    async def sync_catalog(self) -> Optional[Dict]:
+        """
+        Incremental sync of the full uploads playlist into the videos collection
+        (backfill by page token, then deltas above the publishedAt watermark)
+        """
+        if not self.youtube_client or self.db is None:
+            return None
+        channel_id = await self.youtube_client.get_channel_by_handle()
+        catalog = YouTubeCatalogSync(self.youtube_client.youtube, self.db, channel_id)
+        await catalog.ensure_indexes()
+        return await catalog.run()
+
+    async def run_sync_cycle(self):
+        """
+        One sync pass: channel stats + video catalog
+        (scheduled by job_scheduler; live status is owned by live_status_service)
+        """
+        logger.info("🔄 Running YouTube sync...")
+        await self.sync_channel_stats()
+        try:
+            await self.sync_catalog()
+        except Exception as e:
+            logger.error(f"❌ Catalog sync failed, syncing latest uploads only: {e}")
+            await self.sync_latest_videos()
+        logger.info("✅ YouTube sync complete")
+
     async def run_periodic_sync(self, interval_minutes: int = 5):
         """
         Run periodic synchronization
@@ -264,13 +296,7 @@ class YouTubeSyncManager:
         
         while True:
             try:
-                logger.info("🔄 Running periodic sync...")
-                
-                # Sync channel stats
-                await self.sync_channel_stats()
-                
-                # Sync latest videos
-                await self.sync_latest_videos()
+                await self.run_sync_cycle()
                 
                 # Check live status
                 live_status = await self.check_live_status()
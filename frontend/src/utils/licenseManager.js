@@ -185,6 +185,8 @@ export const activateFullLicense = async (licenseKey) => {
     licenseData.activationDate = new Date().toISOString();
     licenseData.backendVerified = true;
     licenseData.verifiedAt = new Date().toISOString();
+    // Signed token for repeat checks via /api/license/verify-token
+    licenseData.licenseToken = result.license_token || null;
     
     localStorage.setItem(LICENSE_STORAGE_KEY, JSON.stringify(licenseData));
     
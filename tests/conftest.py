@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend modules are imported flat (as the server does), so put backend/ on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
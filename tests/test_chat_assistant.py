@@ -0,0 +1,32 @@
+import asyncio
+
+from chat_assistant import ChatAssistant, normalize_question
+
+
+class _Chat:
+    def __init__(self, session_id: str, system_message: str):
+        self.session_id = session_id
+
+    async def send_message(self, message: str) -> str:
+        return f"answer to {message!r} for {self.session_id}"
+
+
+def test_normalize_question_ignores_case_punctuation_and_filler():
+    assert normalize_question("Hey, What's the SCHEDULE??") == normalize_question("what is the schedule")
+    assert normalize_question("hi!! thanks") == ""
+
+
+def test_filler_only_messages_are_not_cached():
+    async def scenario():
+        assistant = ChatAssistant(_Chat, lambda text: text)
+        first, first_cached = await assistant.answer("hi!", "s1")
+        second, second_cached = await assistant.answer("thanks bro", "s2")
+        assert not first_cached and not second_cached
+        assert "s2" in second
+        assert assistant.get_stats()["cached_responses"] == 0
+
+        await assistant.answer("what is the schedule", "s3")
+        answer, cached = await assistant.answer("Hey, what's the schedule?", "s4")
+        assert cached and "s3" in answer
+
+    asyncio.run(scenario())
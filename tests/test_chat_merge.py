@@ -0,0 +1,101 @@
+import asyncio
+import importlib
+
+import chat_merge
+from chat_merge import ChatMergeEngine, ChatMergeHub, ChatSource, FakeChatSource, parse_twitch_privmsg
+
+
+class ManualClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _collect(engine: ChatMergeEngine, count: int, timeout: float = 2.0):
+    _, queue = engine.subscribe()
+    engine.start()
+    try:
+        return [await asyncio.wait_for(queue.get(), timeout) for _ in range(count)]
+    finally:
+        await engine.stop()
+
+
+def _msg(message_id: str, ts: float) -> dict:
+    return {"id": message_id, "username": message_id, "message": message_id, "timestamp": ts}
+
+
+def test_merges_sources_in_timestamp_order():
+    a = FakeChatSource("a", [_msg("a1", 1), _msg("a2", 4), _msg("a3", 6)])
+    b = FakeChatSource("b", [_msg("b1", 2), _msg("b2", 3), _msg("b3", 5)])
+    engine = ChatMergeEngine([a, b], clock=ManualClock())
+
+    merged = asyncio.run(_collect(engine, 6))
+
+    assert [m["id"] for m in merged] == ["a1", "b1", "b2", "a2", "b3", "a3"]
+    assert [m["source"] for m in merged] == ["a", "b", "b", "a", "b", "a"]
+    assert not any(m.get("late") for m in merged)
+
+
+def test_iso_and_epoch_timestamps_interleave():
+    a = FakeChatSource("a", [_msg("a1", "1970-01-01T00:00:10+00:00")])
+    b = FakeChatSource("b", [_msg("b1", 5.0), _msg("b2", 15.0)])
+    merged = asyncio.run(_collect(ChatMergeEngine([a, b], clock=ManualClock()), 3))
+    assert [m["id"] for m in merged] == ["b1", "a1", "b2"]
+
+
+def test_duplicate_ids_are_emitted_once():
+    # Same message seen by two sources (or replayed after an adapter reconnect)
+    a = FakeChatSource("a", [_msg("x", 1), _msg("y", 2)])
+    b = FakeChatSource("b", [_msg("x", 1), _msg("z", 3)])
+    engine = ChatMergeEngine([a, b], clock=ManualClock())
+
+    merged = asyncio.run(_collect(engine, 3))
+
+    assert [m["id"] for m in merged] == ["x", "y", "z"]
+    assert engine.stats["duplicates"] == 1
+
+
+def test_messages_without_id_are_never_deduplicated():
+    source = FakeChatSource("a", [{"message": "hi", "timestamp": 1}, {"message": "hi", "timestamp": 1}])
+    merged = asyncio.run(_collect(ChatMergeEngine([source], clock=ManualClock()), 2))
+    assert merged[0]["id"] != merged[1]["id"]
+
+
+def test_house_streamers_share_one_site_source():
+    key, factories, unsupported = ChatMergeHub().resolve_sources(
+        {"remza019": "youtube", "remza019_twitch": "twitch", "someone": "kick"}
+    )
+    assert key == ("site",)
+    assert unsupported == ["someone"]
+
+
+def test_twitch_adapter_is_registered(monkeypatch):
+    monkeypatch.setattr(chat_merge, "_adapters", {})
+    importlib.reload(importlib.import_module("multi_streamer_api"))
+
+    key, factories, _ = ChatMergeHub().resolve_sources({"partner": "twitch"})
+    source = factories["partner"]()
+    assert key == ("partner",)
+    assert isinstance(source, chat_merge.TwitchChatSource)
+    assert source.channel == "partner"
+
+
+def test_chat_source_is_abstract():
+    try:
+        ChatSource("x")
+    except TypeError:
+        return
+    raise AssertionError("ChatSource without stream() should not be instantiable")
+
+
+def test_parse_twitch_privmsg():
+    line = ("@display-name=Foo\\sBar;id=abc;tmi-sent-ts=1700000000000;user-id=9 "
+            ":foo!foo@foo.tmi.twitch.tv PRIVMSG #chan :hello :) there")
+    assert parse_twitch_privmsg(line) == {
+        "id": "abc", "username": "Foo Bar", "user_id": "9", "message": "hello :) there",
+        "timestamp": "2023-11-14T22:13:20+00:00",
+    }
+    assert parse_twitch_privmsg(":tmi.twitch.tv 001 justinfan1 :Welcome") is None
+    assert parse_twitch_privmsg("PING :tmi.twitch.tv") is None
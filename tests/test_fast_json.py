@@ -0,0 +1,39 @@
+import asyncio
+
+from fast_json import PayloadCache, etag_matches
+
+
+def test_invalidate_during_build_is_not_stored():
+    async def scenario():
+        cache = PayloadCache(enabled=True, max_entries=8)
+        source = {"price": 10}
+        reading = asyncio.Event()
+        release = asyncio.Event()
+
+        async def producer():
+            data = dict(source)
+            reading.set()
+            await release.wait()
+            return data
+
+        build = asyncio.create_task(cache._payload("merch:list", producer, ttl=60))
+        await reading.wait()
+        # The write and its invalidation land after the producer already read
+        source["price"] = 12
+        cache.invalidate("merch:")
+        release.set()
+        assert (await build).body == b'{"price":10}'
+
+        fresh = await cache._payload("merch:list", producer, ttl=60)
+        assert fresh.body == b'{"price":12}'
+        assert cache.stats["misses"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_etag_matches_weak_and_lists():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from highlight_detector import _to_seconds, detect_highlight_windows
+
+
+def test_naive_and_utc_timestamps_share_one_origin():
+    chat = ["2026-10-19T20:00:00", "2026-10-19T20:00:30.500000"]
+    events = ["2026-10-19T20:15:00Z"]
+    origin = datetime(2026, 10, 19, 20, 0, tzinfo=timezone.utc)
+
+    assert list(_to_seconds(chat, origin)) == [0.0, 30.5]
+    assert list(_to_seconds(events, origin)) == [900.0]
+    # Naive stream start against "Z" timestamps
+    assert list(_to_seconds(events, datetime(2026, 10, 19, 20, 0))) == [900.0]
+
+
+def test_detect_with_mixed_naive_and_aware_input():
+    chat = [{"user": f"u{i % 7}", "message": "hello", "timestamp": f"2026-10-19T20:{i // 6:02d}:{(i % 6) * 10:02d}"}
+            for i in range(360)]
+    chat += [{"user": f"h{i}", "message": "POG clutch", "timestamp": "2026-10-19T20:45:05Z"} for i in range(80)]
+    events = [{"type": "victory_royale", "timestamp": "2026-10-19T20:45:00Z"}]
+
+    candidates = detect_highlight_windows(chat, events, stream_start=datetime(2026, 10, 19, 20, 0))
+    assert candidates
+    assert candidates[0]["start_time"] <= 2705 <= candidates[0]["end_time"]
+
+    # No stream start: origin is the earliest timestamp across both kinds
+    assert detect_highlight_windows(chat, events)[0]["start_time"] <= 2705
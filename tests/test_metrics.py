@@ -0,0 +1,11 @@
+from metrics import metrics_authorized
+
+
+def test_metrics_requires_configured_bearer_token():
+    assert metrics_authorized("Bearer s3cret", token="s3cret")
+    assert metrics_authorized("bearer s3cret", token="s3cret")
+    assert not metrics_authorized("Bearer wrong", token="s3cret")
+    assert not metrics_authorized("Basic s3cret", token="s3cret")
+    assert not metrics_authorized(None, token="s3cret")
+    # Unset token: the endpoint stays closed rather than open
+    assert not metrics_authorized("Bearer ", token="")
@@ -0,0 +1,40 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import presence_api
+from presence import PresenceService
+
+
+def _client(monkeypatch, hops: int) -> TestClient:
+    monkeypatch.setattr(presence_api, "TRUSTED_PROXY_HOPS", hops)
+    monkeypatch.setattr(presence_api, "PRESENCE_IDS_PER_IP", 2)
+    monkeypatch.setattr(presence_api, "_ip_budget", presence_api._IpBudget())
+    monkeypatch.setattr(presence_api, "get_presence_service", lambda service=PresenceService(): service)
+    app = FastAPI()
+    app.include_router(presence_api.presence_router)
+    return TestClient(app)
+
+
+def _beat(client: TestClient, viewer: str, forwarded: str) -> int:
+    return client.post("/api/presence/heartbeat", json={"viewer_id": viewer},
+                       headers={"X-Forwarded-For": forwarded}).status_code
+
+
+def test_budget_per_forwarded_client_behind_proxy(monkeypatch):
+    client = _client(monkeypatch, hops=1)
+    # Every request arrives from the proxy; each viewer address gets its own budget
+    assert [_beat(client, f"v{i}", f"203.0.113.{i}") for i in range(10)] == [200] * 10
+    assert [_beat(client, f"w{i}", "198.51.100.7") for i in range(3)] == [200, 200, 429]
+
+
+def test_forged_forwarded_entries_are_ignored(monkeypatch):
+    client = _client(monkeypatch, hops=1)
+    # A client prepending fake addresses still lands in the budget of the address the proxy saw
+    codes = [_beat(client, f"v{i}", f"10.0.0.{i}, 198.51.100.7") for i in range(3)]
+    assert codes == [200, 200, 429]
+
+
+def test_forwarded_header_untrusted_without_proxy(monkeypatch):
+    client = _client(monkeypatch, hops=0)
+    codes = [_beat(client, f"v{i}", f"203.0.113.{i}") for i in range(3)]
+    assert codes == [200, 200, 429]
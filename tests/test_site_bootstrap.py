@@ -0,0 +1,85 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import site_bootstrap
+import site_bootstrap_api
+
+
+class _State:
+    """site_bootstrap_state stand-in: just the generation counter"""
+
+    def __init__(self):
+        self.generation = 0
+
+    async def find_one(self, query, projection=None):
+        return {"generation": self.generation}
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        self.generation += update["$inc"]["generation"]
+        return {"generation": self.generation}
+
+
+class _Db:
+    def __init__(self):
+        self.site_bootstrap_state = _State()
+
+
+def _bootstrap(monkeypatch, collect) -> site_bootstrap.SiteBootstrap:
+    monkeypatch.setattr(site_bootstrap, "REBUILD_DEBOUNCE_SECONDS", 0)
+    bootstrap = site_bootstrap.SiteBootstrap()
+    db = _Db()
+    bootstrap._db = lambda: db
+    bootstrap._collect = collect
+    return bootstrap
+
+
+def test_invalidation_during_build_publishes_a_new_generation(monkeypatch):
+    async def scenario():
+        source = {"theme": "old"}
+        reading = asyncio.Event()
+        release = asyncio.Event()
+
+        async def collect():
+            snapshot = dict(source)
+            reading.set()
+            await release.wait()
+            return snapshot
+
+        bootstrap = _bootstrap(monkeypatch, collect)
+        bootstrap.invalidate("theme")
+        await reading.wait()
+        generation = bootstrap._generation
+        # A second admin write lands after the in-flight build already read the old data
+        source["theme"] = "new"
+        bootstrap.invalidate("theme again")
+        release.set()
+        await bootstrap._rebuild_task
+
+        snapshot = await bootstrap.get()
+        assert b'"theme":"new"' in snapshot.body
+        assert bootstrap._generation == generation + 1
+        assert not bootstrap._dirty
+
+    asyncio.run(scenario())
+
+
+def test_bundle_respects_gzip_q_zero(monkeypatch):
+    async def collect():
+        return {"theme": "x" * 4096}
+
+    bootstrap = _bootstrap(monkeypatch, collect)
+    monkeypatch.setattr(site_bootstrap_api, "get_site_bootstrap", lambda: bootstrap)
+    app = FastAPI()
+    app.include_router(site_bootstrap_api.site_bootstrap_router)
+    client = TestClient(app)
+
+    refused = client.get("/api/site/bootstrap", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+    assert refused.json()["theme"] == "x" * 4096
+
+    accepted = client.get("/api/site/bootstrap", headers={"Accept-Encoding": "gzip"})
+    assert accepted.headers["content-encoding"] == "gzip"
+    # httpx decodes the body transparently
+    assert accepted.content == refused.content
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import web_push
+from web_push import DeliveryReport, VapidSigner, WebPushEngine
+
+
+def _signer() -> VapidSigner:
+    key = ec.generate_private_key(ec.SECP256R1())
+    return VapidSigner(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                         serialization.NoEncryption()).decode())
+
+
+def test_backoff_does_not_hold_the_origin_slot():
+    async def scenario():
+        delivered_at = {}
+        attempts = {"a": 0}
+        started = time.perf_counter()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            name = request.url.path.strip("/")
+            if name == "a" and attempts["a"] == 0:
+                attempts["a"] += 1
+                return httpx.Response(503, headers={"Retry-After": "0.3"})
+            delivered_at[name] = time.perf_counter() - started
+            return httpx.Response(201)
+
+        engine = WebPushEngine(signer=_signer(), transport=httpx.MockTransport(handler), per_origin=1)
+        report = DeliveryReport(2)
+        first = asyncio.create_task(engine._deliver("https://push.test/a", b"x", 60, "normal", None, report))
+        await asyncio.sleep(0.05)
+        await engine._deliver("https://push.test/b", b"x", 60, "normal", None, report)
+        await first
+        await engine.close()
+
+        # b went out while a was waiting out its Retry-After
+        assert delivered_at["b"] < 0.3 <= delivered_at["a"]
+        assert report.delivered == 2 and report.retried == 1
+
+    asyncio.run(scenario())
+
+
+def test_send_batch_bounds_requests_in_flight(monkeypatch):
+    async def scenario():
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.005)
+            in_flight["now"] -= 1
+            return httpx.Response(201)
+
+        async def encrypted_chunks(payload, subscriptions, out):
+            for endpoint, _, _ in subscriptions:
+                await out.put((endpoint, b"x", None))
+            await out.put(None)
+
+        engine = WebPushEngine(signer=_signer(), transport=httpx.MockTransport(handler), send_workers=4)
+        monkeypatch.setattr(engine, "_encrypted_chunks", encrypted_chunks)
+        subscriptions = [{"endpoint": f"https://push.test/{i}", "keys": {"p256dh": "k", "auth": "a"}}
+                         for i in range(50)]
+        result = await engine.send_batch(subscriptions, {"title": "live"})
+        await engine.close()
+
+        assert result["delivered"] == 50
+        assert 1 < in_flight["max"] <= 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+from youtube_scraper import extract_initial_data, parse_channel_page, parse_count, parse_videos
+
+FIXTURES = Path(__file__).parent / "fixtures" / "youtube"
+NOW = datetime(2026, 10, 19, 12, 0, tzinfo=timezone.utc)
+
+
+def _html(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_videos_tab_stats_and_videos():
+    result = parse_channel_page(_html("videos_tab.html"))
+
+    assert result["channel_stats"] == {"subscriber_count": "1200", "video_count": "127", "view_count": "60000"}
+    assert [v["id"] for v in result["videos"]] == ["XnEtSLaI5Vo", "GUhc9NBBxBM", "a1B2c3D4e5F"]
+    assert result["featured_video"] == result["videos"][0]
+
+
+def test_videos_tab_video_fields():
+    first, second, third = parse_videos(extract_initial_data(_html("videos_tab.html")), now=NOW)
+
+    assert first == {
+        "id": "XnEtSLaI5Vo",
+        "title": "Rocket Racing ranked grind",
+        "description": "Road to Unreal",
+        "thumbnail_url": "https://i.ytimg.com/vi/XnEtSLaI5Vo/maxresdefault.jpg",
+        "published_at": "2026-10-16T12:00:00Z",
+        "view_count": "1234",
+        "duration": "PT1H2M3S",
+    }
+    assert second["published_at"] == "2026-10-05T12:00:00Z"
+    assert second["duration"] == "PT14M32S"
+    # No title, thumbnail or views: placeholders instead of empty fields
+    assert third["title"] == "REMZA019 Gaming Video 3"
+    assert third["thumbnail_url"] == "https://img.youtube.com/vi/a1B2c3D4e5F/hqdefault.jpg"
+    assert third["view_count"] == "0"
+    assert third["published_at"] == "2026-10-19T07:00:00Z"
+
+
+def test_video_limit():
+    data = extract_initial_data(_html("videos_tab.html"))
+    assert len(parse_videos(data, limit=2, now=NOW)) == 2
+
+
+def test_legacy_grid_layout():
+    result = parse_channel_page(_html("videos_tab_legacy_grid.html"))
+
+    assert result["channel_stats"]["subscriber_count"] == "980"
+    assert result["channel_stats"]["video_count"] == "1045"
+    assert result["videos"][0]["id"] == "Zz9yX8wV7uT"
+    assert result["videos"][0]["view_count"] == "12000"
+
+
+def test_page_without_initial_data():
+    assert extract_initial_data(_html("consent_page.html")) is None
+    assert parse_channel_page(_html("consent_page.html")) is None
+
+
+def test_parse_count():
+    assert parse_count("1.2K") == "1200"
+    assert parse_count("3M") == "3000000"
+    assert parse_count("1,234") == "1234"
+    assert parse_count("n/a") == "0"